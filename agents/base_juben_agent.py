@@ -44,7 +44,7 @@ try:
     from ..utils.logger import JubenLogger
     from ..utils.zhipu_search import zhipu_search
     from ..utils.knowledge_base_client import KnowledgeBaseClient
-    from ..utils.token_accumulator import TokenUsage, create_token_accumulator, add_token_usage, get_billing_summary
+    from ..utils.token_accumulator import TokenUsage, acreate_token_accumulator, add_token_usage, get_billing_summary
     from ..utils.langsmith_client import create_langsmith_llm_client
     from ..utils.storage_manager import get_storage, ChatMessage, ContextState, Note
     from ..utils.agent_output_storage import get_agent_output_storage
@@ -57,6 +57,7 @@ try:
     from ..utils.memory_manager import get_unified_memory_manager, get_user_profile_manager
     from ..utils.memory_settings import get_memory_settings_manager
     from ..utils.output_schema_registry import get_output_schema_registry
+    from ..utils.llm_response_cache import get_llm_response_cache
     from ..services.output_archive_service import OutputArchiveService
     from apis.core.schemas import FileType
 except ImportError:
@@ -69,7 +70,7 @@ except ImportError:
     from utils.logger import JubenLogger
     from utils.zhipu_search import zhipu_search
     from utils.knowledge_base_client import KnowledgeBaseClient
-    from utils.token_accumulator import TokenUsage, create_token_accumulator, add_token_usage, get_billing_summary
+    from utils.token_accumulator import TokenUsage, acreate_token_accumulator, add_token_usage, get_billing_summary
     from utils.langsmith_client import create_langsmith_llm_client
     from utils.storage_manager import get_storage, ChatMessage, ContextState, Note
     from utils.agent_output_storage import get_agent_output_storage
@@ -82,10 +83,44 @@ except ImportError:
     from utils.memory_manager import get_unified_memory_manager, get_user_profile_manager
     from utils.memory_settings import get_memory_settings_manager
     from utils.output_schema_registry import get_output_schema_registry
+    from utils.llm_response_cache import get_llm_response_cache
     from services.output_archive_service import OutputArchiveService
     from apis.core.schemas import FileType
 
 
+class _LazyComponent:
+    """
+    延迟初始化的Agent子组件
+
+    首次访问时调用对应的 _init_xxx 方法完成初始化；显式赋值（包括子类在构造函数中覆盖）优先。
+    初始化方法未赋值或抛出异常时组件视为不可用（None），不会在每次访问时重试。
+    """
+
+    def __init__(self, init_method: str):
+        self.init_method = init_method
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.slot = f"_lazy_{name}"
+
+    def is_initialized(self, instance) -> bool:
+        return self.slot in instance.__dict__
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        if self.slot not in instance.__dict__:
+            try:
+                getattr(instance, self.init_method)()
+            except Exception as e:
+                instance.logger.warning(f"❌ {self.name} 初始化失败: {e}")
+            instance.__dict__.setdefault(self.slot, None)
+        return instance.__dict__[self.slot]
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.slot] = value
+
+
 class BaseJubenAgent(ABC, ContextManagementMixin):
     """
     竖屏短剧策划助手基础Agent类
@@ -114,6 +149,22 @@ class BaseJubenAgent(ABC, ContextManagementMixin):
     # 🔧 类级别logger用于类方法
     _class_logger: Optional[logging.Logger] = None
 
+    # 重量级子组件：首次使用时才初始化，Agent预热时由 warm_up_components 提前完成
+    project_manager = _LazyComponent("_init_project_manager")
+    notes_manager = _LazyComponent("_init_notes_manager")
+    reference_resolver = _LazyComponent("_init_reference_resolver")
+    multimodal_processor = _LazyComponent("_init_multimodal_processor")
+    stop_manager = _LazyComponent("_init_stop_manager")
+    knowledge_client = _LazyComponent("_init_knowledge_clients")
+    rag_service = _LazyComponent("_init_knowledge_clients")
+    output_archive_service = _LazyComponent("_init_output_archive_service")
+    llm_client = _LazyComponent("_init_llm_client")
+
+    _LAZY_COMPONENTS = (
+        "project_manager", "notes_manager", "reference_resolver", "multimodal_processor",
+        "stop_manager", "knowledge_client", "rag_service", "output_archive_service", "llm_client",
+    )
+
     def __init__(self, agent_name: str, model_provider: str = "zhipu", enable_enhanced_context: bool = False):
         """
         初始化基础Agent
@@ -143,10 +194,6 @@ class BaseJubenAgent(ABC, ContextManagementMixin):
         self.context_tail_max_chars = getattr(self.config, 'context_tail_max_chars', 600)
         self.context_middle_term_limit = getattr(self.config, 'context_middle_term_limit', 5)
 
-        # 🆕 【新增】项目管理器
-        self.project_manager = None
-        self._init_project_manager()
-
         # 🚀 【性能优化配置】从全局配置中读取性能设置
         self.enable_thought_streaming = getattr(self.config, 'enable_thought_streaming', True)
         self.thought_min_length = getattr(self.config, 'thought_min_length', 20)
@@ -155,6 +202,10 @@ class BaseJubenAgent(ABC, ContextManagementMixin):
         
         # Token累加器相关
         self.current_token_accumulator_key = None
+
+        # LLM响应缓存（按Agent开启，只作用于 temperature=0 的确定性调用）
+        self.llm_cache_enabled = False
+        self.llm_response_cache = None
         
         # 性能监控器
         self.performance_monitor = get_performance_monitor()
@@ -173,29 +224,13 @@ class BaseJubenAgent(ABC, ContextManagementMixin):
         self._last_disconnect_log_time = OrderedDict()  # session_id -> timestamp
         self._disconnect_log_interval = 60  # 60秒内不重复输出断网日志
         
-        # 🆕 【新增】Notes系统集成
-        self.notes_manager = None
-        self._init_notes_manager()
-        
-        # 🆕 【新增】智能引用解析器
-        self.reference_resolver = None
-        self._init_reference_resolver()
-        
-        # 🆕 【新增】多模态处理器
-        self.multimodal_processor = None
-        self._init_multimodal_processor()
-        
-        # 🆕 【新增】停止管理器
-        self.stop_manager = None
-        self._init_stop_manager()
-
         # 🆕 【新增】反馈追踪支持
         self._current_trace_id = None
         self._trace_tracking_enabled = True
         self._output_schema: Optional[Dict[str, Any]] = None
         self._output_constraint_template: Optional[str] = None
 
-        # 初始化客户端
+        # 初始化客户端（项目管理器、Notes、引用解析、多模态、停止管理、知识库与LLM客户端在首次使用时初始化）
         self._init_clients()
         self.structured_output_guard = StructuredOutputGuard()
         self._rag_trace: List[Dict[str, Any]] = []
@@ -508,51 +543,69 @@ class BaseJubenAgent(ABC, ContextManagementMixin):
             # 初始化智谱搜索客户端
             self.search_client = zhipu_search
 
-            # 初始化知识库客户端
-            self.knowledge_client = KnowledgeBaseClient()
-
-            # 初始化RAG服务 (可选，如果类不存在则跳过)
-            try:
-                from utils.rag_service import RAGService
-                self.rag_service = RAGService(
-                    logger=self.logger,
-                    search_client=self.search_client,
-                    knowledge_client=self.knowledge_client
-                )
-            except ImportError:
-                self.logger.warning("RAG服务不可用，跳过初始化")
-                self.rag_service = None
-
             # 初始化存储管理器
             self.storage_manager = get_storage()
 
             # 初始化Agent输出存储管理器
             self.output_storage = get_agent_output_storage()
-            self.output_archive_service = OutputArchiveService(
-                logger=self.logger,
-                output_storage=self.output_storage,
-                project_manager=self.project_manager,
-                agent_id=self.agent_id
-            )
-
-            # 初始化LLM客户端
-            self._init_llm_client()
 
             self.logger.info("客户端初始化完成")
         except Exception as e:
             self.logger.error(f"客户端初始化失败: {e}")
             raise
+
+    def _init_knowledge_clients(self):
+        """初始化知识库客户端与RAG服务"""
+        self.knowledge_client = KnowledgeBaseClient()
+
+        # 初始化RAG服务 (可选，如果类不存在则跳过)
+        try:
+            from utils.rag_service import RAGService
+            self.rag_service = RAGService(
+                logger=self.logger,
+                search_client=self.search_client,
+                knowledge_client=self.knowledge_client
+            )
+        except ImportError:
+            self.logger.warning("RAG服务不可用，跳过初始化")
+            self.rag_service = None
+
+    def _init_output_archive_service(self):
+        """初始化Agent输出归档服务"""
+        self.output_archive_service = OutputArchiveService(
+            logger=self.logger,
+            output_storage=self.output_storage,
+            project_manager=self.project_manager,
+            agent_id=self.agent_id
+        )
+
+    def warm_up_components(self) -> Dict[str, float]:
+        """
+        提前初始化所有延迟子组件（Agent预热时调用，避免首个请求承担初始化开销）
+
+        Returns:
+            Dict[str, float]: 本次初始化的子组件及耗时（毫秒）
+        """
+        timings = {}
+        for name in self._LAZY_COMPONENTS:
+            component = getattr(type(self), name)
+            if component.is_initialized(self):
+                continue
+            start = time.perf_counter()
+            getattr(self, name)
+            timings[name] = round((time.perf_counter() - start) * 1000, 2)
+        return timings
     
     def _init_llm_client(self):
         """初始化LLM客户端"""
         try:
             try:
-                from ..utils.llm_client import get_llm_client
+                from ..utils.llm_router import get_routed_llm_client
             except ImportError:
-                from utils.llm_client import get_llm_client
+                from utils.llm_router import get_routed_llm_client
             
-            # 获取基础LLM客户端
-            base_llm_client = get_llm_client(self.model_provider)
+            # 获取基础LLM客户端（配置了 LLM_FALLBACK_PROVIDERS 时为带对冲/故障转移的路由客户端）
+            base_llm_client = get_routed_llm_client(self.model_provider)
             
             # 包装LangSmith追踪
             enable_tracing = os.getenv("LANGCHAIN_API_KEY") is not None
@@ -871,6 +924,8 @@ class BaseJubenAgent(ABC, ContextManagementMixin):
 
                 # 使用asyncio.timeout实现超时控制
                 async def do_search():
+                    if hasattr(self.search_client, "asearch_web"):
+                        return await self.search_client.asearch_web(query, count=count)
                     return self.search_client.search_web(query, count=count)
 
                 result = await asyncio.wait_for(do_search(), timeout=timeout)
@@ -1113,6 +1168,17 @@ class BaseJubenAgent(ABC, ContextManagementMixin):
             expect_json = kwargs.pop("expect_json", False) or bool(self._output_schema)
             output_schema = kwargs.pop("output_schema", None) or self._output_schema
 
+            # 响应缓存：命中时跳过LLM调用
+            response_cache = None
+            if kwargs.pop("use_cache", self.llm_cache_enabled):
+                response_cache = self.llm_response_cache or get_llm_response_cache()
+                if not response_cache.is_cacheable(kwargs):
+                    response_cache = None
+            if response_cache is not None:
+                cached = await response_cache.get(messages, self._llm_cache_model_id(), kwargs)
+                if cached is not None:
+                    return cached
+
             # 使用带追踪的LLM调用（带超时）
             async def do_chat():
                 if hasattr(self.llm_client, 'chat_with_tracing'):
@@ -1138,7 +1204,7 @@ class BaseJubenAgent(ABC, ContextManagementMixin):
             if expect_json or self.structured_output_guard.detect_json_intent(messages):
                 if output_schema is None:
                     output_schema = self.structured_output_guard.extract_inline_schema(messages)
-                return await self.structured_output_guard.enforce_json_string(
+                response = await self.structured_output_guard.enforce_json_string(
                     self.llm_client,
                     messages,
                     response,
@@ -1146,6 +1212,9 @@ class BaseJubenAgent(ABC, ContextManagementMixin):
                     constraint_template=self._output_constraint_template,
                 )
 
+            if response_cache is not None:
+                await response_cache.set(messages, self._llm_cache_model_id(), kwargs, response)
+
             return response
         except (ValueError, TimeoutError):
             raise
@@ -1153,6 +1222,23 @@ class BaseJubenAgent(ABC, ContextManagementMixin):
             self.logger.error(f"LLM调用失败: {e}")
             raise
 
+    def enable_llm_cache(self, cache=None):
+        """
+        开启LLM响应缓存
+
+        适用于分类、路由等确定性调用；只有显式传入 temperature=0 的调用才会读写缓存
+
+        Args:
+            cache: 自定义 LLMResponseCache，默认使用全局共享实例
+        """
+        self.llm_cache_enabled = True
+        self.llm_response_cache = cache
+
+    def _llm_cache_model_id(self) -> str:
+        """缓存键中的模型标识（提供商 + 模型）"""
+        client = getattr(self.llm_client, "base_llm_client", self.llm_client)
+        return f"{self.model_provider}:{getattr(client, 'model', '')}"
+
     async def _call_llm_with_retry(
         self,
         messages: List[Dict[str, str]],
@@ -1508,7 +1594,7 @@ class BaseJubenAgent(ABC, ContextManagementMixin):
             str: 累加器键
         """
         try:
-            accumulator_key = create_token_accumulator(user_id, session_id, request_timestamp)
+            accumulator_key = await acreate_token_accumulator(user_id, session_id)
             self.current_token_accumulator_key = accumulator_key
             self.logger.info(f"🔢 {self.agent_name} 创建Token累加器: {accumulator_key}")
             return accumulator_key
@@ -3864,6 +3950,8 @@ class BaseJubenAgent(ABC, ContextManagementMixin):
             ]
 
             if event.get("event_type") in final_event_types:
+                # 会话完成时立即落库缓冲中的流式事件
+                await self.storage_manager.flush_stream_events(user_id, session_id)
                 await self._auto_save_final_result(event, user_id, session_id)
 
         except Exception as e:
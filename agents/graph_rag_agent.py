@@ -16,7 +16,6 @@ GraphRAG Integration Agent
 创建时间：2025-02-08
 """
 
-import asyncio
 import logging
 from typing import Dict, List, Any, Optional, AsyncGenerator
 from datetime import datetime, timezone
@@ -100,13 +99,9 @@ class GraphRAGAgent(BaseJubenAgent):
     def __init__(self, model_provider: str = "zhipu"):
         super().__init__("graph_rag_agent", model_provider)
         self.llm_client = LLMClient(model_provider)
+        # 图谱管理器在首个请求时初始化（Agent可能在没有事件循环的工作线程中构造）
         self.graph_manager = None
 
-        async def _init():
-            self.graph_manager = await get_enhanced_graph_manager()
-
-        asyncio.create_task(_init())
-
     async def process_request(
         self,
         request_data: Dict[str, Any],
@@ -124,6 +119,9 @@ class GraphRAGAgent(BaseJubenAgent):
         """
         operation = request_data.get("operation", "ask_question")
 
+        if self.graph_manager is None:
+            self.graph_manager = await get_enhanced_graph_manager()
+
         if operation == "ask_question":
             async for event in self._ask_question(request_data):
                 yield event
@@ -28,7 +28,7 @@ from .base_juben_agent import BaseJubenAgent
 from ..utils.logger import JubenLogger
 from ..utils.error_handler import JubenErrorHandler
 from ..utils.workflow_manager import WorkflowManager
-from ..utils.agent_registry import AgentRegistry
+from ..utils.agent_registry import get_agent_registry
 from ..utils.context_builder import get_juben_context_builder
 from ..utils.reference_resolver import get_juben_reference_resolver
 from ..utils.multimodal_processor import get_multimodal_processor
@@ -52,10 +52,13 @@ class JubenOrchestrator(BaseJubenAgent):
         
         # 工作流管理
         self.workflow_manager = WorkflowManager()
-        self.agent_registry = AgentRegistry()
+        self.agent_registry = get_agent_registry()
         
         # 错误处理
         self.error_handler = JubenErrorHandler()
+
+        # 任务类型分析等路由调用复用响应缓存
+        self.enable_llm_cache()
         
         # 🆕 【新增】ReAct模式配置
         self.max_iterations = 4  # 最大迭代次数
@@ -262,7 +265,7 @@ class JubenOrchestrator(BaseJubenAgent):
             ]
             
             # 调用LLM分析
-            response = await self._call_llm(messages, user_id="system", session_id="analysis")
+            response = await self._call_llm(messages, user_id="system", session_id="analysis", temperature=0)
             
             # 解析响应，提取工作流类型
             workflow_type = self._extract_workflow_type(response)
@@ -1385,7 +1388,7 @@ class JubenOrchestrator(BaseJubenAgent):
             ]
             
             # 调用LLM分析
-            response = await self._call_llm(messages, user_id="system", session_id="routing_analysis")
+            response = await self._call_llm(messages, user_id="system", session_id="routing_analysis", temperature=0)
             
             # 解析响应
             try:
@@ -30,6 +30,8 @@ except ImportError:
 
     from agents.base_juben_agent import BaseJubenAgent
 
+from utils.text_chunker import iter_window_chunks
+
 class TextSplitterAgent(BaseJubenAgent):
     """
     文本分割智能体
@@ -89,55 +91,11 @@ class TextSplitterAgent(BaseJubenAgent):
             if len(text) <= chunk_size:
                 return [text]
 
-            chunks = []
-            start = 0
-
-            # 防止无限循环的安全机制：设置最大迭代次数
-            max_iterations = (len(text) // max(1, chunk_size - overlap)) + 100
-            iteration = 0
-
-            while start < len(text):
-                iteration += 1
-                if iteration > max_iterations:
-                    self.logger.error(f"split_text超过最大迭代次数({max_iterations})，强制退出")
-                    break
-
-                # 计算当前块的结束位置
-                end = min(start + chunk_size, len(text))
-
-                # 如果需要保持句子完整性
-                if preserve_sentences and end < len(text):
-                    # 定义句子结束标记
-                    sentence_endings = ['。', '！', '？', '\n', '；', '…']
-
-                    # 在chunk_size范围内寻找最后一个句子结束标记
-                    best_end = end
-                    search_start = max(start, start + int(chunk_size * 0.7))
-
-                    for ending in sentence_endings:
-                        last_ending = text.rfind(ending, search_start, end)
-                        if last_ending > search_start:
-                            best_end = last_ending + 1
-                            break
-
-                    # 如果找到了合适的断点，使用它
-                    if best_end > start + int(chunk_size * 0.5):  # 至少要有chunk_size的一半
-                        end = best_end
-
-                chunk = text[start:end].strip()
-                if chunk:  # 只添加非空块
-                    chunks.append(chunk)
-
-                # 计算下一块的起始位置（考虑重叠）
-                # 确保start至少增加1，防止无限循环
-                next_start = end - overlap
-                if next_start <= start:
-                    next_start = start + 1
-                start = next_start
-
-                # 避免无限循环
-                if start >= len(text):
-                    break
+            # 基于偏移量的流式分块，只在产出时切片
+            chunks = [
+                chunk.content
+                for chunk in iter_window_chunks(text, chunk_size, overlap, preserve_sentences)
+            ]
 
             self.logger.info(f"文本分割完成: 原文长度={len(text)}, chunk_size={chunk_size}, 分割块数={len(chunks)}")
             return chunks
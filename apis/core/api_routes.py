@@ -73,6 +73,7 @@ from utils.logger import get_logger
 from utils.error_handler import get_error_handler, handle_error
 from utils.storage_manager import get_storage
 from utils.agent_dispatch import build_agent_generator
+from utils.agent_registry import get_agent_registry
 from .schemas import (
     BaseResponse, ErrorResponse, ChatRequest, ChatResponse, ResumeRequest, StreamEvent, EventType, StreamContentType, ContentTypeConfig,
     AgentInfo, AgentListResponse, HealthResponse, StatsResponse,
@@ -701,80 +702,45 @@ async def handle_exception(request: Request, exc: Exception):
         ).dict()
     )
 
-# 全局Agent实例
-planner_agent = None
-creator_agent = None
-evaluation_agent = None
-websearch_agent = None
-knowledge_agent = None
-file_reference_agent = None
-story_five_elements_agent = None
-series_analysis_agent = None
-
-
+# Agent实例统一由全局Agent注册表管理（与启动预热、按需加载共享同一实例）
 def get_planner_agent() -> ShortDramaPlannerAgent:
     """获取策划Agent实例"""
-    global planner_agent
-    if planner_agent is None:
-        # 使用 OpenAI 的 gpt-3.5-turbo（最便宜的模型）
-        planner_agent = ShortDramaPlannerAgent(model_provider="openai")
-    return planner_agent
+    return get_agent_registry().get_agent_sync("short_drama_planner_agent")
 
 
 def get_creator_agent() -> ShortDramaCreatorAgent:
     """获取创作Agent实例"""
-    global creator_agent
-    if creator_agent is None:
-        creator_agent = ShortDramaCreatorAgent()
-    return creator_agent
+    return get_agent_registry().get_agent_sync("short_drama_creator_agent")
 
 
 def get_evaluation_agent() -> ShortDramaEvaluationAgent:
     """获取评估Agent实例"""
-    global evaluation_agent
-    if evaluation_agent is None:
-        evaluation_agent = ShortDramaEvaluationAgent()
-    return evaluation_agent
+    return get_agent_registry().get_agent_sync("short_drama_evaluation_agent")
 
 
 def get_websearch_agent() -> WebSearchAgent:
     """获取网络搜索Agent实例"""
-    global websearch_agent
-    if websearch_agent is None:
-        websearch_agent = WebSearchAgent()
-    return websearch_agent
+    return get_agent_registry().get_agent_sync("websearch_agent")
 
 
 def get_knowledge_agent() -> KnowledgeAgent:
     """获取知识库查询Agent实例"""
-    global knowledge_agent
-    if knowledge_agent is None:
-        knowledge_agent = KnowledgeAgent()
-    return knowledge_agent
+    return get_agent_registry().get_agent_sync("knowledge_agent")
 
 
 def get_file_reference_agent() -> FileReferenceAgent:
     """获取文件引用Agent实例"""
-    global file_reference_agent
-    if file_reference_agent is None:
-        file_reference_agent = FileReferenceAgent()
-    return file_reference_agent
+    return get_agent_registry().get_agent_sync("file_reference_agent")
 
 
 def get_story_five_elements_agent() -> StoryFiveElementsAgent:
     """获取故事五元素分析Agent实例"""
-    global story_five_elements_agent
-    if story_five_elements_agent is None:
-        story_five_elements_agent = StoryFiveElementsAgent()
-    return story_five_elements_agent
+    return get_agent_registry().get_agent_sync("story_five_elements_agent")
 
 
 def get_series_analysis_agent() -> SeriesAnalysisAgent:
     """获取已播剧集分析Agent实例"""
-    global series_analysis_agent
-    if series_analysis_agent is None:
-        series_analysis_agent = SeriesAnalysisAgent()
-    return series_analysis_agent
+    return get_agent_registry().get_agent_sync("series_analysis_agent")
 
 
 # 请求模型
@@ -1166,12 +1132,7 @@ async def get_message_info(message_id: str):
             raise HTTPException(status_code=404, detail="消息不存在或已过期")
 
         # 获取缓存的事件数量
-        redis = await stream_manager._get_redis()
-        if redis:
-            cache_key = f"{stream_manager.STREAM_CACHE_PREFIX}{message_id}"
-            cache_size = await redis.llen(cache_key)
-        else:
-            cache_size = 0
+        cache_size = await stream_manager.get_cache_size(message_id)
 
         return {
             "success": True,
@@ -4411,7 +4372,7 @@ async def get_token_ranking(top_n: int = 10, date: str = None):
     try:
         from utils.token_accumulator import get_daily_token_ranking
 
-        ranking = await get_daily_token_ranking(top_n=top_n)
+        ranking = await get_daily_token_ranking(top_n=top_n, target_date=date)
 
         return {
             "success": True,
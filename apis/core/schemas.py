@@ -700,6 +700,7 @@ class ProjectListResponse(BaseResponse):
     total: int = Field(description="项目总数")
     page: int = Field(default=1, description="当前页码")
     page_size: int = Field(default=20, description="每页数量")
+    next_cursor: Optional[str] = Field(default=None, description="下一页游标（keyset分页）")
 
 class ProjectDetailResponse(BaseResponse):
     """项目详情响应模型"""
@@ -764,6 +765,7 @@ class ProjectRestoreRequest(BaseModel):
     """项目恢复请求模型"""
     new_name: Optional[str] = Field(default=None, description="新项目名称（留空则使用原名称）")
     restore_files: bool = Field(default=True, description="是否恢复文件")
+    as_of: Optional[datetime] = Field(default=None, description="按版本历史恢复到该时间点（留空则使用当前文件）")
 
 
 # ==================== Notes系统相关模型（）====================
@@ -30,7 +30,7 @@ try:
     from utils.monitoring_system import MonitoringSystem
     from utils.error_handler import JubenErrorHandler, ErrorType
     from utils.workflow_manager import WorkflowManager
-    from utils.agent_registry import AgentRegistry
+    from utils.agent_registry import get_agent_registry
 except ImportError as e:
     logger.error(f"❌ 导入失败: {e}")
     logger.info("请确保所有依赖模块已正确安装和配置")
@@ -73,7 +73,7 @@ app.add_middleware(GZipMiddleware, minimum_size=1000)
 monitoring_system = MonitoringSystem()
 error_handler = JubenErrorHandler()
 workflow_manager = WorkflowManager()
-agent_registry = AgentRegistry()
+agent_registry = get_agent_registry()
 
 # 启动监控系统
 monitoring_system.start_monitoring()
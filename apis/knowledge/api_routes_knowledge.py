@@ -364,14 +364,9 @@ async def delete_document(document_id: str):
 
         # 从向量库删除
         try:
+            # 上传文档以 knowledge 项目索引（text_id 为 knowledge:document_id:idx）
             indexer = get_rag_indexer()
-            # 假设文档ID格式为 project_id:file_id，这里需要解析
-            # 简化处理：直接按document_id删除
-            client = await get_milvus_client()
-            await client.delete_by_expr(
-                "file_fragments",
-                f'text_id like "{document_id}:%"'
-            )
+            await indexer.delete_project_file_chunks("knowledge", document_id)
         except Exception as e:
             logger.warning(f"删除向量索引失败: {e}")
 
@@ -594,7 +589,7 @@ async def search_documents(request: SearchRequest):
         collection = request.collection or "file_fragments"
 
         # 生成查询向量
-        query_vector = aliyun_embedding_client.embed_texts([request.query])[0]
+        query_vector = await aliyun_embedding_client.aembed_text(request.query)
 
         # 搜索
         results = await client.search_vectors(
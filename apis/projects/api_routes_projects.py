@@ -10,6 +10,7 @@ import uuid
 import logging
 import os
 import json
+import time
 from datetime import datetime
 from pathlib import Path
 from fastapi.responses import FileResponse
@@ -45,6 +46,13 @@ REINDEX_TASKS: Dict[str, Dict[str, Any]] = {}
 REINDEX_TASKS_FILE = Path("logs/reindex_tasks.json")
 REINDEX_WS: Dict[str, List[WebSocket]] = {}
 MAX_TASK_RECORDS = int(os.getenv("REINDEX_TASKS_MAX_RECORDS", "200"))
+# 同时重建索引的文件数
+REINDEX_CONCURRENCY = max(1, int(os.getenv("REINDEX_CONCURRENCY", "4")))
+# 进度更新的落盘间隔（秒）；状态变化总是立即落盘，进度推送不受影响
+REINDEX_SAVE_INTERVAL = float(os.getenv("REINDEX_SAVE_INTERVAL", "2"))
+# 这些字段变化时立即落盘
+_TASK_PERSIST_FIELDS = {"status", "error", "finished_at", "total_files", "result"}
+_last_tasks_save = 0.0
 
 
 def _load_tasks() -> None:
@@ -62,6 +70,8 @@ def _load_tasks() -> None:
 
 
 def _save_tasks() -> None:
+    global _last_tasks_save
+    _last_tasks_save = time.monotonic()
     try:
         # 清理旧任务记录（保留运行中的 + 最近完成的）
         running = {k: v for k, v in REINDEX_TASKS.items() if v.get("status") == "running"}
@@ -73,7 +83,9 @@ def _save_tasks() -> None:
         REINDEX_TASKS.update(running)
 
         REINDEX_TASKS_FILE.parent.mkdir(parents=True, exist_ok=True)
-        REINDEX_TASKS_FILE.write_text(json.dumps(REINDEX_TASKS, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp_file = REINDEX_TASKS_FILE.with_name(REINDEX_TASKS_FILE.name + ".tmp")
+        tmp_file.write_text(json.dumps(REINDEX_TASKS, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp_file, REINDEX_TASKS_FILE)
     except Exception as e:
         logger.warning(f"保存索引任务失败: {e}")
 
@@ -82,7 +94,8 @@ def _update_task(task_id: str, **kwargs) -> None:
     if task_id not in REINDEX_TASKS:
         return
     REINDEX_TASKS[task_id].update(kwargs)
-    _save_tasks()
+    if _TASK_PERSIST_FIELDS.intersection(kwargs) or time.monotonic() - _last_tasks_save >= REINDEX_SAVE_INTERVAL:
+        _save_tasks()
     # 推送进度
     if task_id in REINDEX_WS:
         message = json.dumps(REINDEX_TASKS[task_id], ensure_ascii=False)
@@ -97,17 +110,26 @@ def _update_task(task_id: str, **kwargs) -> None:
                 REINDEX_WS[task_id].remove(ws)
 
 
-def _start_reindex_task(coro, task_type: str, project_id: Optional[str] = None, task_id: Optional[str] = None) -> str:
+def _start_reindex_task(
+    coro,
+    task_type: str,
+    project_id: Optional[str] = None,
+    task_id: Optional[str] = None,
+    user_id: Optional[str] = None
+) -> str:
     task_id = task_id or str(uuid.uuid4())
     REINDEX_TASKS[task_id] = {
         "task_id": task_id,
         "type": task_type,
         "project_id": project_id,
+        "user_id": user_id,
         "status": "running",
         "started_at": datetime.now().isoformat(),
         "finished_at": None,
         "total_files": 0,
         "processed_files": 0,
+        "unchanged_files": 0,
+        "embedded_chunks": 0,
         "progress": 0.0,
         "result": None,
         "error": None
@@ -138,10 +160,10 @@ def _start_reindex_task(coro, task_type: str, project_id: Optional[str] = None,
 _load_tasks()
 
 
-async def _index_project_file(file_data: Dict[str, Any]) -> None:
+async def _index_project_file(file_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     try:
         indexer = get_rag_indexer()
-        await indexer.index_project_file(
+        return await indexer.index_project_file(
             project_id=file_data.get("project_id", ""),
             file_id=file_data.get("id", ""),
             filename=file_data.get("filename", ""),
@@ -152,6 +174,7 @@ async def _index_project_file(file_data: Dict[str, Any]) -> None:
         )
     except Exception as e:
         logger.warning(f"项目文件索引失败: {e}")
+        return None
 
 
 async def _remove_project_file_index(project_id: str, file_id: str) -> None:
@@ -162,53 +185,61 @@ async def _remove_project_file_index(project_id: str, file_id: str) -> None:
         logger.warning(f"删除项目文件索引失败: {e}")
 
 
+async def _reindex_files(files: List[Any], task_id: Optional[str] = None) -> int:
+    """
+    以有限并发重建一组文件的索引
+
+    每个文件与已索引内容比对，未变化的文件直接跳过、变化的文件只重写变化的分块；
+    中断后重新执行时已完成的文件均为未变化，因此可从中断处继续
+
+    Returns:
+        int: 成功处理（含未变化）的文件数
+    """
+    if task_id:
+        _update_task(
+            task_id, total_files=len(files), processed_files=0,
+            unchanged_files=0, embedded_chunks=0, progress=0.0
+        )
+    semaphore = asyncio.Semaphore(REINDEX_CONCURRENCY)
+    succeeded = 0
+
+    async def _run(file) -> None:
+        nonlocal succeeded
+        async with semaphore:
+            result = await _index_project_file(file.dict())
+        if result:
+            succeeded += 1
+        if task_id and task_id in REINDEX_TASKS:
+            task = REINDEX_TASKS[task_id]
+            processed = task.get("processed_files", 0) + 1
+            total = task.get("total_files") or len(files)
+            _update_task(
+                task_id,
+                processed_files=processed,
+                unchanged_files=task.get("unchanged_files", 0) + (1 if result and result["status"] == "unchanged" else 0),
+                embedded_chunks=task.get("embedded_chunks", 0) + (result["embedded"] if result else 0),
+                progress=round(processed / total * 100, 2) if total else 100.0
+            )
+
+    await asyncio.gather(*(_run(file) for file in files))
+    return succeeded
+
+
 async def _reindex_project_files(project_id: str, task_id: Optional[str] = None) -> int:
     manager = get_project_manager()
     files = await manager.get_project_files(project_id)
-    if task_id:
-        _update_task(task_id, total_files=len(files), processed_files=0, progress=0.0)
-    count = 0
-    for file in files:
-        try:
-            await _index_project_file(file.dict())
-            count += 1
-            if task_id:
-                processed = REINDEX_TASKS.get(task_id, {}).get("processed_files", 0) + 1
-                total = REINDEX_TASKS.get(task_id, {}).get("total_files", len(files))
-                progress = round(processed / total * 100, 2) if total else 100.0
-                _update_task(task_id, processed_files=processed, progress=progress)
-        except Exception as e:
-            logger.warning(f"项目文件重建索引失败: {e}")
-    return count
+    return await _reindex_files(files, task_id)
 
 
 async def _reindex_all_projects(user_id: Optional[str] = None, task_id: Optional[str] = None) -> Dict[str, int]:
     manager = get_project_manager()
-    projects = await manager.list_projects(user_id=user_id, status=None, page=1, page_size=100000)
-    files_by_project = []
-    total_files = 0
+    projects = await manager.list_projects(user_id=user_id, status=None, page_size=None)
+    files = []
     for project in projects:
-        project_files = await manager.get_project_files(project.id)
-        total_files += len(project_files)
-        for file in project_files:
-            files_by_project.append((project.id, file))
-    if task_id:
-        _update_task(task_id, total_files=total_files, processed_files=0, progress=0.0)
-    total_files = 0
-    processed = 0
-    for project_id, file in files_by_project:
-        try:
-            await _index_project_file(file.dict())
-            total_files += 1
-        except Exception as e:
-            logger.warning(f"项目文件重建索引失败: {e}")
-        processed += 1
-        if task_id:
-            progress = round(processed / (len(files_by_project) or 1) * 100, 2)
-            _update_task(task_id, processed_files=processed, progress=progress)
+        files.extend(await manager.get_project_files(project.id))
     return {
         "projects": len(projects),
-        "files": total_files
+        "files": await _reindex_files(files, task_id)
     }
 
 router = APIRouter(prefix="/juben/projects", tags=["projects"])
@@ -255,7 +286,8 @@ async def list_projects(
     status: ProjectStatus = Query(default=ProjectStatus.ACTIVE),
     tags: Optional[List[str]] = Query(default=None),
     page: int = Query(default=1, ge=1),
-    page_size: int = Query(default=20, ge=1, le=100)
+    page_size: int = Query(default=20, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None)
 ):
     """
     获取项目列表
@@ -266,22 +298,35 @@ async def list_projects(
         tags: 标签过滤
         page: 页码
         page_size: 每页数量
+        cursor: 游标分页（上一页返回的 next_cursor），提供时忽略 page
 
     Returns:
         ProjectListResponse: 项目列表响应
     """
     try:
         manager = get_project_manager()
-        projects = await manager.list_projects(
-            user_id=user_id,
-            status=status,
-            tags=tags,
-            page=page,
-            page_size=page_size
-        )
+        next_cursor = None
+        if cursor:
+            projects, next_cursor = await manager.list_projects_after(
+                user_id=user_id,
+                status=status,
+                tags=tags,
+                cursor=cursor,
+                limit=page_size
+            )
+        else:
+            projects = await manager.list_projects(
+                user_id=user_id,
+                status=status,
+                tags=tags,
+                page=page,
+                page_size=page_size
+            )
+            if len(projects) == page_size:
+                next_cursor = manager.catalog.encode_cursor(projects[-1].dict())
 
         # 获取总数
-        all_projects = await manager.list_projects(
+        total = await manager.count_projects(
             user_id=user_id,
             status=status,
             tags=tags
@@ -291,9 +336,10 @@ async def list_projects(
             success=True,
             message="获取项目列表成功",
             projects=[p.dict() for p in projects],
-            total=len(all_projects),
+            total=total,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            next_cursor=next_cursor
         )
 
     except Exception as e:
@@ -558,6 +604,101 @@ async def get_project_file(project_id: str, file_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/{project_id}/files/{file_id}/versions", response_model=BaseResponse)
+async def list_project_file_versions(project_id: str, file_id: str):
+    """
+    获取文件版本列表
+
+    Args:
+        project_id: 项目ID
+        file_id: 文件ID
+
+    Returns:
+        BaseResponse: 版本列表响应
+    """
+    try:
+        manager = get_project_manager()
+        versions = await manager.list_file_versions(project_id, file_id)
+
+        return BaseResponse(
+            success=True,
+            message="获取文件版本成功",
+            data={"versions": versions, "total": len(versions)}
+        )
+
+    except Exception as e:
+        logger.error(f"获取文件版本失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{project_id}/files/{file_id}/versions/{version}", response_model=BaseResponse)
+async def get_project_file_version(project_id: str, file_id: str, version: int):
+    """
+    获取文件的指定历史版本
+
+    Args:
+        project_id: 项目ID
+        file_id: 文件ID
+        version: 版本号
+
+    Returns:
+        BaseResponse: 文件内容响应
+    """
+    try:
+        manager = get_project_manager()
+        file = await manager.get_file_version(project_id, file_id, version)
+
+        if not file:
+            raise HTTPException(status_code=404, detail="版本不存在")
+
+        return BaseResponse(
+            success=True,
+            message="获取文件版本成功",
+            data=file.dict()
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"获取文件版本失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/{project_id}/files/{file_id}/versions/{version}/restore", response_model=BaseResponse)
+async def restore_project_file_version(project_id: str, file_id: str, version: int):
+    """
+    将文件回退到指定历史版本
+
+    Args:
+        project_id: 项目ID
+        file_id: 文件ID
+        version: 版本号
+
+    Returns:
+        BaseResponse: 回退后的文件
+    """
+    try:
+        manager = get_project_manager()
+        file = await manager.restore_file_version(project_id, file_id, version)
+
+        if not file:
+            raise HTTPException(status_code=404, detail="版本不存在")
+
+        asyncio.create_task(_index_project_file(file.dict()))
+
+        return BaseResponse(
+            success=True,
+            message="文件版本已恢复",
+            data=file.dict()
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"恢复文件版本失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/{project_id}/files", response_model=BaseResponse)
 async def create_project_file(
     project_id: str,
@@ -715,7 +856,8 @@ async def reindex_all_projects(user_id: Optional[str] = Query(default=None)):
             _reindex_all_projects(user_id=user_id, task_id=task_id),
             task_type="all_reindex",
             project_id=None,
-            task_id=task_id
+            task_id=task_id,
+            user_id=user_id
         )
         return BaseResponse(
             success=True,
@@ -742,6 +884,37 @@ async def reindex_status(task_id: str):
     )
 
 
+@router.post("/reindex/resume/{task_id}", response_model=BaseResponse)
+async def resume_reindex(task_id: str):
+    """
+    继续中断或失败的索引任务
+
+    已按当前内容完成索引的文件会被跳过，只处理剩余文件
+    """
+    task = REINDEX_TASKS.get(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    if task.get("status") == "running":
+        raise HTTPException(status_code=400, detail="任务正在运行")
+
+    if task.get("type") == "project_reindex":
+        coro = _reindex_project_files(task["project_id"], task_id=task_id)
+    else:
+        coro = _reindex_all_projects(user_id=task.get("user_id"), task_id=task_id)
+    _start_reindex_task(
+        coro,
+        task_type=task.get("type", "all_reindex"),
+        project_id=task.get("project_id"),
+        task_id=task_id,
+        user_id=task.get("user_id")
+    )
+    return BaseResponse(
+        success=True,
+        message="已继续索引任务",
+        data={"task_id": task_id}
+    )
+
+
 @router.websocket("/reindex/stream/{task_id}")
 async def reindex_stream(websocket: WebSocket, task_id: str):
     await websocket.accept()
@@ -781,19 +954,24 @@ async def search_projects(request: ProjectSearchRequest):
             query=request.query or "",
             tags=request.tags,
             date_from=request.date_from,
+            date_to=request.date_to,
+            status=request.status,
+            page=request.page,
+            page_size=request.page_size
+        )
+        total = await manager.count_projects(
+            status=request.status,
+            tags=request.tags,
+            query=request.query or None,
+            date_from=request.date_from,
             date_to=request.date_to
         )
 
-        # 分页
-        start = (request.page - 1) * request.page_size
-        end = start + request.page_size
-        paginated_projects = projects[start:end]
-
         return ProjectListResponse(
             success=True,
             message="搜索完成",
-            projects=[p.dict() for p in paginated_projects],
-            total=len(projects),
+            projects=[p.dict() for p in projects],
+            total=total,
             page=request.page,
             page_size=request.page_size
         )
@@ -960,7 +1138,7 @@ async def get_all_tags(user_id: str = Query(default="default_user")):
     """
     try:
         manager = get_project_manager()
-        projects = await manager.list_projects(user_id=user_id)
+        projects = await manager.list_projects(user_id=user_id, page_size=None)
 
         # 收集所有标签
         all_tags = set()
@@ -1306,7 +1484,8 @@ async def restore_project(
         new_project = await manager.restore_project(
             project_id=project_id,
             new_name=request.new_name,
-            restore_files=request.restore_files
+            restore_files=request.restore_files,
+            as_of=request.as_of
         )
 
         if not new_project:
@@ -8,7 +8,7 @@ from difflib import SequenceMatcher
 import json
 from datetime import datetime
 
-from utils.agent_registry import AgentRegistry
+from utils.agent_registry import get_agent_registry
 from utils.agent_dispatch import build_agent_generator
 from utils.graph_consistency import validate_graph, check_character_consistency, check_character_motivation_consistency
 from utils.project_manager import get_project_manager
@@ -40,7 +40,7 @@ def _collect_text(events: List[Dict[str, Any]]) -> str:
 
 @router.post("/stability")
 async def evaluate_stability(request: StabilityRequest):
-    registry = AgentRegistry()
+    registry = get_agent_registry()
     agent = await registry.get_agent(request.agent_id)
     if not agent:
         raise HTTPException(status_code=404, detail="Agent不存在")
@@ -270,6 +270,7 @@ class QuotaSettings(BaseSettings):
     # Redis存储配置
     redis_key_prefix: str = Field(default="quota", env="QUOTA_REDIS_PREFIX", description="Redis键前缀")
     daily_ttl: int = Field(default=86400 * 2, env="QUOTA_DAILY_TTL", description="每日数据过期时间（秒）")
+    usage_flush_interval: float = Field(default=0.0, env="QUOTA_USAGE_FLUSH_INTERVAL", description="Token用量批量写入间隔（秒），0为每次调用立即写入")
 
 
 class PerformanceSettings(BaseSettings):
@@ -279,6 +280,7 @@ class PerformanceSettings(BaseSettings):
     connection_pool_size: int = Field(default=10, env="CONNECTION_POOL_SIZE", description="连接池大小")
     enable_caching: bool = Field(default=True, env="ENABLE_CACHING", description="是否启用缓存")
     cache_ttl: int = Field(default=3600, env="CACHE_TTL", description="缓存生存时间")
+    graph_extraction_concurrency: int = Field(default=4, env="GRAPH_EXTRACTION_CONCURRENCY", description="图谱抽取分块并发数")
 
 
 class JubenSettings(BaseSettings):
@@ -3,6 +3,7 @@
 支持所有 40+ Agents 的统一后端服务
 """
 import uvicorn
+import asyncio
 import logging
 from datetime import datetime
 from fastapi import FastAPI, HTTPException
@@ -23,46 +24,51 @@ startup_logger = logging.getLogger("startup")
 # 添加项目根目录到路径
 sys.path.insert(0, str(Path(__file__).parent))
 
+# ⏱️ 启动性能分析（STARTUP_PROFILE=true 时记录模块导入耗时树，必须在其他导入之前）
+from utils.startup_profiler import get_startup_profiler
+
+startup_profiler = get_startup_profiler()
+
 # 🔒 启动前验证配置（必须在其他导入之前）
 from utils.startup_validator import run_startup_validation
 
-try:
-    # 在开发环境可以设置 SKIP_STARTUP_VALIDATION=1 跳过验证
-    if not os.getenv("SKIP_STARTUP_VALIDATION"):
-        run_startup_validation(strict=True)
-except Exception as e:
-    startup_logger.error(f"❌ 启动验证失败: {e}")
-    startup_logger.info("提示: 开发环境可设置 SKIP_STARTUP_VALIDATION=1 跳过验证")
-    sys.exit(1)
-
-from apis.core.api_routes_modular import router as core_router
-from apis.agents.api_routes_agents import router as agents_router
-from apis.baidu.api_routes_baidu import router as baidu_router
-from apis.tools.api_routes_tools import router as tools_router
-from apis.projects.api_routes_projects import router as projects_router
-from apis.ocr.api_routes_ocr import router as ocr_router
-from apis.filesystem.api_routes_files import router as files_router
-from apis.memory.api_routes_memory import router as memory_router
-from apis.feedback.api_routes_feedback import router as feedback_router
-from apis.evolution.api_routes_evolution import router as evolution_router
-from apis.graph.graph_routes import router as graph_router
-from apis.graph.graph_routes_enhanced import router as graph_enhanced_router
-from apis.auth.api_routes_auth import router as auth_router
-from apis.notes.api_routes_notes import router as notes_router
-from apis.knowledge.api_routes_knowledge import router as knowledge_router
-from apis.statistics.api_routes_statistics import router as statistics_router
-from apis.assets.api_routes_assets import router as assets_router
-from apis.pipelines.api_routes_pipelines import router as pipelines_router
-from apis.release.api_routes_release import router as release_router
-from apis.quality.api_routes_quality import router as quality_router
-from apis.asr.api_routes_asr import router as asr_router
-from middleware.cors_middleware import CORSMiddlewareConfig
-from middleware.auth_middleware import AuthMiddleware, RateLimitMiddleware
-from middleware.request_tracking import RequestTrackingMiddleware
-from middleware.security_headers import SecurityHeadersMiddleware
-from middleware.metrics_middleware import MetricsMiddleware
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
-from utils.logger import get_logger
+with startup_profiler.phase("startup_validation"):
+    try:
+        # 在开发环境可以设置 SKIP_STARTUP_VALIDATION=1 跳过验证
+        if not os.getenv("SKIP_STARTUP_VALIDATION"):
+            run_startup_validation(strict=True)
+    except Exception as e:
+        startup_logger.error(f"❌ 启动验证失败: {e}")
+        startup_logger.info("提示: 开发环境可设置 SKIP_STARTUP_VALIDATION=1 跳过验证")
+        sys.exit(1)
+
+with startup_profiler.phase("import_routes"):
+    from apis.core.api_routes_modular import router as core_router
+    from apis.agents.api_routes_agents import router as agents_router
+    from apis.baidu.api_routes_baidu import router as baidu_router
+    from apis.tools.api_routes_tools import router as tools_router
+    from apis.projects.api_routes_projects import router as projects_router
+    from apis.filesystem.api_routes_files import router as files_router
+    from apis.memory.api_routes_memory import router as memory_router
+    from apis.feedback.api_routes_feedback import router as feedback_router
+    from apis.evolution.api_routes_evolution import router as evolution_router
+    from apis.auth.api_routes_auth import router as auth_router
+    from apis.notes.api_routes_notes import router as notes_router
+    from apis.statistics.api_routes_statistics import router as statistics_router
+    from apis.assets.api_routes_assets import router as assets_router
+    from apis.pipelines.api_routes_pipelines import router as pipelines_router
+    from apis.release.api_routes_release import router as release_router
+    from apis.quality.api_routes_quality import router as quality_router
+
+with startup_profiler.phase("import_middleware"):
+    from middleware.cors_middleware import CORSMiddlewareConfig
+    from middleware.auth_middleware import AuthMiddleware, RateLimitMiddleware
+    from middleware.request_tracking import RequestTrackingMiddleware
+    from middleware.security_headers import SecurityHeadersMiddleware
+    from middleware.metrics_middleware import MetricsMiddleware
+    from middleware.lazy_router import LazyRouterMounter, LazyRouterMiddleware
+    from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+    from utils.logger import get_logger
 
 # 🆕 【新增】导入分布式锁异常处理器
 from utils.distributed_lock import LockAcquisitionError
@@ -199,22 +205,32 @@ app.include_router(agents_router)
 app.include_router(baidu_router)
 app.include_router(tools_router)
 app.include_router(projects_router)
-app.include_router(ocr_router)
 app.include_router(files_router)
 app.include_router(memory_router)
 app.include_router(feedback_router)
 app.include_router(evolution_router)
-app.include_router(graph_router)
-app.include_router(graph_enhanced_router)
 app.include_router(auth_router)
 app.include_router(notes_router, prefix="/juben")
-app.include_router(knowledge_router)
 app.include_router(statistics_router)
 app.include_router(assets_router)
 app.include_router(pipelines_router)
 app.include_router(release_router)
 app.include_router(quality_router)
-app.include_router(asr_router)
+
+# 重量级子系统路由（OCR、图谱、知识库、ASR）：LAZY_ROUTERS=true 时在首次请求其前缀时才导入并挂载
+lazy_routers = LazyRouterMounter(app, profiler=startup_profiler)
+lazy_routers.add("apis.ocr.api_routes_ocr", "/ocr")
+lazy_routers.add("apis.graph.graph_routes", "/graph")
+lazy_routers.add("apis.graph.graph_routes_enhanced", "/graph-enhanced")
+lazy_routers.add("apis.knowledge.api_routes_knowledge", "/juben/knowledge")
+lazy_routers.add("apis.asr.api_routes_asr", "/juben/asr")
+
+if os.getenv("LAZY_ROUTERS", "false").lower() == "true":
+    app.add_middleware(LazyRouterMiddleware, mounter=lazy_routers)
+    logger.info(f"✅ 路由延迟挂载已启用: {[router.module_path for router in lazy_routers.routers]}")
+else:
+    with startup_profiler.phase("import_heavy_routes"):
+        lazy_routers.load_all()
 
 # 静态文件服务 (如果前端构建文件存在)
 frontend_dist = Path(__file__).parent / "frontend" / "dist"
@@ -349,6 +365,14 @@ async def metrics():
     return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
+@app.get("/metrics/startup")
+async def startup_metrics(min_ms: float = 1.0):
+    """启动性能分析：阶段耗时、模块导入耗时树（STARTUP_PROFILE=true）与延迟路由挂载状态"""
+    report = startup_profiler.report(min_ms=min_ms)
+    report["lazy_routers"] = lazy_routers.get_stats()
+    return report
+
+
 @app.on_event("startup")
 async def startup_event():
     """应用启动事件"""
@@ -372,13 +396,29 @@ async def startup_event():
 
     # 🆕 【新增】预热连接池
     try:
-        from utils.connection_pool_manager import get_connection_pool_manager
-        pool_manager = await get_connection_pool_manager()
-        await pool_manager.warmup_pools(['high_priority', 'normal', 'background'])
+        with startup_profiler.phase("warmup_pools"):
+            from utils.connection_pool_manager import get_connection_pool_manager
+            pool_manager = await get_connection_pool_manager()
+            await pool_manager.warmup_pools(['high_priority', 'normal', 'background'])
         logger.info("✅ 连接池预热完成")
     except Exception as e:
         logger.warning(f"⚠️ 连接池预热失败，将在首次使用时创建: {e}")
 
+    # 预热热点Agent（AGENT_PREWARM），默认在后台并行构造；AGENT_PREWARM_BLOCKING=true 时预热完成后才开始接收请求
+    try:
+        from utils.agent_registry import get_agent_registry
+        agent_registry = get_agent_registry()
+        prewarm_types = agent_registry.get_prewarm_agent_types()
+        if prewarm_types:
+            if os.getenv("AGENT_PREWARM_BLOCKING", "false").lower() == "true":
+                with startup_profiler.phase("agent_prewarm"):
+                    await agent_registry.prewarm(prewarm_types)
+            else:
+                app.state.agent_prewarm_task = asyncio.create_task(agent_registry.prewarm(prewarm_types))
+                logger.info(f"✅ Agent后台预热已启动: {len(prewarm_types)} 个")
+    except Exception as e:
+        logger.warning(f"⚠️ Agent预热失败，将在首次使用时构造: {e}")
+
     # 🆕 【新增】启动端口监控服务
     try:
         from utils.port_monitor_service import get_port_monitor_service
@@ -395,6 +435,10 @@ async def startup_event():
     except Exception as e:
         logger.warning(f"⚠️ 端口监控服务启动失败: {e}")
 
+    # 启动完成后停止记录导入耗时（延迟挂载的路由只记录导入总耗时）
+    startup_profiler.stop_import_profiling()
+    startup_profiler.log_summary()
+
     logger.info("✅ 应用启动成功!")
     logger.info("=" * 60)
 
@@ -429,6 +473,14 @@ async def shutdown_event():
     except Exception as e:
         logger.warning(f"⚠️ 关闭连接池失败: {e}")
 
+    # 关闭共享HTTP连接池
+    try:
+        from utils.http_pool import close_http_pool
+        await close_http_pool()
+        logger.info("✅ HTTP连接池已关闭")
+    except Exception as e:
+        logger.warning(f"⚠️ 关闭HTTP连接池失败: {e}")
+
 
 if __name__ == "__main__":
     # 从环境变量读取配置
@@ -0,0 +1,171 @@
+"""
+路由延迟挂载
+重量级子系统（OCR、ASR、图谱、知识库）的路由模块在首次收到其前缀下的请求时才导入并挂载，
+缩短 worker 冷启动时间
+
+- 路由模块在工作线程中导入，同一模块的并发请求等待同一次导入
+- 访问 OpenAPI 文档时挂载全部延迟路由，保证文档完整
+- 未启用延迟挂载时 load_all() 在启动时按原方式同步挂载
+- 挂载的路由插入到覆盖其前缀的挂载点（如根路径前端静态文件）之前，避免被挂载点拦截
+"""
+import asyncio
+import importlib
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, FastAPI
+from starlette.routing import Mount
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from utils.logger import get_logger
+
+logger = get_logger("lazy_router")
+
+
+@dataclass
+class LazyRouter:
+    """延迟挂载的路由模块"""
+    module_path: str
+    prefixes: Tuple[str, ...]
+    attr: str = "router"
+    include_kwargs: Dict[str, Any] = field(default_factory=dict)
+    loaded: bool = False
+    error: Optional[str] = None
+    import_ms: Optional[float] = None
+    future: Optional[asyncio.Future] = None
+
+    def matches(self, path: str) -> bool:
+        return any(path == prefix or path.startswith(prefix + "/") for prefix in self.prefixes)
+
+
+class LazyRouterMounter:
+    """路由延迟挂载管理"""
+
+    def __init__(self, app: FastAPI, profiler=None):
+        self.app = app
+        self.profiler = profiler
+        self.routers: List[LazyRouter] = []
+
+    def add(self, module_path: str, prefixes, attr: str = "router", **include_kwargs) -> None:
+        """
+        登记延迟挂载的路由模块
+
+        Args:
+            module_path: 路由模块路径
+            prefixes: 触发挂载的请求路径前缀（与路由模块内 APIRouter 的前缀一致）
+            attr: 模块中路由对象的属性名
+            include_kwargs: 透传给 app.include_router 的参数
+        """
+        if isinstance(prefixes, str):
+            prefixes = (prefixes,)
+        self.routers.append(LazyRouter(
+            module_path=module_path,
+            prefixes=tuple(prefix.rstrip("/") for prefix in prefixes),
+            attr=attr,
+            include_kwargs=include_kwargs
+        ))
+
+    @property
+    def pending(self) -> bool:
+        return any(not router.loaded and router.error is None for router in self.routers)
+
+    def _import(self, router: LazyRouter) -> APIRouter:
+        start = time.perf_counter()
+        module = importlib.import_module(router.module_path)
+        router.import_ms = round((time.perf_counter() - start) * 1000, 2)
+        return getattr(module, router.attr)
+
+    def _mount(self, router: LazyRouter, api_router: APIRouter) -> None:
+        prefix = router.include_kwargs.get("prefix", "")
+        paths = [getattr(route, "path", None) for route in api_router.routes]
+        unmatched = [path for path in paths if path is not None and not router.matches(prefix + path)]
+        if unmatched:
+            logger.warning(f"⚠️ 延迟路由 {router.module_path} 的部分路径不在登记前缀下，首次请求无法触发挂载: {unmatched}")
+
+        routes = self.app.router.routes
+        existing = len(routes)
+        self.app.include_router(api_router, **router.include_kwargs)
+        # include_router 追加在路由表末尾；挂载点（如根路径的前端静态文件）会吞掉其后的路由，
+        # 新路由需移到第一个覆盖其前缀的挂载点之前
+        mount_index = next(
+            (idx for idx, route in enumerate(routes[:existing])
+             if isinstance(route, Mount) and self._shadows(route.path, router)),
+            None
+        )
+        if mount_index is not None:
+            added = routes[existing:]
+            del routes[existing:]
+            routes[mount_index:mount_index] = added
+        # 新路由需要出现在 OpenAPI 文档中
+        self.app.openapi_schema = None
+        router.loaded = True
+
+    @staticmethod
+    def _shadows(mount_path: str, router: LazyRouter) -> bool:
+        return any(prefix == mount_path or prefix.startswith(mount_path + "/") for prefix in router.prefixes)
+
+    def load_all(self) -> None:
+        """同步导入并挂载全部路由（未启用延迟挂载时在启动阶段调用）"""
+        for router in self.routers:
+            if router.loaded:
+                continue
+            self._mount(router, self._import(router))
+
+    async def _load(self, router: LazyRouter) -> None:
+        if router.future is None:
+            router.future = asyncio.ensure_future(asyncio.to_thread(self._import, router))
+        try:
+            api_router = await asyncio.shield(router.future)
+        except Exception as e:
+            if router.error is None:
+                router.error = str(e)
+                logger.error(f"❌ 延迟路由导入失败: {router.module_path}, 错误: {e}")
+            return
+
+        if not router.loaded:
+            self._mount(router, api_router)
+            logger.info(f"✅ 延迟路由已挂载: {router.module_path} ({router.import_ms}ms)")
+            if self.profiler is not None:
+                elapsed_ms = (time.perf_counter() - self.profiler.started_at) * 1000
+                self.profiler.phases.append({
+                    "phase": f"lazy_router:{router.module_path}",
+                    "offset_ms": round(elapsed_ms - router.import_ms, 2),
+                    "duration_ms": router.import_ms,
+                })
+
+    async def ensure_loaded(self, path: str) -> None:
+        """挂载路径对应的延迟路由；访问 OpenAPI 文档时挂载全部"""
+        if path == self.app.openapi_url:
+            targets = self.routers
+        else:
+            targets = [router for router in self.routers if router.matches(path)]
+        targets = [router for router in targets if not router.loaded and router.error is None]
+        if targets:
+            await asyncio.gather(*(self._load(router) for router in targets))
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """各延迟路由的挂载状态与导入耗时"""
+        return [
+            {
+                "module": router.module_path,
+                "prefixes": list(router.prefixes),
+                "loaded": router.loaded,
+                "import_ms": router.import_ms,
+                "error": router.error,
+            }
+            for router in self.routers
+        ]
+
+
+class LazyRouterMiddleware:
+    """在路由匹配前挂载请求前缀对应的延迟路由"""
+
+    def __init__(self, app: ASGIApp, mounter: LazyRouterMounter):
+        self.app = app
+        self.mounter = mounter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] in ("http", "websocket") and self.mounter.pending:
+            await self.mounter.ensure_loaded(scope.get("path", ""))
+        await self.app(scope, receive, send)
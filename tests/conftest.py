@@ -4,6 +4,7 @@ Pytest configuration and shared fixtures for Juben project tests
 import os
 import sys
 import asyncio
+import tempfile
 import pytest
 from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock, patch
@@ -13,6 +14,9 @@ from typing import Dict, Any
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+# Keep test runs from writing into the repository logs/ directory
+os.environ.setdefault("JUBEN_LOG_DIR", tempfile.mkdtemp(prefix="juben-test-logs-"))
+
 
 @pytest.fixture(scope="session")
 def event_loop():
@@ -0,0 +1,184 @@
+"""
+Unit tests for agent prewarming, shared construction and lazy agent sub-components
+"""
+import asyncio
+import importlib
+import logging
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+
+FAKE_MODULE = "fake_prewarm_agents"
+
+
+def _registry_module():
+    # Load apis first, matching the import order of main.py (agents <-> apis import cycle)
+    importlib.import_module("apis")
+    return importlib.import_module("utils.agent_registry")
+
+
+def _make_agent_class(name, delay=0.0, fail=False):
+    def __init__(self):
+        if fail:
+            raise RuntimeError("boom")
+        time.sleep(delay)
+        type(self).constructed += 1
+        self.warmed = False
+
+    def warm_up_components(self):
+        time.sleep(delay)
+        self.warmed = True
+        return {"llm_client": delay * 1000}
+
+    return type(name, (), {"constructed": 0, "__init__": __init__, "warm_up_components": warm_up_components})
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    module = types.ModuleType(FAKE_MODULE)
+    monkeypatch.setitem(sys.modules, FAKE_MODULE, module)
+
+    instance = _registry_module().AgentRegistry()
+    instance.agent_configs.clear()
+
+    def _register(agent_type, **kwargs):
+        agent_class = _make_agent_class(f"Fake{len(instance.agent_configs)}Agent", **kwargs)
+        setattr(module, agent_class.__name__, agent_class)
+        instance.register_agent(agent_type, agent_class, FAKE_MODULE)
+        return agent_class
+
+    return instance, _register
+
+
+@pytest.mark.unit
+class TestAgentRegistryPrewarm:
+    """Test shared construction, parallel prewarm and construction stats"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_construction(self, registry):
+        agents, register = registry
+        agent_class = register("fake_a", delay=0.05)
+
+        results = await asyncio.gather(*(agents.get_agent("fake_a") for _ in range(5)))
+        assert all(agent is results[0] for agent in results)
+        assert agent_class.constructed == 1
+        assert not results[0].warmed
+
+        stats = agents.get_construction_stats()["fake_a"]
+        assert stats["mode"] == "on_demand"
+        assert stats["init_ms"] >= 40
+        assert "warm_up_ms" not in stats
+
+    @pytest.mark.asyncio
+    async def test_prewarm_builds_in_parallel_and_warms_components(self, registry):
+        agents, register = registry
+        for agent_type in ("fake_a", "fake_b", "fake_c", "fake_d"):
+            register(agent_type, delay=0.2)
+        register("fake_broken", fail=True)
+
+        start = time.perf_counter()
+        result = await agents.prewarm(["fake_a", "fake_b", "fake_c", "fake_d", "fake_broken", "missing"], concurrency=4)
+        assert time.perf_counter() - start < 1.2
+
+        assert sorted(result) == ["fake_a", "fake_b", "fake_broken", "fake_c", "fake_d"]
+        assert result["fake_a"]["mode"] == "prewarm"
+        assert result["fake_a"]["components_ms"] == {"llm_client": 200.0}
+        assert result["fake_broken"]["error"] == "boom"
+        assert (await agents.get_agent("fake_a")).warmed
+        assert await agents.get_agent("fake_broken") is None
+
+        statistics = agents.get_agent_statistics()
+        assert statistics["loaded_agents"] == 4
+        assert list(statistics["construction_stats"])[-1] == "fake_broken"
+
+    @pytest.mark.asyncio
+    async def test_prewarm_completes_on_demand_agents(self, registry):
+        agents, register = registry
+        agent_class = register("fake_a")
+
+        agent = await agents.get_agent("fake_a")
+        await agents.prewarm(["fake_a"])
+        assert agent.warmed
+        assert agent_class.constructed == 1
+        assert "warm_up_ms" in agents.construction_stats["fake_a"]
+
+    @pytest.mark.asyncio
+    async def test_sync_getter_shares_prewarmed_instance(self, registry):
+        agents, register = registry
+        agent_class = register("fake_a")
+
+        await agents.prewarm(["fake_a"])
+        agent = agents.get_agent_sync("fake_a")
+        assert agent is await agents.get_agent("fake_a")
+        assert agent.warmed
+        assert agent_class.constructed == 1
+
+    def test_sync_getter_builds_once_on_demand(self, registry):
+        agents, register = registry
+        agent_class = register("fake_a")
+
+        agent = agents.get_agent_sync("fake_a")
+        assert agents.get_agent_sync("fake_a") is agent
+        assert agent_class.constructed == 1
+        assert agents.get_construction_stats()["fake_a"]["mode"] == "on_demand"
+        assert agents.get_agent_sync("missing") is None
+
+    def test_prewarm_set_from_env(self, registry, monkeypatch):
+        agents, register = registry
+        register("fake_a")
+        register("fake_b")
+
+        monkeypatch.setenv("AGENT_PREWARM", "")
+        assert agents.get_prewarm_agent_types() == []
+        monkeypatch.setenv("AGENT_PREWARM", " fake_b, ,fake_a ")
+        assert agents.get_prewarm_agent_types() == ["fake_b", "fake_a"]
+        monkeypatch.setenv("AGENT_PREWARM", "all")
+        assert agents.get_prewarm_agent_types() == ["fake_a", "fake_b"]
+
+
+@pytest.mark.unit
+class TestLazyComponent:
+    """Test first-use initialization of agent sub-components"""
+
+    def _holder_class(self):
+        _registry_module()
+        from agents.base_juben_agent import _LazyComponent
+
+        class Holder:
+            client = _LazyComponent("_init_client")
+            broken = _LazyComponent("_init_broken")
+
+            def __init__(self):
+                self.logger = logging.getLogger("test")
+                self.calls = 0
+
+            def _init_client(self):
+                self.calls += 1
+                self.client = threading.get_ident()
+
+            def _init_broken(self):
+                self.calls += 1
+                raise RuntimeError("unavailable")
+
+        return Holder
+
+    def test_initialized_once_on_first_access(self):
+        holder = self._holder_class()()
+        assert not type(holder).client.is_initialized(holder)
+        assert holder.client == threading.get_ident()
+        assert holder.client == threading.get_ident()
+        assert holder.calls == 1
+
+    def test_failed_init_yields_none_and_explicit_assignment_wins(self):
+        holder = self._holder_class()()
+        assert holder.broken is None
+        assert holder.broken is None
+        assert holder.calls == 1
+
+        holder.client = "override"
+        assert holder.client == "override"
+        assert holder.calls == 1
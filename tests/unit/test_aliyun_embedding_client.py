@@ -0,0 +1,78 @@
+"""
+Unit tests for AliyunEmbeddingClient async pipeline
+
+Tests micro-batching, batch splitting and the content-hash cache without network access
+"""
+import asyncio
+import pytest
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Embedding client with the HTTP call and Redis replaced"""
+    from utils.aliyun_embedding_client import AliyunEmbeddingClient
+
+    client = AliyunEmbeddingClient(api_key="test")
+    calls = []
+
+    async def fake_request(texts):
+        calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+    async def no_redis():
+        return None
+
+    monkeypatch.setattr(client, "_request_embeddings", fake_request)
+    monkeypatch.setattr(client.cache, "_get_redis", no_redis)
+    client.calls = calls
+    return client
+
+
+@pytest.mark.unit
+class TestAsyncEmbedding:
+    """Test async embedding pipeline"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_single_requests_are_batched(self, client):
+        """Concurrent aembed_text calls share one request"""
+        texts = [f"text-{i}" for i in range(10)]
+
+        vectors = await asyncio.gather(*(client.aembed_text(t) for t in texts))
+
+        assert len(client.calls) == 1
+        assert sorted(client.calls[0]) == sorted(texts)
+        assert vectors[3] == [float(len("text-3")), 1.0]
+
+    @pytest.mark.asyncio
+    async def test_embed_texts_splits_batches_and_dedupes(self, client):
+        """aembed_texts respects the provider batch limit and skips duplicates"""
+        texts = [f"chunk-{i}" for i in range(60)] + ["chunk-0"]
+
+        vectors = await client.aembed_texts(texts)
+
+        assert len(vectors) == len(texts)
+        assert [len(c) for c in client.calls] == [25, 25, 10]
+        assert vectors[-1] == vectors[0]
+
+    @pytest.mark.asyncio
+    async def test_cache_hits_skip_requests(self, client):
+        """Unchanged content is served from the cache"""
+        await client.aembed_texts(["a", "b"])
+        client.calls.clear()
+
+        vectors = await client.aembed_texts(["a", "b", "c"])
+        single = await client.aembed_text("a")
+
+        assert client.calls == [["c"]]
+        assert vectors[0] == single
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_returns_empty(self, client, monkeypatch):
+        """A failed provider call yields an empty result, not partial vectors"""
+        async def failing(texts):
+            return []
+
+        monkeypatch.setattr(client, "_request_embeddings", failing)
+
+        assert await client.aembed_texts(["x", "y"]) == []
+        assert await client.aembed_text("z") == []
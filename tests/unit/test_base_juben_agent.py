@@ -245,13 +245,13 @@ class TestBaseJubenAgentTokenAccumulator:
     @pytest.mark.asyncio
     async def test_initialize_token_accumulator(self, agent):
         """Test token accumulator initialization"""
-        with patch('base_juben_agent.create_token_accumulator') as mock_create:
+        with patch('base_juben_agent.acreate_token_accumulator', new_callable=AsyncMock) as mock_create:
             mock_create.return_value = "test_key_123"
 
             key = await agent.initialize_token_accumulator("user_123", "session_456")
 
             assert key == "test_key_123"
-            mock_create.assert_called_once_with("user_123", "session_456", None)
+            mock_create.assert_called_once_with("user_123", "session_456")
 
     @pytest.mark.asyncio
     async def test_get_token_billing_summary(self, agent):
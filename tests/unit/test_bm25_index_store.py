@@ -0,0 +1,53 @@
+"""
+Unit tests for BM25IndexStore
+
+Tests per-file segment persistence without re-tokenizing
+"""
+import pytest
+
+
+@pytest.mark.unit
+class TestBM25IndexStore:
+    """Test on-disk BM25 segments"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        from utils.bm25_index_store import BM25IndexStore
+        return BM25IndexStore(str(tmp_path / "bm25"))
+
+    def test_save_and_load_roundtrip(self, store):
+        """Segments round-trip doc table and term frequencies"""
+        store.save_file_segment(
+            "p1", "f1",
+            doc_ids=["p1:f1:0", "p1:f1:1"],
+            contents=["第一段", "第二段"],
+            metadata_list=[{"chunk_index": 0}, {"chunk_index": 1}],
+            term_freqs=[{"主角": 2, "反派": 1}, {"反派": 3}],
+        )
+
+        docs = store.load_project("p1")
+
+        assert store.has_project("p1")
+        assert [d["doc_id"] for d in docs] == ["p1:f1:0", "p1:f1:1"]
+        assert docs[0]["term_freqs"] == {"主角": 2, "反派": 1}
+        assert docs[1]["term_freqs"] == {"反派": 3}
+        assert docs[1]["metadata"] == {"chunk_index": 1}
+
+    def test_overwrite_and_delete_segment(self, store):
+        """Re-saving a file replaces its segment and delete returns its doc ids"""
+        store.save_file_segment("p1", "f1", ["p1:f1:0"], ["a"], [{}], [{"x": 1}])
+        store.save_file_segment("p1", "f2", ["p1:f2:0"], ["b"], [{}], [{"y": 1}])
+        store.save_file_segment("p1", "f1", ["p1:f1:0"], ["c"], [{}], [{"z": 1}])
+
+        docs = {d["doc_id"]: d for d in store.load_project("p1")}
+        assert docs["p1:f1:0"]["content"] == "c"
+        assert len(docs) == 2
+
+        assert store.delete_file_segment("p1", "f1") == ["p1:f1:0"]
+        assert store.delete_file_segment("p1", "f1") == []
+        assert [d["doc_id"] for d in store.load_project("p1")] == ["p1:f2:0"]
+
+    def test_missing_project_is_empty(self, store):
+        """Unknown projects load as empty"""
+        assert store.load_project("nope") == []
+        assert not store.has_project("nope")
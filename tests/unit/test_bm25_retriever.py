@@ -0,0 +1,165 @@
+"""
+Unit tests for BM25Retriever
+
+Tests the inverted-index scoring against the reference per-document formula
+"""
+import pytest
+
+
+def _make_retriever():
+    from utils.bm25_retriever import BM25Retriever
+
+    retriever = BM25Retriever(use_jieba=False)
+    retriever.add_documents([
+        {"doc_id": "d1", "content": "hero meets villain in the old castle"},
+        {"doc_id": "d2", "content": "villain plots revenge villain laughs"},
+        {"doc_id": "d3", "content": "quiet morning market scene"},
+        {"doc_id": "d4", "content": "hero trains alone before the final battle"},
+    ])
+    return retriever
+
+
+@pytest.mark.unit
+class TestBM25Retriever:
+    """Test BM25 inverted index"""
+
+    def test_postings_built(self):
+        """Postings list records doc index and term frequency"""
+        retriever = _make_retriever()
+
+        assert retriever.postings["villain"] == [(0, 1), (1, 2)]
+        assert retriever.doc_freqs["hero"] == 2
+        assert len(retriever._doc_norms) == retriever.doc_count
+
+    def test_search_matches_reference_score(self):
+        """Postings-based scores equal the per-document formula"""
+        retriever = _make_retriever()
+        query_tokens = retriever._tokenize("villain hero")
+
+        results = retriever.search("villain hero", top_k=10)
+
+        assert {r.doc_id for r in results} == {"d1", "d2", "d4"}
+        for r in results:
+            doc_idx = retriever._doc_index[r.doc_id]
+            expected = retriever._calculate_bm25_score(query_tokens, doc_idx)
+            assert r.score == pytest.approx(expected)
+        assert [r.score for r in results] == sorted((r.score for r in results), reverse=True)
+
+    def test_search_skips_unrelated_documents(self):
+        """Documents without query terms are never returned"""
+        retriever = _make_retriever()
+
+        results = retriever.search("castle", top_k=10)
+
+        assert [r.doc_id for r in results] == ["d1"]
+        assert retriever.search("nothing matches", top_k=10) == []
+
+    def test_top_k_and_min_score(self):
+        """top_k truncates and min_score filters"""
+        retriever = _make_retriever()
+
+        assert len(retriever.search("villain hero", top_k=1)) == 1
+        best = retriever.search("villain hero", top_k=1)[0]
+        assert retriever.search("villain hero", min_score=best.score + 1) == []
+
+    def test_incremental_add_refreshes_stats(self):
+        """Adding documents invalidates IDF cache and length norms"""
+        retriever = _make_retriever()
+        before = retriever.search("market", top_k=1)[0].score
+
+        retriever.add_documents([{"doc_id": "d5", "content": "market market crowd"}])
+
+        after = {r.doc_id: r.score for r in retriever.search("market", top_k=10)}
+        assert set(after) == {"d3", "d5"}
+        assert after["d3"] != pytest.approx(before)
+
+    def test_get_document_by_id_and_clear(self):
+        """Document lookup is by id and clear resets the index"""
+        retriever = _make_retriever()
+
+        assert retriever.get_document_by_id("d3").content == "quiet morning market scene"
+        assert retriever.get_document_by_id("missing") is None
+
+        retriever.clear()
+        assert retriever.postings == {}
+        assert retriever.search("hero") == []
+
+    def test_remove_documents_rebuilds_postings(self):
+        """Removing documents keeps postings and doc frequencies consistent"""
+        retriever = _make_retriever()
+
+        assert retriever.remove_documents(["d1", "missing"]) == 1
+
+        assert retriever.doc_count == 3
+        assert retriever.postings["villain"] == [(0, 2)]
+        assert "castle" not in retriever.doc_freqs
+        assert [r.doc_id for r in retriever.search("hero")] == ["d4"]
+        assert retriever.get_document_by_id("d4") is retriever.documents[2]
+
+    def test_re_adding_doc_id_replaces_document(self):
+        """A repeated doc_id replaces the old document instead of leaving a stale posting"""
+        retriever = _make_retriever()
+
+        retriever.add_documents([
+            {"doc_id": "d1", "content": "castle gate"},
+            {"doc_id": "d5", "content": "castle tower"},
+            {"doc_id": "d5", "content": "castle moat"},
+        ])
+        assert retriever.doc_count == 5
+        assert retriever.doc_freqs["castle"] == 2
+        assert retriever.doc_freqs["hero"] == 1
+        assert "tower" not in retriever.doc_freqs
+        assert retriever.get_document_by_id("d5").content == "castle moat"
+
+        assert retriever.remove_documents(["d1"]) == 1
+        assert [r.doc_id for r in retriever.search("gate")] == []
+
+    def test_add_tokenized_documents_matches_add_documents(self):
+        """Restoring from term frequencies scores like tokenizing again"""
+        from collections import Counter
+        from utils.bm25_retriever import BM25Retriever
+
+        original = _make_retriever()
+        restored = BM25Retriever(use_jieba=False)
+        restored.add_tokenized_documents([
+            {
+                "doc_id": doc.doc_id,
+                "content": doc.content,
+                "metadata": doc.metadata,
+                "term_freqs": dict(Counter(doc.tokens)),
+            }
+            for doc in original.documents
+        ])
+
+        expected = [(r.doc_id, r.score) for r in original.search("villain hero castle")]
+        actual = [(r.doc_id, r.score) for r in restored.search("villain hero castle")]
+        assert actual == expected
+
+    @pytest.mark.parametrize("use_scipy", [True, False])
+    def test_batch_search_matches_search(self, use_scipy, monkeypatch):
+        """Vectorized batch scoring agrees with per-query search"""
+        import utils.bm25_retriever as bm25_module
+
+        if use_scipy and not bm25_module.SCIPY_AVAILABLE:
+            pytest.skip("scipy not installed")
+        monkeypatch.setattr(bm25_module, "SCIPY_AVAILABLE", use_scipy)
+
+        retriever = _make_retriever()
+        queries = ["villain hero", "market", "castle battle hero", "unknown words"]
+
+        batch = retriever.batch_search(queries, top_k=2)
+
+        assert set(batch) == set(queries)
+        for query in queries:
+            expected = retriever.search(query, top_k=2)
+            assert [r.doc_id for r in batch[query]] == [r.doc_id for r in expected]
+            assert [r.score for r in batch[query]] == pytest.approx([r.score for r in expected])
+
+    def test_batch_search_matrix_invalidated_on_add(self):
+        """Adding documents rebuilds the cached term matrix"""
+        retriever = _make_retriever()
+        retriever.batch_search(["hero"])
+
+        retriever.add_documents([{"doc_id": "d5", "content": "hero again"}])
+
+        assert "d5" in {r.doc_id for r in retriever.batch_search(["hero"])["hero"]}
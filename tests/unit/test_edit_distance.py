@@ -0,0 +1,78 @@
+"""
+Unit tests for the bit-parallel edit-distance engine
+"""
+import random
+
+import pytest
+
+
+def _reference_distance(s1, s2):
+    previous = list(range(len(s2) + 1))
+    for i, c1 in enumerate(s1):
+        current = [i + 1]
+        for j, c2 in enumerate(s2):
+            current.append(min(previous[j + 1] + 1, current[j] + 1, previous[j] + (c1 != c2)))
+        previous = current
+    return previous[-1]
+
+
+@pytest.mark.unit
+class TestEditDistance:
+    """Test exact distance, cutoff and long-text approximation"""
+
+    def test_matches_reference_dp(self):
+        from utils.edit_distance import levenshtein_distance
+
+        rng = random.Random(7)
+        for _ in range(500):
+            s1 = "".join(rng.choice("abc角色") for _ in range(rng.randint(0, 40)))
+            s2 = "".join(rng.choice("abc角色") for _ in range(rng.randint(0, 40)))
+            assert levenshtein_distance(s1, s2) == _reference_distance(s1, s2)
+
+        assert levenshtein_distance("kitten", "sitting") == 3
+        assert levenshtein_distance("", "abc") == 3
+        assert levenshtein_distance(["第一场", "第二场"], ["第一场", "第三场"]) == 1
+
+    def test_max_distance_cuts_off(self):
+        from utils.edit_distance import levenshtein_distance
+
+        assert levenshtein_distance("a" * 100, "b" * 100, max_distance=5) == 6
+        assert levenshtein_distance("abcdef", "abcxef", max_distance=5) == 1
+        assert levenshtein_distance("a", "a" * 20, max_distance=3) == 4
+
+    def test_long_texts_use_close_approximation(self, monkeypatch):
+        import utils.edit_distance as edit_distance
+
+        rng = random.Random(3)
+        original = "".join(rng.choice("的一是了我不人在他有这个上们来到时大地为子中") for _ in range(6000))
+        chars = list(original)
+        for _ in range(300):
+            chars[rng.randrange(len(chars))] = "龙"
+        edited = "开场" + "".join(chars)
+
+        exact, exact_ratio, approximate = edit_distance.edit_metrics(original, edited)
+        assert not approximate
+
+        monkeypatch.setattr(edit_distance, "APPROXIMATE_THRESHOLD", 1000)
+        estimate, estimate_ratio, approximate = edit_distance.edit_metrics(original, edited)
+        assert approximate
+        assert exact <= estimate <= exact * 1.2
+        assert estimate_ratio == pytest.approx(exact_ratio, abs=0.02)
+
+    @pytest.mark.asyncio
+    async def test_feedback_metrics(self):
+        from utils.feedback_manager import AgentFeedback, FeedbackSource, FeedbackType
+
+        feedback = AgentFeedback(
+            trace_id="t1",
+            agent_name="agent",
+            user_input="写一个开场",
+            ai_output="他走进房间。",
+            feedback_type=FeedbackType.REFINEMENT,
+            feedback_source=FeedbackSource.EDITOR,
+            user_edit_text="她走进房间。"
+        )
+        distance, ratio = await feedback.acalculate_edit_metrics()
+        assert distance == 1
+        assert feedback.edit_ratio == pytest.approx(1 / 6)
+        assert feedback.similarity_score == pytest.approx(5 / 6)
@@ -0,0 +1,102 @@
+"""
+Unit tests for the persistent fragment-embedding index
+"""
+import asyncio
+
+import pytest
+
+
+def _embed_counter():
+    calls = []
+
+    async def embed_texts(texts):
+        calls.append(list(texts))
+        return [[1.0, float(i)] for i, _ in enumerate(texts)]
+
+    return embed_texts, calls
+
+
+@pytest.mark.unit
+class TestFragmentEmbeddingIndex:
+    """Test build-once reuse, persistence and vectorized search"""
+
+    @pytest.mark.asyncio
+    async def test_fragments_are_embedded_once_per_content(self, tmp_path):
+        from utils.fragment_embedding_index import FragmentEmbeddingIndex
+
+        index = FragmentEmbeddingIndex(base_dir=str(tmp_path))
+        embed_texts, calls = _embed_counter()
+        key = index.content_key("a\n\nb\n\nc", "m", 1000)
+        fragments = ["a", "b", "c"]
+
+        first, second = await asyncio.gather(
+            index.get_or_build(key, fragments, embed_texts, "m"),
+            index.get_or_build(key, fragments, embed_texts, "m"),
+        )
+        assert first is second
+        assert first.created
+        assert len(calls) == 1
+
+        reopened = FragmentEmbeddingIndex(base_dir=str(tmp_path))
+        entry = await reopened.get_or_build(key, fragments, embed_texts, "m")
+        assert len(calls) == 1
+        assert not entry.created
+        assert entry.fragments == fragments
+        assert index.content_key("a\n\nb\n\nc", "m", 500) != key
+
+    @pytest.mark.asyncio
+    async def test_search_ranks_by_cosine_similarity(self, tmp_path):
+        from utils.fragment_embedding_index import FragmentEmbeddingIndex
+
+        index = FragmentEmbeddingIndex(base_dir=str(tmp_path))
+        vectors = [[1.0, 0.0], [0.0, 2.0], [1.0, 1.0]]
+
+        async def embed_texts(texts):
+            return vectors
+
+        entry = await index.get_or_build("k", ["x", "y", "z"], embed_texts, "m")
+        hits = index.search(entry, [0.0, 5.0], top_k=2)
+        assert [i for _, i in hits] == [1, 2]
+        assert hits[0][0] == pytest.approx(1.0)
+        assert hits[1][0] == pytest.approx(2 ** -0.5)
+        assert index.search(entry, [0.0, 0.0]) == []
+
+    @pytest.mark.asyncio
+    async def test_failed_embedding_is_not_stored(self, tmp_path):
+        from utils.fragment_embedding_index import FragmentEmbeddingIndex
+
+        index = FragmentEmbeddingIndex(base_dir=str(tmp_path))
+
+        async def embed_texts(texts):
+            return []
+
+        assert await index.get_or_build("k", ["x"], embed_texts, "m") is None
+        assert index.load("k") is None
+
+    @pytest.mark.asyncio
+    async def test_new_version_prunes_previous_one(self, tmp_path):
+        from utils.fragment_embedding_index import FragmentEmbeddingIndex
+
+        index = FragmentEmbeddingIndex(base_dir=str(tmp_path))
+        embed_texts, _ = _embed_counter()
+
+        old_key = index.content_key("v1", "m", 1000)
+        shared_key = index.content_key("shared", "m", 1000)
+        await index.get_or_build(old_key, ["v1"], embed_texts, "m", source="a.txt")
+        await index.get_or_build(shared_key, ["shared"], embed_texts, "m", source="b.txt")
+        assert (tmp_path / f"{old_key}.npy").exists()
+
+        new_key = index.content_key("v2", "m", 1000)
+        await index.get_or_build(new_key, ["v2"], embed_texts, "m", source="a.txt")
+        assert not (tmp_path / f"{old_key}.json").exists()
+        assert not (tmp_path / f"{old_key}.npy").exists()
+        assert index.load(old_key) is None
+
+        # a.txt moves to the version b.txt uses; v2 is no longer referenced
+        await index.get_or_build(shared_key, ["shared"], embed_texts, "m", source="a.txt")
+        assert not (tmp_path / f"{new_key}.json").exists()
+
+        # bindings persist; a version still used by another source is kept
+        reopened = FragmentEmbeddingIndex(base_dir=str(tmp_path))
+        reopened.bind_source("b.txt", old_key)
+        assert reopened.load(shared_key) is not None
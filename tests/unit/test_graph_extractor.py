@@ -0,0 +1,170 @@
+"""
+Unit tests for GraphExtractionService concurrent chunk extraction
+"""
+import asyncio
+import json
+
+import pytest
+
+
+class _SlowClient:
+    """Chat client answering each chunk with one character after a delay"""
+
+    def __init__(self, delay=0.05, fail_on=None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.active = 0
+        self.peak = 0
+
+    async def chat(self, messages, **kwargs):
+        text = messages[-1]["content"]
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        if self.fail_on and self.fail_on in text:
+            raise RuntimeError("provider error")
+        if "候选数据" in text:
+            raise RuntimeError("skip validation")
+        name = text.split("角色")[1][:1]
+        return json.dumps({
+            "characters": [{"name": f"角色{name}", "description": text[:20], "confidence": 0.9}],
+        }, ensure_ascii=False)
+
+
+def _service(monkeypatch, client, max_concurrency):
+    monkeypatch.setenv("ZHIPU_API_KEY", "x")
+    from utils.graph_extractor import GraphExtractionService
+
+    service = GraphExtractionService(provider="zhipu", max_concurrency=max_concurrency)
+    service.client = client
+    return service
+
+
+@pytest.mark.unit
+class TestGraphExtractionService:
+    """Test bounded-concurrency extraction"""
+
+    @pytest.mark.asyncio
+    async def test_chunks_run_concurrently_and_merge_in_order(self, monkeypatch):
+        """Chunks are extracted in parallel up to the limit, merged in chunk order"""
+        client = _SlowClient()
+        service = _service(monkeypatch, client, max_concurrency=4)
+        content = "".join(f"第{i}场，角色{'甲乙甲乙丙丁甲乙'[i]}出场。" + "。" * 30 for i in range(8))
+
+        result = await service.extract_and_store(None, "story", content, chunk_size=40, overlap=0, dry_run=True)
+
+        assert result["chunks"] == 8 and result["failed_chunks"] == []
+        assert client.peak == 4
+        assert [n["name"] for n in result["nodes"]] == ["角色甲", "角色乙", "角色丙", "角色丁"]
+
+    @pytest.mark.asyncio
+    async def test_failed_chunk_is_reported(self, monkeypatch):
+        """A provider error on one chunk does not abort the others"""
+        client = _SlowClient(delay=0, fail_on="角色乙")
+        service = _service(monkeypatch, client, max_concurrency=2)
+        content = "角色甲" + "x" * 37 + "角色乙" + "x" * 37
+
+        result = await service.extract_and_store(None, "story", content, chunk_size=40, overlap=0, dry_run=True)
+
+        assert result["failed_chunks"] == [2]
+        assert [n["name"] for n in result["nodes"]] == ["角色甲"]
+
+
+class _RecordingGraph:
+    """Graph store double recording bulk write calls"""
+
+    def __init__(self):
+        self.node_calls = []
+        self.rel_calls = []
+
+    async def merge_story_elements(self, node_type, elements, version=1, batch_size=None):
+        self.node_calls.append((node_type.value, [getattr(e, "name", None) or e.title for e in elements]))
+        return {"errors": [], "element_ids": []}
+
+    async def create_relationships(self, story_id, relationships, batch_size=None):
+        self.rel_calls.append(relationships)
+        return {"errors": [], "ids": [str(i) for i in range(len(relationships))]}
+
+
+@pytest.mark.unit
+class TestGraphBulkWrites:
+    """Test bulk node/relationship writes"""
+
+    @pytest.mark.asyncio
+    async def test_apply_review_writes_one_call_per_type(self, monkeypatch):
+        """Review approval groups nodes by type and writes relationships in one call"""
+        service = _service(monkeypatch, _SlowClient(), max_concurrency=1)
+        graph = _RecordingGraph()
+        payload = {
+            "nodes": [
+                {"type": "Character", "name": "甲"},
+                {"type": "Character", "name": "乙"},
+                {"type": "Location", "name": "古堡"},
+            ],
+            "plot_nodes": [{"title": "开场"}],
+            "relationships": [
+                {"source": "甲", "target": "乙", "type": "SOCIAL_BOND"},
+                {"source": "甲", "target": "古堡", "type": "located_in"},
+            ],
+        }
+
+        result = await service.apply_review(graph, "story", payload)
+
+        assert graph.node_calls == [("Character", ["甲", "乙"]), ("Location", ["古堡"]), ("PlotNode", ["开场"])]
+        assert len(graph.rel_calls) == 1
+        assert [r["type"] for r in graph.rel_calls[0]] == ["SOCIAL_BOND", "LOCATED_IN"]
+        assert result["relationships_created"] == 2 and result["errors"] == []
+
+    @pytest.mark.asyncio
+    async def test_only_written_relationships_are_counted(self, monkeypatch):
+        """Relationships the store did not write are excluded from counts and sent back for review"""
+
+        class _Client:
+            async def chat(self, messages, **kwargs):
+                if "候选数据" in messages[-1]["content"]:
+                    raise RuntimeError("skip validation")
+                return json.dumps({
+                    "characters": [{"name": n, "confidence": 0.9} for n in ("甲", "乙", "丙")],
+                    "relations": [
+                        {"source": "甲", "target": "乙", "type": "SOCIAL_BOND", "confidence": 0.9},
+                        {"source": "甲", "target": "丙", "type": "SOCIAL_BOND", "confidence": 0.9},
+                    ],
+                }, ensure_ascii=False)
+
+        class _PartialGraph(_RecordingGraph):
+            async def create_relationships(self, story_id, relationships, batch_size=None):
+                self.rel_calls.append(relationships)
+                return {"errors": [{"batch": 1, "error": "boom"}], "ids": [f"r{i}" for i in range(len(relationships) - 1)] + [None]}
+
+        service = _service(monkeypatch, _Client(), max_concurrency=1)
+        graph = _PartialGraph()
+
+        result = await service.extract_and_store(graph, "story", "甲乙丙", chunk_size=40, overlap=0)
+        assert len(graph.rel_calls[0]) == 2
+        assert result["relationships_created"] == 1
+        assert [r["id"] for r in result["relationships"]] == ["r0"]
+        failed = result["pending_review"]["relationships"]
+        assert [(r["target"], r["reason"]) for r in failed] == [("丙", "写入失败")]
+        assert failed[0]["source_id"] and failed[0]["target_id"]
+
+        review = await service.apply_review(graph, "story", {"relationships": failed})
+        assert review["relationships_created"] == 0 and len(review["errors"]) == 1
+
+    def test_bulk_and_single_merge_share_statements(self):
+        """UNWIND writes reuse the per-node MERGE body and parameter rows"""
+        from utils.graph_manager import CharacterData, GenericNodeData, GraphDBManager, NodeType
+
+        manager = GraphDBManager()
+        var, key_field, body = manager._node_merge_spec(NodeType.CHARACTER)
+        assert (var, key_field) == ("c", "character_id")
+        assert "MERGE (c:Character {character_id: row.character_id})" in body
+
+        _, key_field, body = manager._node_merge_spec(NodeType.THEME)
+        assert key_field == "node_id" and "MERGE (n:Theme {node_id: row.node_id})" in body
+
+        row = manager._node_row(CharacterData(character_id="c1", name="甲", story_id="s"), version=2)
+        assert row["status"] == "alive" and row["version"] == 2 and row["timestamp"]
+        assert manager._node_row(GenericNodeData(node_id="n1", story_id="s", name="爱"), 1)["category"] is None
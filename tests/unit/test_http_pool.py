@@ -0,0 +1,160 @@
+"""
+Unit tests for the shared HTTP connection pool
+"""
+import asyncio
+
+import pytest
+
+
+@pytest.mark.unit
+class TestHttpPool:
+    """Test client sharing and DNS caching"""
+
+    def test_clients_are_shared_per_event_loop(self):
+        """A client created outside a loop is adopted by the first loop, other loops get their own"""
+        from utils.http_pool import HttpPool, HttpPoolConfig
+
+        pool = HttpPool(HttpPoolConfig(http2=False))
+        unbound = pool.get_async_client()
+
+        async def _get():
+            return pool.get_async_client(), pool.get_async_client()
+
+        first, again = asyncio.run(_get())
+        second, _ = asyncio.run(_get())
+
+        assert first is again is unbound
+        assert second is not first
+        assert pool.get_sync_client() is pool.get_sync_client()
+
+    def test_clients_of_closed_loops_are_released(self):
+        """A new event loop closes the clients left behind by loops that have finished"""
+        import http.server
+        import threading
+        from utils.http_pool import HttpPool, HttpPoolConfig
+
+        released = threading.Event()
+
+        class _Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            def log_message(self, *args):
+                pass
+
+            def finish(self):
+                super().finish()
+                released.set()
+
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/"
+        pool = HttpPool(HttpPoolConfig(http2=False, dns_ttl=0))
+
+        async def _request():
+            client = pool.get_async_client()
+            assert (await client.get(url)).text == "ok"
+            return client
+
+        try:
+            first = asyncio.run(_request())
+            assert not released.is_set()
+
+            async def _next_loop():
+                client = pool.get_async_client()
+                await asyncio.gather(*pool._closing_tasks)
+                return client
+
+            second = asyncio.run(_next_loop())
+            assert second is not first
+            assert first.is_closed
+            assert len(pool._async_clients) == 1
+            assert released.wait(timeout=5)
+        finally:
+            server.shutdown()
+
+    def test_sdk_client_survives_event_loop_changes(self):
+        """A client held by an SDK instance keeps working after the loop it first ran on closes"""
+        import http.server
+        import threading
+        from utils.http_pool import HttpPool, HttpPoolConfig
+
+        class _Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/"
+        pool = HttpPool(HttpPoolConfig(http2=False, dns_ttl=0))
+        sdk_client = pool.get_sdk_async_client()
+
+        async def _request():
+            response = await sdk_client.get(url)
+            await asyncio.gather(*pool._closing_tasks)
+            return response.text, pool.get_async_client()
+
+        try:
+            first_text, first_shared = asyncio.run(_request())
+            second_text, second_shared = asyncio.run(_request())
+        finally:
+            server.shutdown()
+
+        assert first_text == second_text == "ok"
+        assert first_shared.is_closed
+        assert second_shared is not first_shared
+        assert not sdk_client.is_closed
+
+    @pytest.mark.asyncio
+    async def test_dns_cache_and_backend(self):
+        """New connections reuse cached addresses and drop them after a connect error"""
+        import httpcore
+        from utils.http_pool import DNSCache, HttpPool, HttpPoolConfig, _CachingDNSBackend
+
+        client = HttpPool(HttpPoolConfig(http2=False)).get_async_client()
+        assert isinstance(client._transport._pool._network_backend, _CachingDNSBackend)
+
+        cache = DNSCache(ttl=60)
+        lookups = []
+
+        async def _resolve(host, port, type=None):
+            lookups.append(host)
+            return [(None, None, None, "", ("10.0.0.7", port))]
+
+        loop = asyncio.get_running_loop()
+        original = loop.getaddrinfo
+        loop.getaddrinfo = _resolve
+        try:
+            connected = []
+
+            class _Backend:
+                async def connect_tcp(self, host, port, **kwargs):
+                    connected.append(host)
+                    if len(connected) == 2:
+                        raise httpcore.ConnectError("refused")
+                    return "stream"
+
+            backend = _CachingDNSBackend(_Backend(), cache)
+            assert await backend.connect_tcp("api.example.com", 443) == "stream"
+            with pytest.raises(httpcore.ConnectError):
+                await backend.connect_tcp("api.example.com", 443)
+            await backend.connect_tcp("api.example.com", 443)
+            await backend.connect_tcp("127.0.0.1", 80)
+        finally:
+            loop.getaddrinfo = original
+
+        assert connected == ["10.0.0.7", "10.0.0.7", "10.0.0.7", "127.0.0.1"]
+        assert lookups == ["api.example.com", "api.example.com"]
@@ -0,0 +1,64 @@
+"""
+Unit tests for the per-provider LLM token-bucket limiter
+"""
+import asyncio
+
+import pytest
+
+
+@pytest.mark.unit
+class TestProviderRateLimiter:
+    """Test bucket accounting, queue ordering and sharing"""
+
+    def test_token_bucket_wait_time(self):
+        """Waiting time covers exactly the missing tokens at the refill rate"""
+        from utils.llm_rate_limiter import TokenBucket
+
+        bucket = TokenBucket(capacity=60, per_minute=60)
+        now = bucket.updated_at
+        assert bucket.wait_time(60, now) == 0
+        bucket.take(60)
+        assert bucket.wait_time(1, now) == pytest.approx(1.0)
+        assert bucket.wait_time(1, now + 0.5) == pytest.approx(0.5)
+
+    @pytest.mark.asyncio
+    async def test_queue_releases_by_priority_then_fifo(self):
+        """Saturated callers are released one by one, interactive ahead of batch"""
+        from utils.llm_rate_limiter import LimiterPriority, ProviderRateLimiter
+
+        limiter = ProviderRateLimiter("test", requests_per_minute=600)
+        limiter._request_bucket.available = 0
+        order = []
+
+        async def _call(name, priority):
+            await limiter.acquire(priority=priority)
+            order.append(name)
+
+        tasks = [
+            asyncio.create_task(_call("batch-1", LimiterPriority.BATCH)),
+            asyncio.create_task(_call("batch-2", LimiterPriority.BATCH)),
+            asyncio.create_task(_call("interactive", LimiterPriority.INTERACTIVE)),
+        ]
+        await asyncio.gather(*tasks)
+
+        assert order == ["interactive", "batch-1", "batch-2"]
+        assert limiter.stats["queued"] == 3
+        assert limiter.queue_size == 0
+
+    @pytest.mark.asyncio
+    async def test_tokens_per_minute_is_metered(self):
+        """Requests wait for input-token budget, and oversized requests are clamped to capacity"""
+        from utils.llm_rate_limiter import ProviderRateLimiter
+
+        limiter = ProviderRateLimiter("test", requests_per_minute=1000, tokens_per_minute=6000)
+        assert await limiter._try_take(6000) == 0
+        assert await limiter._try_take(100) == pytest.approx(1.0, abs=0.05)
+        assert limiter._clamp_tokens(10 ** 6) == 6000
+
+    def test_limiter_is_shared_per_provider(self):
+        """Clients of the same provider and quota share one limiter"""
+        from utils.llm_rate_limiter import get_provider_rate_limiter
+
+        first = get_provider_rate_limiter("shared-test", 30, 1000)
+        assert get_provider_rate_limiter("shared-test", 30, 1000) is first
+        assert get_provider_rate_limiter("other-test", 30, 1000) is not first
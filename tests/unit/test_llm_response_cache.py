@@ -0,0 +1,59 @@
+"""
+Unit tests for LLMResponseCache
+"""
+import pytest
+
+
+def _messages(question, system="你是路由助手"):
+    return [{"role": "system", "content": system}, {"role": "user", "content": question}]
+
+
+class _Counter:
+    """LLM call double counting invocations"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return f"answer-{self.calls}"
+
+
+@pytest.mark.unit
+class TestLLMResponseCache:
+    """Test exact and semantic response reuse"""
+
+    @pytest.mark.asyncio
+    async def test_exact_hits_only_for_deterministic_calls(self):
+        """temperature=0 calls are reused across whitespace differences, others bypass"""
+        from utils.llm_response_cache import LLMResponseCache
+
+        cache = LLMResponseCache()
+        call = _Counter()
+
+        first = await cache.get_or_call(_messages("分析  这个任务"), "zhipu:glm-4-flash", {"temperature": 0}, call)
+        second = await cache.get_or_call(_messages("分析 这个任务\n"), "zhipu:glm-4-flash", {"temperature": 0, "timeout": 5}, call)
+        assert first == second == "answer-1" and call.calls == 1
+
+        await cache.get_or_call(_messages("分析 这个任务"), "zhipu:glm-4-plus", {"temperature": 0}, call)
+        await cache.get_or_call(_messages("分析 这个任务"), "zhipu:glm-4-flash", {"temperature": 0.7}, call)
+        assert call.calls == 3
+        assert cache.get_stats()["exact_hits"] == 1 and cache.get_stats()["skipped"] == 1
+
+    @pytest.mark.asyncio
+    async def test_semantic_hit_within_same_prefix(self):
+        """Similar final messages reuse a response only under the same system prompt"""
+        from utils.llm_response_cache import LLMResponseCache
+
+        vectors = {"写一个悬疑短剧": [1.0, 0.0], "写个悬疑短剧": [0.99, 0.05], "评估这部剧": [0.0, 1.0]}
+
+        async def _embed(text):
+            return vectors[text]
+
+        cache = LLMResponseCache(embed_fn=_embed, similarity_threshold=0.95)
+        await cache.set(_messages("写一个悬疑短剧"), "m", {"temperature": 0}, "story_creation")
+
+        assert await cache.get(_messages("写个悬疑短剧"), "m", {"temperature": 0}) == "story_creation"
+        assert await cache.get(_messages("评估这部剧"), "m", {"temperature": 0}) is None
+        assert await cache.get(_messages("写个悬疑短剧", system="其他助手"), "m", {"temperature": 0}) is None
+        assert cache.get_stats()["semantic_hits"] == 1
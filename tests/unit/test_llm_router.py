@@ -0,0 +1,159 @@
+"""
+Unit tests for the hedging / failover LLM routing client
+"""
+import asyncio
+
+import pytest
+
+
+class _FakeClient:
+    """Minimal stand-in for a provider client"""
+
+    def __init__(self, provider, delay=0.0, fail=False, chunks=None):
+        self.provider = provider
+        self.model = f"{provider}-model"
+        self.api_key = ""
+        self.base_url = ""
+        self.temperature = 0.7
+        self.max_tokens = 100
+        self.timeout = 30
+        self.max_retries = 1
+        self.delay = delay
+        self.fail = fail
+        self.chunks = chunks or [f"{provider}-a", f"{provider}-b"]
+        self.calls = 0
+        self.cancelled = False
+
+    async def chat(self, messages, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.fail:
+            raise ConnectionError(f"{self.provider} down")
+        return self.provider
+
+    async def stream_chat(self, messages, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            yield f"错误: {self.provider} down"
+            return
+        for chunk in self.chunks:
+            yield chunk
+
+
+def _router(*clients, **kwargs):
+    from utils.circuit_breaker import CircuitBreakerRegistry
+    from utils.llm_router import RoutingLLMClient, _hedge_history
+
+    CircuitBreakerRegistry.reset_all()
+    _hedge_history.clear()
+    options = dict(min_hedge_delay=0.05, max_hedge_delay=1.0, initial_hedge_delay=0.05, first_token_timeout=0.5)
+    options.update(kwargs)
+    return RoutingLLMClient(list(clients), **options)
+
+
+@pytest.mark.unit
+class TestRoutingLLMClient:
+    """Test hedging, failover and latency tracking"""
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self):
+        primary, backup = _FakeClient("p1"), _FakeClient("p2")
+        router = _router(primary, backup)
+
+        assert await router.chat([{"role": "user", "content": "hi"}]) == "p1"
+        assert backup.calls == 0
+        assert router.stats["hedged"] == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged_and_cancelled(self):
+        primary, backup = _FakeClient("p1", delay=1.0), _FakeClient("p2", delay=0.01)
+        router = _router(primary, backup)
+
+        assert await router.chat([{"role": "user", "content": "hi"}]) == "p2"
+        await asyncio.sleep(0)
+        assert router.stats["hedged"] == 1
+        assert router.stats["hedge_wins"] == 1
+        assert primary.cancelled
+
+    @pytest.mark.asyncio
+    async def test_failed_primary_fails_over(self):
+        primary, backup = _FakeClient("p1", fail=True), _FakeClient("p2")
+        router = _router(primary, backup, hedge_enabled=False)
+
+        assert await router.chat([{"role": "user", "content": "hi"}]) == "p2"
+        assert router.stats["failovers"] == 1
+
+        primary.fail = backup.fail = True
+        with pytest.raises(ConnectionError):
+            await router.chat([{"role": "user", "content": "hi"}])
+
+    @pytest.mark.asyncio
+    async def test_stream_fails_over_before_first_chunk(self):
+        primary, backup = _FakeClient("p1", fail=True), _FakeClient("p2")
+        router = _router(primary, backup)
+
+        chunks = [chunk async for chunk in router.stream_chat([{"role": "user", "content": "hi"}])]
+        assert chunks == ["p2-a", "p2-b"]
+
+        primary.fail, primary.delay = False, 1.0
+        chunks = [chunk async for chunk in router.stream_chat([{"role": "user", "content": "hi"}])]
+        assert chunks == ["p2-a", "p2-b"]
+        assert router.stats["failovers"] == 2
+
+    def test_hedge_delay_follows_latency_percentile(self):
+        from utils.circuit_breaker import CircuitBreaker
+
+        primary = _FakeClient("p1")
+        router = _router(primary, _FakeClient("p2"))
+        breaker = router._breaker(primary)
+        assert isinstance(breaker, CircuitBreaker)
+        assert router.hedge_delay(primary) == 0.05
+
+        for latency in range(1, 21):
+            breaker.record_success(latency / 100, "chat:256")
+        assert breaker.latency_percentile(95, "chat:256") == pytest.approx(0.19)
+        assert router.hedge_delay(primary) == pytest.approx(0.19)
+        assert router.hedge_delay(primary, router._call_class(primary, {"max_tokens": 8000})) == 0.05
+
+    def test_breakers_are_keyed_by_provider_and_model(self):
+        primary, other = _FakeClient("p1"), _FakeClient("p1")
+        other.model = "p1-large"
+        router = _router(primary, other)
+
+        assert router._breaker(primary) is not router._breaker(other)
+        assert router._breaker(primary).name == "llm_p1:p1-model"
+
+    @pytest.mark.asyncio
+    async def test_cancelled_primary_records_lower_bound(self):
+        primary, backup = _FakeClient("p1", delay=1.0), _FakeClient("p2", delay=0.01)
+        router = _router(primary, backup)
+
+        assert await router.chat([{"role": "user", "content": "hi"}]) == "p2"
+        await asyncio.sleep(0)
+        breaker = router._breaker(primary)
+        assert breaker.latency_sample_count("chat:256") == 1
+        assert breaker.latency_percentile(50, "chat:256") >= 0.05
+        assert breaker.success_count == 0
+
+    @pytest.mark.asyncio
+    async def test_hedge_rate_is_capped(self):
+        from utils.llm_router import HEDGE_WINDOW
+
+        primary, backup = _FakeClient("p1", delay=0.2), _FakeClient("p2", delay=0.01)
+        router = _router(primary, backup, max_hedge_rate=2 / HEDGE_WINDOW)
+
+        for _ in range(3):
+            await router.chat([{"role": "user", "content": "hi"}])
+        assert router.stats["hedged"] == 2
+        assert backup.calls == 2
+
+    def test_provider_specs_are_parsed(self):
+        from utils.llm_router import parse_provider_specs
+
+        assert parse_provider_specs("zhipu, openai:gpt-4o-mini,") == [("zhipu", None), ("openai", "gpt-4o-mini")]
+        assert parse_provider_specs(None) == []
@@ -0,0 +1,190 @@
+"""
+Unit tests for the local vector index
+
+Tests the MilvusClient-compatible local backend, filter expressions and IVF search
+"""
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def client(tmp_path):
+    from utils.local_vector_index import LocalVectorClient
+    return LocalVectorClient(str(tmp_path / "vectors"))
+
+
+@pytest.mark.unit
+class TestFilterExpr:
+    """Test Milvus-style filter expressions"""
+
+    def test_operators(self):
+        from utils.local_vector_index import compile_filter_expr
+
+        row = {"text_id": "p1:f1:3", "metadata": {"project_id": "p1", "chunk_index": 3}}
+
+        assert compile_filter_expr('text_id like "p1:f1:%"')(row)
+        assert not compile_filter_expr('text_id like "p1:f2:%"')(row)
+        assert compile_filter_expr('project_id == "p1"')(row)
+        assert compile_filter_expr("metadata[\"project_id\"] == 'p1' and chunk_index >= 3")(row)
+        assert compile_filter_expr('text_id in ["x", "p1:f1:3"]')(row)
+        assert compile_filter_expr('project_id == "p2" or chunk_index == 3')(row)
+
+    def test_connectives_inside_quoted_literals(self):
+        from utils.local_vector_index import compile_filter_expr
+
+        row = {"title": "a and b", "tag": "x or y", "chunk_index": 3}
+
+        assert compile_filter_expr('title == "a and b"')(row)
+        assert compile_filter_expr("tag == 'x or y' and chunk_index == 3")(row)
+        assert not compile_filter_expr('title == "a and b" and tag == "x && y"')(row)
+        assert compile_filter_expr('title in ["a or b", "a and b"]')(row)
+
+    def test_unsupported_expression(self):
+        from utils.local_vector_index import compile_filter_expr
+
+        with pytest.raises(ValueError):
+            compile_filter_expr("project_id ~ p1")
+
+
+@pytest.mark.unit
+class TestLocalVectorClient:
+    """Test local vector backend"""
+
+    @pytest.mark.asyncio
+    async def test_insert_search_delete(self, client):
+        """Insert, filtered search and delete behave like MilvusClient"""
+        await client.create_collection("frags", dimension=3)
+        await client.insert_vectors(
+            "frags",
+            text_ids=["p1:f1:0", "p1:f1:1", "p2:f1:0"],
+            contents=["a", "b", "c"],
+            vectors=[[1, 0, 0], [0, 1, 0], [0.9, 0.1, 0]],
+            metadata_list=[{"project_id": "p1"}, {"project_id": "p1"}, {"project_id": "p2"}],
+        )
+
+        hits = (await client.search_vectors("frags", [[1, 0, 0]], top_k=2))[0]
+        assert [h["text_id"] for h in hits] == ["p1:f1:0", "p2:f1:0"]
+        assert hits[0]["score"] == pytest.approx(1.0)
+
+        filtered = (await client.search_vectors(
+            "frags", [[1, 0, 0]], top_k=5, metadata_filter='project_id == "p2"'
+        ))[0]
+        assert [h["text_id"] for h in filtered] == ["p2:f1:0"]
+
+        assert await client.delete_by_expr("frags", 'text_id like "p1:f1:%"')
+        hits = (await client.search_vectors("frags", [[1, 0, 0]], top_k=5))[0]
+        assert [h["text_id"] for h in hits] == ["p2:f1:0"]
+
+        stored = await client.get_vectors("frags", ["p1:f1:0", "p2:f1:0"])
+        assert list(stored) == ["p2:f1:0"]
+        assert np.linalg.norm(stored["p2:f1:0"]) == pytest.approx(1.0)
+
+    @pytest.mark.asyncio
+    async def test_persistence_across_clients(self, tmp_path):
+        """Collections reload from disk"""
+        from utils.local_vector_index import LocalVectorClient
+
+        first = LocalVectorClient(str(tmp_path / "v"))
+        await first.create_collection("c", dimension=2)
+        await first.insert_vectors("c", ["a", "b"], ["A", "B"], [[1, 0], [0, 1]])
+        await first.delete_by_expr("c", 'text_id == "b"')
+
+        second = LocalVectorClient(str(tmp_path / "v"))
+        info = await second.get_collection_info("c")
+        hits = (await second.search_vectors("c", [[0, 1]], top_k=5))[0]
+
+        assert info["num_entities"] == 1
+        assert [h["text_id"] for h in hits] == ["a"]
+        assert await second.list_collections() == ["c"]
+
+    def test_ivf_search_recall(self, tmp_path, monkeypatch):
+        """IVF search finds the exact nearest neighbour for in-corpus queries"""
+        from utils.local_vector_index import LocalVectorCollection
+
+        monkeypatch.setattr(LocalVectorCollection, "IVF_MIN_ROWS", 500)
+        rng = np.random.default_rng(1)
+        data = rng.normal(size=(2000, 16)).astype(np.float32)
+
+        collection = LocalVectorCollection(tmp_path / "ivf", "ivf", dimension=16)
+        collection.insert([str(i) for i in range(2000)], [""] * 2000, [{}] * 2000, data.tolist())
+
+        # 首次检索触发后台构建，构建期间按全量扫描返回
+        exact = collection.search(data[:20].tolist(), top_k=1)
+        assert collection.wait_for_index(timeout=30)
+
+        hits = collection.search(data[:20].tolist(), top_k=1)
+
+        assert [h[0][0] for h in exact] == list(range(20))
+        assert [h[0][0] for h in hits] == list(range(20))
+
+    def test_indexed_filters_track_inserts(self, tmp_path):
+        """Column-indexed and cached per-row filters both see rows inserted after first use"""
+        from utils.local_vector_index import LocalVectorCollection, parse_indexed_filter
+
+        assert parse_indexed_filter('text_id like "p1:f:%" and project_id == "p1"') == [
+            ("text_id", "like", "p1:f:"), ("project_id", "==", "p1")
+        ]
+        assert parse_indexed_filter('text_id like "p1_%"') is None
+        assert parse_indexed_filter('content_type == "x"') is None
+
+        collection = LocalVectorCollection(tmp_path / "cols", "cols", dimension=2)
+        collection.insert(["p1:a:0", "p2:a:0"], ["", ""], [{"project_id": "p1"}, {"project_id": "p2"}],
+                          [[1, 0], [0, 1]])
+        prefix_expr = 'text_id like "p1:a:%"'
+        row_expr = 'content_type == "x"'
+        assert collection._filter_mask(prefix_expr).tolist() == [True, False]
+        assert collection._filter_mask(row_expr).tolist() == [False, False]
+
+        collection.insert(["p1:a:1", "p1:b:0"], ["", ""],
+                          [{"project_id": "p1", "content_type": "x"}, {"project_id": "p1"}], [[1, 1], [1, 0]])
+
+        assert collection._filter_mask(prefix_expr).tolist() == [True, False, True, False]
+        assert collection._filter_mask('metadata["project_id"] == "p1"').tolist() == [True, False, True, True]
+        assert collection._filter_mask('text_id in ["p2:a:0", "p1:b:0"]').tolist() == [False, True, False, True]
+        assert collection._filter_mask(row_expr).tolist() == [False, False, True, False]
+
+        collection.delete('text_id == "p1:a:0"')
+        hits = collection.search([[1, 0]], top_k=5, expr=prefix_expr)[0]
+        assert [collection.rows[i]["text_id"] for i, _ in hits] == ["p1:a:1"]
+
+
+@pytest.mark.unit
+class TestAutoBackend:
+    """Test Milvus reconnect backoff in auto mode"""
+
+    @pytest.mark.asyncio
+    async def test_falls_back_and_reconnects(self, tmp_path, monkeypatch):
+        from utils import milvus_client as module
+        from utils.local_vector_index import LocalVectorClient
+
+        local = LocalVectorClient(str(tmp_path / "vectors"))
+        attempts = []
+        available = [False]
+
+        async def _connect():
+            attempts.append(available[0])
+            module.milvus_client._connected = available[0]
+            return available[0]
+
+        monkeypatch.setenv("VECTOR_BACKEND", "auto")
+        monkeypatch.setattr(module, "_local_vector_client", local)
+        monkeypatch.setattr(module, "_milvus_reconnect_delay", 0.0)
+        monkeypatch.setattr(module, "_milvus_next_reconnect_at", 0.0)
+        monkeypatch.setattr(module.milvus_client, "_connected", False)
+        monkeypatch.setattr(module.milvus_client, "connect", _connect)
+
+        assert await module.get_milvus_client() is local
+        assert await module.get_milvus_client() is local
+        assert len(attempts) == 1
+        assert module._milvus_reconnect_delay == module.MILVUS_RECONNECT_BASE_DELAY
+
+        # backoff window expired
+        module._milvus_next_reconnect_at = 0.0
+        assert await module.get_milvus_client() is local
+        assert len(attempts) == 2
+        assert module._milvus_reconnect_delay == module.MILVUS_RECONNECT_BASE_DELAY * 2
+
+        available[0] = True
+        module._milvus_next_reconnect_at = 0.0
+        assert await module.get_milvus_client() is module.milvus_client
+        assert module._milvus_reconnect_delay == 0.0
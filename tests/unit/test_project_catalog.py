@@ -0,0 +1,123 @@
+"""
+Unit tests for ProjectCatalog and the catalog-backed ProjectManager
+"""
+import pytest
+
+
+@pytest.mark.unit
+class TestProjectCatalog:
+    """Test SQLite project catalog"""
+
+    def _project(self, project_id, updated_at, user_id="u1", status="active", tags=None, name=None):
+        return {
+            "id": project_id,
+            "name": name or f"project {project_id}",
+            "description": "",
+            "user_id": user_id,
+            "created_at": "2024-01-01T00:00:00",
+            "updated_at": updated_at,
+            "status": status,
+            "tags": tags or [],
+            "metadata": {},
+            "file_count": 0,
+        }
+
+    def test_filters_and_ordering(self, tmp_path):
+        """Projects are filtered by user/status/tags and ordered by updated_at desc"""
+        from utils.project_catalog import ProjectCatalog
+
+        catalog = ProjectCatalog(tmp_path / "catalog.db")
+        catalog.upsert_project(self._project("a", "2024-01-02T00:00:00", tags=["悬疑"]))
+        catalog.upsert_project(self._project("b", "2024-01-03T00:00:00.500000", tags=["爱情"]))
+        catalog.upsert_project(self._project("c", "2024-01-04T00:00:00", user_id="u2"))
+        catalog.upsert_project(self._project("d", "2024-01-05T00:00:00", status="deleted"))
+
+        assert [p["id"] for p in catalog.query_projects(user_id="u1")] == ["d", "b", "a"]
+        assert [p["id"] for p in catalog.query_projects(user_id="u1", status="active")] == ["b", "a"]
+        assert [p["id"] for p in catalog.query_projects(tags=["悬疑"])] == ["a"]
+        assert catalog.count_projects(status="active") == 3
+
+        catalog.upsert_project(self._project("a", "2024-01-06T00:00:00", tags=["爱情"]))
+        assert [p["id"] for p in catalog.query_projects(tags=["爱情"])] == ["a", "b"]
+
+    def test_keyset_pagination(self, tmp_path):
+        """Cursor pages cover every project exactly once, including timestamp ties"""
+        from utils.project_catalog import ProjectCatalog
+
+        catalog = ProjectCatalog(tmp_path / "catalog.db")
+        for i in range(7):
+            catalog.upsert_project(self._project(f"p{i}", f"2024-01-0{1 + i // 2}T00:00:00"))
+
+        seen, cursor = [], None
+        while True:
+            page = catalog.query_projects(limit=3, cursor=cursor)
+            if not page:
+                break
+            seen.extend(p["id"] for p in page)
+            cursor = catalog.encode_cursor(page[-1])
+
+        assert seen == [p["id"] for p in catalog.query_projects()]
+        assert len(set(seen)) == 7
+
+
+@pytest.mark.unit
+class TestProjectManagerCatalog:
+    """Test ProjectManager kept in sync with the catalog"""
+
+    @pytest.mark.asyncio
+    async def test_list_search_and_files(self, tmp_path):
+        """Listing, searching and file lookups go through the catalog"""
+        from apis.core.schemas import FileType, ProjectStatus
+        from utils.project_manager import ProjectManager
+
+        manager = ProjectManager(str(tmp_path / "projects"))
+        first = await manager.create_project("古堡疑云", user_id="u1", tags=["悬疑"])
+        second = await manager.create_project("春日来信", user_id="u1", description="爱情故事")
+        await manager.create_project("其他", user_id="u2")
+
+        file = await manager.add_file_to_project(first.id, "大纲", FileType.SCRIPT, {"text": "开场"})
+        await manager.add_file_to_project(first.id, "笔记", FileType.NOTE, "备注")
+
+        projects = await manager.list_projects(user_id="u1")
+        assert [p.id for p in projects] == [first.id, second.id]
+        assert await manager.count_projects(user_id="u1") == 2
+
+        page, cursor = await manager.list_projects_after(user_id="u1", limit=1)
+        assert [p.id for p in page] == [first.id]
+        page, cursor = await manager.list_projects_after(user_id="u1", cursor=cursor, limit=1)
+        assert [p.id for p in page] == [second.id] and cursor is None
+
+        assert [p.id for p in await manager.search_projects("爱情")] == [second.id]
+        assert [p.id for p in await manager.search_projects("悬疑", user_id="u1")] == [first.id]
+
+        scripts = await manager.get_project_files(first.id, file_type=FileType.SCRIPT)
+        assert [f.id for f in scripts] == [file.id]
+        assert len(await manager.get_project_files(first.id)) == 2
+
+        updated = await manager.update_file(first.id, file.id, content={"text": "第二版"})
+        assert updated.version == 2
+        assert (await manager.get_file(first.id, file.id)).content == {"text": "第二版"}
+
+        assert await manager.delete_file(first.id, file.id)
+        assert await manager.get_file(first.id, file.id) is None
+        assert len(await manager.get_project_files(first.id)) == 1
+
+        await manager.delete_project(second.id)
+        assert [p.id for p in await manager.list_projects(user_id="u1")] == [first.id]
+        assert await manager.count_projects(user_id="u1", status=ProjectStatus.DELETED) == 1
+
+    @pytest.mark.asyncio
+    async def test_catalog_built_from_existing_projects(self, tmp_path):
+        """Projects written before the catalog existed are indexed on first use"""
+        from apis.core.schemas import FileType
+        from utils.project_manager import ProjectManager
+
+        base_dir = tmp_path / "projects"
+        manager = ProjectManager(str(base_dir))
+        project = await manager.create_project("旧项目", user_id="u1")
+        file = await manager.add_file_to_project(project.id, "角色", FileType.CHARACTER_PROFILE, {"name": "甲"})
+        (base_dir / ProjectManager.CATALOG_FILE).unlink()
+
+        reopened = ProjectManager(str(base_dir))
+        assert [p.id for p in await reopened.list_projects(user_id="u1")] == [project.id]
+        assert (await reopened.get_file(project.id, file.id)).filename == "角色"
@@ -0,0 +1,145 @@
+"""
+Unit tests for ProjectVersionStore and ProjectManager file versions
+"""
+import pytest
+
+
+def _meta(version, file_id="f1"):
+    return {"id": file_id, "project_id": "p1", "filename": "剧本", "file_type": "script", "version": version}
+
+
+@pytest.mark.unit
+class TestProjectVersionStore:
+    """Test content-addressed version store"""
+
+    def test_round_trip_and_dedupe(self, tmp_path):
+        """Identical content is stored once and every version reads back"""
+        from utils.project_version_store import ProjectVersionStore, serialize_content
+
+        store = ProjectVersionStore(tmp_path / "versions")
+        first = store.save_version(_meta(1), serialize_content({"text": "第一幕"}))
+        second = store.save_version(_meta(2), serialize_content({"text": "第二幕"}))
+        third = store.save_version(_meta(3), serialize_content({"text": "第一幕"}))
+
+        assert third["hash"] == first["hash"] and third["stored_size"] == 0
+        assert len([p for p in (tmp_path / "versions" / "blobs").rglob("*") if p.is_file()]) == 2
+        assert [v["version"] for v in store.list_versions("f1")] == [1, 2, 3]
+        assert store.load_version("f1", 2) == (_meta(2), {"text": "第二幕"})
+        assert store.load_version("f1", 3)[1] == {"text": "第一幕"}
+        assert store.load_version("f1", 9) is None
+        assert second["size"] == len(serialize_content({"text": "第二幕"}))
+
+    def test_delta_chain_stays_small(self, tmp_path):
+        """Small edits to a large script store deltas, chains are bounded"""
+        from utils import project_version_store as module
+        from utils.project_version_store import ProjectVersionStore, serialize_content
+
+        if not module.ZSTD_AVAILABLE:
+            pytest.skip("zstandard not installed")
+
+        import random
+        rng = random.Random(0)
+        lines = [f"第{i}场 " + "".join(rng.choice("甲乙丙丁戊己庚辛") for _ in range(40)) for i in range(2000)]
+
+        store = ProjectVersionStore(tmp_path / "versions")
+        first = store.save_version(_meta(1), serialize_content("\n".join(lines)))
+        for version in range(2, 2 + ProjectVersionStore.MAX_DELTA_CHAIN + 2):
+            lines[version] = f"修改{version}"
+            store.save_version(_meta(version), serialize_content("\n".join(lines)))
+
+        deltas = [v["stored_size"] for v in store.list_versions("f1")[1:ProjectVersionStore.MAX_DELTA_CHAIN]]
+        assert max(deltas) < first["stored_size"] / 10
+        last = store.list_versions("f1")[-1]
+        assert store.load_version("f1", last["version"])[1] == "\n".join(lines)
+
+    def test_latest_versions_as_of_and_tombstones(self, tmp_path):
+        """Point-in-time lookup honours deletions"""
+        from datetime import datetime
+        from utils.project_version_store import ProjectVersionStore, serialize_content
+
+        store = ProjectVersionStore(tmp_path / "versions")
+        store.save_version(_meta(1, "a"), serialize_content("a1"))
+        store.save_version(_meta(1, "b"), serialize_content("b1"))
+        checkpoint = datetime.now()
+        store.save_version(_meta(2, "a"), serialize_content("a2"))
+        store.mark_deleted("b")
+
+        assert {k: v["version"] for k, v in store.latest_versions(checkpoint).items()} == {"a": 1, "b": 1}
+        assert {k: v["version"] for k, v in store.latest_versions().items()} == {"a": 2}
+
+    def test_as_of_compares_across_timezones(self, tmp_path):
+        """Aware, naive-local and legacy naive timestamps are compared as UTC instants"""
+        import json
+        from datetime import datetime, timedelta, timezone
+        from utils.project_version_store import ProjectVersionStore
+
+        store = ProjectVersionStore(tmp_path / "versions")
+        store.version_dir.mkdir(parents=True)
+        written = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+        with open(store.version_dir / store.INDEX_FILE, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"file_id": "a", "version": 1, "hash": "h1", "timestamp": written.isoformat()}) + "\n")
+            naive_local = (written + timedelta(hours=1)).astimezone().replace(tzinfo=None)
+            f.write(json.dumps({"file_id": "a", "version": 2, "hash": "h2", "timestamp": naive_local.isoformat()}) + "\n")
+
+        shanghai = timezone(timedelta(hours=8))
+        assert store.latest_versions(datetime(2026, 1, 1, 20, 30, tzinfo=shanghai))["a"]["version"] == 1
+        assert store.latest_versions(datetime(2026, 1, 1, 21, 30, tzinfo=shanghai))["a"]["version"] == 2
+        assert store.latest_versions(written.astimezone().replace(tzinfo=None))["a"]["version"] == 1
+        assert store.latest_versions(written - timedelta(seconds=1)) == {}
+
+    def test_legacy_snapshots_imported_on_first_access(self, tmp_path):
+        """Old <time>_<id>.json snapshots are indexed once and moved aside"""
+        import json
+        from utils.project_version_store import ProjectVersionStore, serialize_content
+
+        version_dir = tmp_path / "versions"
+        version_dir.mkdir()
+        for stamp, version, text in [("20250101_100000", 1, "一稿"), ("20250102_100000", 2, "二稿")]:
+            snapshot = {
+                "file": {"id": "f1", "filename": "大纲", "version": version, "content": {"text": text}},
+                "timestamp": f"{stamp[:4]}-{stamp[4:6]}-{stamp[6:8]}T10:00:00"
+            }
+            (version_dir / f"{stamp}_f1.json").write_text(json.dumps(snapshot, ensure_ascii=False), encoding="utf-8")
+
+        store = ProjectVersionStore(version_dir)
+        store.save_version(_meta(3, "f1"), serialize_content({"text": "三稿"}))
+
+        assert [v["version"] for v in store.list_versions("f1")] == [1, 2, 3]
+        assert store.load_version("f1", 1) == ({"id": "f1", "filename": "大纲", "version": 1}, {"text": "一稿"})
+        assert not list(version_dir.glob("*.json"))
+        assert len(list((version_dir / "legacy").glob("*.json"))) == 2
+        assert [v["version"] for v in ProjectVersionStore(version_dir).list_versions("f1")] == [1, 2, 3]
+
+
+@pytest.mark.unit
+class TestProjectManagerVersions:
+    """Test ProjectManager version history"""
+
+    @pytest.mark.asyncio
+    async def test_update_list_and_restore(self, tmp_path):
+        """Updates record versions that can be listed and restored"""
+        from datetime import datetime
+        from apis.core.schemas import FileType, ProjectStatus
+        from utils.project_manager import ProjectManager
+
+        manager = ProjectManager(str(tmp_path / "projects"))
+        project = await manager.create_project("剧本", user_id="u1")
+        file = await manager.add_file_to_project(project.id, "大纲", FileType.SCRIPT, {"text": "一稿"})
+        assert file.file_size == len('{"text": "一稿"}'.encode("utf-8"))
+
+        await manager.update_file(project.id, file.id, content={"text": "二稿"})
+        await manager.update_file(project.id, file.id, filename="大纲-改")
+
+        versions = await manager.list_file_versions(project.id, file.id)
+        assert [v["version"] for v in versions] == [1, 2]
+        assert (await manager.get_file_version(project.id, file.id, 1)).content == {"text": "一稿"}
+
+        before_restore = datetime.now()
+        restored = await manager.restore_file_version(project.id, file.id, 1)
+        assert restored.version == 3 and restored.content == {"text": "一稿"}
+        assert (await manager.get_file(project.id, file.id)).filename == "大纲-改"
+
+        await manager.update_project(project.id, status=ProjectStatus.ARCHIVED)
+        copy = await manager.restore_project(project.id, as_of=before_restore)
+        copied_files = await manager.get_project_files(copy.id)
+        assert [f.content for f in copied_files] == [{"text": "二稿"}]
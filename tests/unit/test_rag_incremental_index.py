@@ -0,0 +1,179 @@
+"""
+Unit tests for incremental project-file indexing with chunk change detection
+"""
+import re
+
+import pytest
+
+
+class _FakeVectorClient:
+    """In-memory stand-in for the Milvus client (auto_id primary key: inserts append, text_id is not unique)"""
+
+    backend = "milvus"
+
+    def __init__(self):
+        self.rows = []
+        self.inserted = []
+
+    async def create_collection(self, **kwargs):
+        return True
+
+    async def delete_by_expr(self, collection_name, expr):
+        match = re.fullmatch(r'text_id like "(.*)%"', expr)
+        if match:
+            self.rows = [row for row in self.rows if not row[0].startswith(match.group(1))]
+        else:
+            doomed = set(re.findall(r'"([^"]+)"', expr))
+            self.rows = [row for row in self.rows if row[0] not in doomed]
+        return True
+
+    async def insert_vectors(self, collection_name, text_ids, contents, vectors, metadata_list):
+        self.inserted.append(list(text_ids))
+        self.rows.extend(zip(text_ids, contents, vectors))
+        return True
+
+    async def get_vectors(self, collection_name, text_ids):
+        return {row[0]: row[2] for row in self.rows if row[0] in text_ids}
+
+    def text_ids(self):
+        return sorted(row[0] for row in self.rows)
+
+    def contents(self, text_id):
+        return [row[1] for row in self.rows if row[0] == text_id]
+
+
+class _FakeEmbeddingClient:
+    model = "fake-embedding"
+    dimension = 2
+
+    def __init__(self):
+        self.embedded = 0
+
+    async def aembed_texts(self, texts):
+        self.embedded += len(texts)
+        return [[1.0, float(len(text))] for text in texts]
+
+
+@pytest.fixture
+def indexer(tmp_path, monkeypatch):
+    monkeypatch.setenv("ZHIPU_API_KEY", "x")
+    import utils.rag_indexer as rag_indexer
+    import utils.rag_index_state as rag_index_state
+    import utils.bm25_index_store as bm25_index_store
+    from utils.text_chunker import ChunkingStrategy
+
+    client = _FakeVectorClient()
+
+    async def _get_client():
+        return client
+
+    monkeypatch.setattr(rag_indexer, "get_milvus_client", _get_client)
+    monkeypatch.setattr(rag_index_state, "_rag_index_state", rag_index_state.RagIndexState(tmp_path / "state.db"))
+    monkeypatch.setattr(
+        bm25_index_store, "get_bm25_index_store",
+        lambda: bm25_index_store.BM25IndexStore(str(tmp_path / "bm25"))
+    )
+
+    instance = rag_indexer.RagIndexer(ChunkingStrategy.FIXED)
+    instance.embedding_client = _FakeEmbeddingClient()
+    instance.CHUNK_SIZE, instance.OVERLAP = 50, 0
+    return instance, client
+
+
+def _paragraphs(*words):
+    return "".join(word * 50 for word in words)
+
+
+@pytest.mark.unit
+class TestIncrementalIndexing:
+    """Test unchanged skip, chunk-level diff and fingerprint changes"""
+
+    @pytest.mark.asyncio
+    async def test_unchanged_file_is_skipped(self, indexer):
+        rag, client = indexer
+        content = _paragraphs("a", "b", "c")
+
+        first = await rag.index_project_file("p1", "f1", "f.txt", content)
+        assert first == {"status": "indexed", "embedded": 3, "moved": 0, "kept": 0}
+        assert client.text_ids() == ["p1:f1:0", "p1:f1:1", "p1:f1:2"]
+
+        second = await rag.index_project_file("p1", "f1", "f.txt", content)
+        assert second["status"] == "unchanged"
+        assert rag.embedding_client.embedded == 3
+
+    @pytest.mark.asyncio
+    async def test_only_changed_chunks_are_rewritten(self, indexer):
+        rag, client = indexer
+        await rag.index_project_file("p1", "f1", "f.txt", _paragraphs("a", "b", "c"))
+
+        result = await rag.index_project_file("p1", "f1", "f.txt", _paragraphs("a", "x"))
+        assert result == {"status": "indexed", "embedded": 1, "moved": 0, "kept": 1}
+        assert client.inserted[-1] == ["p1:f1:1"]
+        assert client.text_ids() == ["p1:f1:0", "p1:f1:1"]
+        assert client.contents("p1:f1:1") == ["x" * 50]
+
+    @pytest.mark.asyncio
+    async def test_fingerprint_or_metadata_change_rewrites_all(self, indexer):
+        rag, client = indexer
+        content = _paragraphs("a", "b")
+        await rag.index_project_file("p1", "f1", "f.txt", content)
+
+        result = await rag.index_project_file("p1", "f1", "renamed.txt", content)
+        assert result["embedded"] == 2
+        assert client.text_ids() == ["p1:f1:0", "p1:f1:1"]
+
+        rag.embedding_client.model = "new-model"
+        result = await rag.index_project_file("p1", "f1", "renamed.txt", content)
+        assert result["embedded"] == 2
+        assert client.text_ids() == ["p1:f1:0", "p1:f1:1"]
+        assert (await rag.index_project_file("p1", "f1", "renamed.txt", content))["status"] == "unchanged"
+
+        await rag.delete_project_file_chunks("p1", "f1")
+        assert client.rows == []
+        assert (await rag.index_project_file("p1", "f1", "renamed.txt", content))["status"] == "indexed"
+
+    @pytest.mark.asyncio
+    async def test_model_change_with_shorter_content_drops_tail_chunks(self, indexer):
+        rag, client = indexer
+        await rag.index_project_file("p1", "f1", "f.txt", _paragraphs("a", "b", "c"))
+
+        rag.embedding_client.model = "new-model"
+        result = await rag.index_project_file("p1", "f1", "f.txt", _paragraphs("a", "b"))
+        assert result == {"status": "indexed", "embedded": 2, "moved": 0, "kept": 0}
+        assert client.text_ids() == ["p1:f1:0", "p1:f1:1"]
+        assert client.contents("p1:f1:0") == ["a" * 50]
+
+    @pytest.mark.asyncio
+    async def test_shifted_chunks_reuse_vectors(self, indexer):
+        rag, client = indexer
+        await rag.index_project_file("p1", "f1", "f.txt", _paragraphs("a", "b", "c"))
+
+        result = await rag.index_project_file("p1", "f1", "f.txt", _paragraphs("x", "a", "b", "c"))
+        assert result == {"status": "indexed", "embedded": 1, "moved": 3, "kept": 0}
+        assert rag.embedding_client.embedded == 4
+        assert client.text_ids() == ["p1:f1:0", "p1:f1:1", "p1:f1:2", "p1:f1:3"]
+        assert client.contents("p1:f1:0") == ["x" * 50]
+        assert client.contents("p1:f1:3") == ["c" * 50]
+
+    @pytest.mark.asyncio
+    async def test_backend_change_rewrites_all(self, indexer):
+        rag, client = indexer
+        content = _paragraphs("a", "b")
+        await rag.index_project_file("p1", "f1", "f.txt", content)
+
+        client.backend = "local"
+        result = await rag.index_project_file("p1", "f1", "f.txt", content)
+        assert result == {"status": "indexed", "embedded": 2, "moved": 0, "kept": 0}
+        assert client.text_ids() == ["p1:f1:0", "p1:f1:1"]
+
+    @pytest.mark.asyncio
+    async def test_reindex_false_never_deletes(self, indexer):
+        rag, client = indexer
+
+        async def _failing_delete(collection_name, expr):
+            raise AssertionError("reindex=False must not delete")
+
+        client.delete_by_expr = _failing_delete
+        result = await rag.index_project_file("p1", "f1", "f.txt", _paragraphs("a", "b"), reindex=False)
+        assert result["status"] == "indexed"
+        assert client.text_ids() == ["p1:f1:0", "p1:f1:1"]
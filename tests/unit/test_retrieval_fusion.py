@@ -0,0 +1,88 @@
+"""
+Unit tests for hybrid retrieval fusion and the parallel RAG fan-out
+"""
+import asyncio
+
+import pytest
+
+
+def _item(content, similarity, source_type):
+    return {"content": content, "similarity": similarity, "source": source_type, "type": source_type}
+
+
+@pytest.mark.unit
+class TestReciprocalRankFusion:
+    """Test RRF scoring and near-duplicate merging"""
+
+    def test_near_duplicates_merge_into_hybrid(self):
+        """The same passage from both retrievers is merged and ranked first"""
+        from utils.retrieval_fusion import reciprocal_rank_fusion
+
+        shared = "雨夜，侦探推开古堡的大门，烛光在走廊尽头摇曳，管家提着灯笼迎了上来。"
+        results = reciprocal_rank_fusion({
+            "vector": [_item("女主角在花园里读信，信中提到了失踪的哥哥。", 0.9, "vector"), _item(shared, 0.8, "vector")],
+            "text": [_item(shared + "！", 0.7, "text")],
+        })
+
+        assert len(results) == 2
+        assert results[0]["type"] == "hybrid" and results[0]["sources"] == ["vector", "text"]
+        assert results[0]["similarity"] == 0.8 and results[0]["content"].endswith("！")
+
+    def test_simhash_distance(self):
+        """Small edits stay close, unrelated texts are far apart"""
+        from utils.retrieval_fusion import NEAR_DUPLICATE_DISTANCE, hamming_distance, simhash
+
+        a = simhash("他把钥匙藏在书架第三层的旧词典里，谁也没有发现。")
+        b = simhash("他把钥匙藏在书架第三层的旧字典里，谁也没有发现。")
+        c = simhash("第二天清晨，警察在湖边找到了那辆红色的自行车。")
+        assert hamming_distance(a, b) <= NEAR_DUPLICATE_DISTANCE < hamming_distance(a, c)
+
+    def test_simhash_matches_bitwise_definition(self):
+        """Vectorised fingerprint equals the per-bit majority vote over shingle hashes"""
+        import hashlib
+        from utils.retrieval_fusion import _shingles, simhash
+
+        def reference(text):
+            weights = [0] * 64
+            for shingle in _shingles(text):
+                value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+                for bit in range(64):
+                    weights[bit] += 1 if value >> bit & 1 else -1
+            return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+        for text in ["", "ab", "剧本", "第二天清晨，警察在湖边找到了那辆红色的自行车。" * 3]:
+            assert simhash(text) == reference(text)
+
+
+@pytest.mark.unit
+class TestAutoLoadRagContext:
+    """Test concurrent retrieval with per-source timeouts"""
+
+    @pytest.mark.asyncio
+    async def test_slow_source_is_skipped(self, monkeypatch):
+        """A retriever exceeding its timeout does not block the other one"""
+        monkeypatch.setenv("ZHIPU_API_KEY", "x")
+        from utils.enhanced_context_manager import EnhancedContextManager
+
+        manager = EnhancedContextManager()
+        manager.rag_source_timeouts = {"vector": 0.05, "text": 0.05}
+        stored = []
+
+        async def _vector(query, collection, top_k):
+            await asyncio.sleep(1)
+            return [_item("永远不会返回", 0.9, "vector")]
+
+        async def _text(query, collection, top_k):
+            return [_item("管家在午夜锁上了地下室的门。", 0.6, "text")]
+
+        async def _scratchpad(session_id, user_id, content, **kwargs):
+            stored.append(content)
+
+        monkeypatch.setattr(manager, "_vector_retrieve", _vector)
+        monkeypatch.setattr(manager, "_text_retrieve", _text)
+        monkeypatch.setattr(manager, "add_to_scratchpad", _scratchpad)
+
+        results = await asyncio.wait_for(manager.auto_load_rag_context("s", "u", "地下室"), timeout=0.5)
+
+        assert [r["type"] for r in results] == ["text"]
+        assert stored == ["管家在午夜锁上了地下室的门。"]
@@ -0,0 +1,161 @@
+"""
+Unit tests for the startup profiler and lazy router mounting
+"""
+import sys
+import textwrap
+
+import pytest
+
+
+@pytest.fixture
+def module_dir(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    def _write(name, source):
+        (tmp_path / f"{name}.py").write_text(textwrap.dedent(source), encoding="utf-8")
+        monkeypatch.delitem(sys.modules, name, raising=False)
+
+    return _write
+
+
+@pytest.mark.unit
+class TestStartupProfiler:
+    """Test import-time tree, loader restoration and phase timings"""
+
+    def test_import_tree_nests_child_imports(self, module_dir):
+        from utils.startup_profiler import StartupProfiler
+
+        module_dir("profiled_child", "import time\ntime.sleep(0.02)\nVALUE = 1\n")
+        module_dir("profiled_parent", "import time\nimport profiled_child\ntime.sleep(0.01)\n")
+
+        profiler = StartupProfiler()
+        profiler.start_import_profiling()
+        try:
+            with profiler.phase("imports"):
+                import profiled_parent
+        finally:
+            profiler.stop_import_profiling()
+
+        assert not profiler.import_profiling
+        assert type(profiled_parent.__loader__).__name__ == "SourceFileLoader"
+        assert profiled_parent.__spec__.loader is profiled_parent.__loader__
+
+        tree = profiler.import_tree(min_ms=0)
+        parent = next(node for node in tree if node["module"] == "profiled_parent")
+        child = parent["children"][0]
+        assert child["module"] == "profiled_child"
+        assert child["cumulative_ms"] >= 20
+        assert parent["cumulative_ms"] >= child["cumulative_ms"] + 10
+        assert parent["self_ms"] == pytest.approx(parent["cumulative_ms"] - child["cumulative_ms"], abs=0.05)
+
+        report = profiler.report(min_ms=0)
+        assert report["phases"][0]["phase"] == "imports"
+        assert report["phases"][0]["duration_ms"] >= 30
+        assert report["top_imports"][0]["module"] == "profiled_child"
+
+    def test_phases_recorded_without_import_profiling(self):
+        from utils.startup_profiler import StartupProfiler
+
+        profiler = StartupProfiler()
+        with profiler.phase("validation"):
+            pass
+        report = profiler.report()
+        assert [phase["phase"] for phase in report["phases"]] == ["validation"]
+        assert "import_tree" not in report
+
+
+@pytest.mark.unit
+class TestLazyRouterMounting:
+    """Test that routers are imported on the first request to their prefix"""
+
+    def _app(self, module_dir, static_dir=None):
+        from fastapi import FastAPI
+        from fastapi.staticfiles import StaticFiles
+        from middleware.lazy_router import LazyRouterMiddleware, LazyRouterMounter
+
+        module_dir("lazy_heavy_routes", """
+            from fastapi import APIRouter
+
+            router = APIRouter(prefix="/heavy")
+
+            @router.get("/ping")
+            async def ping():
+                return {"pong": True}
+        """)
+        module_dir("lazy_broken_routes", "raise ImportError('missing dependency')\n")
+
+        app = FastAPI()
+
+        @app.get("/heavy-light")
+        async def light():
+            return {"light": True}
+
+        mounter = LazyRouterMounter(app)
+        mounter.add("lazy_heavy_routes", "/heavy")
+        mounter.add("lazy_broken_routes", "/broken")
+        app.add_middleware(LazyRouterMiddleware, mounter=mounter)
+        if static_dir is not None:
+            app.mount("/", StaticFiles(directory=str(static_dir), html=True), name="frontend")
+        return app, mounter
+
+    def test_router_mounted_on_first_matching_request(self, module_dir):
+        from fastapi.testclient import TestClient
+
+        app, mounter = self._app(module_dir)
+        with TestClient(app) as client:
+            assert client.get("/heavy-light").json() == {"light": True}
+            assert "lazy_heavy_routes" not in sys.modules
+
+            assert client.get("/heavy/ping").json() == {"pong": True}
+            assert client.get("/heavy/ping").status_code == 200
+
+            assert client.get("/broken/x").status_code == 404
+            stats = {item["module"]: item for item in mounter.get_stats()}
+            assert stats["lazy_heavy_routes"]["loaded"]
+            assert stats["lazy_heavy_routes"]["import_ms"] is not None
+            assert "missing dependency" in stats["lazy_broken_routes"]["error"]
+            assert not mounter.pending
+
+    def test_router_mounted_ahead_of_root_static_mount(self, module_dir, tmp_path):
+        from fastapi.testclient import TestClient
+
+        static_dir = tmp_path / "dist"
+        static_dir.mkdir()
+        (static_dir / "index.html").write_text("<html>app</html>", encoding="utf-8")
+
+        app, mounter = self._app(module_dir, static_dir)
+        with TestClient(app) as client:
+            assert client.get("/heavy/ping").json() == {"pong": True}
+            assert client.get("/heavy/ping").json() == {"pong": True}
+            assert client.get("/").text == "<html>app</html>"
+            assert client.get("/heavy-light").json() == {"light": True}
+
+    def test_openapi_request_mounts_everything(self, module_dir):
+        from fastapi.testclient import TestClient
+
+        app, mounter = self._app(module_dir)
+        with TestClient(app) as client:
+            assert "/heavy/ping" in client.get("/openapi.json").json()["paths"]
+        assert mounter.routers[0].loaded
+
+    def test_load_all_mounts_eagerly(self, module_dir):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from middleware.lazy_router import LazyRouterMounter
+
+        module_dir("lazy_heavy_routes", """
+            from fastapi import APIRouter
+
+            router = APIRouter(prefix="/heavy")
+
+            @router.get("/ping")
+            async def ping():
+                return {"pong": True}
+        """)
+        app = FastAPI()
+        mounter = LazyRouterMounter(app)
+        mounter.add("lazy_heavy_routes", "/heavy")
+        mounter.load_all()
+        assert not mounter.pending
+        with TestClient(app) as client:
+            assert client.get("/heavy/ping").json() == {"pong": True}
@@ -0,0 +1,163 @@
+"""
+Unit tests for StreamEventBuffer write-behind batching
+"""
+import asyncio
+
+import pytest
+
+
+def _event(session_id, n, user_id="u1"):
+    return {"user_id": user_id, "session_id": session_id, "n": n}
+
+
+class _Sink:
+    """Collects flushed batches, optionally failing the first writes"""
+
+    def __init__(self, failures=0):
+        self.batches = []
+        self.failures = failures
+
+    async def __call__(self, batch):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("db down")
+        self.batches.append([(e["session_id"], e["n"]) for e in batch])
+
+
+@pytest.mark.unit
+class TestStreamEventBuffer:
+    """Test per-session buffering and flush thresholds"""
+
+    @pytest.mark.asyncio
+    async def test_size_threshold_flushes_one_session(self):
+        """A full session buffer is written as one batch, other sessions keep waiting"""
+        from utils.stream_event_buffer import StreamEventBuffer
+
+        sink = _Sink()
+        buffer = StreamEventBuffer(sink, batch_size=3, flush_interval=60)
+        await buffer.add(_event("s2", 0))
+        for n in range(3):
+            await buffer.add(_event("s1", n))
+
+        assert sink.batches == [[("s1", 0), ("s1", 1), ("s1", 2)]]
+        assert buffer.pending_count == 1
+
+        assert await buffer.flush_session("u1", "s2") == 1
+        assert sink.batches[-1] == [("s2", 0)]
+        await buffer.close()
+
+    @pytest.mark.asyncio
+    async def test_time_threshold_and_close(self):
+        """Events below the size threshold are written after the flush interval"""
+        from utils.stream_event_buffer import StreamEventBuffer
+
+        sink = _Sink()
+        buffer = StreamEventBuffer(sink, batch_size=100, flush_interval=0.01)
+        await buffer.add(_event("s1", 0))
+        await buffer.add(_event("s2", 0))
+        await asyncio.sleep(0.05)
+        assert sink.batches == [[("s1", 0), ("s2", 0)]]
+
+        await buffer.add(_event("s1", 1))
+        await buffer.close()
+        assert sink.batches[-1] == [("s1", 1)] and buffer.pending_count == 0
+
+    @pytest.mark.asyncio
+    async def test_backpressure_and_requeue(self):
+        """Writers wait at max_pending and failed batches are retried in order"""
+        from utils.stream_event_buffer import StreamEventBuffer
+
+        sink = _Sink(failures=1)
+        buffer = StreamEventBuffer(sink, batch_size=10, flush_interval=60, max_pending=10)
+        for n in range(5):
+            await buffer.add(_event("s1", n))
+        with pytest.raises(RuntimeError):
+            await buffer.flush_all()
+        assert buffer.pending_count == 5
+
+        for n in range(5, 15):
+            await buffer.add(_event(f"s{n % 2}", n))
+
+        assert sink.batches[0][:5] == [("s1", n) for n in range(5)]
+        assert sum(len(b) for b in sink.batches) + buffer.pending_count == 15
+        assert buffer.pending_count <= 10
+        await buffer.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_timed_flush_is_retried_with_backoff(self):
+        """A failed timed flush is rescheduled without waiting for new events"""
+        from utils.stream_event_buffer import StreamEventBuffer
+
+        sink = _Sink(failures=1)
+        buffer = StreamEventBuffer(sink, batch_size=100, flush_interval=0.1)
+        await buffer.add(_event("s1", 0))
+
+        await asyncio.sleep(0.15)
+        assert sink.batches == [] and buffer.pending_count == 1
+        assert buffer._retry_delay == 0.1
+
+        await asyncio.sleep(0.15)
+        assert sink.batches == [[("s1", 0)]]
+        assert buffer.pending_count == 0 and buffer._retry_delay == 0.0
+        await buffer.close()
+
+    @pytest.mark.asyncio
+    async def test_poison_event_is_isolated_and_dead_lettered(self):
+        """After repeated batch failures the bad row is bisected out and the rest is written"""
+        from utils.stream_event_buffer import StreamEventBuffer
+
+        written, dead = [], []
+
+        async def _sink(batch):
+            if any(e["n"] == 2 for e in batch):
+                raise ValueError("bad row")
+            written.extend(e["n"] for e in batch)
+
+        async def _dead_letter(events, error):
+            dead.extend((e["n"], str(error)) for e in events)
+
+        buffer = StreamEventBuffer(_sink, batch_size=100, flush_interval=60, dead_letter_callback=_dead_letter)
+        for n in range(5):
+            await buffer.add(_event("s1", n))
+
+        for _ in range(buffer.ISOLATE_AFTER_FAILURES):
+            with pytest.raises(ValueError):
+                await buffer.flush_all()
+        assert written == [] and buffer.pending_count == 5
+
+        with pytest.raises(ValueError):
+            await buffer.flush_all()
+        assert written == [0, 1, 3, 4] and buffer.pending_count == 1
+
+        with pytest.raises(ValueError):
+            await buffer.flush_all()
+        assert await buffer.flush_all() == 0
+        assert dead == [(2, "bad row")]
+        assert buffer.pending_count == 0 and buffer.dead_letter_count == 1
+        await buffer.close()
+
+    @pytest.mark.asyncio
+    async def test_outage_during_isolation_keeps_events(self):
+        """When nothing can be written the bisection stops early and every event stays queued"""
+        from utils.stream_event_buffer import StreamEventBuffer
+
+        calls = []
+
+        async def _sink(batch):
+            calls.append(len(batch))
+            raise ConnectionError("db down")
+
+        buffer = StreamEventBuffer(_sink, batch_size=100, flush_interval=60)
+        for n in range(64):
+            await buffer.add(_event("s1", n))
+        for _ in range(buffer.ISOLATE_AFTER_FAILURES):
+            with pytest.raises(ConnectionError):
+                await buffer.flush_all()
+
+        calls.clear()
+        with pytest.raises(ConnectionError):
+            await buffer.flush_all()
+        assert len(calls) <= 7 + buffer.ISOLATION_PROBE
+        assert buffer.pending_count == 64 and buffer.dead_letter_count == 0
+        buffer._closed = True
+        buffer._flush_task.cancel()
@@ -0,0 +1,79 @@
+"""
+Unit tests for the Redis Stream backed SSE replay logs
+"""
+import time
+
+import pytest
+
+
+def _redis_client(fakeredis):
+    from utils.redis_client import JubenRedisClient
+
+    client = JubenRedisClient()
+    client._client = fakeredis.FakeAsyncRedis()
+    return client
+
+
+@pytest.mark.unit
+class TestStreamSessionManager:
+    """Test per-message event streams"""
+
+    @pytest.mark.asyncio
+    async def test_resume_reads_missing_tail(self):
+        """Resume reads only events after the last seen sequence"""
+        fakeredis = pytest.importorskip("fakeredis")
+        from utils.stream_manager import (
+            StreamEvent, StreamEventType, StreamResponseGenerator, StreamSessionManager
+        )
+
+        manager = StreamSessionManager()
+        manager._redis_client = _redis_client(fakeredis)
+        for sequence in range(1, 6):
+            event_type = StreamEventType.COMPLETE if sequence == 5 else StreamEventType.MESSAGE
+            assert await manager.save_event("m1", StreamEvent(event_type, f"t{sequence}", message_id="m1", sequence=sequence))
+
+        tail = await manager.get_cached_events("m1", from_sequence=3)
+        assert [e.sequence for e in tail] == [4, 5]
+        assert tail[0].content == "t4"
+        assert await manager.get_cache_size("m1") == 5
+
+        chunks = [chunk async for chunk in StreamResponseGenerator(manager).resume("m1", from_sequence=3)]
+        assert len(chunks) == 2 and '"sequence": 5' in chunks[-1]
+
+        redis = manager._redis_client._client
+        assert await redis.type("stream:log:m1") == b"stream"
+        assert 0 < await redis.ttl("stream:log:m1") <= StreamSessionManager.CACHE_TTL
+
+
+@pytest.mark.unit
+class TestStreamReplayManager:
+    """Test per-session replay log"""
+
+    @pytest.mark.asyncio
+    async def test_replay_cursor_and_status(self):
+        """Marking events replayed advances a cursor instead of rewriting events"""
+        fakeredis = pytest.importorskip("fakeredis")
+        from utils.stream_replay_manager import StreamReplayManager
+
+        manager = StreamReplayManager()
+        manager._redis_client = _redis_client(fakeredis)
+        start = time.time() - 1
+
+        for n in range(3):
+            assert await manager.store_event("s1", "u1", "message", "text", "agent", {"n": n})
+
+        events = await manager._get_unreplayed_events("s1")
+        assert [e["event_data"]["n"] for e in events] == [0, 1, 2]
+        assert len(await manager.get_events_after_timestamp("s1", start)) == 3
+
+        assert await manager.mark_events_replayed("s1", [events[0]["id"]])
+        assert [e["event_data"]["n"] for e in await manager._get_unreplayed_events("s1")] == [1, 2]
+
+        assert await manager.mark_events_replayed("s1")
+        await manager.store_event("s1", "u1", "message", "text", "agent", {"n": 3})
+        assert [e["event_data"]["n"] for e in await manager._get_unreplayed_events("s1")] == [3]
+
+        assert (await manager.check_task_status("s1"))["is_running"] is True
+        await manager.mark_session_complete("s1", "u1")
+        status = await manager.check_task_status("s1")
+        assert status["is_running"] is False and status["last_event_type"] == "SESSION_COMPLETE"
@@ -0,0 +1,89 @@
+"""
+Unit tests for the streaming text chunker
+
+Tests offset-based chunk generators used by RagIndexer and TextSplitterAgent
+"""
+import json
+import pytest
+
+
+@pytest.mark.unit
+class TestTextChunker:
+    """Test chunk generators"""
+
+    def _assert_offsets(self, text, chunks):
+        for chunk in chunks:
+            assert text[chunk.start_pos:chunk.end_pos] == chunk.content
+        assert [c.chunk_index for c in chunks] == list(range(len(chunks)))
+
+    def test_sentence_spans(self):
+        """Sentences end on runs of ending marks and never cross paragraphs"""
+        from utils.text_chunker import iter_sentence_spans
+
+        text = "他来了！？真的吗...  是的\n\n第二段没有句号"
+        sentences = [text[s:e] for s, e in iter_sentence_spans(text)]
+
+        assert sentences == ["他来了！？", "真的吗...", "是的", "第二段没有句号"]
+
+    def test_semantic_chunks_respect_max_size(self):
+        """Semantic chunks stay under the max size and are slices of the input"""
+        from utils.text_chunker import iter_semantic_chunks
+
+        text = "\n\n".join("这是第%d句话，内容比较平淡。" % i for i in range(400))
+        chunks = list(iter_semantic_chunks(text, max_chunk_size=300, long_piece_size=100))
+
+        assert len(chunks) > 1
+        assert all(len(c.content) <= 300 for c in chunks)
+        self._assert_offsets(text, chunks)
+
+    def test_semantic_long_sentence_is_split(self):
+        """A sentence longer than the max size is cut into pieces"""
+        from utils.text_chunker import iter_semantic_chunks
+
+        text = "word " * 200 + "。结尾。"
+        chunks = list(iter_semantic_chunks(text, max_chunk_size=300, long_piece_size=100))
+
+        assert all(len(c.content) <= 300 for c in chunks)
+        assert chunks[-1].content.endswith("结尾。")
+        self._assert_offsets(text, chunks)
+
+    def test_fixed_chunks_terminate_with_overlap(self):
+        """Fixed chunks overlap and stop at the end of short texts"""
+        from utils.text_chunker import iter_fixed_chunks
+
+        assert [c.content for c in iter_fixed_chunks("short text", 800, 120)] == ["short text"]
+
+        text = "x" * 2000
+        chunks = list(iter_fixed_chunks(text, 800, 120))
+        assert [(c.start_pos, c.end_pos) for c in chunks] == [(0, 800), (680, 1480), (1360, 2000)]
+
+    def test_markdown_chunks_split_on_headers(self):
+        """Headers start new chunks"""
+        from utils.text_chunker import iter_markdown_chunks
+
+        text = "# 第一章\n内容一\n\n# 第二章\n内容二\n"
+        chunks = list(iter_markdown_chunks(text))
+
+        assert [c.content for c in chunks] == ["# 第一章\n内容一", "# 第二章\n内容二"]
+        self._assert_offsets(text, chunks)
+
+    def test_json_chunks(self):
+        """JSON objects are chunked per top-level key"""
+        from utils.text_chunker import ChunkingStrategy, iter_chunks
+
+        text = json.dumps({"a": 1, "b": [1, 2]})
+        chunks = list(iter_chunks(text, ChunkingStrategy.STRUCTURAL))
+
+        assert [json.loads(c.content) for c in chunks] == [{"a": 1}, {"b": [1, 2]}]
+        assert all(c.start_pos == -1 for c in chunks)
+
+    def test_window_chunks_prefer_sentence_breaks(self):
+        """Window chunks break after a sentence ending near the window end"""
+        from utils.text_chunker import iter_window_chunks
+
+        text = ("甲" * 80 + "。") * 10
+        chunks = list(iter_window_chunks(text, chunk_size=100, overlap=10))
+
+        assert all(c.content.endswith("。") for c in chunks)
+        assert chunks[-1].end_pos == len(text)
+        self._assert_offsets(text, chunks)
@@ -0,0 +1,277 @@
+"""
+Unit tests for QuotaChecker token accounting
+"""
+import pytest
+
+
+class _Settings:
+    """Minimal quota settings"""
+    enabled = True
+    quota_check_mode = "hard"
+    redis_key_prefix = "quota"
+    daily_ttl = 3600
+    user_level_mapping = {"free": "free_daily_quota"}
+    free_daily_quota = 1000
+    zhipu_prices = {}
+    usage_flush_interval = 0.0
+
+
+def _checker(redis_client, flush_interval=0.0):
+    from utils.token_accumulator import QuotaChecker
+    return QuotaChecker(redis_client=redis_client, quota_settings=_Settings(), flush_interval=flush_interval)
+
+
+@pytest.mark.unit
+class TestQuotaChecker:
+    """Test scripted Redis accounting"""
+
+    def test_memory_mode(self):
+        """Dict storage keeps the original breakdown format"""
+        checker = _checker({})
+        checker.record_usage("u1", 100, 60, 40, model_name="glm-4-flash")
+        checker.record_usage("u1", 50, model_name="glm-4-plus")
+
+        usage = checker.get_daily_usage("u1")
+        assert usage["total_tokens"] == 150 and usage["llm_calls"] == 2
+        assert usage["model_breakdown"] == {"glm-4-flash": 100, "glm-4-plus": 50}
+
+    def test_scripted_update_is_exact_under_concurrency(self):
+        """Concurrent writers never lose increments"""
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        from concurrent.futures import ThreadPoolExecutor
+        from datetime import date
+
+        server = fakeredis.FakeServer()
+        checkers = [_checker(fakeredis.FakeRedis(server=server)) for _ in range(4)]
+
+        def _work(i):
+            checker = checkers[i % len(checkers)]
+            checker.record_usage("u1", 3, 2, 1, model_name=f"m{i % 2}")
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(_work, range(200)))
+
+        usage = checkers[0].get_daily_usage("u1")
+        assert usage["total_tokens"] == 600
+        assert usage["prompt_tokens"] == 400 and usage["llm_calls"] == 200
+        assert usage["model_breakdown"] == {"m0": 300, "m1": 300}
+
+        client = fakeredis.FakeRedis(server=server)
+        assert 0 < client.ttl(f"quota:daily:u1:{date.today().isoformat()}") <= 3600
+
+    def test_batched_flush_coalesces_and_checks_pending(self):
+        """Batched mode writes once per window and quota checks include pending usage"""
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        from utils.token_accumulator import QuotaExceededError
+
+        client = fakeredis.FakeRedis()
+        checker = _checker(client, flush_interval=60)
+        for _ in range(10):
+            checker.record_usage("u1", 100, model_name="glm-4-flash")
+
+        assert client.keys("quota:*") == []
+        with pytest.raises(QuotaExceededError):
+            checker.check_quota("u1")
+
+        checker._flush_timer.cancel()
+        assert checker.flush()
+        assert _checker(client).get_daily_usage("u1")["total_tokens"] == 1000
+        assert _checker(client).get_daily_usage("u1")["llm_calls"] == 10
+
+    def test_legacy_breakdown_field_is_merged(self):
+        """Hashes written with the JSON model_breakdown field still parse"""
+        checker = _checker({})
+        usage = checker._parse_usage_hash({
+            b"total_tokens": b"30",
+            b"model_breakdown": b'{"old": 10}',
+            b"model:old": b"5",
+            b"model:new": b"15",
+        })
+        assert usage["total_tokens"] == 30
+        assert usage["model_breakdown"] == {"old": 15, "new": 15}
+
+    @pytest.mark.asyncio
+    async def test_async_client(self):
+        """Async clients record with one scripted call and check with one HGET"""
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+
+        checker = _checker(fakeredis.FakeAsyncRedis())
+        await checker.arecord_usage("u1", 400, 300, 100, model_name="glm-4-air")
+        checker.record_usage("u1", 100, model_name="glm-4-air")
+
+        result = await checker.acheck_quota("u1", raise_on_exceed=False)
+        assert result["used_tokens"] == 500
+        assert await checker.aflush()
+        usage = await checker.aget_daily_usage("u1")
+        assert usage["total_tokens"] == 500 and usage["model_breakdown"] == {"glm-4-air": 500}
+        assert checker.get_daily_usage("u1")["total_tokens"] == 500
+
+
+    def test_only_failed_entries_are_requeued(self):
+        """A key whose script fails is retried alone; keys already written are not replayed"""
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        from datetime import date
+
+        client = fakeredis.FakeRedis()
+        bad_key = f"quota:daily:u2:{date.today().isoformat()}"
+        client.set(bad_key, "not a hash")
+        checker = _checker(client, flush_interval=60)
+        checker.record_usage("u1", 100)
+        checker.record_usage("u2", 40)
+        checker._flush_timer.cancel()
+
+        assert not checker.flush()
+        assert list(checker._pending) == [bad_key]
+
+        client.delete(bad_key)
+        assert checker.flush()
+        assert _checker(client).get_daily_usage("u1")["total_tokens"] == 100
+        assert _checker(client).get_daily_usage("u2")["total_tokens"] == 40
+
+    def test_sync_record_from_another_thread_flushes_on_owning_loop(self):
+        """Sync calls outside the client's event loop hand the write back to that loop"""
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        import asyncio
+        import threading
+        import time
+
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+
+        def _on_loop(coro):
+            return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout=5)
+
+        try:
+            async def _make():
+                return _checker(fakeredis.FakeAsyncRedis())
+
+            checker = _on_loop(_make())
+            assert _on_loop(checker.arecord_usage("u1", 100))
+            flushed_on = []
+            original_aflush = checker.aflush
+
+            async def _tracked_aflush():
+                flushed_on.append(asyncio.get_running_loop())
+                return await original_aflush()
+
+            checker.aflush = _tracked_aflush
+            checker.record_usage("u1", 50)
+
+            deadline = time.monotonic() + 5
+            while (checker._pending or checker._inflight) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            key = checker._get_daily_key("u1")
+            assert int(_on_loop(checker._redis.hget(key, "total_tokens"))) == 150
+            assert flushed_on == [loop]
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=5)
+
+
+@pytest.mark.unit
+class TestTokenRankingManager:
+    """Test sorted-set leaderboards"""
+
+    @pytest.mark.asyncio
+    async def test_rankings_and_dashboard(self, monkeypatch):
+        """Rankings and stats come from the ZSETs and counters kept by record_usage"""
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        from datetime import date
+        from utils.token_accumulator import TokenRankingManager
+
+        server = fakeredis.FakeServer()
+        checker = _checker(fakeredis.FakeRedis(server=server))
+        checker.record_usage("alice", 300, model_name="glm-4-flash")
+        checker.record_usage("bob", 500, model_name="glm-4-flash")
+        checker.record_usage("alice", 100, model_name="glm-4-plus")
+        checker.record_usage("carol", 0, model_name="glm-4-flash")
+
+        client = fakeredis.FakeAsyncRedis(server=server)
+        manager = TokenRankingManager(redis_client=client)
+        monkeypatch.setattr(manager, "_get_key_prefix", lambda: "quota")
+
+        ranking = await manager.get_daily_user_token_ranking(top_n=5)
+        assert [(r["user_id"], r["total_tokens"], r["llm_calls"], r["rank"]) for r in ranking] == [
+            ("bob", 500, 1, 1),
+            ("alice", 400, 2, 2),
+        ]
+        assert [r["user_id"] for r in await manager.get_monthly_user_token_ranking(top_n=1)] == ["bob"]
+
+        today = date.today().isoformat()
+        stats = await manager.get_daily_token_stats(3)
+        assert len(stats) == 3 and stats[today] == 900
+
+        dashboard = await manager.get_token_dashboard_data()
+        assert dashboard["summary"]["today_tokens"] == 900
+        assert dashboard["summary"]["monthly_tokens"] == 900
+        assert dashboard["summary"]["today_active_users"] == 2
+        assert [r["user_id"] for r in dashboard["today_ranking"]] == ["bob", "alice"]
+
+    @pytest.mark.asyncio
+    async def test_existing_usage_is_backfilled_once(self, monkeypatch):
+        """Quota hashes written before the leaderboards existed are folded in on first read"""
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        from datetime import date
+        from utils.token_accumulator import TokenRankingManager
+
+        today = date.today().isoformat()
+        client = fakeredis.FakeAsyncRedis()
+        await client.hset(f"quota:daily:alice:{today}", mapping={"total_tokens": 700, "llm_calls": 7})
+        await client.hset(f"quota:daily:bob:{today}", mapping={"total_tokens": 200, "llm_calls": 2})
+        await client.zadd(f"quota:ranking:daily:{today}", {"bob": 200})
+        await client.set(f"token_stats:daily:{today}", 200)
+
+        manager = TokenRankingManager(redis_client=client)
+        monkeypatch.setattr(manager, "_get_key_prefix", lambda: "quota")
+        ranking = await manager.get_daily_user_token_ranking(top_n=5)
+        assert [(r["user_id"], r["total_tokens"], r["llm_calls"]) for r in ranking] == [
+            ("alice", 700, 7),
+            ("bob", 200, 2),
+        ]
+        assert (await manager.get_daily_token_stats(1))[today] == 900
+        assert [r["total_tokens"] for r in await manager.get_monthly_user_token_ranking()] == [700, 200]
+
+        again = TokenRankingManager(redis_client=client)
+        monkeypatch.setattr(again, "_get_key_prefix", lambda: "quota")
+        await client.hincrby(f"quota:daily:alice:{today}", "total_tokens", 100)
+        assert (await again.get_daily_token_stats(1))[today] == 900
+
+    @pytest.mark.asyncio
+    async def test_default_checker_uses_pooled_async_client(self, monkeypatch):
+        """Without an injected client the checker picks up the async pool client on its first async call"""
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        import utils.redis_client as redis_client
+        from utils.token_accumulator import QuotaChecker, TokenAccumulator, TokenRankingManager, TokenUsage
+
+        client = fakeredis.FakeAsyncRedis()
+
+        class _Manager:
+            async def get_redis_client(self, priority):
+                return client
+
+        async def _get_manager():
+            return _Manager()
+
+        monkeypatch.setattr(redis_client, "get_connection_pool_manager", _get_manager)
+        checker = QuotaChecker(quota_settings=_Settings(), flush_interval=0.0)
+        checker.record_usage("u1", 100, model_name="glm-4-flash")
+        accumulator = TokenAccumulator(quota_checker=checker)
+        key = await accumulator.ainitialize_accumulator("u1", "s1")
+        assert await accumulator.aadd_token_usage(key, TokenUsage(prompt_tokens=150, completion_tokens=50))
+
+        usage = await checker.aget_daily_usage("u1")
+        assert usage["total_tokens"] == 300 and usage["llm_calls"] == 2
+
+        manager = TokenRankingManager(redis_client=client)
+        monkeypatch.setattr(manager, "_get_key_prefix", lambda: "quota")
+        ranking = await manager.get_daily_user_token_ranking()
+        assert [(r["user_id"], r["total_tokens"]) for r in ranking] == [("u1", 300)]
@@ -0,0 +1,72 @@
+"""
+Unit tests for the shared TokenizerService
+"""
+import pytest
+
+
+@pytest.mark.unit
+class TestTokenizerService:
+    """Test encoding selection, caching and batched counting"""
+
+    def test_heuristic_matches_previous_estimate(self, tmp_path):
+        """Without tokenizer files GLM falls back to the character heuristic"""
+        from utils.tokenizer_service import TokenizerService
+
+        service = TokenizerService(tokenizer_dir=str(tmp_path))
+        assert service.count("") == 0
+        assert service.count("你好，世界") == 4 + 1
+        assert service.count("hello world!", model="glm-4-flash") == 3
+        assert service.get_encoding("glm-4-flash").name == "heuristic"
+
+    def test_encoding_resolution(self):
+        """Model names map to their tokenizer families"""
+        from utils.tokenizer_service import _resolve_encoding_name
+
+        assert _resolve_encoding_name("openai/gpt-4o-mini") == "o200k_base"
+        assert _resolve_encoding_name("gpt-3.5-turbo") == "cl100k_base"
+        assert _resolve_encoding_name("GLM-4-Plus") == "glm"
+        assert _resolve_encoding_name("qwen-turbo") == "qwen"
+        assert _resolve_encoding_name(None) == "heuristic"
+
+    def test_batch_counts_use_lru_cache(self, tmp_path):
+        """Repeated long texts are counted once and the cache is bounded"""
+        from utils.tokenizer_service import TokenizerService
+
+        service = TokenizerService(tokenizer_dir=str(tmp_path), cache_size=2)
+        calls = []
+        heuristic = service._heuristic
+        original = heuristic.count_batch
+        heuristic.count_batch = lambda texts: calls.append(len(texts)) or original(texts)
+
+        history = [{"role": "user", "content": "剧情" * 50}, {"role": "assistant", "content": "x" * 100}]
+        first = service.count_messages(history)
+        second = service.count_messages(history)
+
+        assert first == second == (100 + 1) + 25 + 10
+        assert calls == [2]
+        assert service.cache_info()["hits"] == 2
+
+        service.count_batch(["y" * 100, "z" * 100])
+        assert service.cache_info()["size"] == 2
+
+    def test_tiktoken_requires_cached_vocab(self, tmp_path, monkeypatch):
+        """tiktoken is only loaded when its vocab file is already in the local cache"""
+        from types import SimpleNamespace
+        from utils import tokenizer_service as module
+
+        loaded = []
+        fake_encoding = SimpleNamespace(encode_ordinary_batch=lambda texts: [list(t) for t in texts])
+        monkeypatch.setattr(module, "TIKTOKEN_AVAILABLE", True)
+        monkeypatch.setattr(module, "tiktoken", SimpleNamespace(
+            get_encoding=lambda name: loaded.append(name) or fake_encoding
+        ))
+        monkeypatch.setenv("TIKTOKEN_CACHE_DIR", str(tmp_path))
+
+        assert module.TokenizerService().get_encoding("gpt-4o").name == "heuristic"
+        assert loaded == []
+
+        module.tiktoken_cache_file("o200k_base").write_bytes(b"")
+        service = module.TokenizerService()
+        assert service.get_encoding("gpt-4o").name == "o200k_base"
+        assert service.count("abcdefgh" * 10, model="gpt-4o") == 80
+        assert loaded == ["o200k_base"]
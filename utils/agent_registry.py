@@ -1,8 +1,17 @@
 """
 Agent注册表
 负责管理和调度所有专业Agent
+
+- Agent实例按类型缓存，在工作线程中导入模块并构造，同一类型的并发请求共享一次构造
+- 预热：启动时按 AGENT_PREWARM 配置的热点集合并行构造Agent并初始化其延迟子组件，
+  使首个请求不再承担构造开销（AGENT_PREWARM=all 表示预热全部已启用的Agent）
+- 记录每个Agent的构造耗时（模块导入 / 实例化 / 子组件预热），通过 get_agent_statistics 输出
 """
+import asyncio
 import logging
+import os
+import time
+from datetime import datetime
 from typing import Dict, Any, Optional, List
 import importlib
 
@@ -26,6 +35,10 @@ class AgentRegistry:
     def __init__(self):
         """初始化Agent注册表"""
         self.agents = {}
+        # 构造中的Agent（同一类型只构造一次）
+        self._pending: Dict[str, asyncio.Future] = {}
+        # 每个Agent的构造耗时统计
+        self.construction_stats: Dict[str, Dict[str, Any]] = {}
         # 按类别组织的Agent配置
         self.agent_configs = {
             # === 核心编排类 ===
@@ -140,7 +153,9 @@ class AgentRegistry:
                 "module_path": "agents.short_drama_planner_agent",
                 "description": "短剧策划Agent",
                 "category": "creation",
-                "enabled": True
+                "enabled": True,
+                # 使用 OpenAI 的 gpt-3.5-turbo（最便宜的模型）
+                "init_kwargs": {"model_provider": "openai"}
             },
             "short_drama_creator_agent": {
                 "class_name": "ShortDramaCreatorAgent",
@@ -247,7 +262,7 @@ class AgentRegistry:
                 "enabled": True
             },
             "websearch_agent": {
-                "class_name": "WebsearchAgent",
+                "class_name": "WebSearchAgent",
                 "module_path": "agents.websearch_agent",
                 "description": "网络搜索Agent",
                 "category": "tool",
@@ -481,27 +496,166 @@ class AgentRegistry:
         if resolved_type in self.agents:
             return self.agents[resolved_type]
 
-        try:
-            # 动态导入Agent类
-            module_path = config["module_path"]
-            class_name = config["class_name"]
+        return await self._load_agent(resolved_type, warm_up=False)
 
-            # 导入模块
-            module = importlib.import_module(module_path)
-            agent_class = getattr(module, class_name)
+    def get_agent_sync(self, agent_type: str) -> Optional[BaseJubenAgent]:
+        """
+        同步获取Agent实例（供同步调用方使用），与 get_agent / prewarm 共享实例缓存
 
-            # 创建Agent实例
-            agent_instance = agent_class()
+        未加载时在当前线程构造，构造失败时抛出异常
 
-            # 缓存Agent实例
-            self.agents[resolved_type] = agent_instance
+        Args:
+            agent_type: Agent类型（支持别名）
 
-            return agent_instance
+        Returns:
+            BaseJubenAgent: Agent实例，类型不存在或未启用时返回None
+        """
+        resolved_type = self._resolve_agent_type(agent_type)
+        if resolved_type is None:
+            return None
 
+        config = self.agent_configs.get(resolved_type)
+        if not config or not config.get("enabled", True):
+            return None
+
+        agent = self.agents.get(resolved_type)
+        if agent is not None:
+            return agent
+        return self._build_agent(resolved_type, warm_up=False)
+
+    async def _load_agent(self, resolved_type: str, warm_up: bool) -> Optional[BaseJubenAgent]:
+        """在工作线程中构造Agent，同一类型的并发调用等待同一次构造"""
+        pending = self._pending.get(resolved_type)
+        if pending is None:
+            pending = asyncio.ensure_future(asyncio.to_thread(self._build_agent, resolved_type, warm_up))
+            self._pending[resolved_type] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(resolved_type, None))
+
+        try:
+            return await asyncio.shield(pending)
         except Exception as e:
             logger.error(f"❌ 创建Agent失败: {resolved_type}, 错误: {e}")
             return None
 
+    def _build_agent(self, resolved_type: str, warm_up: bool) -> BaseJubenAgent:
+        """导入模块并构造Agent（同步，运行在工作线程中），记录各阶段耗时"""
+        config = self.agent_configs[resolved_type]
+        stats: Dict[str, Any] = {"mode": "prewarm" if warm_up else "on_demand"}
+        self.construction_stats[resolved_type] = stats
+
+        try:
+            # 动态导入Agent类
+            start = time.perf_counter()
+            module = importlib.import_module(config["module_path"])
+            agent_class = getattr(module, config["class_name"])
+            stats["import_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+            # 创建Agent实例
+            start = time.perf_counter()
+            agent_instance = agent_class(**config.get("init_kwargs", {}))
+            stats["init_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+            # 预热时提前初始化延迟子组件
+            if warm_up:
+                self._warm_up(agent_instance, stats)
+        except Exception as e:
+            stats["error"] = str(e)
+            raise
+
+        stats["loaded_at"] = datetime.now().isoformat()
+        # 缓存Agent实例（同步与异步路径同时构造时保留先完成的实例）
+        return self.agents.setdefault(resolved_type, agent_instance)
+
+    @staticmethod
+    def _warm_up(agent: BaseJubenAgent, stats: Dict[str, Any]) -> None:
+        warm_up_components = getattr(agent, "warm_up_components", None)
+        if warm_up_components is None:
+            return
+        start = time.perf_counter()
+        stats["components_ms"] = warm_up_components()
+        stats["warm_up_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    async def prewarm(
+        self,
+        agent_types: Optional[List[str]] = None,
+        concurrency: Optional[int] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        并行预热Agent：构造实例并初始化其延迟子组件
+
+        Args:
+            agent_types: Agent类型列表（支持别名），None 表示读取 AGENT_PREWARM 配置
+            concurrency: 并行构造数量，None 表示读取 AGENT_PREWARM_CONCURRENCY（默认4）
+
+        Returns:
+            Dict[str, Dict[str, Any]]: 每个Agent的构造耗时统计
+        """
+        if agent_types is None:
+            agent_types = self.get_prewarm_agent_types()
+        if concurrency is None:
+            concurrency = int(os.getenv("AGENT_PREWARM_CONCURRENCY", "4"))
+
+        resolved_types = []
+        for agent_type in agent_types:
+            resolved_type = self._resolve_agent_type(agent_type)
+            if resolved_type is None or not self.agent_configs[resolved_type].get("enabled", True):
+                logger.warning(f"⚠️ 跳过预热未知或未启用的Agent: {agent_type}")
+                continue
+            if resolved_type not in resolved_types:
+                resolved_types.append(resolved_type)
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def _prewarm_one(resolved_type: str) -> None:
+            async with semaphore:
+                agent = self.agents.get(resolved_type) or await self._load_agent(resolved_type, warm_up=True)
+                if agent is None:
+                    return
+                # 已按需构造过的Agent只补充初始化子组件
+                stats = self.construction_stats.setdefault(resolved_type, {"mode": "on_demand"})
+                if "warm_up_ms" in stats:
+                    return
+                try:
+                    await asyncio.to_thread(self._warm_up, agent, stats)
+                except Exception as e:
+                    logger.error(f"❌ 预热Agent子组件失败: {resolved_type}, 错误: {e}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(_prewarm_one(resolved_type) for resolved_type in resolved_types))
+        elapsed = time.perf_counter() - start
+
+        loaded = sum(1 for resolved_type in resolved_types if resolved_type in self.agents)
+        logger.info(f"✅ Agent预热完成: {loaded}/{len(resolved_types)}，耗时 {elapsed:.2f}s")
+        return {
+            resolved_type: self.construction_stats.get(resolved_type, {})
+            for resolved_type in resolved_types
+        }
+
+    def get_prewarm_agent_types(self) -> List[str]:
+        """预热的热点Agent集合（AGENT_PREWARM：逗号分隔的Agent类型或别名，all 表示全部）"""
+        value = os.getenv("AGENT_PREWARM", "").strip()
+        if not value:
+            return []
+        if value.lower() == "all":
+            return self.get_available_agents()
+        return [item.strip() for item in value.split(",") if item.strip()]
+
+    def get_construction_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取Agent构造耗时统计
+
+        Returns:
+            Dict[str, Dict[str, Any]]: 按总耗时降序排列的各Agent统计（毫秒）
+        """
+        def _total(stats: Dict[str, Any]) -> float:
+            return stats.get("import_ms", 0) + stats.get("init_ms", 0) + stats.get("warm_up_ms", 0)
+
+        ordered = sorted(self.construction_stats.items(), key=lambda item: _total(item[1]), reverse=True)
+        return {
+            agent_type: {**stats, "total_ms": round(_total(stats), 2)}
+            for agent_type, stats in ordered
+        }
+
     def get_available_agents(self, category: Optional[str] = None) -> List[str]:
         """
         获取可用的Agent类型列表
@@ -588,8 +742,10 @@ class AgentRegistry:
             resolved_type = self._resolve_agent_type(agent_type)
             if resolved_type and resolved_type in self.agents:
                 del self.agents[resolved_type]
+                self.construction_stats.pop(resolved_type, None)
         else:
             self.agents.clear()
+            self.construction_stats.clear()
 
     def register_agent(
         self,
@@ -646,7 +802,8 @@ class AgentRegistry:
             "load_rate": loaded_agents / enabled_agents if enabled_agents > 0 else 0,
             "category_stats": category_stats,
             "categories": list(self.category_mapping.keys()),
-            "available_agents": self.get_available_agents()
+            "available_agents": self.get_available_agents(),
+            "construction_stats": self.get_construction_stats()
         }
 
     def get_categories(self) -> Dict[str, Dict[str, Any]]:
@@ -656,3 +813,14 @@ class AgentRegistry:
             类别信息字典
         """
         return self.category_mapping.copy()
+
+
+_agent_registry: Optional[AgentRegistry] = None
+
+
+def get_agent_registry() -> AgentRegistry:
+    """获取全局Agent注册表（共享Agent实例缓存与预热结果）"""
+    global _agent_registry
+    if _agent_registry is None:
+        _agent_registry = AgentRegistry()
+    return _agent_registry
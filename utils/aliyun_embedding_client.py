@@ -1,18 +1,148 @@
 """
 阿里云Embedding客户端
 使用阿里云的embedding模型进行文本向量化
+
+异步接口（aembed_text / aembed_texts）：
+- 使用进程级共享HTTP连接池（utils.http_pool），不阻塞事件循环
+- 并发的单条请求在短时间窗口内自动合并为批量请求（不超过接口单批上限）
+- 以 模型+内容 哈希为键的向量缓存（内存LRU + Redis），未变化的分块重新索引不再调用接口
 """
 import os
 import json
+import asyncio
+import base64
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
-import requests
+from array import array
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 
+try:
+    from ..utils.http_pool import get_async_http_client, get_sync_http_client
+except ImportError:
+    from utils.http_pool import get_async_http_client, get_sync_http_client
+
+
+class EmbeddingCache:
+    """
+    向量缓存
+
+    - 内存层：LRU，向量以 float32 紧凑存储
+    - Redis层：跨进程共享，值为 float32 字节的 base64 编码；Redis不可用时只使用内存层
+    """
+
+    REDIS_PREFIX = "embedding:"
+    REDIS_RETRY_SECONDS = 60
+
+    def __init__(self, model: str, max_memory_items: int = 4096, redis_ttl: int = 7 * 24 * 3600):
+        self.model = model
+        self.max_memory_items = max_memory_items
+        self.redis_ttl = redis_ttl
+        self._memory: "OrderedDict[str, array]" = OrderedDict()
+        self._redis = None
+        self._redis_retry_at = 0.0
+        self.logger = logging.getLogger(__name__)
+
+    def key(self, text: str) -> str:
+        """内容哈希键"""
+        return hashlib.sha256(f"{self.model}\n{text}".encode("utf-8")).hexdigest()
+
+    def get_local(self, key: str) -> Optional[List[float]]:
+        vector = self._memory.get(key)
+        if vector is None:
+            return None
+        self._memory.move_to_end(key)
+        return vector.tolist()
+
+    def put_local(self, key: str, vector: List[float]) -> None:
+        self._memory[key] = array("f", vector)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    async def _get_redis(self):
+        if self._redis is not None:
+            return self._redis
+        loop_time = asyncio.get_running_loop().time()
+        if loop_time < self._redis_retry_at:
+            return None
+        try:
+            from utils.redis_client import get_redis_client
+            self._redis = await get_redis_client()
+        except Exception:
+            self._redis = None
+        if self._redis is None:
+            self._redis_retry_at = loop_time + self.REDIS_RETRY_SECONDS
+        return self._redis
+
+    async def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """批量读取缓存（内存未命中的再查Redis并回填内存）"""
+        found: Dict[str, List[float]] = {}
+        missing: List[str] = []
+        for key in keys:
+            vector = self.get_local(key)
+            if vector is not None:
+                found[key] = vector
+            else:
+                missing.append(key)
+
+        if not missing:
+            return found
+
+        redis = await self._get_redis()
+        if redis is None:
+            return found
+
+        try:
+            values = await asyncio.gather(*(redis.get(self.REDIS_PREFIX + key) for key in missing))
+        except Exception as e:
+            self.logger.debug(f"读取向量缓存失败: {e}")
+            return found
+
+        for key, value in zip(missing, values):
+            if not value or not isinstance(value, str):
+                continue
+            try:
+                vector = array("f")
+                vector.frombytes(base64.b64decode(value))
+            except Exception:
+                continue
+            self._memory[key] = vector
+            found[key] = vector.tolist()
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+        return found
+
+    async def put_many(self, items: Dict[str, List[float]]) -> None:
+        """批量写入缓存"""
+        for key, vector in items.items():
+            self.put_local(key, vector)
+
+        redis = await self._get_redis()
+        if redis is None or not items:
+            return
+        try:
+            await asyncio.gather(*(
+                redis.set(
+                    self.REDIS_PREFIX + key,
+                    base64.b64encode(array("f", vector).tobytes()).decode("ascii"),
+                    expire=self.redis_ttl
+                )
+                for key, vector in items.items()
+            ))
+        except Exception as e:
+            self.logger.debug(f"写入向量缓存失败: {e}")
+
 
 class AliyunEmbeddingClient:
     """阿里云Embedding客户端"""
-    
+
+    MAX_BATCH_SIZE = 25            # 接口单次请求的文本数上限
+    BATCH_WINDOW_SECONDS = 0.01    # 单条请求合并窗口
+    MAX_CONCURRENT_REQUESTS = 4    # 异步批量请求并发上限
+    REQUEST_TIMEOUT = 30
+
     def __init__(self, api_key: str = None):
         """
         初始化阿里云Embedding客户端
@@ -26,6 +156,14 @@ class AliyunEmbeddingClient:
         self.dimension = 1536
         
         self.logger = logging.getLogger(__name__)
+        self.cache = EmbeddingCache(self.model)
+
+        # 异步组件（绑定到创建它们的事件循环，懒加载）
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._request_semaphore: Optional[asyncio.Semaphore] = None
+        self._pending: List[Tuple[str, str, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
         self.logger.info("阿里云Embedding客户端初始化完成")
     
     def embed_text(self, text: str) -> List[float]:
@@ -51,7 +189,7 @@ class AliyunEmbeddingClient:
                 }
             }
             
-            response = requests.post(
+            response = get_sync_http_client().post(
                 self.base_url,
                 headers=headers,
                 json=data,
@@ -98,7 +236,7 @@ class AliyunEmbeddingClient:
                 }
             }
             
-            response = requests.post(
+            response = get_sync_http_client().post(
                 self.base_url,
                 headers=headers,
                 json=data,
@@ -122,6 +260,171 @@ class AliyunEmbeddingClient:
             self.logger.error(f"批量文本向量化失败: {e}")
             return []
     
+    # ==================== 异步接口 ====================
+
+    def _ensure_async_state(self) -> None:
+        """确保异步组件属于当前事件循环"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._request_semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_REQUESTS)
+        self._pending = []
+        self._flush_task = None
+
+    async def _request_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """发送一次批量请求（texts 不超过 MAX_BATCH_SIZE）"""
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        data = {
+            "model": self.model,
+            "input": {
+                "texts": texts
+            }
+        }
+
+        try:
+            async with self._request_semaphore:
+                response = await get_async_http_client().post(
+                    self.base_url, headers=headers, json=data, timeout=self.REQUEST_TIMEOUT
+                )
+
+            if response.status_code != 200:
+                self.logger.error(f"API调用失败: {response.status_code}, {response.text}")
+                return []
+
+            result = response.json()
+            if "output" not in result or "embeddings" not in result["output"]:
+                self.logger.error(f"响应格式错误: {result}")
+                return []
+
+            # 按 text_index 对齐输入顺序
+            items = sorted(
+                result["output"]["embeddings"],
+                key=lambda item: item.get("text_index", 0)
+            )
+            embeddings = [item["embedding"] for item in items]
+            if len(embeddings) != len(texts):
+                self.logger.error(f"返回向量数量不匹配: {len(embeddings)} != {len(texts)}")
+                return []
+            return embeddings
+
+        except Exception as e:
+            self.logger.error(f"异步文本向量化失败: {e}")
+            return []
+
+    async def _embed_uncached(self, keys: List[str], texts: List[str]) -> Dict[str, List[float]]:
+        """按接口上限切分批次并发请求，结果写入缓存"""
+        batches = [
+            (keys[i:i + self.MAX_BATCH_SIZE], texts[i:i + self.MAX_BATCH_SIZE])
+            for i in range(0, len(texts), self.MAX_BATCH_SIZE)
+        ]
+        responses = await asyncio.gather(
+            *(self._request_embeddings(batch_texts) for _, batch_texts in batches)
+        )
+
+        embedded: Dict[str, List[float]] = {}
+        for (batch_keys, _), vectors in zip(batches, responses):
+            for key, vector in zip(batch_keys, vectors):
+                embedded[key] = vector
+
+        if embedded:
+            await self.cache.put_many(embedded)
+        return embedded
+
+    async def aembed_texts(self, texts: List[str]) -> List[List[float]]:
+        """
+        异步批量向量化（带缓存，自动分批）
+
+        Args:
+            texts: 输入文本列表
+
+        Returns:
+            List[List[float]]: 与输入一一对应的向量列表；任一文本失败时返回空列表
+        """
+        if not texts:
+            return []
+        self._ensure_async_state()
+
+        keys = [self.cache.key(text) for text in texts]
+        vectors = await self.cache.get_many(list(dict.fromkeys(keys)))
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors.update(await self._embed_uncached(list(missing.keys()), list(missing.values())))
+            self.logger.debug(f"批量文本向量化：缓存命中 {len(texts) - len(missing)}，请求 {len(missing)}")
+
+        if any(key not in vectors for key in keys):
+            return []
+        return [vectors[key] for key in keys]
+
+    async def aembed_text(self, text: str) -> List[float]:
+        """
+        异步向量化单条文本
+
+        并发调用会在 BATCH_WINDOW_SECONDS 内合并为一次批量请求
+
+        Args:
+            text: 输入文本
+
+        Returns:
+            List[float]: 向量表示，失败时返回空列表
+        """
+        self._ensure_async_state()
+
+        key = self.cache.key(text)
+        cached = self.cache.get_local(key)
+        if cached is not None:
+            return cached
+
+        future = self._loop.create_future()
+        self._pending.append((key, text, future))
+
+        if len(self._pending) >= self.MAX_BATCH_SIZE:
+            await self._flush_pending()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_after_window())
+
+        return await future
+
+    async def _flush_after_window(self) -> None:
+        await asyncio.sleep(self.BATCH_WINDOW_SECONDS)
+        self._flush_task = None
+        await self._flush_pending()
+
+    async def _flush_pending(self) -> None:
+        """把等待中的单条请求作为一批处理"""
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        unique: Dict[str, str] = {}
+        for key, text, _ in pending:
+            unique.setdefault(key, text)
+
+        try:
+            vectors = await self.cache.get_many(list(unique.keys()))
+            missing = {key: text for key, text in unique.items() if key not in vectors}
+            if missing:
+                vectors.update(await self._embed_uncached(list(missing.keys()), list(missing.values())))
+        except Exception as e:
+            self.logger.error(f"合并向量化请求失败: {e}")
+            vectors = {}
+
+        for key, _, future in pending:
+            if not future.done():
+                future.set_result(vectors.get(key, []))
+
+    async def aclose(self) -> None:
+        """释放异步状态（HTTP连接池为进程共享，由 close_http_pool 统一关闭）"""
+        self._loop = None
+
     def similarity(self, text1: str, text2: str) -> float:
         """
         计算两个文本的相似度
@@ -9,6 +9,11 @@ from typing import Dict, Any, List, Optional
 from pathlib import Path
 from dotenv import load_dotenv
 
+try:
+    from ..utils.http_pool import get_async_http_client
+except ImportError:
+    from utils.http_pool import get_async_http_client
+
 # 加载环境变量
 current_file = Path(__file__).resolve()
 project_root = current_file.parent.parent
@@ -53,15 +58,15 @@ class BaiduAPIClient:
             响应数据
         """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.request(
-                    method=method,
-                    url=url,
-                    headers=self.headers,
-                    **kwargs
-                )
-                response.raise_for_status()
-                return response.json()
+            response = await get_async_http_client().request(
+                method=method,
+                url=url,
+                headers=self.headers,
+                timeout=self.timeout,
+                **kwargs
+            )
+            response.raise_for_status()
+            return response.json()
         except httpx.HTTPStatusError as e:
             logger.error(f"百度 API 请求失败: {e.response.status_code} - {e.response.text}")
             raise
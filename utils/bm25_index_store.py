@@ -0,0 +1,199 @@
+"""
+BM25 索引持久化存储
+按项目保存BM25分词结果，支持按文件增量更新，重启后无需重新分词即可恢复索引
+
+目录结构（每个项目一个目录）：
+    <base_dir>/<project_id>/manifest.json              文件ID -> 分段信息
+    <base_dir>/<project_id>/<segment>.docs.json        文档表：doc_id、内容、元数据、分段词表
+    <base_dir>/<project_id>/<segment>.postings.npy     int32 三元组 (文档序号, 词序号, 词频)，以 mmap 方式读取
+
+每个项目文件对应一个分段：重建索引只重写该文件的分段，删除文件只删除该分段
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from utils.logger import JubenLogger
+
+
+class BM25IndexStore:
+    """项目级BM25索引的磁盘存储"""
+
+    MANIFEST_FILE = "manifest.json"
+    FORMAT_VERSION = 1
+
+    def __init__(self, base_dir: str = "data/bm25_index"):
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.logger = JubenLogger("bm25_index_store")
+        self._lock = threading.Lock()
+
+    def _project_dir(self, project_id: str) -> Path:
+        safe_id = re.sub(r"[^\w\-]", "_", project_id) or "_default"
+        return self.base_dir / safe_id
+
+    @staticmethod
+    def _segment_name(file_id: str) -> str:
+        return hashlib.sha1(file_id.encode("utf-8")).hexdigest()[:16]
+
+    def _load_manifest(self, project_dir: Path) -> Dict[str, Any]:
+        manifest_path = project_dir / self.MANIFEST_FILE
+        if not manifest_path.exists():
+            return {"version": self.FORMAT_VERSION, "files": {}}
+        try:
+            return json.loads(manifest_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            self.logger.warning(f"读取BM25索引清单失败: {manifest_path}, {e}")
+            return {"version": self.FORMAT_VERSION, "files": {}}
+
+    @staticmethod
+    def _atomic_write_text(path: Path, text: str) -> None:
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def _save_manifest(self, project_dir: Path, manifest: Dict[str, Any]) -> None:
+        self._atomic_write_text(
+            project_dir / self.MANIFEST_FILE,
+            json.dumps(manifest, ensure_ascii=False)
+        )
+
+    def has_project(self, project_id: str) -> bool:
+        """项目是否存在持久化索引"""
+        return (self._project_dir(project_id) / self.MANIFEST_FILE).exists()
+
+    def save_file_segment(
+        self,
+        project_id: str,
+        file_id: str,
+        doc_ids: List[str],
+        contents: List[str],
+        metadata_list: List[Dict[str, Any]],
+        term_freqs: List[Dict[str, int]]
+    ) -> None:
+        """
+        写入（覆盖）一个文件的分段
+
+        Args:
+            project_id: 项目ID
+            file_id: 文件ID
+            doc_ids: 分块文档ID列表
+            contents: 分块内容列表
+            metadata_list: 分块元数据列表
+            term_freqs: 各分块的词频
+        """
+        project_dir = self._project_dir(project_id)
+        segment = self._segment_name(file_id)
+
+        vocab: Dict[str, int] = {}
+        rows: List[List[int]] = []
+        for doc_offset, term_freq in enumerate(term_freqs):
+            for term, tf in term_freq.items():
+                term_idx = vocab.setdefault(term, len(vocab))
+                rows.append([doc_offset, term_idx, tf])
+        postings = np.asarray(rows, dtype=np.int32).reshape(-1, 3)
+
+        doc_table = {
+            "file_id": file_id,
+            "doc_ids": doc_ids,
+            "contents": contents,
+            "metadata": metadata_list,
+            "vocab": list(vocab.keys())
+        }
+
+        with self._lock:
+            project_dir.mkdir(parents=True, exist_ok=True)
+            postings_path = project_dir / f"{segment}.postings.npy"
+            tmp_postings = project_dir / f"{segment}.postings.tmp.npy"
+            np.save(tmp_postings, postings)
+            os.replace(tmp_postings, postings_path)
+            self._atomic_write_text(
+                project_dir / f"{segment}.docs.json",
+                json.dumps(doc_table, ensure_ascii=False)
+            )
+
+            manifest = self._load_manifest(project_dir)
+            manifest["files"][file_id] = {"segment": segment, "doc_count": len(doc_ids)}
+            self._save_manifest(project_dir, manifest)
+
+    def delete_file_segment(self, project_id: str, file_id: str) -> List[str]:
+        """
+        删除一个文件的分段
+
+        Returns:
+            List[str]: 被删除的文档ID（用于同步内存索引）
+        """
+        project_dir = self._project_dir(project_id)
+        with self._lock:
+            manifest = self._load_manifest(project_dir)
+            entry = manifest["files"].pop(file_id, None)
+            if not entry:
+                return []
+
+            segment = entry["segment"]
+            doc_ids: List[str] = []
+            docs_path = project_dir / f"{segment}.docs.json"
+            try:
+                doc_ids = json.loads(docs_path.read_text(encoding="utf-8")).get("doc_ids", [])
+            except Exception:
+                pass
+
+            self._save_manifest(project_dir, manifest)
+            for path in (docs_path, project_dir / f"{segment}.postings.npy"):
+                path.unlink(missing_ok=True)
+            return doc_ids
+
+    def load_project(self, project_id: str) -> List[Dict[str, Any]]:
+        """
+        读取项目全部分段
+
+        Returns:
+            List[Dict[str, Any]]: 已分词文档列表，可直接交给 BM25Retriever.add_tokenized_documents
+        """
+        project_dir = self._project_dir(project_id)
+        manifest = self._load_manifest(project_dir)
+
+        documents: List[Dict[str, Any]] = []
+        for file_id, entry in manifest["files"].items():
+            segment = entry["segment"]
+            try:
+                doc_table = json.loads(
+                    (project_dir / f"{segment}.docs.json").read_text(encoding="utf-8")
+                )
+                postings = np.load(project_dir / f"{segment}.postings.npy", mmap_mode="r")
+            except Exception as e:
+                self.logger.warning(f"读取BM25分段失败: {project_id}/{file_id}, {e}")
+                continue
+
+            vocab = doc_table["vocab"]
+            term_freqs: List[Dict[str, int]] = [{} for _ in doc_table["doc_ids"]]
+            for doc_offset, term_idx, tf in postings.tolist():
+                term_freqs[doc_offset][vocab[term_idx]] = tf
+
+            for doc_id, content, metadata, term_freq in zip(
+                doc_table["doc_ids"], doc_table["contents"], doc_table["metadata"], term_freqs
+            ):
+                documents.append({
+                    "doc_id": doc_id,
+                    "content": content,
+                    "metadata": metadata,
+                    "term_freqs": term_freq
+                })
+
+        return documents
+
+
+_bm25_index_store: Optional[BM25IndexStore] = None
+
+
+def get_bm25_index_store() -> BM25IndexStore:
+    global _bm25_index_store
+    if _bm25_index_store is None:
+        _bm25_index_store = BM25IndexStore(os.getenv("BM25_INDEX_DIR", "data/bm25_index"))
+    return _bm25_index_store
@@ -12,12 +12,20 @@ BM25是一种概率检索函数，用于评估文档与查询的相关性
 - BM25算法：https://en.wikipedia.org/wiki/Okapi_BM25
 - 用于短剧剧本的关键词检索
 """
+import heapq
 import math
 import re
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
-from collections import Counter
+from collections import Counter, defaultdict
 import jieba
+import numpy as np
+
+try:
+    import scipy.sparse as sp
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
 
 
 @dataclass
@@ -45,6 +53,11 @@ class BM25Retriever:
     参数说明：
     - k1: 词频饱和参数（默认1.5，控制词频的影响）
     - b: 长度归一化参数（默认0.75，控制文档长度的影响）
+
+    索引结构：
+    - 倒排表 postings: term -> [(doc_idx, tf), ...]，查询只访问包含查询词的文档
+    - 文档长度归一化项 k1 * (1 - b + b * |D| / avgdl) 在建索引时预计算
+    - IDF 按词项缓存，文档集合变化时失效
     """
 
     def __init__(
@@ -80,6 +93,13 @@ class BM25Retriever:
         self.doc_freqs: Dict[str, int] = {}        # 词项文档频率
         self.term_freqs: List[Dict[str, int]] = [] # 各文档的词频
 
+        # 倒排索引
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}  # 词项 -> [(文档下标, 词频)]
+        self._doc_index: Dict[str, int] = {}       # doc_id -> 文档下标
+        self._doc_norms: List[float] = []          # 预计算的长度归一化项
+        self._idf_cache: Dict[str, float] = {}     # 词项IDF缓存
+        self._term_matrix: Optional[Tuple] = None  # 批量检索用的 词项×文档 CSR 权重矩阵（懒构建）
+
         # 默认停用词
         self._init_default_stop_words()
 
@@ -99,8 +119,9 @@ class BM25Retriever:
         添加文档到索引
 
         Args:
-            documents: 文档列表，每个文档应包含 doc_id 和 content
+            documents: 文档列表，每个文档应包含 doc_id 和 content；doc_id 已存在时替换原文档
         """
+        documents = self._replace_existing(documents)
         for doc in documents:
             doc_id = doc.get("doc_id", str(len(self.documents)))
             content = doc.get("content", "")
@@ -116,16 +137,124 @@ class BM25Retriever:
                 tokens=tokens,
                 metadata=metadata
             )
+            doc_idx = len(self.documents)
             self.documents.append(bm25_doc)
+            self._doc_index[doc_id] = doc_idx
 
             # 更新统计
             self.doc_lengths.append(len(tokens))
-            self._update_term_stats(tokens)
+            self._update_term_stats(Counter(tokens), doc_idx)
 
         # 更新统计信息
+        self._refresh_stats()
+
+    def add_tokenized_documents(self, documents: List[Dict[str, Any]]) -> None:
+        """
+        添加已分词的文档（用于从持久化索引恢复，跳过分词）
+
+        Args:
+            documents: 文档列表，每个文档包含 doc_id、content、metadata 和 term_freqs（词项 -> 词频）；
+                恢复的文档不保留原始分词序列，tokens 为空列表；doc_id 已存在时替换原文档
+        """
+        documents = self._replace_existing(documents)
+        for doc in documents:
+            doc_id = doc["doc_id"]
+            term_freq = doc.get("term_freqs", {})
+
+            doc_idx = len(self.documents)
+            self.documents.append(BM25Document(
+                doc_id=doc_id,
+                content=doc.get("content", ""),
+                tokens=[],
+                metadata=doc.get("metadata", {})
+            ))
+            self._doc_index[doc_id] = doc_idx
+
+            self.doc_lengths.append(sum(term_freq.values()))
+            self._update_term_stats(term_freq, doc_idx)
+
+        self._refresh_stats()
+
+    def _replace_existing(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """同一 doc_id 只保留最新的文档：批内重复取最后一个，并先从索引中移除已有的同 ID 文档"""
+        latest: Dict[str, int] = {}
+        for i, doc in enumerate(documents):
+            if "doc_id" in doc:
+                latest[doc["doc_id"]] = i
+        documents = [
+            doc for i, doc in enumerate(documents)
+            if "doc_id" not in doc or latest[doc["doc_id"]] == i
+        ]
+        existing = [doc_id for doc_id in latest if doc_id in self._doc_index]
+        if existing:
+            self.remove_documents(existing)
+        return documents
+
+    def remove_documents(self, doc_ids: List[str]) -> int:
+        """
+        从索引中移除文档
+
+        Args:
+            doc_ids: 要移除的文档ID列表
+
+        Returns:
+            int: 实际移除的文档数量
+        """
+        removed = {self._doc_index[d] for d in doc_ids if d in self._doc_index}
+        if not removed:
+            return 0
+
+        for doc_idx in removed:
+            for term in self.term_freqs[doc_idx]:
+                df = self.doc_freqs.get(term, 0) - 1
+                if df > 0:
+                    self.doc_freqs[term] = df
+                else:
+                    self.doc_freqs.pop(term, None)
+
+        keep = [i for i in range(len(self.documents)) if i not in removed]
+        self.documents = [self.documents[i] for i in keep]
+        self.doc_lengths = [self.doc_lengths[i] for i in keep]
+        self.term_freqs = [self.term_freqs[i] for i in keep]
+
+        # 文档下标已变化，按保留的词频重建倒排表
+        self.postings = {}
+        self._doc_index = {}
+        for doc_idx, (doc, term_freq) in enumerate(zip(self.documents, self.term_freqs)):
+            self._doc_index[doc.doc_id] = doc_idx
+            for term, tf in term_freq.items():
+                self.postings.setdefault(term, []).append((doc_idx, tf))
+
+        self._refresh_stats()
+        return len(removed)
+
+    def _refresh_stats(self) -> None:
+        """刷新全局统计：平均文档长度、长度归一化项，并使IDF缓存失效"""
         self.doc_count = len(self.documents)
         self.avg_doc_length = sum(self.doc_lengths) / self.doc_count if self.doc_count > 0 else 0
 
+        k1, b = self.k1, self.b
+        avgdl = self.avg_doc_length or 1.0
+        self._doc_norms = [k1 * (1 - b + b * length / avgdl) for length in self.doc_lengths]
+        self._idf_cache = {}
+        self._term_matrix = None
+
+    def _idf(self, term: str) -> float:
+        """
+        词项的逆文档频率（带缓存）
+
+        IDF(qi) = log((N - df(qi) + 0.5) / (df(qi) + 0.5) + 1)，使用平滑版本避免负值
+        """
+        idf = self._idf_cache.get(term)
+        if idf is None:
+            df_qi = self.doc_freqs.get(term, 0)
+            if df_qi == 0:
+                return 0.0
+            N = self.doc_count
+            idf = math.log((N - df_qi + 0.5) / (df_qi + 0.5) + 1)
+            self._idf_cache[term] = idf
+        return idf
+
     def _tokenize(self, text: str) -> List[str]:
         """
         对文本进行分词
@@ -153,15 +282,15 @@ class BM25Retriever:
 
         return tokens
 
-    def _update_term_stats(self, tokens: List[str]) -> None:
-        """更新词项统计"""
+    def _update_term_stats(self, term_freq: Dict[str, int], doc_idx: int) -> None:
+        """更新词项统计和倒排表"""
         # 当前文档的词频
-        term_freq = Counter(tokens)
         self.term_freqs.append(dict(term_freq))
 
-        # 更新文档频率
-        for term in term_freq.keys():
+        # 更新文档频率与倒排表
+        for term, tf in term_freq.items():
             self.doc_freqs[term] = self.doc_freqs.get(term, 0) + 1
+            self.postings.setdefault(term, []).append((doc_idx, tf))
 
     def search(
         self,
@@ -189,19 +318,28 @@ class BM25Retriever:
         if not query_tokens:
             return []
 
-        # 计算每个文档的BM25得分
-        scores = []
-        for doc_idx, doc in enumerate(self.documents):
-            score = self._calculate_bm25_score(query_tokens, doc_idx)
-            if score >= min_score:
-                scores.append((doc_idx, score))
+        # 只遍历包含查询词的文档（查询中重复的词按次数加权）
+        k1_plus_1 = self.k1 + 1
+        doc_norms = self._doc_norms
+        accumulator: Dict[int, float] = defaultdict(float)
+        for term, query_tf in Counter(query_tokens).items():
+            term_postings = self.postings.get(term)
+            if not term_postings:
+                continue
+            weight = self._idf(term) * query_tf * k1_plus_1
+            for doc_idx, tf in term_postings:
+                accumulator[doc_idx] += weight * tf / (tf + doc_norms[doc_idx])
 
-        # 按得分降序排序
-        scores.sort(key=lambda x: x[1], reverse=True)
+        # 堆选择top_k，同分时按文档下标升序
+        candidates = (
+            (doc_idx, score) for doc_idx, score in accumulator.items()
+            if score >= min_score
+        )
+        top = heapq.nlargest(top_k, candidates, key=lambda x: (x[1], -x[0]))
 
         # 构建结果
         results = []
-        for doc_idx, score in scores[:top_k]:
+        for doc_idx, score in top:
             doc = self.documents[doc_idx]
             results.append(SearchResult(
                 doc_id=doc.doc_id,
@@ -235,7 +373,7 @@ class BM25Retriever:
             float: BM25得分
         """
         score = 0.0
-        doc_len = self.doc_lengths[doc_idx]
+        doc_norm = self._doc_norms[doc_idx]
         doc_term_freqs = self.term_freqs[doc_idx]
 
         for term in query_tokens:
@@ -245,51 +383,161 @@ class BM25Retriever:
             if f_qi_D == 0:
                 continue
 
-            # 逆文档频率
-            # IDF(qi) = log((N - df(qi) + 0.5) / (df(qi) + 0.5))
-            # 使用平滑版本避免负值
-            N = self.doc_count
-            df_qi = self.doc_freqs.get(term, 0)
-
-            if df_qi == 0:
-                continue
-
-            idf_qi = math.log((N - df_qi + 0.5) / (df_qi + 0.5) + 1)
-
-            # BM25分子分母
+            # BM25分子分母（分母中的长度归一化项已预计算）
             numerator = f_qi_D * (self.k1 + 1)
-            denominator = f_qi_D + self.k1 * (1 - self.b + self.b * doc_len / self.avg_doc_length)
+            denominator = f_qi_D + doc_norm
 
-            score += idf_qi * (numerator / denominator)
+            score += self._idf(term) * (numerator / denominator)
 
         return score
 
     def batch_search(
         self,
         queries: List[str],
-        top_k: int = 10
+        top_k: int = 10,
+        min_score: float = 0.0
     ) -> Dict[str, List[SearchResult]]:
         """
-        批量搜索
+        批量搜索（向量化）
+
+        将所有查询组装为 查询×词项 的稀疏矩阵（值为 IDF×查询词频），与预构建的
+        词项×文档 CSR 权重矩阵（值为 tf*(k1+1)/(tf+归一化项)）一次相乘得到全部得分，
+        再用 argpartition 取每个查询的 top_k。未安装 SciPy 时退化为按词项的 NumPy 累加。
 
         Args:
             queries: 查询列表
             top_k: 每个查询返回的结果数量
+            min_score: 最小得分阈值
 
         Returns:
             Dict[str, List[SearchResult]]: 查询到结果的映射
         """
-        results = {}
-        for query in queries:
-            results[query] = self.search(query, top_k)
+        results: Dict[str, List[SearchResult]] = {query: [] for query in queries}
+        if not self.documents or not queries or top_k <= 0:
+            return results
+
+        term_ids, indptr, doc_indices, weights = self._get_term_matrix()
+
+        # 查询×词项 稀疏矩阵（COO 三元组）
+        rows: List[int] = []
+        cols: List[int] = []
+        vals: List[float] = []
+        for q_idx, query in enumerate(queries):
+            for term, query_tf in Counter(self._tokenize(query)).items():
+                term_id = term_ids.get(term)
+                if term_id is None:
+                    continue
+                rows.append(q_idx)
+                cols.append(term_id)
+                vals.append(self._idf(term) * query_tf)
+
+        if not rows:
+            return results
+
+        for q_idx, doc_idx_arr, score_arr in self._score_query_matrix(
+            len(queries), rows, cols, vals, indptr, doc_indices, weights
+        ):
+            mask = score_arr >= min_score
+            doc_idx_arr, score_arr = doc_idx_arr[mask], score_arr[mask]
+            if score_arr.size == 0:
+                continue
+
+            if score_arr.size > top_k:
+                part = np.argpartition(-score_arr, top_k - 1)[:top_k]
+                doc_idx_arr, score_arr = doc_idx_arr[part], score_arr[part]
+
+            # 得分降序，同分时按文档下标升序（与 search 一致）
+            order = np.lexsort((doc_idx_arr, -score_arr))
+            results[queries[q_idx]] = [
+                SearchResult(
+                    doc_id=self.documents[doc_idx].doc_id,
+                    content=self.documents[doc_idx].content,
+                    score=float(score),
+                    metadata=self.documents[doc_idx].metadata
+                )
+                for doc_idx, score in zip(doc_idx_arr[order].tolist(), score_arr[order].tolist())
+            ]
+
         return results
 
+    def _get_term_matrix(self) -> Tuple:
+        """
+        获取（必要时构建）词项×文档 CSR 权重矩阵
+
+        Returns:
+            Tuple: (term_ids, indptr, doc_indices, weights)
+        """
+        if self._term_matrix is not None:
+            return self._term_matrix
+
+        terms = list(self.postings.keys())
+        term_ids = {term: i for i, term in enumerate(terms)}
+
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(self.postings[term]) for term in terms])
+
+        flat = np.array(
+            [posting for term in terms for posting in self.postings[term]],
+            dtype=np.float64
+        ).reshape(-1, 2)
+        doc_indices = flat[:, 0].astype(np.int32)
+        tf = flat[:, 1]
+        doc_norms = np.asarray(self._doc_norms, dtype=np.float64)
+        weights = tf * (self.k1 + 1) / (tf + doc_norms[doc_indices])
+
+        self._term_matrix = (term_ids, indptr, doc_indices, weights)
+        return self._term_matrix
+
+    def _score_query_matrix(
+        self,
+        n_queries: int,
+        rows: List[int],
+        cols: List[int],
+        vals: List[float],
+        indptr: np.ndarray,
+        doc_indices: np.ndarray,
+        weights: np.ndarray
+    ):
+        """
+        计算 查询矩阵 × 权重矩阵，逐查询产出 (查询下标, 命中文档下标, 得分)
+
+        只返回至少包含一个查询词的文档
+        """
+        n_terms = len(indptr) - 1
+
+        if SCIPY_AVAILABLE:
+            query_matrix = sp.csr_matrix(
+                (vals, (rows, cols)), shape=(n_queries, n_terms), dtype=np.float64
+            )
+            term_matrix = sp.csr_matrix(
+                (weights, doc_indices, indptr), shape=(n_terms, self.doc_count)
+            )
+            scores = (query_matrix @ term_matrix).tocsr()
+            for q_idx in range(n_queries):
+                start, end = scores.indptr[q_idx], scores.indptr[q_idx + 1]
+                if start < end:
+                    yield q_idx, scores.indices[start:end], scores.data[start:end]
+            return
+
+        # NumPy 回退：每个（查询, 词项）对一次向量化累加
+        scores = np.zeros((n_queries, self.doc_count), dtype=np.float64)
+        touched = np.zeros((n_queries, self.doc_count), dtype=bool)
+        for q_idx, term_id, val in zip(rows, cols, vals):
+            start, end = indptr[term_id], indptr[term_id + 1]
+            term_docs = doc_indices[start:end]
+            scores[q_idx, term_docs] += val * weights[start:end]
+            touched[q_idx, term_docs] = True
+        for q_idx in range(n_queries):
+            hit = np.flatnonzero(touched[q_idx])
+            if hit.size:
+                yield q_idx, hit, scores[q_idx, hit]
+
     def get_document_by_id(self, doc_id: str) -> Optional[BM25Document]:
         """根据ID获取文档"""
-        for doc in self.documents:
-            if doc.doc_id == doc_id:
-                return doc
-        return None
+        doc_idx = self._doc_index.get(doc_id)
+        if doc_idx is None:
+            return None
+        return self.documents[doc_idx]
 
     def clear(self) -> None:
         """清空索引"""
@@ -299,6 +547,11 @@ class BM25Retriever:
         self.avg_doc_length = 0.0
         self.doc_freqs = {}
         self.term_freqs = []
+        self.postings = {}
+        self._doc_index = {}
+        self._doc_norms = []
+        self._idf_cache = {}
+        self._term_matrix = None
 
     def get_stats(self) -> Dict[str, Any]:
         """获取索引统计信息"""
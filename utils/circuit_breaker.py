@@ -6,7 +6,7 @@
 import asyncio
 import time
 from enum import Enum
-from typing import Callable, Optional, Any, TypeVar, Coro
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Any, TypeVar
 from collections import deque
 from dataclasses import dataclass
 
@@ -90,6 +90,9 @@ class CircuitBreaker:
         # 滑动窗口：记录最近的请求结果
         self._sliding_window = deque(maxlen=self.config.sliding_window_size)
 
+        # 滑动窗口：按调用类别记录最近请求的耗时（秒）
+        self._latencies: Dict[str, Deque[float]] = {}
+
         # 状态变更时间
         self._state_changed_at = time.time()
 
@@ -125,10 +128,18 @@ class CircuitBreaker:
             time.time() - self._state_changed_at >= self.config.timeout
         )
 
-    def _record_success(self):
+    def _record_latency(self, latency: float, latency_class: str):
+        window = self._latencies.get(latency_class)
+        if window is None:
+            window = self._latencies[latency_class] = deque(maxlen=self.config.sliding_window_size)
+        window.append(latency)
+
+    def _record_success(self, latency: Optional[float] = None, latency_class: str = "default"):
         """记录成功调用"""
         self._success_count += 1
         self._sliding_window.append(True)
+        if latency is not None:
+            self._record_latency(latency, latency_class)
 
         if self._state == CircuitState.HALF_OPEN:
             self._half_open_successes += 1
@@ -172,7 +183,7 @@ class CircuitBreaker:
 
     async def call(
         self,
-        func: Callable[..., Coro[T]],
+        func: Callable[..., Awaitable[T]],
         *args: Any,
         **kwargs: Any
     ) -> T:
@@ -205,6 +216,7 @@ class CircuitBreaker:
             )
 
         # 执行函数调用
+        started = time.monotonic()
         try:
             # 使用超时控制
             result = await asyncio.wait_for(
@@ -213,7 +225,7 @@ class CircuitBreaker:
             )
 
             # 记录成功
-            self._record_success()
+            self._record_success(time.monotonic() - started)
 
             return result
 
@@ -227,6 +239,71 @@ class CircuitBreaker:
             self._record_failure()
             raise
 
+    def is_available(self) -> bool:
+        """
+        判断当前是否允许发起请求（用于调用方自行执行请求的场景）
+
+        OPEN 状态超时后会先转入 HALF_OPEN
+        """
+        if self._should_attempt_reset():
+            self._transition_to(CircuitState.HALF_OPEN)
+            logger.info(f"🔓 熔断器 '{self.name}' 进入半开状态，尝试恢复")
+        return self._state != CircuitState.OPEN
+
+    def record_success(self, latency: Optional[float] = None, latency_class: str = "default"):
+        """
+        记录一次在熔断器外部执行的成功调用
+
+        Args:
+            latency: 调用耗时（秒），不传则不计入延迟统计
+            latency_class: 延迟统计类别（不同类别的调用耗时分布分开统计）
+        """
+        self._total_calls += 1
+        self._record_success(latency, latency_class)
+
+    def record_latency(self, latency: float, latency_class: str = "default"):
+        """
+        只记录耗时、不计入成功失败（如被取消的调用：已耗时是真实耗时的下界，
+        不记录会使分位数只反映较快的请求而偏低）
+        """
+        self._record_latency(latency, latency_class)
+
+    def record_failure(self):
+        """记录一次在熔断器外部执行的失败调用"""
+        self._total_calls += 1
+        self._record_failure()
+
+    def _latency_window(self, latency_class: Optional[str]) -> List[float]:
+        if latency_class is not None:
+            return list(self._latencies.get(latency_class, ()))
+        return [latency for window in self._latencies.values() for latency in window]
+
+    def latency_percentile(self, percentile: float, latency_class: Optional[str] = None) -> Optional[float]:
+        """
+        最近调用耗时的分位数
+
+        Args:
+            percentile: 分位（0-100）
+            latency_class: 延迟统计类别，None 表示合并全部类别
+
+        Returns:
+            耗时（秒），无样本时返回 None
+        """
+        ordered = sorted(self._latency_window(latency_class))
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, max(0, int(round(percentile / 100 * len(ordered))) - 1))
+        return ordered[index]
+
+    @property
+    def latency_samples(self) -> int:
+        """延迟统计样本数（全部类别）"""
+        return sum(len(window) for window in self._latencies.values())
+
+    def latency_sample_count(self, latency_class: str) -> int:
+        """指定类别的延迟统计样本数"""
+        return len(self._latencies.get(latency_class, ()))
+
     def get_stats(self) -> dict:
         """获取熔断器统计信息"""
         # 计算滑动窗口内的失败率
@@ -247,6 +324,8 @@ class CircuitBreaker:
             "failure_rate": round(failure_rate, 4),
             "recent_failures": recent_failures,
             "recent_successes": recent_successes,
+            "p50_latency": self.latency_percentile(50),
+            "p95_latency": self.latency_percentile(95),
             "state_changed_at": self._state_changed_at,
             "time_in_state": time.time() - self._state_changed_at
         }
@@ -258,6 +337,7 @@ class CircuitBreaker:
         self._success_count = 0
         self._half_open_successes = 0
         self._sliding_window.clear()
+        self._latencies.clear()
         self._state_changed_at = time.time()
 
         logger.info(f"🔄 熔断器 '{self.name}' 已重置")
@@ -323,7 +403,7 @@ def with_circuit_breaker(
         return await llm_client.chat(prompt)
     ```
     """
-    def decorator(func: Callable[..., Coro[T]]) -> Callable[..., Coro[T]]:
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
         async def wrapper(*args, **kwargs) -> T:
             breaker = CircuitBreakerRegistry.register(breaker_name, config)
             return await breaker.call(func, *args, **kwargs)
@@ -17,6 +17,7 @@ try:
     from ..utils.logger import JubenLogger
     from ..utils.storage_manager import JubenStorageManager, ChatMessage, ContextState
     from ..utils.llm_client import JubenLLMClient
+    from ..utils.tokenizer_service import get_tokenizer_service
 except ImportError:
     import sys
     from pathlib import Path
@@ -26,12 +27,13 @@ except ImportError:
     from utils.logger import JubenLogger
     from utils.storage_manager import JubenStorageManager, ChatMessage, ContextState
     from utils.llm_client import JubenLLMClient
+    from utils.tokenizer_service import get_tokenizer_service
 
 
 @dataclass
 class CompressionConfig:
     """压缩配置"""
-    max_context_length: int = 8000  # 最大上下文长度
+    max_context_length: int = 8000  # 最大上下文长度（tokens）
     compression_threshold: float = 0.8  # 压缩阈值（80%时开始压缩）
     summary_ratio: float = 0.3  # 摘要比例（保留30%的原始信息）
     preserve_recent: int = 10  # 保留最近N条消息
@@ -100,15 +102,10 @@ class ContextCompactor:
             raise
     
     def calculate_context_length(self, messages: List[Dict[str, Any]]) -> int:
-        """计算上下文长度"""
-        total_length = 0
-        for message in messages:
-            content = message.get('content', '')
-            if isinstance(content, str):
-                total_length += len(content)
-            elif isinstance(content, dict):
-                total_length += len(str(content))
-        return total_length
+        """计算上下文长度（token数）"""
+        return get_tokenizer_service().count_messages(
+            messages, model=getattr(self.llm_client, "model", None), per_message_overhead=0
+        )
     
     def should_compress(self, messages: List[Dict[str, Any]]) -> Tuple[bool, float]:
         """
@@ -239,7 +236,7 @@ class ContextCompactor:
 - 用户ID: {user_id}
 - 会话ID: {session_id}
 - Agent: {agent_name}
-- 当前上下文长度: {self.calculate_context_length(messages)} 字符
+- 当前上下文长度: {self.calculate_context_length(messages)} tokens
 
 ## 对话历史
 {message_text}
@@ -37,6 +37,7 @@ try:
         ChunkType
     )
     from .logger import JubenLogger
+    from .tokenizer_service import get_tokenizer_service
 except ImportError:
     import sys
     sys.path.insert(0, str(Path(__file__).parent))
@@ -47,6 +48,7 @@ except ImportError:
         ChunkType
     )
     from logger import JubenLogger
+    from tokenizer_service import get_tokenizer_service
 
 
 class ContextManagementMixin:
@@ -313,29 +315,20 @@ class ContextManagementMixin:
     # ==================== Token计算 ====================
 
     def count_tokens(self, text: str) -> int:
-        """计算文本的token数（使用增强计数器）"""
-        # 这里可以使用同步方法，因为只是计算
-        import re
-
-        if not text:
-            return 0
-
-        # 中文：约1字符=1token
-        chinese_chars = sum(1 for c in text if '\u4e00' <= c <= '\u9fff')
-        # 英文/数字：约4字符=1token
-        other_chars = len(text) - chinese_chars
-
-        return chinese_chars + max(1, other_chars // 4)
+        """计算文本的token数（使用共享Token计数服务）"""
+        return get_tokenizer_service().count(text, model=self._tokenizer_model())
 
     def estimate_context_tokens(
         self,
         messages: List[Dict[str, Any]]
     ) -> int:
         """估算消息列表的总token数"""
-        return sum(
-            self.count_tokens(msg.get("content", "")) + 5  # +5 for role/metadata
-            for msg in messages
-        )
+        # 每条消息另计约5 tokens的角色/元数据开销
+        return get_tokenizer_service().count_messages(messages, model=self._tokenizer_model())
+
+    def _tokenizer_model(self) -> Optional[str]:
+        """当前Agent所用模型（决定分词编码）"""
+        return getattr(getattr(self, "llm_client", None), "model", None)
 
     # ==================== 辅助方法 ====================
 
@@ -78,6 +78,13 @@ async def fetch_all(sql: str, *args) -> list:
         return [dict(r) for r in rows]
 
 
+async def copy_records(table: str, columns: list, records: list) -> str:
+    """批量写入多行（COPY协议）"""
+    pool = await get_postgres_pool()
+    async with pool.acquire() as conn:
+        return await conn.copy_records_to_table(table, records=records, columns=columns)
+
+
 async def test_connection() -> bool:
     """测试数据库连接"""
     try:
@@ -233,8 +233,13 @@ class EnhancedContextManager:
         self.budget = TokenBudget()
 
         # LLM客户端
+        self.model = model
         self.llm_client = get_llm_client(model_provider, model=model)
 
+        # Token计数
+        from .tokenizer_service import get_tokenizer_service
+        self.tokenizer = get_tokenizer_service()
+
         # 存储管理器
         from utils.storage_manager import get_storage
         self.storage_manager = get_storage()
@@ -251,6 +256,7 @@ class EnhancedContextManager:
         self.rolling_window_size = 10  # 滚动窗口大小（消息数）
         self.compression_threshold = 0.85  # 压缩阈值
         self.summary_target_ratio = 0.3  # 摘要目标比例
+        self.rag_source_timeouts = {"vector": 3.0, "text": 3.0}  # 各检索来源超时（秒）
 
     def _touch_window(self, window: ContextWindow):
         """更新窗口版本与时间戳"""
@@ -309,30 +315,20 @@ class EnhancedContextManager:
 
     def count_tokens(self, text: str) -> int:
         """
-        更准确的Token计数
+        Token计数
 
-        基于GLM-4-Flash的实际tokenizer特性优化
+        使用共享Token计数服务（按模型分词，带缓存）
         """
-        if not text:
-            return 0
-
-        # 中文：约1字符=1token
-        chinese_chars = sum(1 for c in text if '\u4e00' <= c <= '\u9fff')
-        # 英文/数字：约4字符=1token
-        other_chars = len(text) - chinese_chars
-
-        return chinese_chars + max(1, other_chars // 4)
+        return self.tokenizer.count(text, model=self.model)
 
     def count_message_tokens(self, message: Dict[str, Any]) -> int:
         """计算消息的token数"""
-        content = message.get("content", "")
-        role = message.get("role", "")
         # 角色标记约5 tokens
-        return self.count_tokens(content) + 5
+        return self.tokenizer.count_messages([message], model=self.model)
 
     def count_context_tokens(self, messages: List[Dict[str, Any]]) -> int:
         """计算上下文总token数"""
-        return sum(self.count_message_tokens(msg) for msg in messages)
+        return self.tokenizer.count_messages(messages, model=self.model)
 
     # ==================== 语义分块 ====================
 
@@ -1573,79 +1569,45 @@ class EnhancedContextManager:
             - type: 类型 (vector/text/hybrid)
         """
         try:
-            # 延迟导入，避免循环依赖
-            from .vector_store import VectorStore
-            from .knowledge_base_client import KnowledgeBaseClient
-
-            results = []
-
-            # 1. 向量检索
+            # 1. 向量检索与文本检索并发执行，各自限时
+            retrievers = {}
             if enable_rag:
-                try:
-                    vector_store = VectorStore()
-                    if not vector_store._initialized:
-                        await vector_store.initialize()
-
-                    vector_results = await vector_store.search_similar(
-                        collection_name=f"{collection}_collection",
-                        query=query,
-                        top_k=top_k,
-                        score_threshold=0.6
-                    )
-
-                    # 格式化结果
-                    for item in vector_results.get("results", []):
-                        results.append({
-                            "content": item.get("content", ""),
-                            "similarity": item.get("score", 0.0),
-                            "source": item.get("source", "vector_db"),
-                            "type": "vector"
-                        })
-
-                    self.logger.info(f"向量检索: 找到{len(results)}个结果")
-
-                except Exception as e:
-                    self.logger.warning(f"向量检索失败: {e}")
-
-            # 2. 文本/关键词检索（混合）
+                retrievers["vector"] = self._vector_retrieve(query, collection, top_k)
             if enable_hybrid:
-                try:
-                    knowledge_client = KnowledgeBaseClient()
-                    text_results = await knowledge_client.search(query, collection=collection, top_k=top_k)
-
-                    # 格式化结果
-                    for item in text_results.get("results", []):
-                        results.append({
-                            "content": item.get("content", ""),
-                            "similarity": item.get("similarity", 0.0),
-                            "source": item.get("source", "knowledge_base"),
-                            "type": "text"
-                        })
-
-                    self.logger.info(f"文本检索: 找到{len(text_results.get('results', []))}个结果")
-
-                except Exception as e:
-                    self.logger.warning(f"文本检索失败: {e}")
-
-            # 3. 混合检索结果去重和排序
-            if results:
-                results = await self._deduplicate_and_rank(results)
-
-                # 限制返回数量
-                results = results[:top_k]
-
-                # 将结果存储到草稿纸（供后续选择使用）
-                for result in results:
-                    await self.add_to_scratchpad(
-                        session_id, user_id,
-                        result["content"],
-                        importance=result["similarity"],
-                        tags=["rag", result["type"], collection],
-                        metadata={
-                            "source": result["source"],
-                            "similarity": result["similarity"]
-                        }
-                    )
+                retrievers["text"] = self._text_retrieve(query, collection, top_k)
+            if not retrievers:
+                return []
+
+            outcomes = await asyncio.gather(*(
+                asyncio.wait_for(coro, timeout=self.rag_source_timeouts.get(source, 5.0))
+                for source, coro in retrievers.items()
+            ), return_exceptions=True)
+
+            ranked_lists: Dict[str, List[Dict[str, Any]]] = {}
+            for source, outcome in zip(retrievers, outcomes):
+                if isinstance(outcome, asyncio.TimeoutError):
+                    self.logger.warning(f"{source}检索超时，跳过该来源")
+                elif isinstance(outcome, BaseException):
+                    self.logger.warning(f"{source}检索失败: {outcome}")
+                else:
+                    ranked_lists[source] = outcome
+                    self.logger.info(f"{source}检索: 找到{len(outcome)}个结果")
+
+            # 2. RRF融合 + 近似重复合并（SimHash 指纹计算放到线程中，不阻塞事件循环）
+            results = (await asyncio.to_thread(self._fuse_results, ranked_lists))[:top_k]
+
+            # 3. 将结果存储到草稿纸（供后续选择使用）
+            for result in results:
+                await self.add_to_scratchpad(
+                    session_id, user_id,
+                    result["content"],
+                    importance=result["similarity"],
+                    tags=["rag", result["type"], collection],
+                    metadata={
+                        "source": result["source"],
+                        "similarity": result["similarity"]
+                    }
+                )
 
             return results
 
@@ -1653,36 +1615,62 @@ class EnhancedContextManager:
             self.logger.error(f"RAG自动加载失败: {e}")
             return []
 
-    async def _deduplicate_and_rank(
-        self,
-        results: List[Dict[str, Any]]
-    ) -> List[Dict[str, Any]]:
-        """
-        去重和排序混合检索结果
+    async def _vector_retrieve(self, query: str, collection: str, top_k: int) -> List[Dict[str, Any]]:
+        """向量检索（共享向量存储实例）"""
+        from .vector_store import get_vector_store
 
-        Args:
-            results: 混合检索结果列表
+        vector_store = await get_vector_store()
+        vector_results = await vector_store.search_similar(
+            collection_name=f"{collection}_collection",
+            query=query,
+            top_k=top_k,
+            score_threshold=0.6
+        )
+        return [
+            {
+                "content": item.get("content", ""),
+                "similarity": item.get("score", 0.0),
+                "source": item.get("source", "vector_db"),
+                "type": "vector"
+            }
+            for item in vector_results.get("results", [])
+        ]
 
-        Returns:
-            去重和排序后的结果
+    async def _text_retrieve(self, query: str, collection: str, top_k: int) -> List[Dict[str, Any]]:
+        """文本/关键词检索（共享知识库客户端）"""
+        from .knowledge_base_client import knowledge_base_client
+
+        text_results = await knowledge_base_client.search(query, collection=collection, top_k=top_k)
+        return [
+            {
+                "content": item.get("content", ""),
+                "similarity": item.get("similarity", 0.0),
+                "source": item.get("source", "knowledge_base"),
+                "type": "text"
+            }
+            for item in text_results.get("results", [])
+        ]
+
+    def _fuse_results(self, ranked_lists: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
         """
-        # 去重（基于内容相似度）
-        seen_contents = set()
-        unique_results = []
+        融合多路检索结果
 
-        for result in results:
-            content = result.get("content", "")
-            # 使用内容的前100个字符作为去重依据
-            content_key = content[:100] if content else ""
+        各路结果按自身相关度排序后做倒数排名融合（RRF），
+        近似重复内容（SimHash）合并为一条并标记为 hybrid
 
-            if content_key and content_key not in seen_contents:
-                seen_contents.add(content_key)
-                unique_results.append(result)
+        Args:
+            ranked_lists: 来源 -> 检索结果
 
-        # 排序：按相似度降序
-        unique_results.sort(key=lambda x: x.get("similarity", 0), reverse=True)
+        Returns:
+            融合排序后的结果
+        """
+        from .retrieval_fusion import reciprocal_rank_fusion
 
-        return unique_results
+        ordered = {
+            source: sorted(items, key=lambda x: x.get("similarity", 0), reverse=True)
+            for source, items in ranked_lists.items()
+        }
+        return reciprocal_rank_fusion(ordered)
 
     async def rebuild_context_with_rag(
         self,
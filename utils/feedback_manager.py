@@ -21,6 +21,11 @@ from enum import Enum
 from datetime import datetime, timedelta
 from pathlib import Path
 
+try:
+    from .edit_distance import edit_metrics
+except ImportError:
+    from utils.edit_distance import edit_metrics
+
 logger = logging.getLogger(__name__)
 
 
@@ -110,42 +115,28 @@ class AgentFeedback:
         """
         计算编辑距离和修改比例
 
+        超长文本使用按行/句对齐的近似距离，并在 metadata 中标记 edit_distance_approximate
+
         Returns:
             Tuple[int, float]: (编辑距离, 修改比例)
         """
         if not self.user_edit_text:
             return 0, 0.0
 
-        # 使用 Levenshtein 距离计算编辑距离
-        distance = self._levenshtein_distance(self.ai_output, self.user_edit_text)
-        max_len = max(len(self.ai_output), len(self.user_edit_text), 1)
-        ratio = distance / max_len
+        # 位并行 Levenshtein 距离
+        distance, ratio, approximate = edit_metrics(self.ai_output, self.user_edit_text)
 
         self.edit_distance = distance
         self.edit_ratio = ratio
         self.similarity_score = 1.0 - ratio
+        if approximate:
+            self.metadata["edit_distance_approximate"] = True
 
         return distance, ratio
 
-    def _levenshtein_distance(self, s1: str, s2: str) -> int:
-        """计算 Levenshtein 距离"""
-        if len(s1) < len(s2):
-            return self._levenshtein_distance(s2, s1)
-
-        if len(s2) == 0:
-            return len(s1)
-
-        previous_row = range(len(s2) + 1)
-        for i, c1 in enumerate(s1):
-            current_row = [i + 1]
-            for j, c2 in enumerate(s2):
-                insertions = previous_row[j + 1] + 1
-                deletions = current_row[j] + 1
-                substitutions = previous_row[j] + (c1 != c2)
-                current_row.append(min(insertions, deletions, substitutions))
-            previous_row = current_row
-
-        return previous_row[-1]
+    async def acalculate_edit_metrics(self) -> Tuple[int, float]:
+        """在线程中计算编辑指标，长文本不阻塞事件循环"""
+        return await asyncio.to_thread(self.calculate_edit_metrics)
 
 
 # ==================== 反馈管理器 ====================
@@ -190,7 +181,7 @@ class FeedbackManager:
         """
         try:
             # 计算编辑指标
-            feedback.calculate_edit_metrics()
+            await feedback.acalculate_edit_metrics()
 
             # 判断是否为黄金样本
             self._evaluate_gold_sample(feedback)
@@ -626,6 +617,8 @@ class GoldSampleManager:
 
             # 创建样本
             sample_id = f"gold_{uuid.uuid4().hex[:16]}"
+            if feedback.edit_ratio is None and feedback.user_edit_text:
+                await feedback.acalculate_edit_metrics()
             score = self._calculate_score(feedback)
 
             # 插入数据
@@ -0,0 +1,256 @@
+"""
+文件片段向量索引
+按 文件内容哈希 持久化片段及其归一化向量矩阵，同一内容的文件只向量化一次
+
+目录结构：
+    <base_dir>/<key>.json     片段文本、模型与格式版本
+    <base_dir>/<key>.npy      float32 归一化向量矩阵（行与片段一一对应），以 mmap 方式读取
+    <base_dir>/sources.json   来源文件 -> 当前键；来源换用新键后，不再被任何来源引用的旧版本随即删除
+
+查询时只需对查询文本做一次向量化，打分为一次矩阵-向量乘法
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .logger import JubenLogger
+except ImportError:
+    from utils.logger import JubenLogger
+
+
+@dataclass
+class FragmentEntry:
+    """一个文件内容对应的片段与向量矩阵"""
+    key: str
+    fragments: List[str]
+    matrix: np.ndarray  # (片段数, 维度)，已按行归一化；零向量行保持为零（检索得分为 0）
+    created: bool = False  # 是否为本次新建（用于决定是否同步到外部向量库）
+
+
+class FragmentEmbeddingIndex:
+    """以内容哈希为键的片段向量索引（磁盘 + 内存LRU）"""
+
+    FORMAT_VERSION = 1
+    SOURCES_FILE = "sources.json"
+
+    def __init__(self, base_dir: Optional[str] = None, max_memory_entries: int = 32):
+        self.base_dir = Path(base_dir or os.getenv("FRAGMENT_INDEX_DIR", "data/fragment_index"))
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.max_memory_entries = max_memory_entries
+        self.logger = JubenLogger("fragment_embedding_index")
+        self._memory: "OrderedDict[str, FragmentEntry]" = OrderedDict()
+        self._building: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._sources: Optional[Dict[str, str]] = None
+
+    @staticmethod
+    def content_key(content: str, model: str, chunk_size: int) -> str:
+        """内容哈希键（包含模型与分块参数，任一变化都会重建）"""
+        digest = hashlib.sha256()
+        digest.update(f"{model}\n{chunk_size}\n".encode("utf-8"))
+        digest.update(content.encode("utf-8"))
+        return digest.hexdigest()
+
+    # ==================== 读写 ====================
+
+    def _remember(self, entry: FragmentEntry) -> None:
+        with self._lock:
+            self._memory[entry.key] = entry
+            self._memory.move_to_end(entry.key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def load(self, key: str) -> Optional[FragmentEntry]:
+        """读取已有索引（内存未命中时从磁盘加载）"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+
+        meta_path = self.base_dir / f"{key}.json"
+        matrix_path = self.base_dir / f"{key}.npy"
+        if not meta_path.exists() or not matrix_path.exists():
+            return None
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta.get("version") != self.FORMAT_VERSION:
+                return None
+            matrix = np.load(matrix_path, mmap_mode="r")
+            fragments = meta.get("fragments", [])
+            if matrix.shape[0] != len(fragments):
+                return None
+        except Exception as e:
+            self.logger.warning(f"读取片段索引失败: {key}, {e}")
+            return None
+
+        entry = FragmentEntry(key=key, fragments=fragments, matrix=matrix)
+        self._remember(entry)
+        return entry
+
+    def save(self, key: str, fragments: List[str], vectors: List[List[float]], model: str) -> FragmentEntry:
+        """归一化并写入索引"""
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+
+        matrix_tmp = self.base_dir / f"{key}.npy.tmp"
+        meta_tmp = self.base_dir / f"{key}.json.tmp"
+        with open(matrix_tmp, "wb") as f:
+            np.save(f, matrix)
+        meta_tmp.write_text(
+            json.dumps({"version": self.FORMAT_VERSION, "model": model, "fragments": fragments}, ensure_ascii=False),
+            encoding="utf-8"
+        )
+        # 先写矩阵再写元数据：元数据存在即代表索引完整
+        os.replace(matrix_tmp, self.base_dir / f"{key}.npy")
+        os.replace(meta_tmp, self.base_dir / f"{key}.json")
+
+        entry = FragmentEntry(key=key, fragments=fragments, matrix=matrix, created=True)
+        self._remember(entry)
+        return entry
+
+    # ==================== 版本清理 ====================
+
+    def _load_sources(self) -> Dict[str, str]:
+        if self._sources is None:
+            sources_path = self.base_dir / self.SOURCES_FILE
+            try:
+                self._sources = json.loads(sources_path.read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                self._sources = {}
+            except Exception as e:
+                self.logger.warning(f"读取片段索引来源记录失败: {e}")
+                self._sources = {}
+        return self._sources
+
+    def _remove(self, key: str) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+        for suffix in (".json", ".npy"):
+            try:
+                (self.base_dir / f"{key}{suffix}").unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.logger.warning(f"删除旧片段索引失败: {key}{suffix}, {e}")
+
+    def bind_source(self, source: str, key: str) -> None:
+        """
+        记录来源文件当前对应的键，并删除该来源的上一版本（仍被其他来源引用时保留）
+
+        Args:
+            source: 来源标识（文件路径）
+            key: content_key 生成的键
+        """
+        with self._lock:
+            sources = self._load_sources()
+            previous = sources.get(source)
+            if previous == key:
+                return
+            sources[source] = key
+            stale = previous if previous is not None and previous not in sources.values() else None
+            sources_tmp = self.base_dir / f"{self.SOURCES_FILE}.tmp"
+            sources_tmp.write_text(json.dumps(sources, ensure_ascii=False), encoding="utf-8")
+            os.replace(sources_tmp, self.base_dir / self.SOURCES_FILE)
+
+        if stale is not None:
+            self._remove(stale)
+            self.logger.info(f"已删除旧版本片段索引: {stale[:12]}（{source}）")
+
+    # ==================== 构建 ====================
+
+    async def get_or_build(
+        self,
+        key: str,
+        fragments: List[str],
+        embed_texts: Callable[[List[str]], Awaitable[List[List[float]]]],
+        model: str,
+        source: Optional[str] = None
+    ) -> Optional[FragmentEntry]:
+        """
+        获取索引，不存在时批量向量化片段并保存
+
+        同一键的并发构建只执行一次
+
+        Args:
+            key: content_key 生成的键
+            fragments: 片段列表
+            embed_texts: 异步批量向量化函数，失败时返回空列表
+            model: 向量模型名称
+            source: 来源标识（文件路径），提供时删除该来源的旧版本索引
+
+        Returns:
+            FragmentEntry，向量化失败时返回 None
+        """
+        entry = self.load(key)
+        if entry is not None:
+            if source is not None:
+                self.bind_source(source, key)
+            return entry
+
+        building = self._building.get(key)
+        if building is not None:
+            entry = await asyncio.shield(building)
+            if entry is not None and source is not None:
+                self.bind_source(source, key)
+            return entry
+
+        future = asyncio.get_running_loop().create_future()
+        self._building[key] = future
+        try:
+            vectors = await embed_texts(fragments) if fragments else []
+            entry = None
+            if fragments and len(vectors) == len(fragments):
+                entry = self.save(key, fragments, vectors, model)
+                self.logger.info(f"片段索引已建立: {key[:12]}，{len(fragments)} 个片段")
+                if source is not None:
+                    self.bind_source(source, key)
+            future.set_result(entry)
+            return entry
+        except Exception as e:
+            self.logger.error(f"建立片段索引失败: {e}")
+            future.set_result(None)
+            return None
+        finally:
+            self._building.pop(key, None)
+
+    # ==================== 检索 ====================
+
+    @staticmethod
+    def search(entry: FragmentEntry, query_vector: List[float], top_k: int = 3) -> List[Tuple[float, int]]:
+        """
+        余弦相似度检索
+
+        Returns:
+            [(相似度, 片段序号)]，按相似度降序
+        """
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0 or entry.matrix.shape[0] == 0:
+            return []
+        scores = np.asarray(entry.matrix @ (query / norm))
+        top_k = min(top_k, scores.shape[0])
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(float(scores[i]), int(i)) for i in top]
+
+
+_fragment_index: Optional[FragmentEmbeddingIndex] = None
+
+
+def get_fragment_embedding_index() -> FragmentEmbeddingIndex:
+    """获取全局片段向量索引"""
+    global _fragment_index
+    if _fragment_index is None:
+        _fragment_index = FragmentEmbeddingIndex()
+    return _fragment_index
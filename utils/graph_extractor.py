@@ -4,6 +4,7 @@
 """
 from __future__ import annotations
 
+import asyncio
 import json
 import re
 import hashlib
@@ -14,6 +15,7 @@ from pydantic import BaseModel, Field, ValidationError, validator
 
 from config.settings import JubenSettings
 from utils.llm_client import get_llm_client
+from utils.llm_rate_limiter import LimiterPriority
 from utils.graph_manager import (
     GraphDBManager,
     NodeType,
@@ -79,6 +81,15 @@ JSON Schema:
 
 LOW_CONFIDENCE_THRESHOLD = 0.6
 
+# 抽取结果中按名称合并的实体类别
+ENTITY_GROUPS: List[Tuple[str, NodeType]] = [
+    ("characters", NodeType.CHARACTER),
+    ("locations", NodeType.LOCATION),
+    ("conflicts", NodeType.CONFLICT),
+    ("themes", NodeType.THEME),
+    ("motivations", NodeType.MOTIVATION),
+]
+
 ALIAS_FILE = Path(__file__).resolve().parent.parent / "config" / "graph_aliases.json"
 
 
@@ -266,13 +277,19 @@ def _chunk_text(text: str, chunk_size: int = 4000, overlap: int = 200) -> List[s
 class GraphExtractionService:
     """图谱自动抽取与落库服务"""
 
-    def __init__(self, provider: Optional[str] = None, model: Optional[str] = None):
+    def __init__(
+        self,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+    ):
         self.settings = JubenSettings()
         self.provider = provider or self.settings.default_provider
         self.model = model
         self.logger = JubenLogger("GraphExtractionService")
         self.client = get_llm_client(provider=self.provider, model=self.model)
         self.aliases = _load_aliases()
+        self.max_concurrency = max(1, max_concurrency or self.settings.performance.graph_extraction_concurrency)
 
     async def extract_and_store(
         self,
@@ -291,52 +308,10 @@ class GraphExtractionService:
         plot_nodes: List[Dict[str, Any]] = []
         relations: List[Dict[str, Any]] = []
 
-        for idx, chunk in enumerate(chunks):
-            extracted = await self._extract_chunk(chunk, index=idx + 1)
-            for item in extracted.get("characters", []) or []:
-                name = _normalize_entity_name(item.get("name") or "", self.aliases.get("characters", {}))
-                if name:
-                    item["name"] = name
-                    registry[(NodeType.CHARACTER.value, name.lower())] = _best_item(
-                        registry.get((NodeType.CHARACTER.value, name.lower()), {}),
-                        item,
-                    )
-            for item in extracted.get("locations", []) or []:
-                name = _normalize_entity_name(item.get("name") or "", self.aliases.get("locations", {}))
-                if name:
-                    item["name"] = name
-                    registry[(NodeType.LOCATION.value, name.lower())] = _best_item(
-                        registry.get((NodeType.LOCATION.value, name.lower()), {}),
-                        item,
-                    )
-            for item in extracted.get("conflicts", []) or []:
-                name = _normalize_entity_name(item.get("name") or "", self.aliases.get("conflicts", {}))
-                if name:
-                    item["name"] = name
-                    registry[(NodeType.CONFLICT.value, name.lower())] = _best_item(
-                        registry.get((NodeType.CONFLICT.value, name.lower()), {}),
-                        item,
-                    )
-            for item in extracted.get("themes", []) or []:
-                name = _normalize_entity_name(item.get("name") or "", self.aliases.get("themes", {}))
-                if name:
-                    item["name"] = name
-                    registry[(NodeType.THEME.value, name.lower())] = _best_item(
-                        registry.get((NodeType.THEME.value, name.lower()), {}),
-                        item,
-                    )
-            for item in extracted.get("motivations", []) or []:
-                name = _normalize_entity_name(item.get("name") or "", self.aliases.get("motivations", {}))
-                if name:
-                    item["name"] = name
-                    registry[(NodeType.MOTIVATION.value, name.lower())] = _best_item(
-                        registry.get((NodeType.MOTIVATION.value, name.lower()), {}),
-                        item,
-                    )
-            for item in extracted.get("plot_nodes", []) or []:
-                plot_nodes.append(item)
-            for rel in extracted.get("relations", []) or []:
-                relations.append(rel)
+        # 并发抽取，按分块顺序合并（结果与串行抽取一致）
+        extracted_chunks, failed_chunks = await self._extract_chunks(chunks)
+        for extracted in extracted_chunks:
+            self._merge_extracted(extracted, registry, plot_nodes, relations)
 
         validated = await self._validate_and_merge(registry, plot_nodes, relations)
 
@@ -349,6 +324,7 @@ class GraphExtractionService:
         id_map: Dict[str, str] = {}
         created_nodes = []
         pending_nodes = []
+        node_writes: Dict[NodeType, List[Any]] = {}
 
         for (node_type, name_lower), item in registry.items():
             name = (item.get("name") or "").strip()
@@ -388,7 +364,7 @@ class GraphExtractionService:
                         strengths=[],
                         metadata={"source": "auto_extraction"},
                     )
-                    await graph_db.merge_story_element(NodeType.CHARACTER, data)
+                    node_writes.setdefault(NodeType.CHARACTER, []).append(data)
                 created_nodes.append({
                     "type": node_type,
                     "id": character_id,
@@ -410,7 +386,7 @@ class GraphExtractionService:
                         category=item.get("category"),
                         metadata={"source": "auto_extraction"},
                     )
-                    await graph_db.merge_story_element(NodeType(node_type), data)
+                    node_writes.setdefault(NodeType(node_type), []).append(data)
                 created_nodes.append({
                     "type": node_type,
                     "id": node_id,
@@ -460,7 +436,7 @@ class GraphExtractionService:
                     importance=float(plot.get("importance") or 50),
                     metadata={"source": "auto_extraction"},
                 )
-                await graph_db.merge_story_element(NodeType.PLOT_NODE, data)
+                node_writes.setdefault(NodeType.PLOT_NODE, []).append(data)
             created_plots.append({
                 "type": NodeType.PLOT_NODE.value,
                 "id": plot_id,
@@ -475,8 +451,11 @@ class GraphExtractionService:
                 "importance": plot.get("importance") or 50,
             })
 
+        write_errors = await self._write_nodes(graph_db, node_writes)
+
         created_rels = []
         pending_rels = []
+        rel_writes: List[Dict[str, Any]] = []
         for rel in relations:
             source = (rel.get("source") or "").strip()
             target = (rel.get("target") or "").strip()
@@ -512,16 +491,15 @@ class GraphExtractionService:
                 })
                 continue
             if not dry_run:
-                result = await graph_db.create_relationship(
-                    story_id=story_id,
-                    source_id=source_id,
-                    target_id=target_id,
-                    relation_type=rel_type,
-                    properties=props,
-                )
+                rel_writes.append({
+                    "source_id": source_id,
+                    "target_id": target_id,
+                    "type": rel_type,
+                    "properties": props,
+                })
                 created_rels.append({
                     "type": rel_type,
-                    "id": result.get("id"),
+                    "id": None,
                     "source": source_id,
                     "target": target_id,
                     "source_name": source,
@@ -540,9 +518,32 @@ class GraphExtractionService:
                     "description": rel.get("description"),
                 })
 
+        if rel_writes:
+            rel_result = await graph_db.create_relationships(story_id, rel_writes)
+            written_rels = []
+            # 未写入的关系（端点节点写入失败、批次失败）不计入结果，转入待审核以便重新提交
+            for entry, rel_id in zip(created_rels, rel_result["ids"]):
+                if rel_id is None:
+                    pending_rels.append({
+                        "source": entry["source_name"],
+                        "target": entry["target_name"],
+                        "type": entry["type"],
+                        "description": entry["description"],
+                        "confidence": entry["confidence"],
+                        "reason": "写入失败",
+                        "source_id": entry["source"],
+                        "target_id": entry["target"],
+                    })
+                    continue
+                entry["id"] = rel_id
+                written_rels.append(entry)
+            created_rels = written_rels
+            write_errors.extend(rel_result["errors"])
+
         return {
             "success": True,
             "chunks": len(chunks),
+            "failed_chunks": failed_chunks,
             "nodes_created": len(created_nodes),
             "plot_nodes_created": len(created_plots),
             "relationships_created": len(created_rels),
@@ -555,6 +556,7 @@ class GraphExtractionService:
                 "relationships": pending_rels,
             },
             "validation_issues": validation_issues,
+            "write_errors": write_errors,
         }
 
     async def apply_review(
@@ -573,6 +575,7 @@ class GraphExtractionService:
         created_plots = []
         created_rels = []
         errors: List[str] = []
+        node_writes: Dict[NodeType, List[Any]] = {}
 
         for item in nodes:
             node_type = item.get("type")
@@ -599,7 +602,7 @@ class GraphExtractionService:
                     strengths=[],
                     metadata={"source": "manual_review"},
                 )
-                await graph_db.merge_story_element(NodeType.CHARACTER, data)
+                node_writes.setdefault(NodeType.CHARACTER, []).append(data)
                 created_nodes.append({"type": node_type, "id": character_id, "name": name})
             elif node_type == NodeType.PLOT_NODE.value:
                 # plot_nodes 单独处理
@@ -620,7 +623,7 @@ class GraphExtractionService:
                     category=item.get("category"),
                     metadata={"source": "manual_review"},
                 )
-                await graph_db.merge_story_element(node_enum, data)
+                node_writes.setdefault(node_enum, []).append(data)
                 created_nodes.append({"type": node_type, "id": node_id, "name": name})
 
         for i, plot in enumerate(plot_nodes):
@@ -644,10 +647,14 @@ class GraphExtractionService:
                 importance=float(plot.get("importance") or 50),
                 metadata={"source": "manual_review"},
             )
-            await graph_db.merge_story_element(NodeType.PLOT_NODE, data)
+            node_writes.setdefault(NodeType.PLOT_NODE, []).append(data)
             created_plots.append({"type": NodeType.PLOT_NODE.value, "id": plot_id, "title": title})
 
+        for error in await self._write_nodes(graph_db, node_writes):
+            errors.append(f"{error['type']} 第{error['batch']}批写入失败: {error['error']}")
+
         # 关系处理
+        rel_writes: List[Dict[str, Any]] = []
         for rel in relationships:
             source = (rel.get("source") or "").strip()
             target = (rel.get("target") or "").strip()
@@ -660,14 +667,15 @@ class GraphExtractionService:
             props = {}
             if rel.get("description"):
                 props["description"] = rel.get("description")
-            result = await graph_db.create_relationship(
-                story_id=story_id,
-                source_id=source_id,
-                target_id=target_id,
-                relation_type=rel_type,
-                properties=props,
-            )
-            created_rels.append({"type": rel_type, "id": result.get("id"), "source": source_id, "target": target_id})
+            rel_writes.append({"source_id": source_id, "target_id": target_id, "type": rel_type, "properties": props})
+
+        if rel_writes:
+            rel_result = await graph_db.create_relationships(story_id, rel_writes)
+            for rel, rel_id in zip(rel_writes, rel_result["ids"]):
+                if rel_id is None:
+                    errors.append(f"关系未写入: {rel['source_id']}->{rel['target_id']}")
+                    continue
+                created_rels.append({"type": rel["type"], "id": rel_id, "source": rel["source_id"], "target": rel["target_id"]})
 
         return {
             "success": True,
@@ -680,6 +688,18 @@ class GraphExtractionService:
             "errors": errors,
         }
 
+    async def _write_nodes(
+        self,
+        graph_db: GraphDBManager,
+        node_writes: Dict[NodeType, List[Any]],
+    ) -> List[Dict[str, Any]]:
+        """按节点类型批量写入，返回各批次错误"""
+        errors: List[Dict[str, Any]] = []
+        for node_type, elements in node_writes.items():
+            result = await graph_db.merge_story_elements(node_type, elements)
+            errors.extend({**error, "type": node_type.value} for error in result["errors"])
+        return errors
+
     async def _validate_and_merge(
         self,
         registry: Dict[Tuple[str, str], Dict[str, Any]],
@@ -702,7 +722,7 @@ class GraphExtractionService:
                 {"role": "system", "content": VALIDATION_PROMPT},
                 {"role": "user", "content": f"候选数据如下：\\n{json.dumps(payload, ensure_ascii=False)}"},
             ]
-            response = await self.client.chat(messages, temperature=0.1, max_tokens=2000)
+            response = await self.client.chat(messages, temperature=0.1, max_tokens=2000, priority=LimiterPriority.BATCH)
             merged = _safe_json_loads(response)
             merged = _validate_payload(merged, ValidationPayload)
 
@@ -764,12 +784,58 @@ class GraphExtractionService:
             self.logger.warning(f"二阶段校验失败，使用回退逻辑: {e}")
             return {"registry": registry, "plot_nodes": plot_nodes, "relations": relations, "validation_issues": [str(e)]}
 
+    async def _extract_chunks(self, chunks: List[str]) -> Tuple[List[Dict[str, Any]], List[int]]:
+        """
+        有界并发抽取全部分块
+
+        Returns:
+            Tuple[List[Dict[str, Any]], List[int]]: (按分块顺序排列的抽取结果, 失败的分块序号)
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def _run(idx: int, chunk: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._extract_chunk(chunk, index=idx + 1)
+
+        results = await asyncio.gather(
+            *(_run(idx, chunk) for idx, chunk in enumerate(chunks)),
+            return_exceptions=True,
+        )
+
+        extracted_chunks: List[Dict[str, Any]] = []
+        failed_chunks: List[int] = []
+        for idx, result in enumerate(results):
+            if isinstance(result, BaseException):
+                self.logger.error(f"分块#{idx + 1}抽取失败: {result}")
+                failed_chunks.append(idx + 1)
+                continue
+            extracted_chunks.append(result)
+        return extracted_chunks, failed_chunks
+
+    def _merge_extracted(
+        self,
+        extracted: Dict[str, Any],
+        registry: Dict[Tuple[str, str], Dict[str, Any]],
+        plot_nodes: List[Dict[str, Any]],
+        relations: List[Dict[str, Any]],
+    ) -> None:
+        """将单个分块的抽取结果合并到实体注册表"""
+        for group, node_type in ENTITY_GROUPS:
+            for item in extracted.get(group, []) or []:
+                name = _normalize_entity_name(item.get("name") or "", self.aliases.get(group, {}))
+                if name:
+                    item["name"] = name
+                    key = (node_type.value, name.lower())
+                    registry[key] = _best_item(registry.get(key, {}), item)
+        plot_nodes.extend(extracted.get("plot_nodes", []) or [])
+        relations.extend(extracted.get("relations", []) or [])
+
     async def _extract_chunk(self, text: str, index: int = 1) -> Dict[str, Any]:
         messages = [
             {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": f"文本片段#{index}：\\n{text}\\n\\n请按JSON输出。"},
         ]
-        response = await self.client.chat(messages, temperature=0.2, max_tokens=2000)
+        response = await self.client.chat(messages, temperature=0.2, max_tokens=2000, priority=LimiterPriority.BATCH)
         try:
             data = _safe_json_loads(response)
             data = _validate_payload(data, ExtractionPayload)
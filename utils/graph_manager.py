@@ -18,6 +18,7 @@ import asyncio
 import os
 import json
 import logging
+import re
 from datetime import datetime, timezone
 from typing import Dict, List, Any, Optional, Union, Tuple
 from enum import Enum
@@ -518,118 +519,158 @@ class GraphDBManager:
             logger.error(f"merge_story_element 失败: {e}")
             raise
 
-    async def _merge_character(
-        self,
-        session,
-        data: CharacterData,
-        version: int,
-    ) -> Dict[str, Any]:
-        """合并角色节点（原子操作）"""
-        query = f"""
-        MERGE (c:{NodeType.CHARACTER} {{character_id: $character_id}})
+    # ============ 节点写入语句（单条与批量共用） ============
+
+    # 节点类型 -> (变量名, 主键字段, MERGE 语句体)；语句体中的参数均来自 row
+    _NODE_MERGE_BODIES: Dict[str, Tuple[str, str, str]] = {
+        NodeType.CHARACTER.value: ("c", "character_id", """
+        MERGE (c:Character {character_id: row.character_id})
         ON CREATE SET
-            c.created_at = datetime($timestamp),
-            c.version = $version,
-            c.first_appearance = $first_appearance
+            c.created_at = datetime(row.timestamp),
+            c.version = row.version,
+            c.first_appearance = row.first_appearance
         ON MATCH SET
-            c.updated_at = datetime($timestamp),
-            c.version = $version,
-            c.arc = COALESCE($arc, c.arc),
-            c.status = COALESCE($status, c.status),
-            c.location = COALESCE($location, c.location)
+            c.updated_at = datetime(row.timestamp),
+            c.version = row.version,
+            c.arc = COALESCE(row.arc, c.arc),
+            c.status = COALESCE(row.status, c.status),
+            c.location = COALESCE(row.location, c.location)
         SET
-            c.name = $name,
-            c.story_id = $story_id,
-            c.persona = $persona,
-            c.backstory = $backstory,
-            c.motivations = $motivations,
-            c.flaws = $flaws,
-            c.strengths = $strengths,
-            c.metadata = $metadata
-        RETURN c
+            c.name = row.name,
+            c.story_id = row.story_id,
+            c.persona = row.persona,
+            c.backstory = row.backstory,
+            c.motivations = row.motivations,
+            c.flaws = row.flaws,
+            c.strengths = row.strengths,
+            c.metadata = row.metadata
+        """),
+        NodeType.STORY.value: ("s", "story_id", """
+        MERGE (s:Story {story_id: row.story_id})
+        ON CREATE SET
+            s.created_at = datetime(row.timestamp),
+            s.version = row.version
+        ON MATCH SET
+            s.updated_at = datetime(row.timestamp),
+            s.version = row.version
+        SET
+            s.name = row.name,
+            s.description = row.description,
+            s.genre = row.genre,
+            s.tags = row.tags,
+            s.status = row.status,
+            s.metadata = row.metadata
+        """),
+        NodeType.PLOT_NODE.value: ("p", "plot_id", """
+        MERGE (p:PlotNode {plot_id: row.plot_id})
+        ON CREATE SET
+            p.created_at = datetime(row.timestamp),
+            p.version = row.version
+        ON MATCH SET
+            p.updated_at = datetime(row.timestamp),
+            p.version = row.version,
+            p.tension_score = row.tension_score,
+            p.importance = row.importance
+        SET
+            p.story_id = row.story_id,
+            p.title = row.title,
+            p.description = row.description,
+            p.sequence_number = row.sequence_number,
+            p.timestamp = datetime(row.timestamp),
+            p.chapter = row.chapter,
+            p.characters_involved = row.characters_involved,
+            p.locations = row.locations,
+            p.conflicts = row.conflicts,
+            p.themes = row.themes,
+            p.metadata = row.metadata
+        """),
+        NodeType.WORLD_RULE.value: ("r", "rule_id", """
+        MERGE (r:WorldRule {rule_id: row.rule_id})
+        ON CREATE SET
+            r.created_at = datetime(row.timestamp),
+            r.version = row.version
+        ON MATCH SET
+            r.updated_at = datetime(row.timestamp),
+            r.version = row.version
+        SET
+            r.story_id = row.story_id,
+            r.name = row.name,
+            r.description = row.description,
+            r.rule_type = row.rule_type,
+            r.severity = row.severity,
+            r.consequences = row.consequences,
+            r.exceptions = row.exceptions,
+            r.constraints = row.constraints,
+            r.examples = row.examples,
+            r.metadata = row.metadata
+        """),
+    }
+
+    _GENERIC_MERGE_BODY = """
+        MERGE (n:{label} {{node_id: row.node_id}})
+        ON CREATE SET
+            n.created_at = datetime(row.timestamp),
+            n.version = row.version
+        ON MATCH SET
+            n.updated_at = datetime(row.timestamp),
+            n.version = row.version
+        SET
+            n.story_id = row.story_id,
+            n.name = row.name,
+            n.description = row.description,
+            n.category = row.category,
+            n.metadata = row.metadata
         """
 
-        params = {
-            "character_id": data.character_id,
-            "name": data.name,
-            "story_id": data.story_id,
-            "status": data.status.value,
-            "location": data.location,
-            "persona": data.persona,
-            "arc": data.arc,
-            "backstory": data.backstory,
-            "motivations": data.motivations,
-            "flaws": data.flaws,
-            "strengths": data.strengths,
-            "first_appearance": data.first_appearance,
-            "metadata": data.metadata,
-            "version": version,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-        }
-
-        result = await session.run(query, params)
-        record = await result.single()
-
-        if record:
-            node = record["c"]
-            return {
-                "success": True,
-                "element_id": data.character_id,
-                "type": NodeType.CHARACTER.value,
-                "created": node.get("created_at") is not None,
-                "updated": node.get("updated_at") is not None,
-                "version": version,
-                "node": dict(node),
-            }
-
-        return {"success": False, "error": "创建节点失败"}
+    _GENERIC_NODE_TYPES = {
+        NodeType.LOCATION,
+        NodeType.ITEM,
+        NodeType.CONFLICT,
+        NodeType.THEME,
+        NodeType.MOTIVATION,
+    }
+
+    def _node_merge_spec(self, element_type: NodeType) -> Tuple[str, str, str]:
+        """获取节点写入语句 (变量名, 主键字段, MERGE 语句体)"""
+        if element_type in self._GENERIC_NODE_TYPES:
+            return "n", "node_id", self._GENERIC_MERGE_BODY.format(label=element_type.value)
+        spec = self._NODE_MERGE_BODIES.get(element_type.value)
+        if spec is None:
+            raise ValueError(f"不支持的节点类型: {element_type}")
+        return spec
+
+    @staticmethod
+    def _node_row(
+        data: Union[StoryData, CharacterData, PlotNodeData, WorldRuleData, GenericNodeData],
+        version: int,
+    ) -> Dict[str, Any]:
+        """节点数据 -> 写入参数行"""
+        row = data.to_dict()
+        row["version"] = version
+        row["timestamp"] = row.get("timestamp") or datetime.now(timezone.utc).isoformat()
+        return row
 
-    async def _merge_story(
+    async def _merge_node(
         self,
         session,
-        data: StoryData,
+        element_type: NodeType,
+        data: Union[StoryData, CharacterData, PlotNodeData, WorldRuleData, GenericNodeData],
         version: int,
     ) -> Dict[str, Any]:
-        """合并故事节点（原子操作）"""
-        query = f"""
-        MERGE (s:{NodeType.STORY} {{story_id: $story_id}})
-        ON CREATE SET
-            s.created_at = datetime($timestamp),
-            s.version = $version
-        ON MATCH SET
-            s.updated_at = datetime($timestamp),
-            s.version = $version
-        SET
-            s.name = $name,
-            s.description = $description,
-            s.genre = $genre,
-            s.tags = $tags,
-            s.status = $status,
-            s.metadata = $metadata
-        RETURN s
-        """
-
-        params = {
-            "story_id": data.story_id,
-            "name": data.name,
-            "description": data.description,
-            "genre": data.genre,
-            "tags": data.tags,
-            "status": data.status,
-            "metadata": data.metadata,
-            "version": version,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-        }
+        """合并单个节点（原子操作）"""
+        var, key_field, body = self._node_merge_spec(element_type)
+        query = f"WITH $row AS row{body}RETURN {var}"
+        row = self._node_row(data, version)
 
-        result = await session.run(query, params)
+        result = await session.run(query, {"row": row})
         record = await result.single()
 
         if record:
-            node = record["s"]
+            node = record[var]
             return {
                 "success": True,
-                "element_id": data.story_id,
-                "type": NodeType.STORY.value,
+                "element_id": row[key_field],
+                "type": element_type.value,
                 "created": node.get("created_at") is not None,
                 "updated": node.get("updated_at") is not None,
                 "version": version,
@@ -638,6 +679,14 @@ class GraphDBManager:
 
         return {"success": False, "error": "创建节点失败"}
 
+    async def _merge_character(self, session, data: CharacterData, version: int) -> Dict[str, Any]:
+        """合并角色节点（原子操作）"""
+        return await self._merge_node(session, NodeType.CHARACTER, data, version)
+
+    async def _merge_story(self, session, data: StoryData, version: int) -> Dict[str, Any]:
+        """合并故事节点（原子操作）"""
+        return await self._merge_node(session, NodeType.STORY, data, version)
+
     async def _merge_generic_node(
         self,
         session,
@@ -646,179 +695,293 @@ class GraphDBManager:
         version: int,
     ) -> Dict[str, Any]:
         """合并通用节点（原子操作）"""
-        query = f"""
-        MERGE (n:{node_type.value} {{node_id: $node_id}})
-        ON CREATE SET
-            n.created_at = datetime($timestamp),
-            n.version = $version
-        ON MATCH SET
-            n.updated_at = datetime($timestamp),
-            n.version = $version
-        SET
-            n.story_id = $story_id,
-            n.name = $name,
-            n.description = $description,
-            n.category = $category,
-            n.metadata = $metadata
-        RETURN n
+        return await self._merge_node(session, node_type, data, version)
+
+    async def _merge_plot_node(self, session, data: PlotNodeData, version: int) -> Dict[str, Any]:
+        """合并情节节点（原子操作）"""
+        return await self._merge_node(session, NodeType.PLOT_NODE, data, version)
+
+    async def _merge_world_rule(self, session, data: WorldRuleData, version: int) -> Dict[str, Any]:
+        """合并世界观规则节点（原子操作）"""
+        return await self._merge_node(session, NodeType.WORLD_RULE, data, version)
+
+    # ============ 批量写入 ============
+
+    # 单个 UNWIND 事务写入的最大行数
+    DEFAULT_BATCH_SIZE = 500
+
+    async def _run_unwind_batches(
+        self,
+        query: str,
+        rows: List[Dict[str, Any]],
+        operation: str,
+        params: Optional[Dict[str, Any]] = None,
+        batch_size: Optional[int] = None,
+    ) -> Dict[str, Any]:
         """
+        分批执行 UNWIND 写入，每批一个写事务
 
-        params = {
-            "node_id": data.node_id,
-            "story_id": data.story_id,
-            "name": data.name,
-            "description": data.description,
-            "category": data.category,
-            "metadata": data.metadata,
-            "version": version,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+        Args:
+            query: 以 UNWIND $rows AS row 开头的 Cypher
+            rows: 参数行
+            operation: 操作名称（日志/错误报告）
+            params: 额外参数
+            batch_size: 批次大小
+
+        Returns:
+            Dict: total/successful/failed/batches/errors/records，errors 按批次记录
+        """
+        batch_size = max(1, batch_size or self.DEFAULT_BATCH_SIZE)
+        summary: Dict[str, Any] = {
+            "total": len(rows),
+            "successful": 0,
+            "failed": 0,
+            "batches": 0,
+            "errors": [],
+            "records": [],
         }
+        if not rows:
+            return summary
 
-        result = await session.run(query, params)
-        record = await result.single()
+        async def _write(tx, batch):
+            result = await tx.run(query, {**(params or {}), "rows": batch})
+            return await result.data()
 
-        if record:
-            node = record["n"]
-            return {
-                "success": True,
-                "element_id": data.node_id,
-                "type": node_type.value,
-                "created": node.get("created_at") is not None,
-                "updated": node.get("updated_at") is not None,
-                "version": version,
-                "node": dict(node),
-            }
+        async with self._get_session() as session:
+            for offset in range(0, len(rows), batch_size):
+                batch = rows[offset:offset + batch_size]
+                summary["batches"] += 1
+                self._transaction_stats["total_transactions"] += 1
+                try:
+                    records = await session.execute_write(_write, batch)
+                    summary["successful"] += len(batch)
+                    summary["records"].extend(records)
+                    self._transaction_stats["successful_transactions"] += 1
+                except Exception as e:
+                    summary["failed"] += len(batch)
+                    summary["errors"].append({
+                        "batch": summary["batches"],
+                        "offset": offset,
+                        "size": len(batch),
+                        "error": str(e),
+                    })
+                    self._transaction_stats["failed_transactions"] += 1
+                    logger.error(f"{operation} 第 {summary['batches']} 批失败: {e}")
 
-        return {"success": False, "error": "创建节点失败"}
+        return summary
 
-    async def _merge_plot_node(
+    async def merge_story_elements(
         self,
-        session,
-        data: PlotNodeData,
-        version: int,
+        element_type: NodeType,
+        elements: List[Union[StoryData, CharacterData, PlotNodeData, WorldRuleData, GenericNodeData]],
+        version: int = 1,
+        batch_size: Optional[int] = None,
     ) -> Dict[str, Any]:
-        """合并情节节点（原子操作）"""
-        query = f"""
-        MERGE (p:{NodeType.PLOT_NODE} {{plot_id: $plot_id}})
-        ON CREATE SET
-            p.created_at = datetime($timestamp),
-            p.version = $version
-        ON MATCH SET
-            p.updated_at = datetime($timestamp),
-            p.version = $version,
-            p.tension_score = $tension_score,
-            p.importance = $importance
-        SET
-            p.story_id = $story_id,
-            p.title = $title,
-            p.description = $description,
-            p.sequence_number = $sequence_number,
-            p.timestamp = datetime($timestamp),
-            p.chapter = $chapter,
-            p.characters_involved = $characters_involved,
-            p.locations = $locations,
-            p.conflicts = $conflicts,
-            p.themes = $themes,
-            p.metadata = $metadata
-        RETURN p
         """
+        批量合并同类型故事元素（UNWIND，按批次提交）
 
-        params = {
-            "plot_id": data.plot_id,
-            "story_id": data.story_id,
-            "title": data.title,
-            "description": data.description,
-            "sequence_number": data.sequence_number,
-            "tension_score": data.tension_score,
-            "timestamp": data.timestamp.isoformat() if data.timestamp else datetime.now(timezone.utc).isoformat(),
-            "chapter": data.chapter,
-            "characters_involved": data.characters_involved,
-            "locations": data.locations,
-            "conflicts": data.conflicts,
-            "themes": data.themes,
-            "importance": data.importance,
-            "metadata": data.metadata,
-            "version": version,
-        }
+        写入语义与 merge_story_element 一致
 
-        result = await session.run(query, params)
-        record = await result.single()
+        Args:
+            element_type: 节点类型
+            elements: 节点数据列表
+            version: 版本号
+            batch_size: 批次大小
 
-        if record:
-            node = record["p"]
-            return {
-                "success": True,
-                "element_id": data.plot_id,
-                "type": NodeType.PLOT_NODE.value,
-                "created": node.get("created_at") is not None,
-                "updated": node.get("updated_at") is not None,
-                "version": version,
-                "node": dict(node),
-            }
+        Returns:
+            Dict: 批量写入结果，element_ids 为成功写入的节点ID
+        """
+        var, key_field, body = self._node_merge_spec(element_type)
+        query = f"UNWIND $rows AS row{body}RETURN row.{key_field} AS element_id"
+        rows = [self._node_row(data, version) for data in elements]
 
-        return {"success": False, "error": "创建节点失败"}
+        summary = await self._run_unwind_batches(
+            query, rows, f"merge_story_elements({element_type.value})", batch_size=batch_size
+        )
+        summary["type"] = element_type.value
+        summary["element_ids"] = [record["element_id"] for record in summary.pop("records")]
+        return summary
 
-    async def _merge_world_rule(
+    async def create_relationships(
         self,
-        session,
-        data: WorldRuleData,
-        version: int,
+        story_id: str,
+        relationships: List[Dict[str, Any]],
+        batch_size: Optional[int] = None,
     ) -> Dict[str, Any]:
-        """合并世界观规则节点（原子操作）"""
+        """
+        批量创建通用关系（按关系类型分组 UNWIND）
+
+        Args:
+            story_id: 故事ID
+            relationships: [{"source_id", "target_id", "type", "properties"}]
+            batch_size: 批次大小
+
+        Returns:
+            Dict: 批量写入结果，ids 与输入顺序对应（端点不存在或失败为 None）
+        """
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        summary: Dict[str, Any] = {
+            "total": len(relationships),
+            "successful": 0,
+            "failed": 0,
+            "batches": 0,
+            "errors": [],
+            "ids": [None] * len(relationships),
+        }
+        for index, rel in enumerate(relationships):
+            rel_type = str(rel.get("type") or "")
+            if not re.fullmatch(r"[A-Z][A-Z0-9_]*", rel_type):
+                summary["failed"] += 1
+                summary["errors"].append({"index": index, "error": f"非法关系类型: {rel_type}"})
+                continue
+            grouped.setdefault(rel_type, []).append({
+                "index": index,
+                "source_id": rel.get("source_id"),
+                "target_id": rel.get("target_id"),
+                "props": rel.get("properties") or {},
+            })
+
+        for rel_type, rows in grouped.items():
+            query = f"""
+            UNWIND $rows AS row
+            MATCH (a {{story_id: $story_id}})
+            WHERE a.character_id = row.source_id OR a.plot_id = row.source_id OR a.rule_id = row.source_id OR a.node_id = row.source_id OR a.story_id = row.source_id
+            MATCH (b {{story_id: $story_id}})
+            WHERE b.character_id = row.target_id OR b.plot_id = row.target_id OR b.rule_id = row.target_id OR b.node_id = row.target_id OR b.story_id = row.target_id
+            MERGE (a)-[r:{rel_type}]->(b)
+            SET r += row.props
+            RETURN row.index AS index, id(r) AS rid
+            """
+            result = await self._run_unwind_batches(
+                query, rows, f"create_relationships({rel_type})",
+                params={"story_id": story_id}, batch_size=batch_size,
+            )
+            for record in result["records"]:
+                summary["ids"][record["index"]] = str(record["rid"])
+            summary["successful"] += result["successful"]
+            summary["failed"] += result["failed"]
+            summary["batches"] += result["batches"]
+            summary["errors"].extend({**error, "type": rel_type} for error in result["errors"])
+
+        return summary
+
+    async def create_social_bonds(
+        self,
+        bonds: List[Dict[str, Any]],
+        batch_size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        批量创建角色社交关系（语义同 create_social_bond）
+
+        Args:
+            bonds: [{"character_id_1", "character_id_2", "trust_level", "bond_type", "hidden_relation", "metadata"}]
+            batch_size: 批次大小
+
+        Returns:
+            Dict: 批量写入结果
+        """
+        timestamp = datetime.now(timezone.utc).isoformat()
+        rows, errors = [], []
+        for index, bond in enumerate(bonds):
+            trust_level = bond.get("trust_level", 0)
+            if not -100 <= trust_level <= 100:
+                errors.append({"index": index, "error": "trust_level 必须在 -100 到 100 之间"})
+                continue
+            rows.append({
+                "character_id_1": bond["character_id_1"],
+                "character_id_2": bond["character_id_2"],
+                "trust_level": trust_level,
+                "bond_type": bond.get("bond_type", "neutral"),
+                "hidden_relation": bond.get("hidden_relation"),
+                "metadata": bond.get("metadata") or {},
+                "timestamp": timestamp,
+            })
+
         query = f"""
-        MERGE (r:{NodeType.WORLD_RULE} {{rule_id: $rule_id}})
+        UNWIND $rows AS row
+        MATCH (c1:{NodeType.CHARACTER.value} {{character_id: row.character_id_1}})
+        MATCH (c2:{NodeType.CHARACTER.value} {{character_id: row.character_id_2}})
+        MERGE (c1)-[r:{RelationType.SOCIAL_BOND.value}]->(c2)
         ON CREATE SET
-            r.created_at = datetime($timestamp),
-            r.version = $version
+            r.created_at = datetime(row.timestamp),
+            r.trust_level = row.trust_level,
+            r.bond_type = row.bond_type,
+            r.hidden_relation = row.hidden_relation,
+            r.metadata = row.metadata
         ON MATCH SET
-            r.updated_at = datetime($timestamp),
-            r.version = $version
-        SET
-            r.story_id = $story_id,
-            r.name = $name,
-            r.description = $description,
-            r.rule_type = $rule_type,
-            r.severity = $severity,
-            r.consequences = $consequences,
-            r.exceptions = $exceptions,
-            r.constraints = $constraints,
-            r.examples = $examples,
-            r.metadata = $metadata
-        RETURN r
+            r.updated_at = datetime(row.timestamp),
+            r.trust_level = row.trust_level,
+            r.bond_type = row.bond_type,
+            r.hidden_relation = COALESCE(row.hidden_relation, r.hidden_relation),
+            r.metadata = COALESCE(row.metadata, r.metadata)
+        RETURN count(r) AS written
         """
+        summary = await self._run_unwind_batches(query, rows, "create_social_bonds", batch_size=batch_size)
+        summary.pop("records")
+        summary["total"] = len(bonds)
+        summary["failed"] += len(errors)
+        summary["errors"] = errors + summary["errors"]
+        return summary
+
+    async def create_influences(
+        self,
+        influences: List[Dict[str, Any]],
+        batch_size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        批量创建影响关系（语义同 create_influence）
 
-        params = {
-            "rule_id": data.rule_id,
-            "story_id": data.story_id,
-            "name": data.name,
-            "description": data.description,
-            "rule_type": data.rule_type,
-            "severity": data.severity,
-            "consequences": data.consequences,
-            "exceptions": data.exceptions,
-            "constraints": data.constraints,
-            "examples": data.examples,
-            "metadata": data.metadata,
-            "version": version,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-        }
-
-        result = await session.run(query, params)
-        record = await result.single()
+        Args:
+            influences: [{"from_element_id", "to_element_id", "impact_score", "influence_type", "description", "metadata"}]
+            batch_size: 批次大小
 
-        if record:
-            node = record["r"]
-            return {
-                "success": True,
-                "element_id": data.rule_id,
-                "type": NodeType.WORLD_RULE.value,
-                "created": node.get("created_at") is not None,
-                "updated": node.get("updated_at") is not None,
-                "version": version,
-                "node": dict(node),
-            }
+        Returns:
+            Dict: 批量写入结果
+        """
+        timestamp = datetime.now(timezone.utc).isoformat()
+        rows, errors = [], []
+        for index, influence in enumerate(influences):
+            impact_score = influence.get("impact_score", 50.0)
+            if not 0 <= impact_score <= 100:
+                errors.append({"index": index, "error": "impact_score 必须在 0 到 100 之间"})
+                continue
+            rows.append({
+                "from_id": influence["from_element_id"],
+                "to_id": influence["to_element_id"],
+                "impact_score": impact_score,
+                "influence_type": influence.get("influence_type", "direct"),
+                "description": influence.get("description"),
+                "metadata": influence.get("metadata") or {},
+                "timestamp": timestamp,
+            })
 
-        return {"success": False, "error": "创建节点失败"}
+        query = f"""
+        UNWIND $rows AS row
+        MATCH (from)
+        WHERE from.character_id = row.from_id OR from.plot_id = row.from_id OR from.rule_id = row.from_id
+        MATCH (to)
+        WHERE to.character_id = row.to_id OR to.plot_id = row.to_id OR to.rule_id = row.to_id
+        MERGE (from)-[r:{RelationType.INFLUENCES.value}]->(to)
+        ON CREATE SET
+            r.created_at = datetime(row.timestamp),
+            r.impact_score = row.impact_score,
+            r.influence_type = row.influence_type,
+            r.description = row.description,
+            r.metadata = row.metadata
+        ON MATCH SET
+            r.updated_at = datetime(row.timestamp),
+            r.impact_score = row.impact_score,
+            r.influence_type = row.influence_type,
+            r.description = COALESCE(row.description, r.description),
+            r.metadata = COALESCE(row.metadata, r.metadata)
+        RETURN count(r) AS written
+        """
+        summary = await self._run_unwind_batches(query, rows, "create_influences", batch_size=batch_size)
+        summary.pop("records")
+        summary["total"] = len(influences)
+        summary["failed"] += len(errors)
+        summary["errors"] = errors + summary["errors"]
+        return summary
 
     # ============ 关系操作 ============
 
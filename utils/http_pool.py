@@ -0,0 +1,339 @@
+"""
+进程级HTTP连接池
+LLM提供商、Embedding、搜索等外部调用共享的 httpx 客户端
+
+- 按主机复用长连接（keep-alive），避免每次调用重新握手 TLS
+- 安装 h2 时启用 HTTP/2，同一主机的并发请求复用一条连接
+- 新建连接时的DNS解析结果按TTL缓存（证书校验与SNI仍使用原主机名）
+- 连接数、keep-alive、超时均可通过环境变量配置
+
+异步客户端按事件循环隔离（连接不能跨事件循环复用）；
+出现新的事件循环时，已关闭事件循环的客户端会被关闭并释放其连接。
+长期持有 http_client 的SDK实例（openai.AsyncOpenAI 等）使用 get_sdk_async_http_client()：
+其传输层不持有连接，每个请求在发出时转发到当前事件循环的共享客户端
+"""
+import asyncio
+import ipaddress
+import logging
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+import httpx
+
+try:
+    import httpcore
+    HTTPCORE_AVAILABLE = True
+except ImportError:
+    httpcore = None
+    HTTPCORE_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HttpPoolConfig:
+    """连接池配置"""
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    timeout: float = 60.0
+    connect_timeout: float = 10.0
+    http2: bool = True
+    dns_ttl: float = 300.0
+
+    @classmethod
+    def from_env(cls) -> "HttpPoolConfig":
+        """从环境变量读取配置"""
+        return cls(
+            max_connections=int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", "30")),
+            timeout=float(os.getenv("HTTP_POOL_TIMEOUT", "60")),
+            connect_timeout=float(os.getenv("HTTP_POOL_CONNECT_TIMEOUT", "10")),
+            http2=os.getenv("HTTP_POOL_HTTP2", "true").lower() == "true",
+            dns_ttl=float(os.getenv("HTTP_POOL_DNS_TTL", "300")),
+        )
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    @property
+    def timeouts(self) -> httpx.Timeout:
+        return httpx.Timeout(self.timeout, connect=self.connect_timeout)
+
+    @property
+    def use_http2(self) -> bool:
+        return self.http2 and HTTP2_AVAILABLE
+
+
+class DNSCache:
+    """主机名解析缓存（进程内共享）"""
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._entries: Dict[Tuple[str, int], Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _is_ip(host: str) -> bool:
+        try:
+            ipaddress.ip_address(host)
+            return True
+        except ValueError:
+            return False
+
+    def get(self, host: str, port: int) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get((host, port))
+            if entry and entry[1] > time.monotonic():
+                return entry[0]
+            return None
+
+    def put(self, host: str, port: int, address: str):
+        with self._lock:
+            self._entries[(host, port)] = (address, time.monotonic() + self.ttl)
+
+    def invalidate(self, host: str, port: int):
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+    async def resolve(self, host: str, port: int) -> str:
+        """解析主机名，IP地址或解析失败时原样返回"""
+        if self.ttl <= 0 or host == "localhost" or self._is_ip(host):
+            return host
+        address = self.get(host, port)
+        if address:
+            return address
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except OSError:
+            return host
+        if not infos:
+            return host
+        address = infos[0][4][0]
+        self.put(host, port, address)
+        return address
+
+
+if HTTPCORE_AVAILABLE:
+    class _CachingDNSBackend(httpcore.AsyncNetworkBackend):
+        """在 httpcore 默认网络后端之上增加DNS缓存"""
+
+        def __init__(self, backend, dns_cache: DNSCache):
+            self._backend = backend
+            self._dns_cache = dns_cache
+
+        async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+            address = await self._dns_cache.resolve(host, port)
+            try:
+                return await self._backend.connect_tcp(
+                    address, port, timeout=timeout, local_address=local_address, socket_options=socket_options
+                )
+            except httpcore.ConnectError:
+                # 缓存的地址不可用时下次重新解析
+                self._dns_cache.invalidate(host, port)
+                raise
+
+        async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+            return await self._backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+        async def sleep(self, seconds: float) -> None:
+            await self._backend.sleep(seconds)
+
+
+def _build_async_transport(config: HttpPoolConfig, dns_cache: DNSCache) -> httpx.AsyncHTTPTransport:
+    transport = httpx.AsyncHTTPTransport(http2=config.use_http2, limits=config.limits)
+    pool = getattr(transport, "_pool", None)
+    backend = getattr(pool, "_network_backend", None)
+    if HTTPCORE_AVAILABLE and backend is not None:
+        pool._network_backend = _CachingDNSBackend(backend, dns_cache)
+    return transport
+
+
+async def _close_stale_client(client: httpx.AsyncClient) -> None:
+    """
+    关闭属于已关闭事件循环的客户端
+
+    连接绑定在原事件循环上，aclose 会因事件循环已关闭而失败（失败前连接可能已移出连接池），
+    因此先取出各连接的底层 socket，aclose 失败时直接关闭其读写，释放与服务端的连接
+    （文件描述符随传输对象回收）
+    """
+    sockets = []
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    for connection in list(getattr(pool, "connections", [])):
+        stream = getattr(getattr(connection, "_connection", None), "_network_stream", None)
+        sock = stream.get_extra_info("socket") if stream is not None else None
+        if sock is not None:
+            sockets.append(sock)
+
+    try:
+        await client.aclose()
+        return
+    except Exception:
+        pass
+
+    for sock in sockets:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class _LoopRoutedTransport(httpx.AsyncBaseTransport):
+    """按请求所在事件循环转发到共享客户端连接池的传输层（本身不持有连接，关闭为空操作）"""
+
+    def __init__(self, pool: "HttpPool"):
+        self._pool = pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._pool.get_async_client()._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class HttpPool:
+    """进程级HTTP连接池"""
+
+    def __init__(self, config: Optional[HttpPoolConfig] = None):
+        self.config = config or HttpPoolConfig.from_env()
+        self.dns_cache = DNSCache(self.config.dns_ttl)
+        self._lock = threading.Lock()
+        self._async_clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+        self._closing_tasks: Set[asyncio.Task] = set()
+        # 在事件循环外创建、尚未绑定事件循环的客户端
+        self._unbound_client: Optional[httpx.AsyncClient] = None
+        self._sync_client: Optional[httpx.Client] = None
+
+    def _new_async_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            transport=_build_async_transport(self.config, self.dns_cache),
+            timeout=self.config.timeouts,
+            follow_redirects=True,
+        )
+
+    def get_async_client(self) -> httpx.AsyncClient:
+        """获取当前事件循环的共享异步客户端"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        with self._lock:
+            if loop is None:
+                if self._unbound_client is None:
+                    self._unbound_client = self._new_async_client()
+                return self._unbound_client
+
+            client = self._async_clients.get(loop)
+            if client is not None and not client.is_closed:
+                return client
+
+            stale = self._pop_stale_clients()
+            if self._unbound_client is not None:
+                client, self._unbound_client = self._unbound_client, None
+            else:
+                client = self._new_async_client()
+            self._async_clients[loop] = client
+
+        for stale_client in stale:
+            task = loop.create_task(_close_stale_client(stale_client))
+            self._closing_tasks.add(task)
+            task.add_done_callback(self._closing_tasks.discard)
+        return client
+
+    def get_sdk_async_client(self) -> httpx.AsyncClient:
+        """
+        获取供SDK实例长期持有的异步客户端
+
+        每次返回新的轻量客户端（SDK关闭自己的客户端不影响其他实例），
+        请求在发出时才解析当前事件循环的共享客户端，共享客户端随事件循环关闭、重建后仍可继续使用
+        """
+        return httpx.AsyncClient(
+            transport=_LoopRoutedTransport(self),
+            timeout=self.config.timeouts,
+            follow_redirects=True,
+        )
+
+    def _pop_stale_clients(self) -> List[httpx.AsyncClient]:
+        """移除已关闭事件循环的客户端（调用方持有锁）"""
+        closed_loops = [loop for loop in self._async_clients if loop.is_closed()]
+        return [self._async_clients.pop(loop) for loop in closed_loops]
+
+    def get_sync_client(self) -> httpx.Client:
+        """获取共享同步客户端（供只支持同步调用的SDK使用，线程安全）"""
+        with self._lock:
+            if self._sync_client is None or self._sync_client.is_closed:
+                self._sync_client = httpx.Client(
+                    http2=self.config.use_http2,
+                    limits=self.config.limits,
+                    timeout=self.config.timeouts,
+                    follow_redirects=True,
+                )
+            return self._sync_client
+
+    async def aclose(self):
+        """关闭所有连接（应用退出时调用）"""
+        with self._lock:
+            clients = list(self._async_clients.values())
+            if self._unbound_client is not None:
+                clients.append(self._unbound_client)
+            self._async_clients = {}
+            self._unbound_client = None
+            sync_client, self._sync_client = self._sync_client, None
+
+        for client in clients:
+            await _close_stale_client(client)
+        if sync_client is not None:
+            sync_client.close()
+
+
+# 全局HTTP连接池实例
+_http_pool: Optional[HttpPool] = None
+_http_pool_lock = threading.Lock()
+
+
+def get_http_pool() -> HttpPool:
+    """获取HTTP连接池单例"""
+    global _http_pool
+    if _http_pool is None:
+        with _http_pool_lock:
+            if _http_pool is None:
+                _http_pool = HttpPool()
+    return _http_pool
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """获取共享异步HTTP客户端"""
+    return get_http_pool().get_async_client()
+
+
+def get_sdk_async_http_client() -> httpx.AsyncClient:
+    """获取供SDK实例长期持有的异步HTTP客户端"""
+    return get_http_pool().get_sdk_async_client()
+
+
+def get_sync_http_client() -> httpx.Client:
+    """获取共享同步HTTP客户端"""
+    return get_http_pool().get_sync_client()
+
+
+async def close_http_pool():
+    """关闭共享HTTP连接池"""
+    if _http_pool is not None:
+        await _http_pool.aclose()
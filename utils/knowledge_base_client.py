@@ -213,7 +213,7 @@ class KnowledgeBaseClient:
             return self._embedding_cache[cache_key]
 
         try:
-            embedding = await asyncio.to_thread(self.embedding_client.embed_text, text)
+            embedding = await self.embedding_client.aembed_text(text)
             if embedding:
                 self._embedding_cache[cache_key] = embedding
                 if len(self._embedding_cache) > self._embedding_cache_max:
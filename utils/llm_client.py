@@ -15,12 +15,17 @@ from dotenv import load_dotenv
 from enum import Enum
 from functools import wraps
 from dataclasses import dataclass, field
-import aiohttp
 
 try:
     from ..utils.local_model_manager import ensure_ollama_model
+    from ..utils.tokenizer_service import get_tokenizer_service
+    from ..utils.http_pool import get_async_http_client, get_sdk_async_http_client, get_sync_http_client
+    from ..utils.llm_rate_limiter import LimiterPriority, get_provider_rate_limiter
 except ImportError:
     from utils.local_model_manager import ensure_ollama_model
+    from utils.tokenizer_service import get_tokenizer_service
+    from utils.http_pool import get_async_http_client, get_sdk_async_http_client, get_sync_http_client
+    from utils.llm_rate_limiter import LimiterPriority, get_provider_rate_limiter
 
 # 加载环境变量
 current_file = Path(__file__).resolve()
@@ -336,31 +341,58 @@ class BaseLLMClient:
         self.timeout = kwargs.get("timeout", 30)
         self.max_retries = kwargs.get("max_retries", 3)
 
-        # 速率限制保护
-        self._request_times = []
+        # 速率限制保护（按提供商共享的令牌桶，同时计量每分钟请求数与输入Token数）
         self._rate_limit = kwargs.get("rate_limit", 60)  # 每分钟最多请求数
+        self._tokens_per_minute = kwargs.get(
+            "tokens_per_minute", int(os.getenv(f"{provider.upper()}_TOKENS_PER_MINUTE", "0"))
+        )  # 每分钟最多输入Token数（0为不限制）
+        self._rate_limiter = get_provider_rate_limiter(provider, self._rate_limit, self._tokens_per_minute)
 
         self.logger = logger
         self.logger.info(f"初始化LLM客户端: {provider} - {model}")
 
-    async def _check_rate_limit(self):
-        """检查速率限制"""
-        now = time.time()
-        # 清理超过1分钟的记录
-        self._request_times = [t for t in self._request_times if now - t < 60]
-
-        if len(self._request_times) >= self._rate_limit:
-            sleep_time = 60 - (now - self._request_times[0])
-            if sleep_time > 0:
-                self.logger.warning(f"达到速率限制，等待 {sleep_time:.1f} 秒")
-                await asyncio.sleep(sleep_time)
+    async def _check_rate_limit(
+        self,
+        messages: Optional[List[Dict[str, str]]] = None,
+        priority: Optional[LimiterPriority] = None,
+        streaming: bool = False
+    ):
+        """
+        等待提供商限流额度
 
-        self._request_times.append(now)
+        Args:
+            messages: 本次请求的消息（用于计量输入Token）
+            priority: 优先级，默认流式输出为交互优先级，其余为普通优先级
+            streaming: 是否为流式调用
+        """
+        if priority is None:
+            priority = LimiterPriority.INTERACTIVE if streaming else LimiterPriority.DEFAULT
+        tokens = self.estimate_input_tokens(messages) if messages and self._rate_limiter.tokens_per_minute else 0
+        await self._rate_limiter.acquire(tokens, priority)
 
     async def chat(self, messages: List[Dict[str, str]], **kwargs) -> str:
         """同步聊天接口"""
         raise NotImplementedError("子类必须实现chat方法")
 
+    async def chat_cached(self, messages: List[Dict[str, str]], cache=None, **kwargs) -> str:
+        """
+        带响应缓存的聊天接口
+
+        只有 temperature 不高于缓存上限（默认0）的调用会读写缓存，其余直接调用 chat
+
+        Args:
+            messages: 消息列表
+            cache: LLMResponseCache 实例，默认使用全局共享实例
+        """
+        if cache is None:
+            try:
+                from ..utils.llm_response_cache import get_llm_response_cache
+            except ImportError:
+                from utils.llm_response_cache import get_llm_response_cache
+            cache = get_llm_response_cache()
+        model_id = f"{self.provider}:{kwargs.get('model', self.model)}"
+        return await cache.get_or_call(messages, model_id, kwargs, lambda: self.chat(messages, **kwargs))
+
     async def chat_with_response(self, messages: List[Dict[str, str]], **kwargs) -> LLMResponse:
         """聊天接口，返回完整响应对象"""
         start_time = time.time()
@@ -404,23 +436,18 @@ class BaseLLMClient:
         messages_list: List[List[Dict[str, str]]],
         **kwargs
     ) -> List[str]:
-        """批量聊天接口"""
+        """批量聊天接口（默认以批量优先级排队）"""
+        kwargs.setdefault("priority", LimiterPriority.BATCH)
         tasks = [self.chat(messages, **kwargs) for messages in messages_list]
         return await asyncio.gather(*tasks)
 
     def count_tokens(self, text: str) -> int:
-        """估算Token数量（简单实现）"""
-        # 中文约1个字符=1个token，英文约4个字符=1个token
-        chinese_chars = sum(1 for c in text if '\u4e00' <= c <= '\u9fff')
-        other_chars = len(text) - chinese_chars
-        return chinese_chars + (other_chars // 4)
+        """计算Token数量（按当前模型的分词器）"""
+        return get_tokenizer_service().count(text, model=self.model)
 
     def estimate_input_tokens(self, messages: List[Dict[str, str]]) -> int:
         """估算输入Token数量"""
-        total = 0
-        for msg in messages:
-            total += self.count_tokens(msg.get("content", ""))
-        return total
+        return get_tokenizer_service().count_messages(messages, model=self.model, per_message_overhead=0)
 
 
 class DashScopeLLMClient(BaseLLMClient):
@@ -450,7 +477,8 @@ class DashScopeLLMClient(BaseLLMClient):
             import openai
             self.client = openai.AsyncOpenAI(
                 api_key=self.api_key,
-                base_url=self.base_url
+                base_url=self.base_url,
+                http_client=get_sdk_async_http_client()
             )
             self.logger.info("DashScope客户端初始化成功")
         except ImportError:
@@ -462,6 +490,7 @@ class DashScopeLLMClient(BaseLLMClient):
 
     async def chat(self, messages: List[Dict[str, str]], **kwargs) -> str:
         """DashScope聊天"""
+        await self._check_rate_limit(messages, kwargs.get("priority"))
         try:
             # 支持动态传递model参数
             model = kwargs.get("model", self.model)
@@ -481,6 +510,7 @@ class DashScopeLLMClient(BaseLLMClient):
 
     async def stream_chat(self, messages: List[Dict[str, str]], **kwargs) -> AsyncGenerator[str, None]:
         """DashScope流式聊天"""
+        await self._check_rate_limit(messages, kwargs.get("priority"), streaming=True)
         try:
             # 支持动态传递model参数
             model = kwargs.get("model", self.model)
@@ -527,7 +557,7 @@ class ZhipuLLMClient(BaseLLMClient):
 
         try:
             from zhipuai import ZhipuAI
-            self.client = ZhipuAI(api_key=self.api_key)
+            self.client = ZhipuAI(api_key=self.api_key, http_client=get_sync_http_client())
             self.logger.info("智谱AI客户端初始化成功")
         except ImportError:
             self.logger.error("zhipuai包未安装，请运行: pip install zhipuai")
@@ -538,6 +568,7 @@ class ZhipuLLMClient(BaseLLMClient):
 
     async def chat(self, messages: List[Dict[str, str]], **kwargs) -> str:
         """智谱AI聊天"""
+        await self._check_rate_limit(messages, kwargs.get("priority"))
         try:
             # 转换消息格式
             zhipu_messages = self._convert_messages(messages)
@@ -545,8 +576,9 @@ class ZhipuLLMClient(BaseLLMClient):
             # 支持动态传递model参数
             model = kwargs.get("model", self.model)
 
-            # 调用智谱AI
-            response = self.client.chat.completions.create(
+            # 调用智谱AI（SDK为同步接口，放到线程中执行，不阻塞事件循环）
+            response = await asyncio.to_thread(
+                self.client.chat.completions.create,
                 model=model,
                 messages=zhipu_messages,
                 temperature=kwargs.get("temperature", self.temperature),
@@ -562,6 +594,7 @@ class ZhipuLLMClient(BaseLLMClient):
 
     async def stream_chat(self, messages: List[Dict[str, str]], **kwargs) -> AsyncGenerator[str, None]:
         """智谱AI流式聊天"""
+        await self._check_rate_limit(messages, kwargs.get("priority"), streaming=True)
         try:
             # 转换消息格式
             zhipu_messages = self._convert_messages(messages)
@@ -569,8 +602,9 @@ class ZhipuLLMClient(BaseLLMClient):
             # 支持动态传递model参数
             model = kwargs.get("model", self.model)
 
-            # 流式调用智谱AI
-            response = self.client.chat.completions.create(
+            # 流式调用智谱AI（逐块在线程中读取）
+            response = await asyncio.to_thread(
+                self.client.chat.completions.create,
                 model=model,
                 messages=zhipu_messages,
                 temperature=kwargs.get("temperature", self.temperature),
@@ -578,8 +612,12 @@ class ZhipuLLMClient(BaseLLMClient):
                 stream=True
             )
 
-            for chunk in response:
-                if chunk.choices[0].delta.content:
+            chunks = iter(response)
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                if chunk.choices and chunk.choices[0].delta.content:
                     yield chunk.choices[0].delta.content
 
         except Exception as e:
@@ -627,7 +665,8 @@ class OpenRouterLLMClient(BaseLLMClient):
             import openai
             self.client = openai.AsyncOpenAI(
                 api_key=self.api_key,
-                base_url=self.base_url
+                base_url=self.base_url,
+                http_client=get_sdk_async_http_client()
             )
             self.logger.info("OpenRouter客户端初始化成功")
         except ImportError:
@@ -639,6 +678,7 @@ class OpenRouterLLMClient(BaseLLMClient):
 
     async def chat(self, messages: List[Dict[str, str]], **kwargs) -> str:
         """OpenRouter聊天"""
+        await self._check_rate_limit(messages, kwargs.get("priority"))
         try:
             response = await self.client.chat.completions.create(
                 model=self.model,
@@ -655,6 +695,7 @@ class OpenRouterLLMClient(BaseLLMClient):
 
     async def stream_chat(self, messages: List[Dict[str, str]], **kwargs) -> AsyncGenerator[str, None]:
         """OpenRouter流式聊天"""
+        await self._check_rate_limit(messages, kwargs.get("priority"), streaming=True)
         try:
             response = await self.client.chat.completions.create(
                 model=self.model,
@@ -689,7 +730,8 @@ class OpenAILLMClient(BaseLLMClient):
             import openai
             self.client = openai.AsyncOpenAI(
                 api_key=self.api_key,
-                base_url=self.base_url
+                base_url=self.base_url,
+                http_client=get_sdk_async_http_client()
             )
             self.logger.info("OpenAI客户端初始化成功")
         except ImportError:
@@ -701,6 +743,7 @@ class OpenAILLMClient(BaseLLMClient):
 
     async def chat(self, messages: List[Dict[str, str]], **kwargs) -> str:
         """OpenAI聊天"""
+        await self._check_rate_limit(messages, kwargs.get("priority"))
         try:
             response = await self.client.chat.completions.create(
                 model=self.model,
@@ -717,6 +760,7 @@ class OpenAILLMClient(BaseLLMClient):
 
     async def stream_chat(self, messages: List[Dict[str, str]], **kwargs) -> AsyncGenerator[str, None]:
         """OpenAI流式聊天"""
+        await self._check_rate_limit(messages, kwargs.get("priority"), streaming=True)
         try:
             response = await self.client.chat.completions.create(
                 model=self.model,
@@ -751,7 +795,8 @@ class LocalLLMClient(BaseLLMClient):
             import openai
             self.client = openai.AsyncOpenAI(
                 api_key=self.api_key,
-                base_url=self.base_url
+                base_url=self.base_url,
+                http_client=get_sdk_async_http_client()
             )
             self.logger.info("本地OpenAI兼容客户端初始化成功")
         except ImportError:
@@ -762,6 +807,7 @@ class LocalLLMClient(BaseLLMClient):
             raise
 
     async def chat(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        await self._check_rate_limit(messages, kwargs.get("priority"))
         try:
             response = await self.client.chat.completions.create(
                 model=kwargs.get("model", self.model),
@@ -775,6 +821,7 @@ class LocalLLMClient(BaseLLMClient):
             raise
 
     async def stream_chat(self, messages: List[Dict[str, str]], **kwargs) -> AsyncGenerator[str, None]:
+        await self._check_rate_limit(messages, kwargs.get("priority"), streaming=True)
         try:
             response = await self.client.chat.completions.create(
                 model=kwargs.get("model", self.model),
@@ -807,6 +854,7 @@ class OllamaLLMClient(BaseLLMClient):
             ensure_ollama_model(self.model, self.base_url)
 
     async def chat(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        await self._check_rate_limit(messages, kwargs.get("priority"))
         payload = {
             "model": kwargs.get("model", self.model),
             "messages": messages,
@@ -816,13 +864,13 @@ class OllamaLLMClient(BaseLLMClient):
                 "num_predict": kwargs.get("max_tokens", self.max_tokens),
             }
         }
-        async with aiohttp.ClientSession() as session:
-            async with session.post(f"{self.base_url}/api/chat", json=payload, timeout=self.timeout) as resp:
-                resp.raise_for_status()
-                data = await resp.json()
-                return data.get("message", {}).get("content", "")
+        resp = await get_async_http_client().post(f"{self.base_url}/api/chat", json=payload, timeout=self.timeout)
+        resp.raise_for_status()
+        data = resp.json()
+        return data.get("message", {}).get("content", "")
 
     async def stream_chat(self, messages: List[Dict[str, str]], **kwargs) -> AsyncGenerator[str, None]:
+        await self._check_rate_limit(messages, kwargs.get("priority"), streaming=True)
         payload = {
             "model": kwargs.get("model", self.model),
             "messages": messages,
@@ -832,19 +880,19 @@ class OllamaLLMClient(BaseLLMClient):
                 "num_predict": kwargs.get("max_tokens", self.max_tokens),
             }
         }
-        async with aiohttp.ClientSession() as session:
-            async with session.post(f"{self.base_url}/api/chat", json=payload, timeout=self.timeout) as resp:
-                resp.raise_for_status()
-                async for line in resp.content:
-                    try:
-                        data = json.loads(line.decode("utf-8").strip())
-                    except Exception:
-                        continue
-                    if data.get("done"):
-                        break
-                    content = data.get("message", {}).get("content")
-                    if content:
-                        yield content
+        client = get_async_http_client()
+        async with client.stream("POST", f"{self.base_url}/api/chat", json=payload, timeout=self.timeout) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                try:
+                    data = json.loads(line.strip())
+                except Exception:
+                    continue
+                if data.get("done"):
+                    break
+                content = data.get("message", {}).get("content")
+                if content:
+                    yield content
 
 
 def get_llm_client(
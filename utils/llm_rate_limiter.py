@@ -0,0 +1,243 @@
+"""
+LLM提供商限流器
+按提供商共享的令牌桶：同时限制每分钟请求数（RPM）与每分钟输入Token数（TPM）
+
+- 令牌按速率连续补充，额度用满后按缺口计算精确等待时间，不再整批等待后同时放行
+- 等待队列按优先级 + 先来先到排序，由单个调度协程按队首需求等待，避免惊群
+- 优先级：交互式流式输出 > 普通调用 > 批量任务（评估、图谱抽取等）
+- 可选 Redis 共享桶状态（Lua 脚本原子扣减），多个 worker 共用同一提供商配额；Redis 不可用时回退到进程内令牌桶
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from enum import IntEnum
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class LimiterPriority(IntEnum):
+    """限流优先级（数值越小越先放行）"""
+    INTERACTIVE = 0   # 交互式流式输出
+    DEFAULT = 1       # 普通调用
+    BATCH = 2         # 批量任务
+
+
+# 桶状态：req/tok 为剩余额度，ts 为上次更新时间（毫秒）；额度不足时返回需等待的毫秒数
+TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local rpm = tonumber(ARGV[2])
+local tpm = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'req', 'tok', 'ts')
+local req = tonumber(state[1]) or rpm
+local tok = tonumber(state[2]) or tpm
+local ts = tonumber(state[3]) or now
+local elapsed = math.max(0, now - ts)
+req = math.min(rpm, req + elapsed * rpm / 60000)
+if tpm > 0 then
+    tok = math.min(tpm, tok + elapsed * tpm / 60000)
+end
+local wait = 0
+if req < 1 then
+    wait = (1 - req) * 60000 / rpm
+end
+if tpm > 0 and tok < cost then
+    wait = math.max(wait, (cost - tok) * 60000 / tpm)
+end
+if wait == 0 then
+    req = req - 1
+    if tpm > 0 then
+        tok = tok - cost
+    end
+end
+redis.call('HSET', KEYS[1], 'req', tostring(req), 'tok', tostring(tok), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], 120000)
+return math.ceil(wait)
+"""
+
+
+class TokenBucket:
+    """进程内令牌桶"""
+
+    def __init__(self, capacity: float, per_minute: float):
+        self.capacity = float(capacity)
+        self.rate = float(per_minute) / 60.0
+        self.available = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        elapsed = max(0.0, now - self.updated_at)
+        self.available = min(self.capacity, self.available + elapsed * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """获取 amount 个令牌还需等待的秒数"""
+        self._refill(now)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def take(self, amount: float):
+        self.available -= amount
+
+
+class ProviderRateLimiter:
+    """单个提供商的限流器"""
+
+    REDIS_KEY_PREFIX = "juben:llm_rate:"
+
+    def __init__(
+        self,
+        provider: str,
+        requests_per_minute: int,
+        tokens_per_minute: int = 0,
+        shared: bool = False
+    ):
+        """
+        初始化限流器
+
+        Args:
+            provider: 提供商名称
+            requests_per_minute: 每分钟请求数上限
+            tokens_per_minute: 每分钟输入Token上限（0 表示不限制）
+            shared: 是否通过 Redis 在多个 worker 间共享额度
+        """
+        self.provider = provider
+        self.requests_per_minute = max(1, int(requests_per_minute))
+        self.tokens_per_minute = max(0, int(tokens_per_minute or 0))
+        self.shared = shared
+
+        self._request_bucket = TokenBucket(self.requests_per_minute, self.requests_per_minute)
+        self._token_bucket = TokenBucket(self.tokens_per_minute, self.tokens_per_minute) if self.tokens_per_minute else None
+
+        # 等待队列：(优先级, 序号, 所需Token, future)
+        self._queue: List[Tuple[int, int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        self._script = None
+
+        self.stats = {"granted": 0, "queued": 0, "waited_seconds": 0.0}
+
+    def _clamp_tokens(self, tokens: int) -> int:
+        """单次请求的Token数不超过桶容量，否则永远无法放行"""
+        tokens = max(0, int(tokens or 0))
+        return min(tokens, self.tokens_per_minute) if self.tokens_per_minute else 0
+
+    # ==================== 额度检查 ====================
+
+    def _try_take_local(self, tokens: int) -> float:
+        now = time.monotonic()
+        wait = self._request_bucket.wait_time(1, now)
+        if self._token_bucket is not None:
+            wait = max(wait, self._token_bucket.wait_time(tokens, now))
+        if wait == 0:
+            self._request_bucket.take(1)
+            if self._token_bucket is not None:
+                self._token_bucket.take(tokens)
+        return wait
+
+    async def _get_script(self):
+        if self._script is None:
+            try:
+                try:
+                    from ..utils.redis_client import get_redis_client
+                except ImportError:
+                    from utils.redis_client import get_redis_client
+                client = await get_redis_client()
+                raw = getattr(client, "_client", None) if client else None
+                if raw is None:
+                    self.shared = False
+                    return None
+                self._script = raw.register_script(TOKEN_BUCKET_SCRIPT)
+            except Exception as e:
+                logger.warning(f"LLM限流器无法使用Redis，回退到进程内令牌桶: {e}")
+                self.shared = False
+                return None
+        return self._script
+
+    async def _try_take(self, tokens: int) -> float:
+        """尝试扣减额度，成功返回0，否则返回需等待的秒数"""
+        if self.shared:
+            script = await self._get_script()
+            if script is not None:
+                try:
+                    wait_ms = await script(
+                        keys=[f"{self.REDIS_KEY_PREFIX}{self.provider}"],
+                        args=[int(time.time() * 1000), self.requests_per_minute, self.tokens_per_minute, tokens],
+                    )
+                    return int(wait_ms) / 1000.0
+                except Exception as e:
+                    logger.warning(f"LLM限流器Redis调用失败，本次使用进程内令牌桶: {e}")
+        return self._try_take_local(tokens)
+
+    # ==================== 等待队列 ====================
+
+    async def acquire(self, tokens: int = 0, priority: LimiterPriority = LimiterPriority.DEFAULT):
+        """
+        获取一次调用额度（额度不足时排队等待）
+
+        Args:
+            tokens: 本次请求的预估输入Token数
+            priority: 优先级
+        """
+        tokens = self._clamp_tokens(tokens)
+        if not self._queue and await self._try_take(tokens) == 0:
+            self.stats["granted"] += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (int(priority), next(self._sequence), tokens, future))
+        self.stats["queued"] += 1
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+        started = time.monotonic()
+        await future
+        self.stats["waited_seconds"] += time.monotonic() - started
+
+    async def _dispatch(self):
+        """按队首需求等待并依次放行"""
+        while self._queue:
+            _, _, tokens, future = self._queue[0]
+            if future.done():
+                # 等待方已取消
+                heapq.heappop(self._queue)
+                continue
+            wait = await self._try_take(tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            heapq.heappop(self._queue)
+            self.stats["granted"] += 1
+            future.set_result(None)
+
+    @property
+    def queue_size(self) -> int:
+        return sum(1 for *_, future in self._queue if not future.done())
+
+
+_provider_limiters: Dict[Tuple[str, int, int], ProviderRateLimiter] = {}
+
+
+def get_provider_rate_limiter(
+    provider: str,
+    requests_per_minute: int = 60,
+    tokens_per_minute: int = 0
+) -> ProviderRateLimiter:
+    """
+    获取提供商限流器（同一提供商、相同额度配置的所有客户端共享）
+
+    Redis 共享由环境变量 LLM_RATE_LIMIT_SHARED 控制
+    """
+    key = (provider, max(1, int(requests_per_minute)), max(0, int(tokens_per_minute or 0)))
+    limiter = _provider_limiters.get(key)
+    if limiter is None:
+        shared = os.getenv("LLM_RATE_LIMIT_SHARED", "false").lower() == "true"
+        limiter = ProviderRateLimiter(provider, key[1], key[2], shared=shared)
+        _provider_limiters[key] = limiter
+    return limiter
@@ -0,0 +1,274 @@
+"""
+LLM响应缓存
+跨请求复用确定性LLM调用（temperature=0 的分类/路由类调用）的结果
+
+查找顺序：
+1. 精确匹配：规范化消息 + 模型 + 调用参数 的哈希，命中 L1 内存缓存，其次 Redis（可选，跨进程共享）
+2. 语义匹配（可选，需要提供 embed_fn）：前缀消息与参数相同的调用中，
+   最后一条消息的向量相似度不低于阈值时复用其结果
+
+缓存为按调用方开启（opt-in），不会影响创作类等非确定性调用
+"""
+import hashlib
+import json
+import re
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from ..utils.logger import JubenLogger
+    from ..utils.multi_level_cache import L1MemoryCache
+    from ..utils.redis_client import get_redis_client
+except ImportError:
+    from utils.logger import JubenLogger
+    from utils.multi_level_cache import L1MemoryCache
+    from utils.redis_client import get_redis_client
+
+logger = JubenLogger("llm_response_cache")
+
+# 不影响输出内容的调用参数，不参与缓存键
+_NON_SEMANTIC_PARAMS = {"timeout", "stream", "use_cache", "user_id", "session_id", "agent_name", "token_accumulator_key",
+                        "priority", "hedge"}
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+EmbedFn = Callable[[str], Awaitable[Optional[List[float]]]]
+
+
+def _normalize_content(content: Any) -> str:
+    """规范化消息内容（折叠空白；非字符串按排序后的JSON）"""
+    if isinstance(content, str):
+        return _WHITESPACE_PATTERN.sub(" ", content).strip()
+    return json.dumps(content, ensure_ascii=False, sort_keys=True, default=str)
+
+
+def _digest(payload: Any) -> str:
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """LLM响应缓存"""
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        ttl: float = 3600.0,
+        use_redis: bool = False,
+        redis_prefix: str = "juben:llm_cache:",
+        max_temperature: float = 0.0,
+        embed_fn: Optional[EmbedFn] = None,
+        similarity_threshold: float = 0.97,
+        max_semantic_entries: int = 500
+    ):
+        """
+        初始化LLM响应缓存
+
+        Args:
+            max_size: 内存缓存条目数
+            ttl: 过期时间（秒）
+            use_redis: 是否使用Redis作为二级缓存
+            redis_prefix: Redis键前缀
+            max_temperature: 可缓存调用的最高temperature
+            embed_fn: 文本向量化函数（提供时启用语义匹配）
+            similarity_threshold: 语义匹配的最低余弦相似度
+            max_semantic_entries: 每个前缀保留的语义索引条目数
+        """
+        self.ttl = ttl
+        self.use_redis = use_redis
+        self.redis_prefix = redis_prefix
+        self.max_temperature = max_temperature
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self.max_semantic_entries = max_semantic_entries
+
+        self._memory = L1MemoryCache(max_size=max_size, default_ttl=ttl)
+        self._redis_client = None
+        # 前缀哈希 -> [(单位向量, 精确键)]
+        self._semantic_index: Dict[str, Deque[Tuple[np.ndarray, str]]] = {}
+
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0, "skipped": 0}
+
+    # ==================== 缓存键 ====================
+
+    def is_cacheable(self, params: Dict[str, Any]) -> bool:
+        """只缓存显式指定低温度的调用"""
+        temperature = params.get("temperature")
+        return temperature is not None and temperature <= self.max_temperature
+
+    @staticmethod
+    def _normalize_messages(messages: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        return [(msg.get("role", ""), _normalize_content(msg.get("content", ""))) for msg in messages]
+
+    @staticmethod
+    def _normalize_params(params: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in params.items() if k not in _NON_SEMANTIC_PARAMS and v is not None}
+
+    def make_key(self, messages: List[Dict[str, Any]], model: str, params: Dict[str, Any]) -> str:
+        """精确匹配键：规范化消息 + 模型 + 参数"""
+        return _digest([model, self._normalize_params(params), self._normalize_messages(messages)])
+
+    def _prefix_key(self, messages: List[Dict[str, Any]], model: str, params: Dict[str, Any]) -> str:
+        """语义匹配的分组键：除最后一条消息外的所有内容"""
+        return _digest([model, self._normalize_params(params), self._normalize_messages(messages[:-1])])
+
+    # ==================== 存取 ====================
+
+    async def _get_redis(self):
+        if self._redis_client is None:
+            self._redis_client = await get_redis_client()
+        return self._redis_client
+
+    async def _load(self, key: str) -> Optional[str]:
+        value = self._memory.get(key)
+        if value is not None or not self.use_redis:
+            return value
+        redis = await self._get_redis()
+        if redis is None:
+            return None
+        cached = await redis.get(f"{self.redis_prefix}{key}")
+        if isinstance(cached, dict) and "response" in cached:
+            self._memory.set(key, cached["response"])
+            return cached["response"]
+        return None
+
+    async def _store(self, key: str, response: str):
+        self._memory.set(key, response)
+        if self.use_redis:
+            redis = await self._get_redis()
+            if redis is not None:
+                await redis.set(f"{self.redis_prefix}{key}", {"response": response}, expire=int(self.ttl))
+
+    async def _embed(self, messages: List[Dict[str, Any]]) -> Optional[np.ndarray]:
+        text = _normalize_content(messages[-1].get("content", ""))
+        try:
+            vector = await self.embed_fn(text)
+        except Exception as e:
+            logger.warning(f"⚠️ LLM缓存向量化失败: {e}")
+            return None
+        if not vector:
+            return None
+        array = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(array))
+        return array / norm if norm else None
+
+    async def get(self, messages: List[Dict[str, Any]], model: str, params: Dict[str, Any]) -> Optional[str]:
+        """
+        查找缓存
+
+        Args:
+            messages: 消息列表
+            model: 模型标识（含提供商）
+            params: 调用参数
+
+        Returns:
+            Optional[str]: 命中时返回响应文本
+        """
+        if not messages:
+            return None
+        key = self.make_key(messages, model, params)
+        response = await self._load(key)
+        if response is not None:
+            self._stats["exact_hits"] += 1
+            return response
+
+        if self.embed_fn is not None:
+            entries = self._semantic_index.get(self._prefix_key(messages, model, params))
+            if entries:
+                vector = await self._embed(messages)
+                if vector is not None:
+                    best_key, best_score = None, self.similarity_threshold
+                    for candidate, candidate_key in entries:
+                        if candidate.shape != vector.shape:
+                            continue
+                        score = float(np.dot(candidate, vector))
+                        if score >= best_score:
+                            best_key, best_score = candidate_key, score
+                    if best_key is not None:
+                        response = await self._load(best_key)
+                        if response is not None:
+                            self._stats["semantic_hits"] += 1
+                            await self._store(key, response)
+                            return response
+
+        self._stats["misses"] += 1
+        return None
+
+    async def set(self, messages: List[Dict[str, Any]], model: str, params: Dict[str, Any], response: str):
+        """写入缓存"""
+        if not messages or not isinstance(response, str) or not response:
+            return
+        key = self.make_key(messages, model, params)
+        await self._store(key, response)
+        self._stats["stores"] += 1
+
+        if self.embed_fn is not None:
+            vector = await self._embed(messages)
+            if vector is not None:
+                prefix = self._prefix_key(messages, model, params)
+                entries = self._semantic_index.get(prefix)
+                if entries is None:
+                    entries = deque(maxlen=self.max_semantic_entries)
+                    self._semantic_index[prefix] = entries
+                entries.append((vector, key))
+
+    async def get_or_call(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str,
+        params: Dict[str, Any],
+        call: Callable[[], Awaitable[str]]
+    ) -> str:
+        """
+        命中缓存时直接返回，否则调用LLM并写入缓存
+
+        Args:
+            messages: 消息列表
+            model: 模型标识
+            params: 调用参数（决定是否可缓存）
+            call: 实际的LLM调用
+
+        Returns:
+            str: 响应文本
+        """
+        if not self.is_cacheable(params):
+            self._stats["skipped"] += 1
+            return await call()
+
+        cached = await self.get(messages, model, params)
+        if cached is not None:
+            return cached
+
+        response = await call()
+        await self.set(messages, model, params, response)
+        return response
+
+    def clear(self):
+        """清空内存缓存与语义索引"""
+        self._memory.clear()
+        self._semantic_index.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        lookups = self._stats["exact_hits"] + self._stats["semantic_hits"] + self._stats["misses"]
+        hits = self._stats["exact_hits"] + self._stats["semantic_hits"]
+        return {
+            **self._stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0,
+            "memory": self._memory.get_stats(),
+            "semantic_groups": len(self._semantic_index),
+        }
+
+
+# 全局LLM响应缓存实例
+_llm_response_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_response_cache() -> LLMResponseCache:
+    """获取LLM响应缓存单例"""
+    global _llm_response_cache
+    if _llm_response_cache is None:
+        _llm_response_cache = LLMResponseCache()
+    return _llm_response_cache
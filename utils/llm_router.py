@@ -0,0 +1,353 @@
+"""
+多提供商路由LLM客户端
+在多个提供商/模型之间对冲慢请求、故障转移失败请求，用于压低长尾延迟
+
+- chat：先请求首选客户端，超过其同类调用的 p95 延迟仍未返回时向下一个候选发起对冲请求，取最先成功的结果并取消其余请求；
+  失败的请求立即转移到下一个候选
+- stream_chat：首个内容块到达前失败（异常、错误块或首块超时）时转移到下一个候选；首块到达后不再切换
+- 候选的可用性与延迟统计来自 CircuitBreakerRegistry 中按提供商与模型注册的熔断器（llm_<provider>:<model>）
+- 延迟按调用类别分开统计：非流式调用按 max_tokens 分档，流式调用统计首个内容块耗时；
+  被取消的请求记录已耗时（真实耗时的下界），避免分位数只反映较快的请求
+- 每个首选候选最近 HEDGE_WINDOW 次请求中对冲次数不超过 LLM_HEDGE_MAX_RATE 比例
+
+环境变量：
+- LLM_FALLBACK_PROVIDERS：备用候选，逗号分隔，格式 provider 或 provider:model，如 "zhipu,openai:gpt-4o-mini"
+- LLM_HEDGE_ENABLED：是否启用对冲（默认 true）
+- LLM_HEDGE_PERCENTILE：对冲等待时间使用的延迟分位（默认 95）
+- LLM_HEDGE_MIN_DELAY / LLM_HEDGE_MAX_DELAY：对冲等待时间上下限（秒，默认 2 / 60）
+- LLM_HEDGE_INITIAL_DELAY：延迟样本不足时的对冲等待时间（秒，默认 20）
+- LLM_HEDGE_MAX_RATE：对冲请求占比上限（默认 0.05）
+- LLM_STREAM_FIRST_TOKEN_TIMEOUT：流式调用等待首个内容块的超时（秒，默认 30，0 表示不限制）
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, Deque, Dict, List, Optional, Tuple
+
+try:
+    from ..utils.llm_client import BaseLLMClient, get_llm_client
+    from ..utils.circuit_breaker import CircuitBreaker, get_breaker
+except ImportError:
+    from utils.llm_client import BaseLLMClient, get_llm_client
+    from utils.circuit_breaker import CircuitBreaker, get_breaker
+
+logger = logging.getLogger(__name__)
+
+# 延迟样本少于该数量时使用初始对冲等待时间
+MIN_LATENCY_SAMPLES = 10
+
+# 非流式调用按 max_tokens 分档统计延迟（输出越长耗时越长，混在一起会让短调用过晚对冲、长调用过早对冲）
+MAX_TOKENS_BUCKETS = (256, 1024, 4096)
+
+# 对冲率统计窗口（请求数）
+HEDGE_WINDOW = 200
+
+# 首选候选 -> 最近请求是否发起了对冲（进程内共享，路由客户端按调用创建）
+_hedge_history: Dict[str, Deque[bool]] = {}
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def parse_provider_specs(value: Optional[str]) -> List[Tuple[str, Optional[str]]]:
+    """
+    解析候选配置
+
+    Args:
+        value: 形如 "zhipu,openai:gpt-4o-mini" 的字符串
+
+    Returns:
+        [(provider, model)] 列表，未指定模型时 model 为 None
+    """
+    specs = []
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        provider, _, model = item.partition(":")
+        specs.append((provider.strip(), model.strip() or None))
+    return specs
+
+
+class RoutingLLMClient(BaseLLMClient):
+    """按顺序排列候选客户端的路由LLM客户端（第一个为首选）"""
+
+    def __init__(
+        self,
+        clients: List[BaseLLMClient],
+        hedge_enabled: Optional[bool] = None,
+        hedge_percentile: Optional[float] = None,
+        min_hedge_delay: Optional[float] = None,
+        max_hedge_delay: Optional[float] = None,
+        initial_hedge_delay: Optional[float] = None,
+        max_hedge_rate: Optional[float] = None,
+        first_token_timeout: Optional[float] = None
+    ):
+        """
+        初始化路由客户端
+
+        Args:
+            clients: 候选客户端（第一个为首选）
+            hedge_enabled: 是否启用对冲
+            hedge_percentile: 对冲等待时间使用的延迟分位
+            min_hedge_delay: 对冲等待时间下限（秒）
+            max_hedge_delay: 对冲等待时间上限（秒）
+            initial_hedge_delay: 延迟样本不足时的对冲等待时间（秒）
+            max_hedge_rate: 对冲请求占比上限
+            first_token_timeout: 流式调用等待首个内容块的超时（秒，0 表示不限制）
+        """
+        if not clients:
+            raise ValueError("RoutingLLMClient 至少需要一个候选客户端")
+        primary = clients[0]
+
+        # 不调用基类初始化：限流、超时等均由各候选客户端自行处理
+        self.clients = clients
+        self.provider = primary.provider
+        self.model = primary.model
+        self.api_key = primary.api_key
+        self.base_url = primary.base_url
+        self.temperature = primary.temperature
+        self.max_tokens = primary.max_tokens
+        self.timeout = primary.timeout
+        self.max_retries = primary.max_retries
+        self.logger = logger
+
+        if hedge_enabled is None:
+            hedge_enabled = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile if hedge_percentile is not None else _env_float("LLM_HEDGE_PERCENTILE", 95)
+        self.min_hedge_delay = min_hedge_delay if min_hedge_delay is not None else _env_float("LLM_HEDGE_MIN_DELAY", 2.0)
+        self.max_hedge_delay = max_hedge_delay if max_hedge_delay is not None else _env_float("LLM_HEDGE_MAX_DELAY", 60.0)
+        self.initial_hedge_delay = (
+            initial_hedge_delay if initial_hedge_delay is not None else _env_float("LLM_HEDGE_INITIAL_DELAY", 20.0)
+        )
+        self.max_hedge_rate = max_hedge_rate if max_hedge_rate is not None else _env_float("LLM_HEDGE_MAX_RATE", 0.05)
+        self.first_token_timeout = (
+            first_token_timeout if first_token_timeout is not None else _env_float("LLM_STREAM_FIRST_TOKEN_TIMEOUT", 30.0)
+        )
+
+        self.stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0}
+
+    # ==================== 候选与统计 ====================
+
+    @staticmethod
+    def _breaker(client: BaseLLMClient) -> CircuitBreaker:
+        return get_breaker(f"llm_{client.provider}:{client.model}")
+
+    @staticmethod
+    def _call_class(client: BaseLLMClient, kwargs: Dict[str, Any]) -> str:
+        """非流式调用的延迟统计类别（按 max_tokens 分档）"""
+        max_tokens = kwargs.get("max_tokens") or client.max_tokens or 0
+        for bucket in MAX_TOKENS_BUCKETS:
+            if max_tokens <= bucket:
+                return f"chat:{bucket}"
+        return "chat:large"
+
+    def _candidates(self) -> List[BaseLLMClient]:
+        """熔断器允许请求的候选（全部熔断时仍返回全部候选，避免直接失败）"""
+        available = [client for client in self.clients if self._breaker(client).is_available()]
+        return available or list(self.clients)
+
+    def hedge_delay(self, client: BaseLLMClient, call_class: Optional[str] = None) -> float:
+        """向下一个候选发起对冲请求前的等待时间（秒），call_class 默认为客户端默认参数下的类别"""
+        call_class = call_class or self._call_class(client, {})
+        breaker = self._breaker(client)
+        delay = None
+        if breaker.latency_sample_count(call_class) >= MIN_LATENCY_SAMPLES:
+            delay = breaker.latency_percentile(self.hedge_percentile, call_class)
+        if delay is None:
+            delay = self.initial_hedge_delay
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, delay))
+
+    def _hedge_allowed(self, client: BaseLLMClient) -> bool:
+        """首选候选最近的对冲次数是否仍在对冲率上限内"""
+        history = _hedge_history.get(self._label(client))
+        return history is None or sum(history) < self.max_hedge_rate * HEDGE_WINDOW
+
+    def _record_hedge(self, client: BaseLLMClient, hedged: bool) -> None:
+        history = _hedge_history.get(self._label(client))
+        if history is None:
+            history = _hedge_history[self._label(client)] = deque(maxlen=HEDGE_WINDOW)
+        history.append(hedged)
+
+    def _label(self, client: BaseLLMClient) -> str:
+        return f"{client.provider}:{client.model}"
+
+    # ==================== 非流式 ====================
+
+    async def _timed_chat(self, client: BaseLLMClient, messages: List[Dict[str, str]], kwargs: Dict[str, Any]) -> str:
+        call_class = self._call_class(client, kwargs)
+        started = time.monotonic()
+        try:
+            result = await client.chat(messages, **kwargs)
+        except asyncio.CancelledError:
+            # 被对冲取消的请求：已耗时作为真实耗时的下界计入
+            self._breaker(client).record_latency(time.monotonic() - started, call_class)
+            raise
+        except Exception:
+            self._breaker(client).record_failure()
+            raise
+        self._breaker(client).record_success(time.monotonic() - started, call_class)
+        return result
+
+    async def chat(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """对冲 + 故障转移的聊天调用"""
+        hedge = kwargs.pop("hedge", self.hedge_enabled)
+        candidates = self._candidates()
+        self.stats["requests"] += 1
+        track_hedge = hedge and len(candidates) > 1
+        hedge = track_hedge and self._hedge_allowed(candidates[0])
+        hedged = False
+
+        pending: Dict[asyncio.Task, BaseLLMClient] = {}
+        next_index = 0
+        last_error: Optional[BaseException] = None
+
+        def _launch() -> Optional[asyncio.Task]:
+            nonlocal next_index
+            if next_index >= len(candidates):
+                return None
+            client = candidates[next_index]
+            next_index += 1
+            task = asyncio.create_task(self._timed_chat(client, messages, kwargs))
+            pending[task] = client
+            return task
+
+        _launch()
+        try:
+            while pending:
+                timeout = None
+                if hedge and next_index < len(candidates) and len(pending) == 1:
+                    waiting = next(iter(pending.values()))
+                    timeout = self.hedge_delay(waiting, self._call_class(waiting, kwargs))
+                done, _ = await asyncio.wait(pending.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # 首选请求超过分位延迟仍未返回，发起对冲
+                    hedged = True
+                    self.stats["hedged"] += 1
+                    self.logger.info(f"LLM请求超过 {timeout:.1f}s 未返回，对冲到 {self._label(candidates[next_index])}")
+                    _launch()
+                    continue
+
+                for task in done:
+                    client = pending.pop(task)
+                    if task.exception() is None:
+                        if client is not candidates[0]:
+                            self.stats["hedge_wins" if pending else "failovers"] += 1
+                        return task.result()
+                    last_error = task.exception()
+                    self.logger.warning(f"LLM候选 {self._label(client)} 调用失败: {last_error}")
+
+                # 失败后立即转移到下一个候选
+                if not pending and _launch() is None:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            if track_hedge:
+                self._record_hedge(candidates[0], hedged)
+
+        raise last_error if last_error else RuntimeError("没有可用的LLM候选客户端")
+
+    # ==================== 流式 ====================
+
+    async def _first_chunk(self, stream: AsyncGenerator[str, None]) -> Optional[str]:
+        """获取首个内容块（流结束时返回 None）"""
+        try:
+            if self.first_token_timeout > 0:
+                return await asyncio.wait_for(stream.__anext__(), timeout=self.first_token_timeout)
+            return await stream.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    async def stream_chat(self, messages: List[Dict[str, str]], **kwargs) -> AsyncGenerator[str, None]:
+        """首个内容块前可故障转移的流式聊天"""
+        kwargs.pop("hedge", None)
+        candidates = self._candidates()
+        self.stats["requests"] += 1
+        last_error = ""
+
+        for index, client in enumerate(candidates):
+            breaker = self._breaker(client)
+            stream = client.stream_chat(messages, **kwargs)
+            started = time.monotonic()
+            try:
+                first = await self._first_chunk(stream)
+            except asyncio.CancelledError:
+                await stream.aclose()
+                raise
+            except Exception as e:
+                first, last_error = None, f"错误: {e}"
+                await stream.aclose()
+                breaker.record_failure()
+                self.logger.warning(f"LLM候选 {self._label(client)} 流式调用在首个内容块前失败: {e!r}")
+                continue
+
+            if isinstance(first, str) and first.startswith("错误:"):
+                # 各客户端将异常转换为错误内容块输出
+                last_error = first
+                await stream.aclose()
+                breaker.record_failure()
+                self.logger.warning(f"LLM候选 {self._label(client)} 流式调用失败: {first}")
+                continue
+
+            breaker.record_success(time.monotonic() - started, "stream")
+            if index > 0:
+                self.stats["failovers"] += 1
+            if first is None:
+                return
+            yield first
+            async for chunk in stream:
+                yield chunk
+            return
+
+        yield last_error or "错误: 没有可用的LLM候选客户端"
+
+    async def batch_chat(self, messages_list: List[List[Dict[str, str]]], **kwargs) -> List[str]:
+        """批量任务不做对冲，只做故障转移"""
+        kwargs.setdefault("hedge", False)
+        return await super().batch_chat(messages_list, **kwargs)
+
+
+def get_routed_llm_client(
+    provider: str = "dashscope",
+    model: Optional[str] = None,
+    fallbacks: Optional[List[Tuple[str, Optional[str]]]] = None,
+    **kwargs
+) -> BaseLLMClient:
+    """
+    获取带对冲/故障转移的LLM客户端
+
+    未配置备用候选（参数或 LLM_FALLBACK_PROVIDERS）时直接返回 get_llm_client 的结果
+
+    Args:
+        provider: 首选提供商
+        model: 首选模型
+        fallbacks: 备用候选 [(provider, model)]
+        **kwargs: 传给 get_llm_client 的其他参数
+
+    Returns:
+        BaseLLMClient: 客户端实例
+    """
+    if fallbacks is None:
+        fallbacks = parse_provider_specs(os.getenv("LLM_FALLBACK_PROVIDERS"))
+    fallbacks = [spec for spec in fallbacks if spec != (provider, model)]
+
+    primary = get_llm_client(provider, model, **kwargs)
+    if not fallbacks:
+        return primary
+
+    clients = [primary]
+    for fallback_provider, fallback_model in fallbacks:
+        try:
+            clients.append(get_llm_client(fallback_provider, fallback_model))
+        except Exception as e:
+            logger.warning(f"备用LLM客户端 {fallback_provider}:{fallback_model} 创建失败，已跳过: {e}")
+    return RoutingLLMClient(clients) if len(clients) > 1 else primary
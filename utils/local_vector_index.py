@@ -0,0 +1,753 @@
+"""
+本地向量索引
+进程内的向量存储与检索，作为Milvus不可用时的后备（或单机部署的主存储）
+
+- 接口与 MilvusClient 一致：create_collection / insert_vectors / search_vectors / delete_by_expr 等
+- 每个集合一个目录，向量以 float32 追加写入并通过 np.memmap 读取，行数据为 JSONL
+- 默认暴力检索（矩阵-向量乘）；行数较多时在后台线程构建 IVF 倒排聚类索引，建成后只扫描最相近的若干簇
+- 过滤表达式支持 Milvus 常用子集：==、!=、like、in，以及 and / or 组合；
+  text_id（等值、in、前缀 like）与 project_id 条件走列索引，其余条件逐行匹配并缓存掩码（追加行时增量扩展）
+- 检索、写入、删除均在线程中执行，不阻塞事件循环
+"""
+import ast
+import json
+import os
+import re
+import asyncio
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.logger import JubenLogger
+
+
+def _compile_clause(clause: str) -> Callable[[Dict[str, Any]], bool]:
+    """编译单个过滤条件"""
+    clause = clause.strip()
+    while clause.startswith("(") and clause.endswith(")"):
+        clause = clause[1:-1].strip()
+
+    match = re.fullmatch(r'([\w\.]+(?:\[\s*["\']\w+["\']\s*\])?)\s+(like|in|not in)\s+(.+)', clause, re.S)
+    if not match:
+        match = re.fullmatch(r'([\w\.]+(?:\[\s*["\']\w+["\']\s*\])?)\s*(==|!=|>=|<=|>|<)\s*(.+)', clause, re.S)
+    if not match:
+        raise ValueError(f"不支持的过滤表达式: {clause}")
+
+    field, op, raw_value = match.group(1), match.group(2), match.group(3).strip()
+    value = ast.literal_eval(raw_value)
+
+    json_key = re.fullmatch(r'(\w+)\[\s*["\'](\w+)["\']\s*\]', field)
+
+    def resolve(row: Dict[str, Any]) -> Any:
+        if json_key:
+            container = row.get(json_key.group(1)) or {}
+            return container.get(json_key.group(2)) if isinstance(container, dict) else None
+        if field in row:
+            return row[field]
+        metadata = row.get("metadata") or {}
+        return metadata.get(field) if isinstance(metadata, dict) else None
+
+    if op == "like":
+        pattern = re.compile("".join(".*" if c == "%" else "." if c == "_" else re.escape(c) for c in value), re.S)
+        return lambda row: isinstance(resolve(row), str) and pattern.fullmatch(resolve(row)) is not None
+    if op == "in":
+        options = set(value)
+        return lambda row: resolve(row) in options
+    if op == "not in":
+        options = set(value)
+        return lambda row: resolve(row) not in options
+
+    comparisons = {
+        "==": lambda a, b: a == b,
+        "!=": lambda a, b: a != b,
+        ">=": lambda a, b: a is not None and a >= b,
+        "<=": lambda a, b: a is not None and a <= b,
+        ">": lambda a, b: a is not None and a > b,
+        "<": lambda a, b: a is not None and a < b,
+    }
+    compare = comparisons[op]
+    return lambda row: compare(resolve(row), value)
+
+
+_QUOTED_LITERAL = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'')
+_LITERAL_PLACEHOLDER = re.compile(r"\x00(\d+)\x00")
+
+
+def compile_filter_expr(expr: str) -> Callable[[Dict[str, Any]], bool]:
+    """
+    编译Milvus风格的过滤表达式（不支持括号嵌套的 and/or 组合，and 优先级高于 or）
+
+    引号内的字符串字面量先替换为占位符再按 and/or 切分，字面量中的 and/or 不会被当作连接符
+
+    Args:
+        expr: 过滤表达式，如 'project_id == "p1" and text_id like "p1:f1:%"'
+
+    Returns:
+        Callable: 接收行字典返回是否匹配的函数
+    """
+    literals: List[str] = []
+
+    def _stash(match: "re.Match[str]") -> str:
+        literals.append(match.group(0))
+        return f"\x00{len(literals) - 1}\x00"
+
+    def _restore(part: str) -> str:
+        return _LITERAL_PLACEHOLDER.sub(lambda match: literals[int(match.group(1))], part)
+
+    masked = _QUOTED_LITERAL.sub(_stash, expr)
+    or_groups = []
+    for or_part in re.split(r"\s+or\s+|\s*\|\|\s*", masked):
+        and_clauses = [
+            _compile_clause(_restore(part))
+            for part in re.split(r"\s+and\s+|\s*&&\s*", or_part)
+            if part.strip()
+        ]
+        or_groups.append(and_clauses)
+    return lambda row: any(all(c(row) for c in group) for group in or_groups)
+
+
+_INDEXED_CLAUSE = re.compile(
+    r'(text_id|project_id|metadata\[\s*["\']project_id["\']\s*\])\s*(==|\blike\b|\bin\b)\s*(.+)', re.S
+)
+
+
+def parse_indexed_filter(expr: str) -> Optional[List[Tuple[str, str, Any]]]:
+    """
+    解析可走列索引的过滤表达式（仅由 and 连接的 text_id / project_id 条件）
+
+    Returns:
+        [(列, 操作, 值)]，表达式含其他条件或 or 组合时返回 None
+    """
+    literals: List[str] = []
+
+    def _stash(match: "re.Match[str]") -> str:
+        literals.append(match.group(0))
+        return f"\x00{len(literals) - 1}\x00"
+
+    masked = _QUOTED_LITERAL.sub(_stash, expr)
+    if re.search(r"\s+or\s+|\|\||\(", masked):
+        return None
+    clauses = []
+    for part in re.split(r"\s+and\s+|\s*&&\s*", masked):
+        part = _LITERAL_PLACEHOLDER.sub(lambda match: literals[int(match.group(1))], part.strip())
+        match = _INDEXED_CLAUSE.fullmatch(part)
+        if not match:
+            return None
+        column = "text_id" if match.group(1) == "text_id" else "project_id"
+        op = match.group(2)
+        try:
+            value = ast.literal_eval(match.group(3).strip())
+        except (ValueError, SyntaxError):
+            return None
+        if op == "like":
+            # 只支持不含其他通配符的前缀匹配，前缀需以分隔符 ":" 结尾（与索引的前缀粒度一致）
+            if not isinstance(value, str) or not value.endswith(":%") or "%" in value[:-1] or "_" in value:
+                return None
+            value = value[:-1]
+        elif op == "in" and not isinstance(value, (list, tuple)):
+            return None
+        clauses.append((column, op, value))
+    return clauses
+
+
+class LocalVectorCollection:
+    """
+    单个本地向量集合
+
+    文件：
+        meta.json      集合配置（维度、度量、行数）
+        vectors.f32    float32 行主序向量（COSINE 度量下写入前已归一化）
+        rows.jsonl     行数据：text_id、content、metadata
+        deleted.json   已删除行号（墓碑）
+    """
+
+    IVF_MIN_ROWS = 20000       # 达到该行数后构建IVF索引
+    IVF_NPROBE = 16            # 查询时扫描的簇数
+    IVF_TRAIN_ITERATIONS = 8
+    COMPACT_RATIO = 0.3        # 墓碑占比超过该值时压缩
+
+    def __init__(
+        self,
+        path: Path,
+        name: str,
+        dimension: int = 768,
+        metric_type: str = "COSINE",
+        description: str = ""
+    ):
+        self.path = path
+        self.name = name
+        self._lock = threading.RLock()
+
+        meta_path = path / "meta.json"
+        if meta_path.exists():
+            self.meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        else:
+            path.mkdir(parents=True, exist_ok=True)
+            self.meta = {
+                "name": name,
+                "dimension": dimension,
+                "metric_type": metric_type.upper(),
+                "description": description,
+                "count": 0
+            }
+            self._save_meta()
+
+        self.dimension: int = self.meta["dimension"]
+        self.metric_type: str = self.meta["metric_type"]
+
+        self.rows: List[Dict[str, Any]] = []
+        rows_path = path / "rows.jsonl"
+        if rows_path.exists():
+            with open(rows_path, "r", encoding="utf-8") as f:
+                self.rows = [json.loads(line) for line in f if line.strip()]
+        # 以向量文件和行文件中较短者为准（防止中断写入导致不一致）
+        count = min(len(self.rows), self._vector_file_rows())
+        self.rows = self.rows[:count]
+        self.meta["count"] = count
+
+        self.alive = np.ones(count, dtype=bool)
+        deleted_path = path / "deleted.json"
+        if deleted_path.exists():
+            deleted = [i for i in json.loads(deleted_path.read_text(encoding="utf-8")) if i < count]
+            self.alive[deleted] = False
+
+        self._vectors: Optional[np.ndarray] = None
+        # 表达式 -> 行掩码（长度可能小于行数：新追加的行在下次使用时增量匹配；压缩后清空）
+        self._filter_cache: Dict[str, np.ndarray] = {}
+        # 列索引：text_id、text_id 前缀（到最后一个 ":" 为止的每一级）、metadata.project_id -> 行号
+        self._id_index: Dict[str, List[int]] = {}
+        self._prefix_index: Dict[str, List[int]] = {}
+        self._project_index: Dict[str, List[int]] = {}
+        self._index_rows(0)
+
+        self._ivf: Optional[Dict[str, Any]] = None
+        self._ivf_thread: Optional[threading.Thread] = None
+        self._ivf_generation = 0  # 压缩后行号变化，进行中的构建结果作废
+
+    # ---------- 持久化 ----------
+
+    def _save_meta(self) -> None:
+        tmp = self.path / "meta.json.tmp"
+        tmp.write_text(json.dumps(self.meta, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path / "meta.json")
+
+    def _save_deleted(self) -> None:
+        tmp = self.path / "deleted.json.tmp"
+        tmp.write_text(json.dumps(np.flatnonzero(~self.alive).tolist()), encoding="utf-8")
+        os.replace(tmp, self.path / "deleted.json")
+
+    def _vector_file_rows(self) -> int:
+        vector_path = self.path / "vectors.f32"
+        if not vector_path.exists():
+            return 0
+        return vector_path.stat().st_size // (4 * self.dimension)
+
+    def _matrix(self) -> np.ndarray:
+        """当前全部向量（memmap，只读）"""
+        count = self.meta["count"]
+        if self._vectors is None or self._vectors.shape[0] != count:
+            if count == 0:
+                self._vectors = np.zeros((0, self.dimension), dtype=np.float32)
+            else:
+                self._vectors = np.memmap(
+                    self.path / "vectors.f32", dtype=np.float32, mode="r",
+                    shape=(count, self.dimension)
+                )
+        return self._vectors
+
+    def _prepare(self, vectors: List[List[float]]) -> np.ndarray:
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+        if self.metric_type == "COSINE":
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix = matrix / norms
+        return matrix
+
+    # ---------- 写操作 ----------
+
+    def insert(
+        self,
+        text_ids: List[str],
+        contents: List[str],
+        metadata_list: List[Dict[str, Any]],
+        vectors: List[List[float]]
+    ) -> List[int]:
+        """追加写入，返回新行号"""
+        matrix = self._prepare(vectors)
+        with self._lock:
+            start = self.meta["count"]
+            with open(self.path / "vectors.f32", "ab") as f:
+                f.write(np.ascontiguousarray(matrix).tobytes())
+            new_rows = [
+                {"text_id": text_id, "content": content, "metadata": metadata or {}}
+                for text_id, content, metadata in zip(text_ids, contents, metadata_list)
+            ]
+            with open(self.path / "rows.jsonl", "a", encoding="utf-8") as f:
+                for row in new_rows:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+            self.rows.extend(new_rows)
+            self.alive = np.concatenate([self.alive, np.ones(len(new_rows), dtype=bool)])
+            self.meta["count"] = start + len(new_rows)
+            self._save_meta()
+            self._index_rows(start)
+            return list(range(start, start + len(new_rows)))
+
+    def delete(self, expr: str) -> int:
+        """按表达式删除（墓碑标记），返回删除行数"""
+        with self._lock:
+            mask = self._filter_mask(expr) & self.alive
+            deleted = int(mask.sum())
+            if deleted:
+                self.alive[mask] = False
+                dead = int((~self.alive).sum())
+                if dead > self.COMPACT_RATIO * len(self.alive):
+                    self._compact()
+                else:
+                    self._save_deleted()
+            return deleted
+
+    def _compact(self) -> None:
+        """重写文件，移除已删除的行"""
+        keep = np.flatnonzero(self.alive)
+        matrix = np.array(self._matrix()[keep]) if keep.size else np.zeros((0, self.dimension), np.float32)
+        rows = [self.rows[i] for i in keep.tolist()]
+
+        self._vectors = None
+        tmp_vectors = self.path / "vectors.f32.tmp"
+        tmp_vectors.write_bytes(np.ascontiguousarray(matrix).tobytes())
+        tmp_rows = self.path / "rows.jsonl.tmp"
+        with open(tmp_rows, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        os.replace(tmp_vectors, self.path / "vectors.f32")
+        os.replace(tmp_rows, self.path / "rows.jsonl")
+
+        self.rows = rows
+        self.alive = np.ones(len(rows), dtype=bool)
+        self.meta["count"] = len(rows)
+        self._save_meta()
+        (self.path / "deleted.json").unlink(missing_ok=True)
+        self._ivf = None
+        self._ivf_generation += 1
+        self._filter_cache.clear()
+        self._id_index, self._prefix_index, self._project_index = {}, {}, {}
+        self._index_rows(0)
+
+    def flush(self) -> None:
+        """写入即落盘，保留该方法以兼容 pymilvus Collection 接口"""
+
+    @property
+    def num_entities(self) -> int:
+        return int(self.alive.sum())
+
+    # ---------- 检索 ----------
+
+    def get_vectors(self, text_ids: List[str]) -> Dict[str, List[float]]:
+        """按 text_id 读取已存向量（同一 text_id 有多行时取最后写入的一行）"""
+        with self._lock:
+            found = {}
+            for text_id in text_ids:
+                alive_rows = [idx for idx in self._id_index.get(text_id, ()) if self.alive[idx]]
+                if alive_rows:
+                    found[text_id] = alive_rows[-1]
+            matrix = self._matrix()
+            return {text_id: matrix[idx].tolist() for text_id, idx in found.items()}
+
+    def _index_rows(self, start: int) -> None:
+        """把 start 之后的行加入列索引"""
+        for idx in range(start, len(self.rows)):
+            row = self.rows[idx]
+            text_id = row["text_id"]
+            self._id_index.setdefault(text_id, []).append(idx)
+            end = text_id.find(":")
+            while end != -1:
+                self._prefix_index.setdefault(text_id[:end + 1], []).append(idx)
+                end = text_id.find(":", end + 1)
+            metadata = row.get("metadata")
+            project_id = metadata.get("project_id") if isinstance(metadata, dict) else None
+            if project_id is not None:
+                self._project_index.setdefault(str(project_id), []).append(idx)
+
+    def _indexed_mask(self, clauses: List[Tuple[str, str, Any]]) -> np.ndarray:
+        mask = np.ones(len(self.rows), dtype=bool)
+        for column, op, value in clauses:
+            if column == "project_id":
+                index, values = self._project_index, [str(value)] if op == "==" else [str(v) for v in value]
+            elif op == "like":
+                index, values = self._prefix_index, [value]
+            else:
+                index, values = self._id_index, [value] if op == "==" else list(value)
+            clause_mask = np.zeros(len(self.rows), dtype=bool)
+            for item in values:
+                rows = index.get(item)
+                if rows:
+                    clause_mask[rows] = True
+            mask &= clause_mask
+        return mask
+
+    def _filter_mask(self, expr: Optional[str]) -> np.ndarray:
+        """表达式匹配的行掩码（列索引或逐行匹配；逐行匹配的结果缓存，追加行后只匹配新行）"""
+        if not expr:
+            return np.ones(len(self.rows), dtype=bool)
+        clauses = parse_indexed_filter(expr)
+        if clauses is not None and all(column == "text_id" or op != "in" or value for column, op, value in clauses):
+            return self._indexed_mask(clauses)
+
+        cached = self._filter_cache.get(expr)
+        start = 0 if cached is None else len(cached)
+        if start == len(self.rows):
+            return cached
+        predicate = compile_filter_expr(expr)
+        tail = np.fromiter((predicate(row) for row in self.rows[start:]), dtype=bool, count=len(self.rows) - start)
+        mask = tail if cached is None else np.concatenate([cached, tail])
+        if cached is None and len(self._filter_cache) > 64:
+            self._filter_cache.clear()
+        self._filter_cache[expr] = mask
+        return mask
+
+    def _ensure_ivf(self) -> Optional[Dict[str, Any]]:
+        """
+        当前可用的IVF索引；行数足够但尚无索引（或数据翻倍）时在后台线程构建（L2度量不使用IVF）
+
+        构建期间返回旧索引（其后追加的行按全量扫描补充）或 None（全量扫描）
+        """
+        count = self.meta["count"]
+        if self.metric_type == "L2" or count < self.IVF_MIN_ROWS:
+            return None
+        if self._ivf is None or self._ivf["rows"] * 2 <= count:
+            self._start_ivf_build()
+        return self._ivf
+
+    def _start_ivf_build(self) -> None:
+        """启动后台构建（调用方持有锁）"""
+        if self._ivf_thread is not None and self._ivf_thread.is_alive():
+            return
+        self._ivf_thread = threading.Thread(
+            target=self._build_ivf,
+            args=(self._matrix(), self.meta["count"], self._ivf_generation),
+            name=f"ivf-build-{self.name}",
+            daemon=True
+        )
+        self._ivf_thread.start()
+
+    def _build_ivf(self, matrix: np.ndarray, count: int, generation: int) -> None:
+        try:
+            ivf = self._train_ivf(matrix, count)
+        except Exception as e:
+            JubenLogger("local_vector_index").error(f"❌ 构建本地集合 {self.name} 的IVF索引失败: {e}")
+            return
+        with self._lock:
+            if generation == self._ivf_generation:
+                self._ivf = ivf
+
+    def wait_for_index(self, timeout: Optional[float] = None) -> bool:
+        """等待进行中的IVF构建完成，返回索引是否可用"""
+        thread = self._ivf_thread
+        if thread is not None:
+            thread.join(timeout)
+        return self._ivf is not None
+
+    def _train_ivf(self, matrix: np.ndarray, count: int) -> Dict[str, Any]:
+        """k-means 训练簇中心并按簇排列行号"""
+        nlist = max(16, int(np.sqrt(count)))
+        rng = np.random.default_rng(0)
+        sample = np.array(matrix[rng.choice(count, size=min(count, nlist * 40), replace=False)])
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+        for _ in range(self.IVF_TRAIN_ITERATIONS):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assign == c]
+                if len(members):
+                    centroid = members.mean(axis=0)
+                    norm = np.linalg.norm(centroid)
+                    centroids[c] = centroid / norm if norm else centroid
+
+        assignments = np.empty(count, dtype=np.int32)
+        for start in range(0, count, 65536):
+            block = np.asarray(matrix[start:start + 65536])
+            assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+
+        order = np.argsort(assignments, kind="stable").astype(np.int64)
+        offsets = np.searchsorted(assignments[order], np.arange(nlist + 1))
+        return {"rows": count, "centroids": centroids, "order": order, "offsets": offsets}
+
+    def _candidates(self, query: np.ndarray) -> Optional[np.ndarray]:
+        """IVF候选行（含索引构建后新追加的行）；无索引时返回None表示全量扫描"""
+        ivf = self._ensure_ivf()
+        if ivf is None:
+            return None
+        centroid_scores = ivf["centroids"] @ query
+        nprobe = min(self.IVF_NPROBE, len(centroid_scores))
+        probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        parts = [ivf["order"][ivf["offsets"][p]:ivf["offsets"][p + 1]] for p in probes]
+        parts.append(np.arange(ivf["rows"], self.meta["count"], dtype=np.int64))
+        return np.concatenate(parts)
+
+    def search(
+        self,
+        query_vectors: List[List[float]],
+        top_k: int = 5,
+        expr: Optional[str] = None
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        检索
+
+        Returns:
+            List[List[Tuple[int, float]]]: 每个查询的 (行号, 得分) 列表；COSINE/IP 得分越大越相似，L2 为距离平方
+        """
+        queries = self._prepare(query_vectors)
+        with self._lock:
+            matrix = self._matrix()
+            valid = self.alive & self._filter_mask(expr)
+
+            all_hits: List[List[Tuple[int, float]]] = []
+            for query in queries:
+                candidates = self._candidates(query)
+                if candidates is None:
+                    candidates = np.flatnonzero(valid)
+                else:
+                    candidates = candidates[valid[candidates]]
+                if candidates.size == 0:
+                    all_hits.append([])
+                    continue
+
+                vectors = matrix[candidates]
+                if self.metric_type == "L2":
+                    diff = vectors - query
+                    scores = -np.einsum("ij,ij->i", diff, diff)
+                else:
+                    scores = vectors @ query
+
+                k = min(top_k, scores.size)
+                top = np.argpartition(-scores, k - 1)[:k]
+                top = top[np.argsort(-scores[top], kind="stable")]
+                sign = -1.0 if self.metric_type == "L2" else 1.0
+                all_hits.append([
+                    (int(candidates[i]), float(sign * scores[i])) for i in top
+                ])
+            return all_hits
+
+
+class LocalVectorClient:
+    """
+    本地向量客户端
+
+    与 MilvusClient 方法签名一致，可在 get_milvus_client() 中替换使用
+    """
+
+    def __init__(self, base_dir: Optional[str] = None):
+        self.logger = JubenLogger("local_vector_client")
+        self.base_dir = Path(base_dir or os.getenv("LOCAL_VECTOR_DIR", "data/local_vectors"))
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.collections: Dict[str, LocalVectorCollection] = {}
+        self.backend = "local"
+        self._connected = True
+        self._open_lock = threading.Lock()
+
+    def _collection_dir(self, collection_name: str) -> Path:
+        return self.base_dir / re.sub(r"[^\w\-]", "_", collection_name)
+
+    def _open(self, collection_name: str) -> Optional[LocalVectorCollection]:
+        collection = self.collections.get(collection_name)
+        if collection is not None:
+            return collection
+        path = self._collection_dir(collection_name)
+        if not (path / "meta.json").exists():
+            return None
+        with self._open_lock:
+            collection = self.collections.get(collection_name)
+            if collection is None:
+                collection = LocalVectorCollection(path, collection_name)
+                self.collections[collection_name] = collection
+        return collection
+
+    async def connect(self) -> bool:
+        self._connected = True
+        return True
+
+    async def disconnect(self):
+        self.collections.clear()
+
+    def ensure_connected(self):
+        """本地存储始终可用"""
+
+    async def ensure_connected_async(self):
+        return True
+
+    async def ensure_connected_with_retry(self) -> bool:
+        return True
+
+    async def create_collection(
+        self,
+        collection_name: str,
+        dimension: int = 768,
+        metric_type: str = "COSINE",
+        description: str = ""
+    ) -> bool:
+        """创建集合（已存在时直接返回）"""
+        try:
+            if self._open(collection_name) is not None:
+                return True
+            with self._open_lock:
+                if collection_name not in self.collections:
+                    self.collections[collection_name] = LocalVectorCollection(
+                        self._collection_dir(collection_name),
+                        collection_name,
+                        dimension=dimension,
+                        metric_type=metric_type,
+                        description=description
+                    )
+            self.logger.info(f"✅ 本地集合 {collection_name} 已创建")
+            return True
+        except Exception as e:
+            self.logger.error(f"❌ 创建本地集合 {collection_name} 失败: {e}")
+            return False
+
+    async def get_collection(self, collection_name: str) -> Optional[LocalVectorCollection]:
+        collection = self._open(collection_name)
+        if collection is None:
+            self.logger.warning(f"集合 {collection_name} 不存在")
+        return collection
+
+    async def insert_vectors(
+        self,
+        collection_name: str,
+        text_ids: List[str],
+        contents: List[str],
+        vectors: List[List[float]],
+        metadata_list: List[Dict[str, Any]] = None
+    ) -> bool:
+        """插入向量数据"""
+        try:
+            collection = self._open(collection_name)
+            if collection is None:
+                self.logger.warning(f"集合 {collection_name} 不存在")
+                return False
+            if metadata_list is None:
+                metadata_list = [{}] * len(vectors)
+            min_length = min(len(text_ids), len(contents), len(vectors), len(metadata_list))
+            await asyncio.to_thread(
+                collection.insert,
+                text_ids[:min_length],
+                contents[:min_length],
+                metadata_list[:min_length],
+                vectors[:min_length]
+            )
+            self.logger.info(f"✅ 向本地集合 {collection_name} 插入 {min_length} 条向量数据")
+            return True
+        except Exception as e:
+            self.logger.error(f"❌ 插入向量数据到本地集合 {collection_name} 失败: {e}")
+            return False
+
+    async def search_vectors(
+        self,
+        collection_name: str,
+        query_vectors: List[List[float]],
+        top_k: int = 5,
+        score_threshold: float = 0.0,
+        metadata_filter: str = None
+    ) -> List[List[Dict[str, Any]]]:
+        """搜索相似向量，返回格式与 MilvusClient.search_vectors 一致"""
+        try:
+            collection = self._open(collection_name)
+            if collection is None:
+                return []
+
+            formatted_results = []
+            hits_list = await asyncio.to_thread(collection.search, query_vectors, top_k, metadata_filter)
+            for hits in hits_list:
+                formatted = []
+                for row_idx, score in hits:
+                    if collection.metric_type != "L2" and score < score_threshold:
+                        continue
+                    row = collection.rows[row_idx]
+                    formatted.append({
+                        "id": row_idx,
+                        "text_id": row["text_id"],
+                        "content": row["content"],
+                        "metadata": row["metadata"],
+                        "score": score
+                    })
+                formatted_results.append(formatted)
+            return formatted_results
+        except Exception as e:
+            self.logger.error(f"❌ 在本地集合 {collection_name} 中搜索向量失败: {e}")
+            return []
+
+    async def get_vectors(self, collection_name: str, text_ids: List[str]) -> Dict[str, List[float]]:
+        """按 text_id 读取已存向量，返回 {text_id: vector}"""
+        try:
+            collection = self._open(collection_name)
+            if collection is None or not text_ids:
+                return {}
+            return await asyncio.to_thread(collection.get_vectors, text_ids)
+        except Exception as e:
+            self.logger.error(f"❌ 从本地集合 {collection_name} 读取向量失败: {e}")
+            return {}
+
+    async def delete_collection(self, collection_name: str) -> bool:
+        """删除集合"""
+        path = self._collection_dir(collection_name)
+        if not (path / "meta.json").exists():
+            self.logger.warning(f"集合 {collection_name} 不存在")
+            return False
+        self.collections.pop(collection_name, None)
+        for file in path.iterdir():
+            file.unlink()
+        path.rmdir()
+        self.logger.info(f"✅ 本地集合 {collection_name} 删除成功")
+        return True
+
+    async def delete_by_expr(self, collection_name: str, expr: str) -> bool:
+        """按条件删除向量数据"""
+        try:
+            collection = self._open(collection_name)
+            if collection is None:
+                return False
+            deleted = await asyncio.to_thread(collection.delete, expr)
+            self.logger.info(f"✅ 从本地集合 {collection_name} 删除 {deleted} 条数据，条件: {expr}")
+            return True
+        except Exception as e:
+            self.logger.error(f"❌ 删除本地向量数据失败: {e}")
+            return False
+
+    async def get_collection_info(self, collection_name: str) -> Optional[Dict[str, Any]]:
+        """获取集合信息"""
+        collection = self._open(collection_name)
+        if collection is None:
+            return None
+        return {
+            "name": collection_name,
+            "description": collection.meta.get("description", ""),
+            "num_entities": collection.num_entities,
+            "schema": {
+                "dimension": collection.dimension,
+                "metric_type": collection.metric_type,
+                "backend": "local"
+            }
+        }
+
+    async def list_collections(self) -> List[str]:
+        """列出所有集合"""
+        names = []
+        for path in self.base_dir.iterdir():
+            meta_path = path / "meta.json"
+            if meta_path.exists():
+                try:
+                    names.append(json.loads(meta_path.read_text(encoding="utf-8"))["name"])
+                except Exception:
+                    names.append(path.name)
+        return names
+
+    async def health_check(self) -> Dict[str, Any]:
+        """健康检查"""
+        return {
+            "status": "connected",
+            "backend": "local",
+            "path": str(self.base_dir),
+            "collections_count": len(await self.list_collections())
+        }
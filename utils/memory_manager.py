@@ -451,7 +451,10 @@ class StyleMemory:
                 self.logger.warning("嵌入向量客户端未配置")
                 return None
 
-            # 调用嵌入向量API
+            # 调用嵌入向量API（优先使用带缓存和批量合并的异步接口）
+            if hasattr(self.embedding_client, "aembed_text"):
+                embedding = await self.embedding_client.aembed_text(text)
+                return embedding or None
             embedding = await self.embedding_client.embed(text)
             return embedding
 
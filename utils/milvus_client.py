@@ -3,6 +3,7 @@ Juben项目Milvus向量数据库客户端
 支持向量存储、相似性搜索和集合管理
 """
 import os
+import json
 import asyncio
 import time
 from typing import Optional, List, Dict, Any, Union
@@ -33,6 +34,7 @@ class MilvusClient:
         self.logger = JubenLogger("milvus_client")
         self.connection_alias = "default"
         self.collections: Dict[str, Collection] = {}
+        self.backend = "milvus"
 
         # 连接配置
         self.host = os.getenv('MILVUS_HOST', 'localhost')
@@ -367,6 +369,22 @@ class MilvusClient:
 
         return []
     
+    async def get_vectors(self, collection_name: str, text_ids: List[str]) -> Dict[str, List[float]]:
+        """按 text_id 读取已存向量，返回 {text_id: vector}"""
+        try:
+            collection = await self.get_collection(collection_name)
+            if not collection or not text_ids:
+                return {}
+            collection.load()
+            rows = collection.query(
+                expr=f"text_id in {json.dumps(text_ids, ensure_ascii=False)}",
+                output_fields=["text_id", "vector"]
+            )
+            return {row["text_id"]: list(row["vector"]) for row in rows}
+        except Exception as e:
+            self.logger.error(f"❌ 从集合 {collection_name} 读取向量失败: {e}")
+            return {}
+
     async def delete_collection(self, collection_name: str) -> bool:
         """删除集合"""
         try:
@@ -457,11 +475,59 @@ class MilvusClient:
 # 全局Milvus客户端实例
 milvus_client = MilvusClient()
 
+# 本地向量后端（懒加载）
+_local_vector_client = None
+
+# auto 模式下 Milvus 不可用时的重连退避（秒）
+MILVUS_RECONNECT_BASE_DELAY = 30.0
+MILVUS_RECONNECT_MAX_DELAY = 600.0
+_milvus_reconnect_delay = 0.0
+_milvus_next_reconnect_at = 0.0
+
+
+def _get_local_vector_client():
+    global _local_vector_client
+    if _local_vector_client is None:
+        from utils.local_vector_index import LocalVectorClient
+        _local_vector_client = LocalVectorClient()
+    return _local_vector_client
+
 
 async def get_milvus_client() -> MilvusClient:
-    """获取Milvus客户端实例"""
+    """
+    获取向量数据库客户端实例
+
+    后端由环境变量 VECTOR_BACKEND 决定：
+    - milvus：只使用Milvus
+    - local：只使用本地向量索引（单机部署/测试）
+    - auto（默认）：优先Milvus；连接失败时暂用本地向量索引，并按指数退避（30s 起，最长 10 分钟）
+      重新尝试连接，Milvus 恢复后切回。降级期间写入本地索引的数据不会同步到Milvus
+    """
+    global _milvus_reconnect_delay, _milvus_next_reconnect_at
+
+    backend = os.getenv("VECTOR_BACKEND", "auto").lower()
+    if backend == "local":
+        return _get_local_vector_client()
+    if backend == "auto" and time.monotonic() < _milvus_next_reconnect_at:
+        return _get_local_vector_client()
+
     if not milvus_client._connected:
-        await milvus_client.connect()
+        connected = await milvus_client.connect()
+        if not connected and backend == "auto":
+            _milvus_reconnect_delay = min(
+                max(_milvus_reconnect_delay * 2, MILVUS_RECONNECT_BASE_DELAY),
+                MILVUS_RECONNECT_MAX_DELAY
+            )
+            _milvus_next_reconnect_at = time.monotonic() + _milvus_reconnect_delay
+            milvus_client.logger.error(
+                f"❌ Milvus不可用（{milvus_client.host}:{milvus_client.port}），已降级为本地向量索引，"
+                f"{_milvus_reconnect_delay:.0f}秒后重试连接；降级期间写入的向量不会同步到Milvus"
+            )
+            return _get_local_vector_client()
+        if connected and _milvus_reconnect_delay:
+            milvus_client.logger.info("✅ Milvus已恢复，停止使用本地向量索引")
+            _milvus_reconnect_delay = 0.0
+            _milvus_next_reconnect_at = 0.0
     return milvus_client
 
 
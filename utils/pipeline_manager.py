@@ -7,7 +7,7 @@ from pathlib import Path
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
-from utils.agent_registry import AgentRegistry
+from utils.agent_registry import get_agent_registry
 from utils.agent_dispatch import build_agent_generator
 
 
@@ -84,7 +84,7 @@ class PipelineManager:
         self.templates_file = self.base_dir / "templates.json"
         self.runs_dir = self.base_dir / "runs"
         self.runs_dir.mkdir(parents=True, exist_ok=True)
-        self.registry = AgentRegistry()
+        self.registry = get_agent_registry()
         self._ensure_templates()
 
     def _ensure_templates(self):
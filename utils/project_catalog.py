@@ -0,0 +1,396 @@
+"""
+项目元数据目录（SQLite）
+为 ProjectManager 索引项目与文件元数据，列表/搜索/按ID定位文件时不再扫描目录
+
+- projects：按 用户/状态/更新时间 建索引，保存项目JSON快照，列表直接由目录返回
+- project_tags：标签过滤
+- project_files：文件ID -> 存储路径、类型、时间等，避免 rglob
+- 支持 offset 分页与基于 (updated_at, id) 的 keyset 分页
+
+项目目录下的 JSON 文件仍是数据源，目录在首次使用时从磁盘构建，之后由 ProjectManager 的写操作同步维护
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _sort_key(value: Any) -> str:
+    """时间统一为微秒精度的ISO字符串，保证字典序即时间序"""
+    if isinstance(value, datetime):
+        return value.isoformat(timespec="microseconds")
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value).isoformat(timespec="microseconds")
+        except ValueError:
+            return value
+    return ""
+
+
+class ProjectCatalog:
+    """项目元数据目录"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _get_conn(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_db(self) -> None:
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                conn.executescript(
+                    """
+                    CREATE TABLE IF NOT EXISTS projects (
+                        id TEXT PRIMARY KEY,
+                        user_id TEXT,
+                        name TEXT,
+                        description TEXT,
+                        status TEXT,
+                        created_at TEXT,
+                        updated_at TEXT,
+                        data TEXT NOT NULL
+                    );
+                    CREATE INDEX IF NOT EXISTS idx_projects_user_updated
+                        ON projects (user_id, updated_at DESC, id DESC);
+                    CREATE INDEX IF NOT EXISTS idx_projects_status_updated
+                        ON projects (status, updated_at DESC, id DESC);
+                    CREATE INDEX IF NOT EXISTS idx_projects_updated
+                        ON projects (updated_at DESC, id DESC);
+
+                    CREATE TABLE IF NOT EXISTS project_tags (
+                        project_id TEXT NOT NULL,
+                        tag TEXT NOT NULL,
+                        PRIMARY KEY (project_id, tag)
+                    );
+                    CREATE INDEX IF NOT EXISTS idx_project_tags_tag ON project_tags (tag);
+
+                    CREATE TABLE IF NOT EXISTS project_files (
+                        id TEXT NOT NULL,
+                        project_id TEXT NOT NULL,
+                        path TEXT NOT NULL,
+                        filename TEXT,
+                        file_type TEXT,
+                        agent_source TEXT,
+                        tags TEXT,
+                        created_at TEXT,
+                        updated_at TEXT,
+                        file_size INTEGER DEFAULT 0,
+                        version INTEGER DEFAULT 1,
+                        PRIMARY KEY (project_id, id)
+                    );
+                    CREATE INDEX IF NOT EXISTS idx_project_files_created
+                        ON project_files (project_id, created_at DESC);
+                    CREATE INDEX IF NOT EXISTS idx_project_files_type
+                        ON project_files (project_id, file_type);
+
+                    CREATE TABLE IF NOT EXISTS catalog_meta (
+                        key TEXT PRIMARY KEY,
+                        value TEXT
+                    );
+                    """
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+    # ==================== 构建 ====================
+
+    def is_built(self) -> bool:
+        conn = self._get_conn()
+        try:
+            row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'built_at'").fetchone()
+            return row is not None
+        finally:
+            conn.close()
+
+    def rebuild(self, base_dir: Path) -> Tuple[int, int]:
+        """
+        从项目目录全量重建目录
+
+        Returns:
+            Tuple[int, int]: (项目数, 文件数)
+        """
+        base_dir = Path(base_dir)
+        projects: List[Dict[str, Any]] = []
+        files: List[Tuple[Dict[str, Any], str]] = []
+
+        for project_dir in base_dir.iterdir():
+            project_file = project_dir / "project.json"
+            if not project_file.is_file():
+                continue
+            try:
+                projects.append(json.loads(project_file.read_text(encoding="utf-8")))
+            except Exception:
+                continue
+            for file_path in project_dir.rglob("*.json"):
+                if file_path.name == "project.json" or file_path.parent.name == "versions":
+                    continue
+                try:
+                    file_data = json.loads(file_path.read_text(encoding="utf-8"))
+                except Exception:
+                    continue
+                if not isinstance(file_data, dict) or "id" not in file_data or "file_type" not in file_data:
+                    continue
+                files.append((file_data, str(file_path.relative_to(base_dir))))
+
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                conn.execute("DELETE FROM projects")
+                conn.execute("DELETE FROM project_tags")
+                conn.execute("DELETE FROM project_files")
+                for project in projects:
+                    self._upsert_project(conn, project)
+                for file_data, rel_path in files:
+                    self._upsert_file(conn, file_data, rel_path)
+                conn.execute(
+                    "INSERT OR REPLACE INTO catalog_meta (key, value) VALUES ('built_at', ?)",
+                    (datetime.now().isoformat(),)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        return len(projects), len(files)
+
+    # ==================== 项目 ====================
+
+    @staticmethod
+    def _upsert_project(conn: sqlite3.Connection, project: Dict[str, Any]) -> None:
+        status = project.get("status")
+        status = getattr(status, "value", status)
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO projects
+                (id, user_id, name, description, status, created_at, updated_at, data)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                project["id"],
+                project.get("user_id"),
+                project.get("name", ""),
+                project.get("description") or "",
+                status,
+                _sort_key(project.get("created_at")),
+                _sort_key(project.get("updated_at")),
+                json.dumps(project, ensure_ascii=False, default=str),
+            )
+        )
+        conn.execute("DELETE FROM project_tags WHERE project_id = ?", (project["id"],))
+        conn.executemany(
+            "INSERT OR IGNORE INTO project_tags (project_id, tag) VALUES (?, ?)",
+            [(project["id"], tag) for tag in project.get("tags") or []]
+        )
+
+    def upsert_project(self, project: Dict[str, Any]) -> None:
+        """新增或更新项目"""
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                self._upsert_project(conn, project)
+                conn.commit()
+            finally:
+                conn.close()
+
+    def remove_project(self, project_id: str) -> None:
+        """移除项目及其文件记录"""
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                conn.execute("DELETE FROM projects WHERE id = ?", (project_id,))
+                conn.execute("DELETE FROM project_tags WHERE project_id = ?", (project_id,))
+                conn.execute("DELETE FROM project_files WHERE project_id = ?", (project_id,))
+                conn.commit()
+            finally:
+                conn.close()
+
+    @staticmethod
+    def _project_filters(
+        user_id: Optional[str],
+        status: Optional[str],
+        tags: Optional[List[str]],
+        query: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> Tuple[List[str], List[Any]]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        if user_id:
+            clauses.append("p.user_id = ?")
+            params.append(user_id)
+        if status:
+            clauses.append("p.status = ?")
+            params.append(status)
+        if tags:
+            placeholders = ",".join("?" * len(tags))
+            clauses.append(
+                f"EXISTS (SELECT 1 FROM project_tags t WHERE t.project_id = p.id AND t.tag IN ({placeholders}))"
+            )
+            params.extend(tags)
+        if query:
+            like = f"%{query.lower()}%"
+            clauses.append(
+                "(lower(p.name) LIKE ? OR lower(p.description) LIKE ? OR "
+                "EXISTS (SELECT 1 FROM project_tags t WHERE t.project_id = p.id AND lower(t.tag) LIKE ?))"
+            )
+            params.extend([like, like, like])
+        if date_from:
+            clauses.append("p.created_at >= ?")
+            params.append(_sort_key(date_from))
+        if date_to:
+            clauses.append("p.created_at <= ?")
+            params.append(_sort_key(date_to))
+        return clauses, params
+
+    def query_projects(
+        self,
+        user_id: Optional[str] = None,
+        status: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        query: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        查询项目（按更新时间倒序）
+
+        Args:
+            cursor: keyset 分页游标（上一页最后一项的 encode_cursor 结果），提供时忽略 offset
+
+        Returns:
+            List[Dict[str, Any]]: 项目JSON快照列表
+        """
+        clauses, params = self._project_filters(user_id, status, tags, query, date_from, date_to)
+        if cursor:
+            updated_at, _, last_id = cursor.partition("|")
+            clauses.append("(p.updated_at < ? OR (p.updated_at = ? AND p.id < ?))")
+            params.extend([updated_at, updated_at, last_id])
+            offset = 0
+
+        sql = "SELECT p.data FROM projects p"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY p.updated_at DESC, p.id DESC"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
+
+        conn = self._get_conn()
+        try:
+            return [json.loads(row[0]) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def count_projects(
+        self,
+        user_id: Optional[str] = None,
+        status: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        query: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> int:
+        """统计满足条件的项目数"""
+        clauses, params = self._project_filters(user_id, status, tags, query, date_from, date_to)
+        sql = "SELECT COUNT(*) FROM projects p"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        conn = self._get_conn()
+        try:
+            return conn.execute(sql, params).fetchone()[0]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def encode_cursor(project: Dict[str, Any]) -> str:
+        """生成 keyset 分页游标"""
+        return f"{_sort_key(project.get('updated_at'))}|{project['id']}"
+
+    # ==================== 文件 ====================
+
+    @staticmethod
+    def _upsert_file(conn: sqlite3.Connection, file_data: Dict[str, Any], rel_path: str) -> None:
+        file_type = file_data.get("file_type")
+        file_type = getattr(file_type, "value", file_type)
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO project_files
+                (id, project_id, path, filename, file_type, agent_source, tags,
+                 created_at, updated_at, file_size, version)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                file_data["id"],
+                file_data.get("project_id"),
+                rel_path,
+                file_data.get("filename"),
+                file_type,
+                file_data.get("agent_source"),
+                json.dumps(file_data.get("tags") or [], ensure_ascii=False),
+                _sort_key(file_data.get("created_at")),
+                _sort_key(file_data.get("updated_at")),
+                file_data.get("file_size", 0),
+                file_data.get("version", 1),
+            )
+        )
+
+    def upsert_file(self, file_data: Dict[str, Any], rel_path: str) -> None:
+        """新增或更新文件记录"""
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                self._upsert_file(conn, file_data, rel_path)
+                conn.commit()
+            finally:
+                conn.close()
+
+    def remove_file(self, project_id: str, file_id: str) -> None:
+        """移除文件记录"""
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                conn.execute(
+                    "DELETE FROM project_files WHERE project_id = ? AND id = ?",
+                    (project_id, file_id)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+    def get_file_path(self, project_id: str, file_id: str) -> Optional[str]:
+        """文件存储路径（相对项目根目录）"""
+        conn = self._get_conn()
+        try:
+            row = conn.execute(
+                "SELECT path FROM project_files WHERE project_id = ? AND id = ?",
+                (project_id, file_id)
+            ).fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+
+    def list_file_paths(self, project_id: str, file_type: Optional[str] = None) -> List[str]:
+        """项目文件路径列表（按创建时间倒序）"""
+        sql = "SELECT path FROM project_files WHERE project_id = ?"
+        params: List[Any] = [project_id]
+        if file_type:
+            sql += " AND file_type = ?"
+            params.append(file_type)
+        sql += " ORDER BY created_at DESC"
+        conn = self._get_conn()
+        try:
+            return [row[0] for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
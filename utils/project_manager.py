@@ -7,7 +7,7 @@
 import json
 import uuid
 import asyncio
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 from datetime import datetime
 import aiofiles
@@ -19,6 +19,8 @@ from apis.core.schemas import (
     ProjectStatus,
     FileType
 )
+from utils.project_catalog import ProjectCatalog
+from utils.project_version_store import ProjectVersionStore, serialize_content
 
 logger = logging.getLogger(__name__)
 
@@ -30,10 +32,12 @@ class ProjectManager:
     功能：
     - 项目的CRUD操作
     - 项目文件管理
-    - 项目搜索和过滤
+    - 项目搜索和过滤（基于 ProjectCatalog 索引，不扫描目录）
     - 项目元数据管理
     """
 
+    CATALOG_FILE = ".catalog.db"
+
     def __init__(self, base_dir: str = "projects"):
         """
         初始化项目管理器
@@ -47,6 +51,14 @@ class ProjectManager:
         # 创建子目录结构
         self._init_directory_structure()
 
+        # 元数据目录（首次使用时从磁盘构建）
+        self.catalog = ProjectCatalog(self.base_dir / self.CATALOG_FILE)
+        self._catalog_ready = False
+        self._catalog_lock = asyncio.Lock()
+
+        # 项目ID -> 版本存储
+        self._version_stores: Dict[str, ProjectVersionStore] = {}
+
     def _init_directory_structure(self):
         """初始化项目目录结构"""
         subdirs = [
@@ -70,6 +82,73 @@ class ProjectManager:
 
         logger.info(f"项目目录结构已初始化: {self.base_dir}")
 
+    async def _ensure_catalog(self):
+        """确保元数据目录已构建（旧数据首次使用时全量扫描一次）"""
+        if self._catalog_ready:
+            return
+        async with self._catalog_lock:
+            if self._catalog_ready:
+                return
+            if not self.catalog.is_built():
+                project_count, file_count = await asyncio.to_thread(self.catalog.rebuild, self.base_dir)
+                logger.info(f"项目元数据目录已构建: {project_count} 个项目, {file_count} 个文件")
+            self._catalog_ready = True
+
+    async def rebuild_catalog(self) -> Tuple[int, int]:
+        """
+        从磁盘全量重建元数据目录（目录外修改项目文件后使用）
+
+        Returns:
+            Tuple[int, int]: (项目数, 文件数)
+        """
+        async with self._catalog_lock:
+            result = await asyncio.to_thread(self.catalog.rebuild, self.base_dir)
+            self._catalog_ready = True
+        return result
+
+    @staticmethod
+    def _dump_file(file_meta: Dict[str, Any], content: Any) -> str:
+        """序列化文件JSON（元数据与内容）"""
+        return json.dumps({**file_meta, "content": content}, ensure_ascii=False, indent=2)
+
+    def _get_version_store(self, project_id: str) -> ProjectVersionStore:
+        store = self._version_stores.get(project_id)
+        if store is None:
+            store = ProjectVersionStore(self.base_dir / project_id / "versions")
+            self._version_stores[project_id] = store
+        return store
+
+    @staticmethod
+    def _file_catalog_entry(file_data: Dict[str, Any]) -> Dict[str, Any]:
+        """文件目录记录（不含内容）"""
+        return {key: value for key, value in file_data.items() if key != "content"}
+
+    async def _find_file_path(self, project_id: str, file_id: str) -> Optional[Path]:
+        """定位文件存储路径：优先查目录，目录缺失时回退扫描并回填"""
+        await self._ensure_catalog()
+        rel_path = self.catalog.get_file_path(project_id, file_id)
+        if rel_path:
+            file_path = self.base_dir / rel_path
+            if file_path.exists():
+                return file_path
+            self.catalog.remove_file(project_id, file_id)
+
+        project_dir = self.base_dir / project_id
+        for file_path in project_dir.rglob(f"{file_id}.json"):
+            if file_path.parent.name == "versions":
+                continue
+            try:
+                async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
+                    file_data = json.loads(await f.read())
+                self.catalog.upsert_file(
+                    self._file_catalog_entry(file_data),
+                    str(file_path.relative_to(self.base_dir))
+                )
+            except Exception as e:
+                logger.warning(f"回填文件目录失败: {file_path}, 错误: {e}")
+            return file_path
+        return None
+
     async def create_project(
         self,
         name: str,
@@ -115,6 +194,7 @@ class ProjectManager:
         project_file = project_dir / "project.json"
         async with aiofiles.open(project_file, 'w', encoding='utf-8') as f:
             await f.write(json.dumps(project_data, ensure_ascii=False, indent=2))
+        self.catalog.upsert_project(project_data)
 
         # 创建子目录
         self._create_project_subdirs(project_dir)
@@ -225,6 +305,7 @@ class ProjectManager:
             if project_dir.exists():
                 import shutil
                 shutil.rmtree(project_dir)
+                self.catalog.remove_project(project_id)
                 logger.info(f"项目已永久删除: {project_id}")
                 return True
             return False
@@ -247,7 +328,7 @@ class ProjectManager:
         status: ProjectStatus = ProjectStatus.ACTIVE,
         tags: List[str] = None,
         page: int = 1,
-        page_size: int = 20
+        page_size: Optional[int] = 20
     ) -> List[Project]:
         """
         列出项目
@@ -257,39 +338,78 @@ class ProjectManager:
             status: 状态过滤
             tags: 标签过滤
             page: 页码
-            page_size: 每页数量
+            page_size: 每页数量（None 表示不分页）
 
         Returns:
-            List[Project]: 项目列表
+            List[Project]: 项目列表（按更新时间倒序）
         """
-        projects = []
-
-        # 遍历项目目录
-        for project_dir in self.base_dir.iterdir():
-            if not project_dir.is_dir():
-                continue
+        await self._ensure_catalog()
+        offset = (page - 1) * page_size if page_size else 0
+        rows = self.catalog.query_projects(
+            user_id=user_id,
+            status=getattr(status, "value", status),
+            tags=tags,
+            limit=page_size,
+            offset=offset
+        )
+        return [Project(**row) for row in rows]
 
-            project = await self.get_project(project_dir.name)
-            if not project:
-                continue
+    async def list_projects_after(
+        self,
+        user_id: str = None,
+        status: ProjectStatus = ProjectStatus.ACTIVE,
+        tags: List[str] = None,
+        cursor: str = None,
+        limit: int = 20
+    ) -> Tuple[List[Project], Optional[str]]:
+        """
+        基于游标（keyset）分页列出项目，翻页代价与页码无关
 
-            # 过滤条件
-            if user_id and project.user_id != user_id:
-                continue
-            if status and project.status != status:
-                continue
-            if tags and not any(tag in project.tags for tag in tags):
-                continue
+        Args:
+            user_id: 用户ID过滤
+            status: 状态过滤
+            tags: 标签过滤
+            cursor: 上一页返回的游标，首页为 None
+            limit: 每页数量
 
-            projects.append(project)
+        Returns:
+            Tuple[List[Project], Optional[str]]: (项目列表, 下一页游标；没有更多时为 None)
+        """
+        await self._ensure_catalog()
+        rows = self.catalog.query_projects(
+            user_id=user_id,
+            status=getattr(status, "value", status),
+            tags=tags,
+            limit=limit + 1,
+            cursor=cursor
+        )
+        next_cursor = self.catalog.encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        return [Project(**row) for row in rows[:limit]], next_cursor
 
-        # 排序：按更新时间倒序
-        projects.sort(key=lambda p: p.updated_at, reverse=True)
+    async def count_projects(
+        self,
+        user_id: str = None,
+        status: ProjectStatus = ProjectStatus.ACTIVE,
+        tags: List[str] = None,
+        query: str = None,
+        date_from: datetime = None,
+        date_to: datetime = None
+    ) -> int:
+        """
+        统计项目数量
 
-        # 分页
-        start = (page - 1) * page_size
-        end = start + page_size
-        return projects[start:end]
+        Returns:
+            int: 满足条件的项目数
+        """
+        await self._ensure_catalog()
+        return self.catalog.count_projects(
+            user_id=user_id,
+            status=getattr(status, "value", status),
+            tags=tags,
+            query=query,
+            date_from=date_from,
+            date_to=date_to
+        )
 
     async def add_file_to_project(
         self,
@@ -338,24 +458,26 @@ class ProjectManager:
 
         file_dir.mkdir(parents=True, exist_ok=True)
 
-        # 保存文件内容
+        # 保存文件内容（规范序列化结果供大小统计与版本存储共用）
         file_path = file_dir / f"{file_id}.json"
-        file_content = {
+        content_bytes = serialize_content(content)
+        file_meta = {
             "id": file_id,
             "project_id": project_id,
             "filename": filename,
             "file_type": file_type.value,
             "agent_source": agent_source,
-            "content": content,
             "tags": tags or [],
             "created_at": now.isoformat(),
             "updated_at": now.isoformat(),
-            "file_size": len(json.dumps(content).encode('utf-8')),
+            "file_size": len(content_bytes),
             "version": 1
         }
 
         async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps(file_content, ensure_ascii=False, indent=2))
+            await f.write(self._dump_file(file_meta, content))
+        self.catalog.upsert_file(file_meta, str(file_path.relative_to(self.base_dir)))
+        await self._save_file_version(project_id, file_meta, content_bytes)
 
         # 更新项目文件计数
         project.file_count += 1
@@ -364,7 +486,7 @@ class ProjectManager:
 
         logger.info(f"文件已添加到项目: {project_id}/{file_id}")
 
-        return ProjectFile(**file_content)
+        return ProjectFile(**file_meta, content=content)
 
     async def get_project_files(
         self,
@@ -385,31 +507,24 @@ class ProjectManager:
         if not project:
             return []
 
-        files = []
-
-        # 遍历项目目录中的所有文件
-        project_dir = self.base_dir / project_id
-        for file_path in project_dir.rglob("*.json"):
-            if file_path.name == "project.json":
-                continue
+        await self._ensure_catalog()
+        rel_paths = self.catalog.list_file_paths(
+            project_id,
+            file_type=file_type.value if file_type else None
+        )
 
+        async def _read(rel_path: str) -> Optional[ProjectFile]:
+            file_path = self.base_dir / rel_path
             try:
                 async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-                    content = await f.read()
-                    file_data = json.loads(content)
-
-                    # 类型过滤
-                    if file_type and file_data.get("file_type") != file_type.value:
-                        continue
-
-                    files.append(ProjectFile(**file_data))
+                    return ProjectFile(**json.loads(await f.read()))
             except Exception as e:
                 logger.warning(f"读取文件失败: {file_path}, 错误: {e}")
+                return None
 
-        # 排序：按创建时间倒序
-        files.sort(key=lambda f: f.created_at, reverse=True)
-
-        return files
+        # 目录已按创建时间倒序
+        files = await asyncio.gather(*(_read(rel_path) for rel_path in rel_paths))
+        return [file for file in files if file is not None]
 
     async def get_file(self, project_id: str, file_id: str) -> Optional[ProjectFile]:
         """
@@ -422,16 +537,17 @@ class ProjectManager:
         Returns:
             ProjectFile: 文件对象，如果不存在返回None
         """
-        # 搜索文件
-        project_dir = self.base_dir / project_id
-        for file_path in project_dir.rglob(f"{file_id}.json"):
-            try:
-                async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-                    content = await f.read()
-                    file_data = json.loads(content)
-                    return ProjectFile(**file_data)
-            except Exception as e:
-                logger.error(f"读取文件失败: {file_path}, 错误: {e}")
+        file_path = await self._find_file_path(project_id, file_id)
+        if not file_path:
+            return None
+
+        try:
+            async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
+                content = await f.read()
+                file_data = json.loads(content)
+                return ProjectFile(**file_data)
+        except Exception as e:
+            logger.error(f"读取文件失败: {file_path}, 错误: {e}")
 
         return None
 
@@ -463,9 +579,9 @@ class ProjectManager:
         # 更新字段
         if filename is not None:
             file.filename = filename
-        if content is not None:
+        content_changed = content is not None
+        if content_changed:
             file.content = content
-            file.file_size = len(json.dumps(content).encode('utf-8'))
             file.version += 1
         if tags is not None:
             file.tags = tags
@@ -473,18 +589,23 @@ class ProjectManager:
         file.updated_at = datetime.now()
 
         # 保存文件
-        project_dir = self.base_dir / project_id
-        for file_path in project_dir.rglob(f"{file_id}.json"):
-            async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
-                await f.write(json.dumps(file.dict(), ensure_ascii=False, indent=2))
+        file_path = await self._find_file_path(project_id, file_id)
+        if not file_path:
+            return None
 
-            # 保存版本历史
-            await self._save_file_version(project_id, file)
+        content_bytes = serialize_content(file.content)
+        file.file_size = len(content_bytes)
+        file_meta = json.loads(file.json(exclude={"content"}))
+        async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
+            await f.write(self._dump_file(file_meta, file.content))
+        self.catalog.upsert_file(file_meta, str(file_path.relative_to(self.base_dir)))
 
-            logger.info(f"文件已更新: {project_id}/{file_id}")
-            return file
+        # 保存版本历史（内容未变化时只更新元数据）
+        if content_changed:
+            await self._save_file_version(project_id, file_meta, content_bytes)
 
-        return None
+        logger.info(f"文件已更新: {project_id}/{file_id}")
+        return file
 
     async def delete_file(self, project_id: str, file_id: str) -> bool:
         """
@@ -501,37 +622,82 @@ class ProjectManager:
         if not project:
             return False
 
-        project_dir = self.base_dir / project_id
-        for file_path in project_dir.rglob(f"{file_id}.json"):
-            file_path.unlink()
+        file_path = await self._find_file_path(project_id, file_id)
+        if not file_path:
+            return False
 
-            # 更新项目文件计数
-            project.file_count = max(0, project.file_count - 1)
-            await self._save_project(project)
+        file_path.unlink()
+        self.catalog.remove_file(project_id, file_id)
+        await asyncio.to_thread(self._get_version_store(project_id).mark_deleted, file_id)
 
-            logger.info(f"文件已删除: {project_id}/{file_id}")
-            return True
+        # 更新项目文件计数
+        project.file_count = max(0, project.file_count - 1)
+        await self._save_project(project)
 
-        return False
+        logger.info(f"文件已删除: {project_id}/{file_id}")
+        return True
 
     async def _save_project(self, project: Project):
         """保存项目到文件"""
         project_file = self.base_dir / project.id / "project.json"
+        project_data = json.loads(project.json())
         async with aiofiles.open(project_file, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps(project.dict(), ensure_ascii=False, indent=2))
+            await f.write(json.dumps(project_data, ensure_ascii=False, indent=2))
+        self.catalog.upsert_project(project_data)
 
-    async def _save_file_version(self, project_id: str, file: ProjectFile):
-        """保存文件版本历史"""
-        version_dir = self.base_dir / project_id / "versions"
-        version_file = version_dir / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.id}.json"
+    async def _save_file_version(self, project_id: str, file_meta: Dict[str, Any], content_bytes: bytes):
+        """保存文件版本历史（按内容哈希去重、增量压缩）"""
+        store = self._get_version_store(project_id)
+        await asyncio.to_thread(store.save_version, file_meta, content_bytes)
 
-        version_data = {
-            "file": file.dict(),
-            "timestamp": datetime.now().isoformat()
-        }
+    async def list_file_versions(self, project_id: str, file_id: str = None) -> List[Dict[str, Any]]:
+        """
+        列出文件版本（只读版本索引，不读取快照内容）
 
-        async with aiofiles.open(version_file, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps(version_data, ensure_ascii=False, indent=2))
+        Args:
+            project_id: 项目ID
+            file_id: 文件ID，None 表示项目内全部文件
+
+        Returns:
+            List[Dict]: 版本记录（file_id、version、hash、size、stored_size、timestamp、meta）
+        """
+        store = self._get_version_store(project_id)
+        return await asyncio.to_thread(store.list_versions, file_id)
+
+    async def get_file_version(self, project_id: str, file_id: str, version: int) -> Optional[ProjectFile]:
+        """
+        获取文件的指定历史版本
+
+        Args:
+            project_id: 项目ID
+            file_id: 文件ID
+            version: 版本号
+
+        Returns:
+            ProjectFile: 该版本的文件对象，不存在返回None
+        """
+        store = self._get_version_store(project_id)
+        try:
+            result = await asyncio.to_thread(store.load_version, file_id, version)
+        except Exception as e:
+            logger.error(f"读取文件版本失败: {project_id}/{file_id}@{version}, 错误: {e}")
+            return None
+        if result is None:
+            return None
+        file_meta, content = result
+        return ProjectFile(**file_meta, content=content)
+
+    async def restore_file_version(self, project_id: str, file_id: str, version: int) -> Optional[ProjectFile]:
+        """
+        将文件内容回退到指定历史版本（作为新版本保存）
+
+        Returns:
+            ProjectFile: 更新后的文件对象
+        """
+        old_file = await self.get_file_version(project_id, file_id, version)
+        if not old_file:
+            return None
+        return await self.update_file(project_id, file_id, content=old_file.content)
 
     async def search_projects(
         self,
@@ -539,47 +705,40 @@ class ProjectManager:
         user_id: str = None,
         tags: List[str] = None,
         date_from: datetime = None,
-        date_to: datetime = None
+        date_to: datetime = None,
+        status: ProjectStatus = None,
+        page: int = 1,
+        page_size: Optional[int] = None
     ) -> List[Project]:
         """
         搜索项目
 
         Args:
-            query: 搜索关键词
+            query: 搜索关键词（匹配名称、描述、标签）
             user_id: 用户ID
             tags: 标签过滤
             date_from: 起始日期
             date_to: 结束日期
+            status: 状态过滤（None 表示全部）
+            page: 页码
+            page_size: 每页数量（None 表示不分页）
 
         Returns:
-            List[Project]: 匹配的项目列表
-        """
-        projects = await self.list_projects(user_id=user_id, status=None)
-
-        # 关键词搜索
-        if query:
-            query_lower = query.lower()
-            projects = [
-                p for p in projects
-                if query_lower in p.name.lower() or
-                   query_lower in p.description.lower() or
-                   any(query_lower in tag.lower() for tag in p.tags)
-            ]
-
-        # 标签过滤
-        if tags:
-            projects = [
-                p for p in projects
-                if any(tag in p.tags for tag in tags)
-            ]
-
-        # 日期过滤
-        if date_from:
-            projects = [p for p in projects if p.created_at >= date_from]
-        if date_to:
-            projects = [p for p in projects if p.created_at <= date_to]
-
-        return projects
+            List[Project]: 匹配的项目列表（按更新时间倒序）
+        """
+        await self._ensure_catalog()
+        offset = (page - 1) * page_size if page_size else 0
+        rows = self.catalog.query_projects(
+            user_id=user_id,
+            status=getattr(status, "value", status),
+            tags=tags,
+            query=query,
+            date_from=date_from,
+            date_to=date_to,
+            limit=page_size,
+            offset=offset
+        )
+        return [Project(**row) for row in rows]
 
     async def duplicate_project(
         self,
@@ -674,7 +833,7 @@ class ProjectManager:
         template_files = []
         if include_files:
             files = await self.get_project_files(project_id)
-            template_files = [f.dict() for f in files]
+            template_files = [json.loads(f.json()) for f in files]
 
         template_data = {
             "id": template_id,
@@ -856,7 +1015,8 @@ class ProjectManager:
         self,
         project_id: str,
         new_name: str = None,
-        restore_files: bool = True
+        restore_files: bool = True,
+        as_of: datetime = None
     ) -> Optional[Project]:
         """
         恢复已归档/删除的项目
@@ -865,6 +1025,7 @@ class ProjectManager:
             project_id: 项目ID
             new_name: 新项目名称
             restore_files: 是否恢复文件
+            as_of: 按版本历史恢复到该时间点的文件状态（None 表示当前文件）
 
         Returns:
             Project: 恢复的项目对象
@@ -897,7 +1058,10 @@ class ProjectManager:
 
         # 恢复文件
         if restore_files:
-            source_files = await self.get_project_files(project_id)
+            if as_of:
+                source_files = await self._load_files_as_of(project_id, as_of)
+            else:
+                source_files = await self.get_project_files(project_id)
             for source_file in source_files:
                 await self.add_file_to_project(
                     project_id=new_project.id,
@@ -911,6 +1075,20 @@ class ProjectManager:
         logger.info(f"项目已恢复: {project_id} -> {new_project.id}")
         return new_project
 
+    async def _load_files_as_of(self, project_id: str, as_of: datetime) -> List[ProjectFile]:
+        """按版本索引取各文件在时间点的最新版本，只读取命中的内容块"""
+        store = self._get_version_store(project_id)
+        entries = await asyncio.to_thread(store.latest_versions, as_of)
+
+        files = []
+        for entry in entries.values():
+            try:
+                file_meta, content = await asyncio.to_thread(store.load_entry, entry)
+                files.append(ProjectFile(**file_meta, content=content))
+            except Exception as e:
+                logger.warning(f"读取文件版本失败: {project_id}/{entry.get('file_id')}, 错误: {e}")
+        return files
+
     async def archive_project(self, project_id: str) -> Optional[Project]:
         """
         归档项目
@@ -0,0 +1,308 @@
+"""
+项目文件版本存储
+按内容哈希去重、压缩保存文件历史版本，版本列表只读索引不读快照
+
+目录结构（每个项目一个，位于 <project>/versions 下）：
+    index.jsonl                 追加写的版本索引：文件元数据 + 内容哈希（删除文件时写入墓碑记录）
+    blobs/<hash[:2]>/<hash>     内容块：一行JSON头（编码、基准块、链深度）+ 压缩数据
+
+内容块编码：
+- zstd-delta：以同一文件上一版本内容为原始字典压缩，只存储变化部分（需要 zstandard）
+- zstd：独立压缩（链深度达到上限时重新起一个完整块）
+- zlib：未安装 zstandard 时的回退编码
+相同内容只存一份，编辑会话中反复保存不会线性增长
+
+版本时间戳按 UTC（带时区）记录；旧索引中不带时区的时间戳与不带时区的查询时间点均按本地时间解释。
+旧版逐次保存的 versions/<时间>_<文件ID>.json 快照在首次访问时导入索引，原文件移入 versions/legacy/
+"""
+import hashlib
+import json
+import os
+import threading
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+
+def serialize_content(content: Any) -> bytes:
+    """文件内容的规范序列化（用于计算大小、哈希与存储）"""
+    return json.dumps(content, ensure_ascii=False).encode("utf-8")
+
+
+def to_utc(value: Any) -> Optional[datetime]:
+    """时间点 / ISO 字符串 -> 带时区的 UTC 时间（不带时区的按本地时间解释），无法解析时返回 None"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    return value.astimezone(timezone.utc)
+
+
+class ProjectVersionStore:
+    """单个项目的文件版本存储"""
+
+    INDEX_FILE = "index.jsonl"
+    LEGACY_DIR = "legacy"
+    MAX_DELTA_CHAIN = 16
+    COMPRESSION_LEVEL = 10
+
+    def __init__(self, version_dir: Path):
+        self.version_dir = Path(version_dir)
+        self.blob_dir = self.version_dir / "blobs"
+        self._lock = threading.RLock()
+        # 文件ID -> 最近版本内容哈希（增量压缩的基准），首次保存时由索引加载
+        self._latest_hashes: Optional[Dict[str, str]] = None
+        self._legacy_checked = False
+
+    # ==================== 内容块 ====================
+
+    def _blob_path(self, content_hash: str) -> Path:
+        return self.blob_dir / content_hash[:2] / content_hash
+
+    def _read_blob_header(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        blob_path = self._blob_path(content_hash)
+        if not blob_path.exists():
+            return None
+        with open(blob_path, "rb") as f:
+            return json.loads(f.readline())
+
+    def _write_blob(self, content_hash: str, data: bytes, base_hash: Optional[str]) -> int:
+        """写入内容块，返回落盘字节数"""
+        header: Dict[str, Any] = {"codec": "zlib", "base": None, "depth": 0}
+        if ZSTD_AVAILABLE:
+            base_header = self._read_blob_header(base_hash) if base_hash else None
+            if base_header is not None and base_header.get("depth", 0) + 1 < self.MAX_DELTA_CHAIN:
+                base_data = self.read_blob(base_hash)
+                dict_data = zstandard.ZstdCompressionDict(base_data, dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+                payload = zstandard.ZstdCompressor(level=self.COMPRESSION_LEVEL, dict_data=dict_data).compress(data)
+                header = {"codec": "zstd-delta", "base": base_hash, "depth": base_header.get("depth", 0) + 1}
+            else:
+                payload = zstandard.ZstdCompressor(level=self.COMPRESSION_LEVEL).compress(data)
+                header = {"codec": "zstd", "base": None, "depth": 0}
+        else:
+            payload = zlib.compress(data, 6)
+
+        blob_path = self._blob_path(content_hash)
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = blob_path.with_name(blob_path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            f.write(payload)
+        os.replace(tmp_path, blob_path)
+        return blob_path.stat().st_size
+
+    def read_blob(self, content_hash: str) -> bytes:
+        """读取内容块（沿增量链还原）"""
+        with open(self._blob_path(content_hash), "rb") as f:
+            header = json.loads(f.readline())
+            payload = f.read()
+
+        codec = header.get("codec")
+        if codec == "zlib":
+            return zlib.decompress(payload)
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError(f"读取版本内容需要 zstandard: {content_hash}")
+        if codec == "zstd":
+            return zstandard.ZstdDecompressor().decompress(payload)
+
+        base_data = self.read_blob(header["base"])
+        dict_data = zstandard.ZstdCompressionDict(base_data, dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+        return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(payload)
+
+    # ==================== 索引 ====================
+
+    def _append_index(self, entry: Dict[str, Any]) -> None:
+        self.version_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.version_dir / self.INDEX_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+
+    def _read_index(self) -> List[Dict[str, Any]]:
+        if not self._legacy_checked:
+            self._import_legacy_snapshots()
+        index_path = self.version_dir / self.INDEX_FILE
+        if not index_path.exists():
+            return []
+        entries = []
+        with open(index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue
+        return entries
+
+    def _import_legacy_snapshots(self) -> None:
+        """
+        导入旧版 <时间>_<文件ID>.json 快照（{"file": 文件数据, "timestamp": ...}）
+
+        按时间顺序写入内容块，索引记录插在已有记录之前（快照均早于新版本索引），
+        导入后原快照移入 legacy/ 目录，不再重复导入
+        """
+        with self._lock:
+            if self._legacy_checked:
+                return
+            snapshots = []
+            for path in self.version_dir.glob("*.json") if self.version_dir.exists() else ():
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    file_data = data["file"]
+                    snapshots.append((to_utc(data.get("timestamp")) or to_utc(file_data.get("updated_at")), path, file_data))
+                except (ValueError, KeyError, TypeError, OSError):
+                    continue
+            if snapshots:
+                epoch = datetime.min.replace(tzinfo=timezone.utc)
+                snapshots.sort(key=lambda item: (item[0] or epoch, item[1].name))
+                base_hashes: Dict[str, str] = {}
+                entries = []
+                for timestamp, _, file_data in snapshots:
+                    content_bytes = serialize_content(file_data.get("content"))
+                    content_hash = hashlib.sha256(content_bytes).hexdigest()
+                    stored_size = 0
+                    if not self._blob_path(content_hash).exists():
+                        stored_size = self._write_blob(content_hash, content_bytes, base_hashes.get(file_data["id"]))
+                    base_hashes[file_data["id"]] = content_hash
+                    entries.append({
+                        "file_id": file_data["id"],
+                        "version": file_data.get("version", 1),
+                        "hash": content_hash,
+                        "size": len(content_bytes),
+                        "stored_size": stored_size,
+                        "timestamp": (timestamp or epoch).isoformat(),
+                        "meta": {key: value for key, value in file_data.items() if key != "content"},
+                        "imported": True
+                    })
+
+                index_path = self.version_dir / self.INDEX_FILE
+                existing = index_path.read_bytes() if index_path.exists() else b""
+                tmp_path = index_path.with_name(index_path.name + ".tmp")
+                with open(tmp_path, "wb") as f:
+                    for entry in entries:
+                        f.write((json.dumps(entry, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+                    f.write(existing)
+                os.replace(tmp_path, index_path)
+
+                legacy_dir = self.version_dir / self.LEGACY_DIR
+                legacy_dir.mkdir(exist_ok=True)
+                for _, path, _ in snapshots:
+                    os.replace(path, legacy_dir / path.name)
+                self._latest_hashes = None
+            self._legacy_checked = True
+
+    def _get_latest_hashes(self) -> Dict[str, str]:
+        if self._latest_hashes is None:
+            self._latest_hashes = {
+                file_id: entry["hash"] for file_id, entry in self.latest_versions().items()
+            }
+        return self._latest_hashes
+
+    # ==================== 版本操作 ====================
+
+    def save_version(self, file_meta: Dict[str, Any], content_bytes: bytes) -> Dict[str, Any]:
+        """
+        保存一个版本
+
+        Args:
+            file_meta: 文件元数据（不含内容），需包含 id 与 version
+            content_bytes: serialize_content 的结果
+
+        Returns:
+            Dict[str, Any]: 版本索引记录
+        """
+        content_hash = hashlib.sha256(content_bytes).hexdigest()
+        with self._lock:
+            latest_hashes = self._get_latest_hashes()
+            stored_size = 0
+            if not self._blob_path(content_hash).exists():
+                stored_size = self._write_blob(content_hash, content_bytes, latest_hashes.get(file_meta["id"]))
+            latest_hashes[file_meta["id"]] = content_hash
+
+            entry = {
+                "file_id": file_meta["id"],
+                "version": file_meta.get("version", 1),
+                "hash": content_hash,
+                "size": len(content_bytes),
+                "stored_size": stored_size,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "meta": {key: value for key, value in file_meta.items() if key != "content"}
+            }
+            self._append_index(entry)
+        return entry
+
+    def mark_deleted(self, file_id: str) -> None:
+        """记录文件删除（墓碑），按时间点恢复时跳过"""
+        with self._lock:
+            self._get_latest_hashes().pop(file_id, None)
+            self._append_index({
+                "file_id": file_id,
+                "deleted": True,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            })
+
+    def list_versions(self, file_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        版本列表（只读索引）
+
+        Returns:
+            List[Dict[str, Any]]: 版本记录，按保存顺序排列
+        """
+        return [
+            entry for entry in self._read_index()
+            if not entry.get("deleted") and (file_id is None or entry.get("file_id") == file_id)
+        ]
+
+    def latest_versions(self, as_of: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        各文件在某一时间点的最新版本（已删除的文件不包含在内）
+
+        Args:
+            as_of: 时间点，None 表示当前（不带时区时按本地时间解释）
+
+        Returns:
+            Dict[str, Dict[str, Any]]: 文件ID -> 版本记录
+        """
+        cutoff = to_utc(as_of) if as_of else None
+        latest: Dict[str, Dict[str, Any]] = {}
+        for entry in self._read_index():
+            if cutoff:
+                timestamp = to_utc(entry.get("timestamp"))
+                if timestamp is None or timestamp > cutoff:
+                    continue
+            if entry.get("deleted"):
+                latest.pop(entry["file_id"], None)
+            else:
+                latest[entry["file_id"]] = entry
+        return latest
+
+    def load_version(self, file_id: str, version: int) -> Optional[Tuple[Dict[str, Any], Any]]:
+        """
+        读取指定版本
+
+        Returns:
+            Optional[Tuple[Dict[str, Any], Any]]: (文件元数据, 内容)
+        """
+        match = None
+        for entry in self.list_versions(file_id):
+            if entry.get("version") == version:
+                match = entry
+        if match is None:
+            return None
+        return self.load_entry(match)
+
+    def load_entry(self, entry: Dict[str, Any]) -> Tuple[Dict[str, Any], Any]:
+        """按版本记录读取（元数据, 内容）"""
+        content = json.loads(self.read_blob(entry["hash"]).decode("utf-8"))
+        return dict(entry.get("meta") or {}), content
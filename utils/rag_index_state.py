@@ -0,0 +1,143 @@
+"""
+RAG 索引状态（SQLite）
+记录每个项目文件当前已写入向量库的内容，用于重建索引时的变更检测
+
+- indexed_files：文件级哈希（内容 + 元数据 + 索引配置）与各分块的 [内容哈希, start_pos, end_pos]
+- 文件哈希未变化时整个文件跳过；否则按分块内容哈希比对（与位置无关）：
+  内容未变的分块不再向量化，只有位置变化的分块复用旧向量、更新 text_id 与偏移后重写
+- 索引配置（向量模型、维度、分块参数、向量后端）变化后所有分块视为变化；已按新配置完成的文件在中断后重跑时直接跳过，
+  因此全量重建可从中断处继续
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+def chunk_hash(content: str) -> str:
+    """分块内容哈希（不含位置，分块移动后仍可匹配）"""
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def file_hash(content: str, fingerprint: str, meta_hash: str) -> str:
+    """文件级哈希"""
+    digest = hashlib.sha256(f"{fingerprint}\n{meta_hash}\n".encode("utf-8"))
+    digest.update(content.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def metadata_hash(metadata: Dict[str, Any]) -> str:
+    """写入每个分块的文件元数据（文件名、类型、标签等）的哈希"""
+    return hashlib.sha1(json.dumps(metadata, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class RagIndexState:
+    """项目文件索引状态"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _get_conn(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_db(self) -> None:
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                conn.executescript(
+                    """
+                    CREATE TABLE IF NOT EXISTS indexed_files (
+                        project_id TEXT NOT NULL,
+                        file_id TEXT NOT NULL,
+                        file_hash TEXT NOT NULL,
+                        fingerprint TEXT NOT NULL,
+                        meta_hash TEXT NOT NULL,
+                        chunk_hashes TEXT NOT NULL,
+                        indexed_at TEXT,
+                        PRIMARY KEY (project_id, file_id)
+                    );
+                    """
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+    def get_file(self, project_id: str, file_id: str) -> Optional[Dict[str, Any]]:
+        """已索引文件的状态，未索引时返回 None"""
+        conn = self._get_conn()
+        try:
+            row = conn.execute(
+                "SELECT file_hash, fingerprint, meta_hash, chunk_hashes FROM indexed_files "
+                "WHERE project_id = ? AND file_id = ?",
+                (project_id, file_id)
+            ).fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return None
+        return {
+            "file_hash": row[0],
+            "fingerprint": row[1],
+            "meta_hash": row[2],
+            "chunk_hashes": json.loads(row[3]),
+        }
+
+    def save_file(
+        self,
+        project_id: str,
+        file_id: str,
+        file_hash: str,
+        fingerprint: str,
+        meta_hash: str,
+        chunk_hashes: List[List[Any]]
+    ) -> None:
+        """记录文件已按当前内容完成索引"""
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO indexed_files "
+                    "(project_id, file_id, file_hash, fingerprint, meta_hash, chunk_hashes, indexed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        project_id, file_id, file_hash, fingerprint, meta_hash,
+                        json.dumps(chunk_hashes), datetime.now().isoformat()
+                    )
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+    def remove_file(self, project_id: str, file_id: str) -> None:
+        """移除文件状态（删除文件或索引写入失败时调用，下次将完整重建）"""
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                conn.execute(
+                    "DELETE FROM indexed_files WHERE project_id = ? AND file_id = ?",
+                    (project_id, file_id)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+
+_rag_index_state: Optional[RagIndexState] = None
+
+
+def get_rag_index_state() -> RagIndexState:
+    """获取全局索引状态"""
+    global _rag_index_state
+    if _rag_index_state is None:
+        _rag_index_state = RagIndexState(Path(os.getenv("RAG_INDEX_STATE_DB", "data/rag_index_state.db")))
+    return _rag_index_state
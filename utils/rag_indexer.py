@@ -6,35 +6,18 @@ RAG 索引器
 - 智能分块（语义感知、结构感知）
 - 混合检索（向量+BM25）
 - LLM重排序
+- 增量重建：按分块哈希比对已索引内容，只向量化并重写变化的分块
 """
 import json
-import re
 import asyncio
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from dataclasses import dataclass
-from enum import Enum
 
 from utils.logger import JubenLogger
 from utils.aliyun_embedding_client import aliyun_embedding_client
 from utils.milvus_client import get_milvus_client
-
-
-class ChunkingStrategy(Enum):
-    """分块策略"""
-    FIXED = "fixed"           # 固定大小分块
-    SEMANTIC = "semantic"     # 语义感知分块
-    STRUCTURAL = "structural" # 结构感知分块
-    ADAPTIVE = "adaptive"     # 自适应分块
-
-
-@dataclass
-class ChunkInfo:
-    """分块信息"""
-    content: str
-    chunk_index: int
-    start_pos: int
-    end_pos: int
-    metadata: Dict[str, Any]
+from utils.text_chunker import ChunkingStrategy, ChunkInfo, iter_chunks
+from utils.rag_index_state import chunk_hash, file_hash, get_rag_index_state, metadata_hash
 
 
 @dataclass
@@ -63,14 +46,13 @@ class RagIndexer:
     # 语义分块参数
     MIN_CHUNK_SIZE = 200
     MAX_CHUNK_SIZE = 1500
-    SENTENCE_ENDINGS = ['。', '！', '？', '.', '!', '?']
-    PARAGRAPH_SEPARATOR = '\n\n'
 
     def __init__(self, chunking_strategy: ChunkingStrategy = ChunkingStrategy.SEMANTIC):
         self.logger = JubenLogger("rag_indexer")
         self.embedding_client = aliyun_embedding_client
         self.chunking_strategy = chunking_strategy
-        self._bm25_index = None  # BM25索引缓存
+        self._bm25_indexes: Dict[str, Any] = {}  # project_id -> BM25Retriever（首次混合检索时懒加载）
+        self._bm25_lock = asyncio.Lock()
 
     async def _ensure_collection(self) -> bool:
         client = await get_milvus_client()
@@ -81,217 +63,34 @@ class RagIndexer:
             description="Project file fragments for RAG"
         )
 
-    def _chunk_text(self, text: str) -> List[str]:
-        """
-        智能分块 - 根据策略选择分块方法
-        """
-        if not text:
-            return []
-
-        if self.chunking_strategy == ChunkingStrategy.FIXED:
-            return self._fixed_chunking(text)
-        elif self.chunking_strategy == ChunkingStrategy.SEMANTIC:
-            return self._semantic_chunking(text)
-        elif self.chunking_strategy == ChunkingStrategy.STRUCTURAL:
-            return self._structural_chunking(text)
-        else:  # ADAPTIVE
-            return self._adaptive_chunking(text)
-
-    def _fixed_chunking(self, text: str) -> List[str]:
-        """固定大小分块（原有方法）"""
-        chunks = []
-        start = 0
-        length = len(text)
-        while start < length:
-            end = min(start + self.CHUNK_SIZE, length)
-            chunk = text[start:end].strip()
-            if chunk:
-                chunks.append(chunk)
-            start = end - self.OVERLAP
-            if start < 0:
-                start = 0
-        return chunks
-
-    def _semantic_chunking(self, text: str) -> List[str]:
+    def iter_chunks(self, text: str) -> Iterator[ChunkInfo]:
         """
-        语义感知分块 - 在句子边界处分块
+        流式分块 - 根据策略产出带原文偏移的分块
         """
-        chunks = []
-        paragraphs = text.split(self.PARAGRAPH_SEPARATOR)
-        current_chunk = ""
-        current_start = 0
-
-        for para in paragraphs:
-            para = para.strip()
-            if not para:
-                continue
-
-            sentences = self._split_sentences(para)
-
-            for sentence in sentences:
-                sentence = sentence.strip()
-                if not sentence:
-                    continue
-
-                test_chunk = current_chunk + ("\n\n" if current_chunk else "") + sentence
-                test_size = len(test_chunk)
-
-                if test_size <= self.MAX_CHUNK_SIZE:
-                    current_chunk = test_chunk
-                else:
-                    # 当前块已满，保存并开始新块
-                    if current_chunk:
-                        chunks.append(current_chunk)
-
-                    # 如果单句超过最大块大小，强制分割
-                    if len(sentence) > self.MAX_CHUNK_SIZE:
-                        sub_chunks = self._split_long_sentence(sentence)
-                        chunks.extend(sub_chunks[:-1])
-                        current_chunk = sub_chunks[-1] if sub_chunks else ""
-                    else:
-                        current_chunk = sentence
-
-        # 添加最后一块
-        if current_chunk:
-            chunks.append(current_chunk)
-
-        return chunks
-
-    def _split_sentences(self, text: str) -> List[str]:
-        """分割句子"""
-        sentences = []
-        current = ""
-        i = 0
-
-        while i < len(text):
-            char = text[i]
-            current += char
-
-            # 检查是否是句子结束符
-            if char in self.SENTENCE_ENDINGS:
-                # 检查是否是引用（如"..."）
-                if i > 0 and text[i-1] == '.' and char == '.':
-                    i += 1
-                    continue
-                sentences.append(current)
-                current = ""
-
-            i += 1
-
-        if current:
-            sentences.append(current)
-
-        return sentences
-
-    def _split_long_sentence(self, sentence: str) -> List[str]:
-        """分割过长的句子"""
-        chunks = []
-        pos = 0
-        while pos < len(sentence):
-            end = min(pos + self.CHUNK_SIZE, len(sentence))
-            # 尝试在逗号或空格处分割
-            if end < len(sentence):
-                comma_pos = sentence.rfind(',', pos, end)
-                space_pos = sentence.rfind(' ', pos, end)
-                split_pos = max(comma_pos, space_pos)
-                if split_pos > pos:
-                    end = split_pos + 1
-            chunks.append(sentence[pos:end].strip())
-            pos = end
-        return [c for c in chunks if c]
-
-    def _structural_chunking(self, text: str) -> List[str]:
-        """
-        结构感知分块 - 检测Markdown、JSON等结构
-        """
-        # 检测是否是JSON
-        if text.strip().startswith('{') or text.strip().startswith('['):
-            return self._json_chunking(text)
-
-        # 检测是否是Markdown
-        if text.strip().startswith('#'):
-            return self._markdown_chunking(text)
-
-        # 默认使用语义分块
-        return self._semantic_chunking(text)
+        return iter_chunks(
+            text,
+            self.chunking_strategy,
+            chunk_size=self.CHUNK_SIZE,
+            overlap=self.OVERLAP,
+            max_chunk_size=self.MAX_CHUNK_SIZE
+        )
 
-    def _json_chunking(self, text: str) -> List[str]:
-        """JSON结构分块"""
-        try:
-            data = json.loads(text)
-            chunks = []
-
-            if isinstance(data, dict):
-                for key, value in data.items():
-                    chunk = json.dumps({key: value}, ensure_ascii=False, indent=2)
-                    if len(chunk) > self.MAX_CHUNK_SIZE:
-                        # 继续分割
-                        sub_chunks = self._semantic_chunking(chunk)
-                        chunks.extend(sub_chunks)
-                    else:
-                        chunks.append(chunk)
-            elif isinstance(data, list):
-                for item in data:
-                    chunk = json.dumps(item, ensure_ascii=False, indent=2)
-                    if len(chunk) > self.MAX_CHUNK_SIZE:
-                        sub_chunks = self._semantic_chunking(chunk)
-                        chunks.extend(sub_chunks)
-                    else:
-                        chunks.append(chunk)
-            else:
-                chunks.append(text)
-
-            return chunks
-        except:
-            return self._semantic_chunking(text)
-
-    def _markdown_chunking(self, text: str) -> List[str]:
-        """Markdown结构分块"""
-        chunks = []
-        current_chunk = ""
-        current_header = ""
-
-        lines = text.split('\n')
-        for line in lines:
-            # 检测标题
-            if line.strip().startswith('#'):
-                # 保存前一块
-                if current_chunk:
-                    chunks.append(current_chunk)
-
-                current_header = line.strip()
-                current_chunk = line + '\n'
-            else:
-                current_chunk += line + '\n'
-
-            # 检查块大小
-            if len(current_chunk) >= self.MAX_CHUNK_SIZE:
-                chunks.append(current_chunk)
-                current_chunk = ""
-
-        if current_chunk:
-            chunks.append(current_chunk)
-
-        return chunks
-
-    def _adaptive_chunking(self, text: str) -> List[str]:
+    def _chunk_text(self, text: str) -> List[str]:
         """
-        自适应分块 - 根据内容特征自动选择策略
+        智能分块 - 根据策略选择分块方法
         """
-        # 检测结构化内容
-        if text.strip().startswith(('{', '[', '#')):
-            return self._structural_chunking(text)
-
-        # 检测段落结构
-        if self.PARAGRAPH_SEPARATOR in text:
-            para_count = len([p for p in text.split(self.PARAGRAPH_SEPARATOR) if p.strip()])
-            if para_count > 3:
-                return self._semantic_chunking(text)
-
-        # 默认使用固定大小分块
-        return self._fixed_chunking(text)
+        return [chunk.content for chunk in self.iter_chunks(text)]
+
+    @property
+    def index_fingerprint(self) -> str:
+        """索引配置指纹：向量模型或分块参数变化后，已索引的分块全部视为变化"""
+        return (
+            f"{self.embedding_client.model}:{self.embedding_client.dimension}:"
+            f"{self.chunking_strategy.value}:{self.CHUNK_SIZE}:{self.OVERLAP}:{self.MAX_CHUNK_SIZE}"
+        )
 
     async def delete_project_file_chunks(self, project_id: str, file_id: str) -> None:
+        await asyncio.to_thread(get_rag_index_state().remove_file, project_id, file_id)
         try:
             client = await get_milvus_client()
             expr = f'text_id like "{project_id}:{file_id}:%"'
@@ -299,6 +98,8 @@ class RagIndexer:
         except Exception as e:
             self.logger.warning(f"删除旧向量失败: {e}")
 
+        await self._remove_bm25_file(project_id, file_id)
+
     async def index_project_file(
         self,
         project_id: str,
@@ -309,30 +110,88 @@ class RagIndexer:
         agent_source: Optional[str] = None,
         tags: Optional[List[str]] = None,
         reindex: bool = True
-    ) -> None:
+    ) -> Optional[Dict[str, Any]]:
+        """
+        索引项目文件
+
+        reindex=True 时与已索引内容比对：文件未变化直接跳过，否则只向量化内容变化的分块；
+        reindex=False 表示调用方确认该文件没有已索引数据，直接写入且不删除任何旧向量
+
+        Returns:
+            {"status": "unchanged" | "indexed", "embedded": 向量化分块数,
+             "moved": 复用旧向量、仅更新位置的分块数, "kept": 原样保留分块数}，
+            内容为空或失败时返回 None
+        """
+        state_store = get_rag_index_state()
         try:
             if content is None:
-                return
+                return None
 
             if not isinstance(content, str):
                 content = json.dumps(content, ensure_ascii=False, indent=2)
 
             if not content.strip():
-                return
-
-            if reindex:
-                await self.delete_project_file_chunks(project_id, file_id)
-
-            await self._ensure_collection()
-
-            chunks = self._chunk_text(content)
-            if not chunks:
-                return
-
-            vectors = self.embedding_client.embed_texts(chunks)
-            if not vectors or len(vectors) != len(chunks):
-                self.logger.warning("向量化失败或数量不匹配")
-                return
+                return None
+
+            file_metadata = {
+                "filename": filename,
+                "file_type": file_type,
+                "agent_source": agent_source,
+                "tags": tags or [],
+            }
+            client = await get_milvus_client()
+            # 向量后端计入指纹：回退到本地存储期间写入的分块，切回 Milvus 后全部重写
+            fingerprint = f"{self.index_fingerprint}:{client.backend}"
+            meta_hash = metadata_hash(file_metadata)
+            current_hash = file_hash(content, fingerprint, meta_hash)
+
+            previous = await asyncio.to_thread(state_store.get_file, project_id, file_id) if reindex else None
+            if previous and previous["file_hash"] == current_hash:
+                return {"status": "unchanged", "embedded": 0, "moved": 0, "kept": len(previous["chunk_hashes"])}
+
+            chunk_infos = list(self.iter_chunks(content))
+            if not chunk_infos:
+                if reindex:
+                    await self.delete_project_file_chunks(project_id, file_id)
+                return None
+            chunks = [chunk.content for chunk in chunk_infos]
+            entries = [[chunk_hash(chunk.content), chunk.start_pos, chunk.end_pos] for chunk in chunk_infos]
+
+            # 索引配置或元数据变化时全部分块重写，旧数据整体删除
+            rebuild_all = previous is None or (
+                previous["fingerprint"] != fingerprint or previous["meta_hash"] != meta_hash
+            )
+            old_entries: List[List[Any]] = [] if rebuild_all else previous["chunk_hashes"]
+
+            # 按内容哈希匹配旧分块（与位置无关），优先匹配同一序号
+            matched: Dict[int, int] = {
+                idx: idx for idx, entry in enumerate(entries)
+                if idx < len(old_entries) and old_entries[idx][0] == entry[0]
+            }
+            unmatched_old: Dict[str, List[int]] = {}
+            for old_idx, old_entry in enumerate(old_entries):
+                if old_idx not in matched:
+                    unmatched_old.setdefault(old_entry[0], []).append(old_idx)
+            for idx, entry in enumerate(entries):
+                if idx not in matched and unmatched_old.get(entry[0]):
+                    matched[idx] = unmatched_old[entry[0]].pop(0)
+
+            # 序号与偏移都未变的分块原样保留；只移动了位置的分块复用旧向量，按新序号与偏移重写
+            kept = {idx for idx, old_idx in matched.items() if old_idx == idx and old_entries[idx] == entries[idx]}
+            moved = {idx: old_idx for idx, old_idx in matched.items() if idx not in kept}
+            old_ids = {idx: f"{project_id}:{file_id}:{old_idx}" for idx, old_idx in moved.items()}
+            stored = await client.get_vectors(self.COLLECTION_NAME, list(old_ids.values())) if moved else {}
+            vectors_by_idx = {idx: stored[old_id] for idx, old_id in old_ids.items() if old_id in stored}
+
+            to_embed = [idx for idx in range(len(chunks)) if idx not in kept and idx not in vectors_by_idx]
+            if to_embed:
+                await self._ensure_collection()
+                vectors = await self.embedding_client.aembed_texts([chunks[idx] for idx in to_embed])
+                if not vectors or len(vectors) != len(to_embed):
+                    self.logger.warning("向量化失败或数量不匹配")
+                    return None
+                vectors_by_idx.update(zip(to_embed, vectors))
+            to_write = [idx for idx in range(len(chunks)) if idx not in kept]
 
             text_ids = [f"{project_id}:{file_id}:{idx}" for idx in range(len(chunks))]
             metadata_list: List[Dict[str, Any]] = []
@@ -340,23 +199,58 @@ class RagIndexer:
                 metadata_list.append({
                     "project_id": project_id,
                     "file_id": file_id,
-                    "filename": filename,
-                    "file_type": file_type,
-                    "agent_source": agent_source,
-                    "tags": tags or [],
-                    "chunk_index": idx
+                    **file_metadata,
+                    "chunk_index": idx,
+                    "start_pos": chunk_infos[idx].start_pos,
+                    "end_pos": chunk_infos[idx].end_pos
                 })
 
-            client = await get_milvus_client()
-            await client.insert_vectors(
+            # reindex=False 表示调用方确认没有旧数据，不做任何删除
+            if reindex and previous is None:
+                # 没有索引状态（首次索引或状态丢失）：清理可能残留的旧数据
+                await client.delete_by_expr(self.COLLECTION_NAME, f'text_id like "{project_id}:{file_id}:%"')
+            elif reindex and rebuild_all:
+                if not await client.delete_by_expr(
+                    self.COLLECTION_NAME, f'text_id like "{project_id}:{file_id}:%"'
+                ):
+                    raise RuntimeError("删除文件旧向量失败")
+            elif reindex:
+                replaced = [f"{project_id}:{file_id}:{idx}" for idx in range(len(old_entries)) if idx not in kept]
+                if replaced and not await client.delete_by_expr(
+                    self.COLLECTION_NAME, f"text_id in {json.dumps(replaced, ensure_ascii=False)}"
+                ):
+                    raise RuntimeError("删除变化分块的旧向量失败")
+
+            # 先清除状态：写入中途失败时下次完整重建
+            if previous is not None:
+                await asyncio.to_thread(state_store.remove_file, project_id, file_id)
+
+            if to_write and not await client.insert_vectors(
                 collection_name=self.COLLECTION_NAME,
-                text_ids=text_ids,
-                contents=chunks,
-                vectors=vectors,
-                metadata_list=metadata_list
+                text_ids=[text_ids[idx] for idx in to_write],
+                contents=[chunks[idx] for idx in to_write],
+                vectors=[vectors_by_idx[idx] for idx in to_write],
+                metadata_list=[metadata_list[idx] for idx in to_write]
+            ):
+                raise RuntimeError("写入变化分块的向量失败")
+
+            await self._index_bm25_file(project_id, file_id, text_ids, chunks, metadata_list)
+            await asyncio.to_thread(
+                state_store.save_file, project_id, file_id, current_hash, fingerprint, meta_hash, entries
             )
+            return {
+                "status": "indexed",
+                "embedded": len(to_embed),
+                "moved": len(to_write) - len(to_embed),
+                "kept": len(kept)
+            }
         except Exception as e:
             self.logger.error(f"索引项目文件失败: {e}")
+            try:
+                await asyncio.to_thread(state_store.remove_file, project_id, file_id)
+            except Exception:
+                pass
+            return None
 
     # ==================== 增强检索功能 ====================
 
@@ -389,7 +283,7 @@ class RagIndexer:
                 self.logger.warning("Milvus客户端不可用")
                 return []
 
-            query_vector = self.embedding_client.embed_text(query)
+            query_vector = await self.embedding_client.aembed_text(query)
             if not query_vector:
                 self.logger.warning("查询向量化失败")
                 return []
@@ -469,15 +363,14 @@ class RagIndexer:
             )
 
             # 获取BM25索引
-            if not self._bm25_index:
-                await self._build_bm25_index(project_id)
+            bm25_index = await self._build_bm25_index(project_id)
 
-            if not self._bm25_index:
+            if not bm25_index:
                 # BM25不可用，仅使用向量结果
                 return vector_results[:top_k]
 
             # 执行BM25搜索
-            bm25_results = self._bm25_index.search(query, top_k=top_k * 2)
+            bm25_results = bm25_index.search(query, top_k=top_k * 2)
 
             # 合并结果
             combined_results = self._combine_search_results(
@@ -501,21 +394,87 @@ class RagIndexer:
             self.logger.error(f"混合搜索失败: {e}")
             return []
 
-    async def _build_bm25_index(self, project_id: Optional[str] = None) -> None:
-        """构建BM25索引"""
+    async def _build_bm25_index(self, project_id: Optional[str] = None):
+        """
+        获取项目BM25索引，首次使用时从持久化分段懒加载（无需重新分词）
+
+        未指定项目时不做全库BM25检索，返回None
+        """
+        if not project_id:
+            return None
+
+        index = self._bm25_indexes.get(project_id)
+        if index is not None:
+            return index
+
         try:
             from utils.bm25_retriever import BM25Retriever
+            from utils.bm25_index_store import get_bm25_index_store
+
+            async with self._bm25_lock:
+                index = self._bm25_indexes.get(project_id)
+                if index is None:
+                    documents = await asyncio.to_thread(
+                        get_bm25_index_store().load_project, project_id
+                    )
+                    index = BM25Retriever()
+                    index.add_tokenized_documents(documents)
+                    self._bm25_indexes[project_id] = index
+            return index
 
-            # 获取所有文档
-            client = await get_milvus_client()
-            if not client:
-                return
+        except Exception as e:
+            self.logger.warning(f"构建BM25索引失败: {e}")
+            return None
 
-            # 这里简化处理，实际应该从数据库或缓存中获取文档
-            self._bm25_index = BM25Retriever()
+    async def _index_bm25_file(
+        self,
+        project_id: str,
+        file_id: str,
+        text_ids: List[str],
+        chunks: List[str],
+        metadata_list: List[Dict[str, Any]]
+    ) -> None:
+        """分词并写入文件的BM25分段，同步已加载的内存索引"""
+        try:
+            from collections import Counter
+            from utils.bm25_retriever import BM25Retriever
+            from utils.bm25_index_store import get_bm25_index_store
+
+            def _tokenize_and_save() -> List[Dict[str, int]]:
+                tokenizer = BM25Retriever()
+                term_freqs = [dict(Counter(tokenizer._tokenize(chunk))) for chunk in chunks]
+                get_bm25_index_store().save_file_segment(
+                    project_id, file_id, text_ids, chunks, metadata_list, term_freqs
+                )
+                return term_freqs
+
+            term_freqs = await asyncio.to_thread(_tokenize_and_save)
 
+            index = self._bm25_indexes.get(project_id)
+            if index is not None:
+                index.remove_documents(
+                    [doc_id for doc_id in index._doc_index if doc_id.startswith(f"{project_id}:{file_id}:")]
+                )
+                index.add_tokenized_documents([
+                    {"doc_id": doc_id, "content": chunk, "metadata": metadata, "term_freqs": term_freq}
+                    for doc_id, chunk, metadata, term_freq in zip(text_ids, chunks, metadata_list, term_freqs)
+                ])
         except Exception as e:
-            self.logger.warning(f"构建BM25索引失败: {e}")
+            self.logger.warning(f"更新BM25索引失败: {e}")
+
+    async def _remove_bm25_file(self, project_id: str, file_id: str) -> None:
+        """删除文件的BM25分段，同步已加载的内存索引"""
+        try:
+            from utils.bm25_index_store import get_bm25_index_store
+
+            doc_ids = await asyncio.to_thread(
+                get_bm25_index_store().delete_file_segment, project_id, file_id
+            )
+            index = self._bm25_indexes.get(project_id)
+            if index is not None and doc_ids:
+                index.remove_documents(doc_ids)
+        except Exception as e:
+            self.logger.warning(f"删除BM25索引失败: {e}")
 
     def _combine_search_results(
         self,
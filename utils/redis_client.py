@@ -396,6 +396,106 @@ class JubenRedisClient:
             self.logger.error(f"❌ Redis LTRIM失败: {key}, {e}")
             return False
 
+    @staticmethod
+    def _decode_stream_entries(entries) -> List[tuple]:
+        """Stream条目解码为 (条目ID, 字段字典)"""
+        decoded = []
+        for entry_id, fields in entries or []:
+            if isinstance(entry_id, bytes):
+                entry_id = entry_id.decode('utf-8')
+            decoded.append((entry_id, {
+                (k.decode('utf-8') if isinstance(k, bytes) else k):
+                (v.decode('utf-8') if isinstance(v, bytes) else v)
+                for k, v in fields.items()
+            }))
+        return decoded
+
+    async def xadd_many(
+        self,
+        key: str,
+        entries: List[Dict[str, Any]],
+        maxlen: Optional[int] = None,
+        expire: Optional[int] = None,
+        ids: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        批量追加Stream条目（单次往返：XADD... + EXPIRE 管道）
+
+        Args:
+            key: Stream键
+            entries: 条目字段列表
+            maxlen: 近似长度上限（MAXLEN ~）
+            expire: 过期时间（秒）
+            ids: 显式条目ID（需单调递增），默认由Redis生成
+
+        Returns:
+            List[str]: 写入的条目ID
+        """
+        try:
+            client = await self._get_client()
+            if not client or not entries:
+                return []
+
+            pipe = client.pipeline(transaction=False)
+            for index, fields in enumerate(entries):
+                pipe.xadd(
+                    key,
+                    fields,
+                    id=ids[index] if ids else '*',
+                    maxlen=maxlen,
+                    approximate=True
+                )
+            if expire:
+                pipe.expire(key, expire)
+            results = await pipe.execute()
+            return [
+                r.decode('utf-8') if isinstance(r, bytes) else r
+                for r in results[:len(entries)]
+            ]
+
+        except Exception as e:
+            self.logger.error(f"❌ Redis XADD失败: {key}, {e}")
+            return []
+
+    async def xlen(self, key: str) -> int:
+        """获取Stream长度"""
+        try:
+            client = await self._get_client()
+            if not client:
+                return 0
+
+            return int(await client.xlen(key))
+
+        except Exception as e:
+            self.logger.error(f"❌ Redis XLEN失败: {key}, {e}")
+            return 0
+
+    async def xrange(self, key: str, start: str = '-', end: str = '+', count: Optional[int] = None) -> List[tuple]:
+        """按ID范围读取Stream条目（正序）"""
+        try:
+            client = await self._get_client()
+            if not client:
+                return []
+
+            return self._decode_stream_entries(await client.xrange(key, start, end, count=count))
+
+        except Exception as e:
+            self.logger.error(f"❌ Redis XRANGE失败: {key}, {e}")
+            return []
+
+    async def xrevrange(self, key: str, end: str = '+', start: str = '-', count: Optional[int] = None) -> List[tuple]:
+        """按ID范围读取Stream条目（倒序）"""
+        try:
+            client = await self._get_client()
+            if not client:
+                return []
+
+            return self._decode_stream_entries(await client.xrevrange(key, end, start, count=count))
+
+        except Exception as e:
+            self.logger.error(f"❌ Redis XREVRANGE失败: {key}, {e}")
+            return []
+
     async def setex(self, key: str, seconds: int, value: Any) -> bool:
         """设置键值并指定过期时间（兼容接口）"""
         try:
@@ -18,6 +18,7 @@ try:
     from .project_manager import ProjectManager
     from .aliyun_embedding_client import aliyun_embedding_client
     from .milvus_client import get_milvus_client
+    from .fragment_embedding_index import get_fragment_embedding_index
 except ImportError:
     import sys
     from pathlib import Path
@@ -29,6 +30,7 @@ except ImportError:
     from utils.project_manager import ProjectManager
     from utils.aliyun_embedding_client import aliyun_embedding_client
     from utils.milvus_client import get_milvus_client
+    from utils.fragment_embedding_index import get_fragment_embedding_index
 
 
 class JubenReferenceResolver:
@@ -43,9 +45,10 @@ class JubenReferenceResolver:
     5. 缓存解析结果
 
     智能片段读取（新增）：
-    1. 检查引用文件大小，>10KB 触发 Milvus 向量检索
+    1. 检查引用文件大小，>10KB 触发向量检索
     2. 根据用户当前问题，提取最相关的前3个片段
     3. 保持与 BaseJubenAgent 的接口兼容性
+    4. 片段向量按文件内容哈希持久化，同一内容只向量化一次，查询时只向量化问题
     """
 
     # 文件大小阈值：10KB
@@ -54,6 +57,9 @@ class JubenReferenceResolver:
     # 向量搜索返回的片段数量
     TOP_FRAGMENTS = 3
 
+    # 片段大小
+    FRAGMENT_CHUNK_SIZE = 1000
+
     # Milvus 集合名称
     FILE_FRAGMENTS_COLLECTION = "file_fragments"
 
@@ -66,6 +72,8 @@ class JubenReferenceResolver:
         self._embedding_client = aliyun_embedding_client
         self._milvus_client = None
         self._file_cache = {}  # 文件内容缓存
+        self._fragment_index = get_fragment_embedding_index()
+        self._fragment_keys: Dict[str, Tuple[int, int, str]] = {}  # 文件路径 -> (mtime_ns, size, 片段索引键)
         self._reference_trace: List[Dict[str, Any]] = []
 
         # 引用模式定义
@@ -589,7 +597,7 @@ class JubenReferenceResolver:
             if not client:
                 return []
 
-            vector = self._embedding_client.embed_text(query)
+            vector = await self._embedding_client.aembed_text(query)
             if not vector:
                 return []
 
@@ -683,9 +691,9 @@ class JubenReferenceResolver:
         智能片段读取
 
         核心逻辑：
-        1. 读取文件内容并分块
+        1. 获取文件的片段向量索引（按内容哈希复用，首次时批量向量化全部片段）
         2. 对查询文本进行向量化
-        3. 使用 Milvus 进行相似度检索
+        3. 与片段向量矩阵做一次矩阵-向量乘法计算相似度
         4. 返回最相关的前3个片段
 
         Args:
@@ -703,46 +711,92 @@ class JubenReferenceResolver:
                 content = await self._read_file_content(file_path)
                 return self._generate_file_summary(file_identifier, content)
 
-            # 读取文件内容
-            content = await self._read_file_content(file_path)
-            if not content:
-                return f"[File content unavailable: {file_identifier}]"
-
-            # 分块处理
-            fragments = self._split_into_fragments(content)
-            if not fragments:
-                return f"[File is empty: {file_identifier}]"
+            # 获取（或首次建立）片段向量索引
+            entry = await self._get_fragment_entry(file_path)
+            if entry is None:
+                content = await self._read_file_content(file_path)
+                if not content:
+                    return f"[File content unavailable: {file_identifier}]"
+                fragments = self._split_into_fragments(content, self.FRAGMENT_CHUNK_SIZE)
+                if not fragments:
+                    return f"[File is empty: {file_identifier}]"
+                self.logger.warning("片段向量化失败，使用前3个片段")
+                return self._format_fragments(file_identifier, fragments[:self.TOP_FRAGMENTS])
 
-            # 获取查询向量
-            query_embedding = self._embedding_client.embed_text(query)
+            # 获取查询向量（每次引用只需这一次向量化调用）
+            query_embedding = await self._embedding_client.aembed_text(query)
             if not query_embedding:
                 self.logger.warning("查询向量化失败，使用前3个片段")
-                return self._format_fragments(file_identifier, fragments[:self.TOP_FRAGMENTS])
-
-            # 计算每个片段的相似度
-            scored_fragments = []
-            for i, fragment in enumerate(fragments):
-                fragment_embedding = self._embedding_client.embed_text(fragment)
-                if fragment_embedding:
-                    similarity = self._cosine_similarity(query_embedding, fragment_embedding)
-                    scored_fragments.append((similarity, i, fragment))
-
-            # 按相似度排序，取前3个
-            scored_fragments.sort(key=lambda x: x[0], reverse=True)
-            top_fragments = [f[2] for f in scored_fragments[:self.TOP_FRAGMENTS]]
-
-            # 可选：将片段索引到 Milvus 以便下次快速检索
-            await self._index_fragments_to_milvus(file_path, fragments, user_id)
+                return self._format_fragments(file_identifier, entry.fragments[:self.TOP_FRAGMENTS])
+
+            # 一次矩阵-向量乘法完成所有片段的打分
+            hits = self._fragment_index.search(entry, query_embedding, self.TOP_FRAGMENTS)
+            scored_fragments = [(score, i, entry.fragments[i]) for score, i in hits]
+            top_fragments = [f[2] for f in scored_fragments]
+
+            # 新建的索引同步到 Milvus，复用已计算的向量
+            if entry.created:
+                entry.created = False
+                await self._index_fragments_to_milvus(
+                    file_path, entry.fragments, user_id, embeddings=np.asarray(entry.matrix).tolist()
+                )
 
-            return self._format_fragments(file_identifier, top_fragments, scored_fragments[:self.TOP_FRAGMENTS])
+            return self._format_fragments(file_identifier, top_fragments, scored_fragments)
 
         except Exception as e:
             self.logger.error(f"❌ 智能片段读取失败: {e}")
             # 降级：返回前3个片段
             content = await self._read_file_content(file_path)
-            fragments = self._split_into_fragments(content)
+            fragments = self._split_into_fragments(content, self.FRAGMENT_CHUNK_SIZE)
             return self._format_fragments(file_identifier, fragments[:self.TOP_FRAGMENTS])
 
+    async def _get_fragment_entry(self, file_path: str):
+        """
+        获取文件的片段向量索引
+
+        文件未修改（mtime 与大小不变）时直接按已知键读取，不再读取和分块文件；
+        内容变化时按新内容哈希建立索引（片段一次性批量向量化），该文件的旧版本索引随之删除
+
+        Args:
+            file_path: 文件路径
+
+        Returns:
+            FragmentEntry，向量化失败时返回 None
+        """
+        try:
+            stat = Path(file_path).stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            signature = None
+
+        known = self._fragment_keys.get(file_path)
+        if signature and known and known[:2] == signature:
+            entry = self._fragment_index.load(known[2])
+            if entry is not None:
+                return entry
+
+        content = await self._read_file_content(file_path)
+        if not content:
+            return None
+
+        key = self._fragment_index.content_key(
+            content, self._embedding_client.model, self.FRAGMENT_CHUNK_SIZE
+        )
+        entry = self._fragment_index.load(key)
+        if entry is not None:
+            self._fragment_index.bind_source(file_path, key)
+        else:
+            fragments = self._split_into_fragments(content, self.FRAGMENT_CHUNK_SIZE)
+            if not fragments:
+                return None
+            entry = await self._fragment_index.get_or_build(
+                key, fragments, self._embedding_client.aembed_texts, self._embedding_client.model,
+                source=file_path
+            )
+        if entry is not None and signature:
+            self._fragment_keys[file_path] = (*signature, key)
+        return entry
+
     def _split_into_fragments(self, content: str, chunk_size: int = 1000) -> List[str]:
         """
         将文本分割成语义相关的片段
@@ -830,7 +884,8 @@ class JubenReferenceResolver:
         self,
         file_path: str,
         fragments: List[str],
-        user_id: str
+        user_id: str,
+        embeddings: Optional[List[List[float]]] = None
     ) -> bool:
         """
         将片段索引到 Milvus
@@ -839,6 +894,7 @@ class JubenReferenceResolver:
             file_path: 文件路径
             fragments: 片段列表
             user_id: 用户ID
+            embeddings: 已计算的片段向量（与片段一一对应），不传时批量向量化
 
         Returns:
             bool: 是否成功
@@ -848,30 +904,24 @@ class JubenReferenceResolver:
             if not milvus_client:
                 return False
 
+            if embeddings is None:
+                embeddings = await self._embedding_client.aembed_texts(fragments)
+            if not embeddings or len(embeddings) != len(fragments):
+                return False
+
             # 为每个片段生成 ID
-            text_ids = []
-            embeddings = []
-            metadata_list = []
-
-            for i, fragment in enumerate(fragments):
-                text_id = f"{user_id}_{file_path}_{i}"
-                embedding = self._embedding_client.embed_text(fragment)
-
-                if embedding:
-                    text_ids.append(text_id)
-                    embeddings.append(embedding)
-                    metadata_list.append({
-                        "file_path": file_path,
-                        "fragment_index": i,
-                        "user_id": user_id
-                    })
+            text_ids = [f"{user_id}_{file_path}_{i}" for i in range(len(fragments))]
+            metadata_list = [
+                {"file_path": file_path, "fragment_index": i, "user_id": user_id}
+                for i in range(len(fragments))
+            ]
 
             # 批量插入
-            if text_ids and embeddings:
+            if text_ids:
                 await milvus_client.insert_vectors(
                     collection_name=self.FILE_FRAGMENTS_COLLECTION,
                     text_ids=text_ids,
-                    contents=fragments[:len(text_ids)],
+                    contents=fragments,
                     vectors=embeddings,
                     metadata_list=metadata_list
                 )
@@ -907,7 +957,7 @@ class JubenReferenceResolver:
                 return []
 
             # 获取查询向量
-            query_embedding = self._embedding_client.embed_text(query)
+            query_embedding = await self._embedding_client.aembed_text(query)
             if not query_embedding:
                 return []
 
@@ -0,0 +1,116 @@
+"""
+混合检索结果融合
+多路检索结果按倒数排名融合（RRF）排序，并用 SimHash 识别近似重复内容
+
+RRF 只依赖各路结果的排名，不需要对向量相似度与文本相似度做分数归一化；
+SimHash 基于字符 n-gram 指纹，能识别只有少量字词差异的同一段内容
+"""
+import hashlib
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# RRF 平滑常数（经验值）
+RRF_K = 60
+
+# SimHash 指纹位数与近似重复判定阈值（汉明距离）
+# 检索片段较短，单字改动即影响约 3 个 n-gram；无关片段的距离通常在 30 左右
+SIMHASH_BITS = 64
+NEAR_DUPLICATE_DISTANCE = 10
+
+
+def _shingles(text: str, size: int = 3) -> List[str]:
+    """字符 n-gram（忽略空白，适用于中文等无分词文本）"""
+    compact = "".join(text.split())
+    if len(compact) <= size:
+        return [compact] if compact else []
+    return [compact[i:i + size] for i in range(len(compact) - size + 1)]
+
+
+def simhash(text: str, size: int = 3) -> int:
+    """
+    计算文本的 SimHash 指纹
+
+    Args:
+        text: 文本
+        size: n-gram 长度
+
+    Returns:
+        int: 64 位指纹
+    """
+    shingles = _shingles(text or "", size)
+    if not shingles:
+        return 0
+    digests = b"".join(
+        hashlib.blake2b(shingle.encode("utf-8"), digest_size=SIMHASH_BITS // 8).digest() for shingle in shingles
+    )
+    # 每个 n-gram 一行 64 位（高位在前），逐位统计 1 与 0 的票数差
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(len(shingles), -1), axis=1)
+    weights = 2 * bits.sum(axis=0, dtype=np.int64) - len(shingles)
+    return int.from_bytes(np.packbits(weights > 0).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """两个指纹的汉明距离"""
+    return bin(a ^ b).count("1")
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: Dict[str, Sequence[Dict[str, Any]]],
+    k: int = RRF_K,
+    weights: Optional[Dict[str, float]] = None,
+    max_distance: int = NEAR_DUPLICATE_DISTANCE,
+) -> List[Dict[str, Any]]:
+    """
+    多路检索结果融合：RRF 打分 + 近似重复合并
+
+    同一内容（或近似重复内容）出现在多路结果中时合并为一条，分数累加，
+    type 标记为 hybrid，similarity 取各路最大值
+
+    Args:
+        ranked_lists: 来源名 -> 按相关度降序排列的结果
+        k: RRF 平滑常数
+        weights: 来源权重，默认均为 1
+        max_distance: 判定近似重复的最大汉明距离
+
+    Returns:
+        List[Dict[str, Any]]: 按 rrf_score 降序排列的结果（附带 rrf_score 与 sources）
+    """
+    fused: List[Dict[str, Any]] = []
+    fingerprints: List[int] = []
+
+    for source, items in ranked_lists.items():
+        weight = (weights or {}).get(source, 1.0)
+        for rank, item in enumerate(items, start=1):
+            content = item.get("content") or ""
+            if not content:
+                continue
+            score = weight / (k + rank)
+            fingerprint = simhash(content)
+
+            match = None
+            for index, existing in enumerate(fingerprints):
+                if hamming_distance(existing, fingerprint) <= max_distance:
+                    match = index
+                    break
+
+            if match is None:
+                entry = dict(item)
+                entry["rrf_score"] = score
+                entry["sources"] = [source]
+                fused.append(entry)
+                fingerprints.append(fingerprint)
+                continue
+
+            entry = fused[match]
+            entry["rrf_score"] += score
+            if source not in entry["sources"]:
+                entry["sources"].append(source)
+                entry["type"] = "hybrid"
+            entry["similarity"] = max(entry.get("similarity", 0.0), item.get("similarity", 0.0))
+            # 近似重复时保留更完整的内容
+            if len(content) > len(entry.get("content") or ""):
+                entry["content"] = content
+
+    fused.sort(key=lambda entry: entry["rrf_score"], reverse=True)
+    return fused
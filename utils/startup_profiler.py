@@ -0,0 +1,231 @@
+"""
+启动性能分析
+记录启动阶段耗时与模块导入耗时树，用于定位 worker 冷启动的慢路径
+
+- 阶段耗时：phase() 上下文管理器记录各初始化阶段（始终开启，开销可忽略）
+- 导入耗时树：STARTUP_PROFILE=true 时在 sys.meta_path 最前面安装计时 finder，
+  记录每个模块执行（含扩展模块加载）的累计耗时与自身耗时，按导入嵌套关系组织成树
+- 模块执行前恢复原始 loader，模块本身看不到计时代理
+"""
+import importlib.abc
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _ImportNode:
+    """导入耗时树节点"""
+
+    __slots__ = ("name", "cumulative_ms", "children")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.cumulative_ms = 0.0
+        self.children: List["_ImportNode"] = []
+
+    @property
+    def self_ms(self) -> float:
+        return max(self.cumulative_ms - sum(child.cumulative_ms for child in self.children), 0.0)
+
+    def to_dict(self, min_ms: float) -> Dict[str, Any]:
+        children = sorted(
+            (child for child in self.children if child.cumulative_ms >= min_ms),
+            key=lambda child: child.cumulative_ms,
+            reverse=True
+        )
+        return {
+            "module": self.name,
+            "cumulative_ms": round(self.cumulative_ms, 2),
+            "self_ms": round(self.self_ms, 2),
+            "children": [child.to_dict(min_ms) for child in children],
+        }
+
+
+class _TimedLoader:
+    """计时 loader 代理：create_module（扩展模块在此加载）与 exec_module 计入同一节点"""
+
+    def __init__(self, loader, fullname: str, profiler: "StartupProfiler"):
+        self._loader = loader
+        self._fullname = fullname
+        self._profiler = profiler
+        self._create_ms = 0.0
+
+    def create_module(self, spec):
+        create_module = getattr(self._loader, "create_module", None)
+        if create_module is None:
+            return None
+        start = time.perf_counter()
+        try:
+            return create_module(spec)
+        finally:
+            self._create_ms = (time.perf_counter() - start) * 1000
+
+    def exec_module(self, module):
+        module.__loader__ = self._loader
+        if getattr(module, "__spec__", None) is not None:
+            module.__spec__.loader = self._loader
+        with self._profiler._time_import(self._fullname, self._create_ms):
+            self._loader.exec_module(module)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class _ImportTimingFinder(importlib.abc.MetaPathFinder):
+    """委托给其余 finder 查找模块，并用计时代理包装找到的 loader"""
+
+    def __init__(self, profiler: "StartupProfiler"):
+        self._profiler = profiler
+        self._local = threading.local()
+
+    def find_spec(self, fullname, path, target=None):
+        # finder 内部触发的导入交给其余 finder 处理
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            spec = None
+            for finder in list(sys.meta_path):
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+        finally:
+            self._local.finding = False
+
+        if spec is None or spec.loader is None or not hasattr(spec.loader, "exec_module"):
+            return spec
+        spec.loader = _TimedLoader(spec.loader, fullname, self._profiler)
+        return spec
+
+
+class StartupProfiler:
+    """启动性能分析器"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.phases: List[Dict[str, Any]] = []
+        self._roots: List[_ImportNode] = []
+        self._local = threading.local()
+        self._finder: Optional[_ImportTimingFinder] = None
+
+    @property
+    def import_profiling(self) -> bool:
+        return self._finder is not None
+
+    def start_import_profiling(self) -> None:
+        """安装导入计时 finder（之后的新导入才会被记录）"""
+        if self._finder is None:
+            self._finder = _ImportTimingFinder(self)
+            sys.meta_path.insert(0, self._finder)
+
+    def stop_import_profiling(self) -> None:
+        """移除导入计时 finder，已记录的导入树保留"""
+        if self._finder is not None:
+            try:
+                sys.meta_path.remove(self._finder)
+            except ValueError:
+                pass
+            self._finder = None
+
+    @contextmanager
+    def _time_import(self, name: str, extra_ms: float = 0.0) -> Iterator[None]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        node = _ImportNode(name)
+        (stack[-1].children if stack else self._roots).append(node)
+        stack.append(node)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stack.pop()
+            node.cumulative_ms = (time.perf_counter() - start) * 1000 + extra_ms
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """记录一个初始化阶段的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append({
+                "phase": name,
+                "offset_ms": round((start - self.started_at) * 1000, 2),
+                "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+            })
+
+    def import_tree(self, min_ms: float = 1.0) -> List[Dict[str, Any]]:
+        """
+        导入耗时树
+
+        Args:
+            min_ms: 累计耗时低于该值的节点不输出
+
+        Returns:
+            List[Dict[str, Any]]: 顶层导入节点（按累计耗时降序），子节点为其触发的嵌套导入
+        """
+        roots = sorted(
+            (node for node in self._roots if node.cumulative_ms >= min_ms),
+            key=lambda node: node.cumulative_ms,
+            reverse=True
+        )
+        return [node.to_dict(min_ms) for node in roots]
+
+    def top_imports(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """自身耗时最高的模块（不含其触发的嵌套导入）"""
+        nodes = []
+        pending = list(self._roots)
+        while pending:
+            node = pending.pop()
+            nodes.append(node)
+            pending.extend(node.children)
+        nodes.sort(key=lambda node: node.self_ms, reverse=True)
+        return [
+            {"module": node.name, "self_ms": round(node.self_ms, 2), "cumulative_ms": round(node.cumulative_ms, 2)}
+            for node in nodes[:limit]
+        ]
+
+    def report(self, min_ms: float = 1.0, limit: int = 20) -> Dict[str, Any]:
+        """启动分析报告"""
+        report: Dict[str, Any] = {
+            "elapsed_ms": round((time.perf_counter() - self.started_at) * 1000, 2),
+            "phases": list(self.phases),
+            "import_profiling": self.import_profiling or bool(self._roots),
+        }
+        if self._roots:
+            report["import_total_ms"] = round(sum(node.cumulative_ms for node in self._roots), 2)
+            report["top_imports"] = self.top_imports(limit)
+            report["import_tree"] = self.import_tree(min_ms)
+        return report
+
+    def log_summary(self, limit: int = 10) -> None:
+        """输出阶段耗时与最慢的导入"""
+        phases = ", ".join(f"{phase['phase']}={phase['duration_ms']:.0f}ms" for phase in self.phases)
+        logger.info(f"⏱️ 启动阶段耗时: {phases}")
+        if self._roots:
+            slowest = ", ".join(
+                f"{item['module']}={item['self_ms']:.0f}ms" for item in self.top_imports(limit)
+            )
+            logger.info(f"⏱️ 最慢的模块导入（自身耗时）: {slowest}")
+
+
+_startup_profiler: Optional[StartupProfiler] = None
+
+
+def get_startup_profiler() -> StartupProfiler:
+    """获取全局启动分析器（STARTUP_PROFILE=true 时首次获取即开始记录导入耗时）"""
+    global _startup_profiler
+    if _startup_profiler is None:
+        _startup_profiler = StartupProfiler()
+        if os.getenv("STARTUP_PROFILE", "false").lower() == "true":
+            _startup_profiler.start_import_profiling()
+    return _startup_profiler
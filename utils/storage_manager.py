@@ -15,8 +15,10 @@ from utils.database_client import (
     fetch_one,
     fetch_all,
     execute,
+    copy_records,
 )
 from utils.redis_client import JubenRedisClient, get_redis_client, test_redis_connection
+from utils.stream_event_buffer import StreamEventBuffer
 
 
 @dataclass
@@ -169,6 +171,20 @@ class JubenStorageManager:
             'auto_summary_enabled': True  # 启用自动摘要
         }
         
+        # 流式事件写缓冲配置
+        self.stream_event_config = {
+            'batch_size': 100,      # 单会话缓冲达到该数量立即落库
+            'flush_interval': 0.5,  # 最长缓冲时间（秒）
+            'max_pending': 5000,    # 全局待写上限（背压）
+            'cache_size': 50        # Redis中每会话保留的最近事件数
+        }
+        self.stream_event_buffer = StreamEventBuffer(
+            self._write_stream_events,
+            batch_size=self.stream_event_config['batch_size'],
+            flush_interval=self.stream_event_config['flush_interval'],
+            max_pending=self.stream_event_config['max_pending']
+        )
+        
         self._initialized = False
     
     async def initialize(self):
@@ -1450,12 +1466,23 @@ class JubenStorageManager:
     
     # ==================== 流式事件存储 ====================
     
+    STREAM_EVENT_COLUMNS = [
+        'id', 'user_id', 'session_id', 'event_type', 'content_type', 'agent_source',
+        'event_data', 'event_metadata', 'is_replayed', 'created_at'
+    ]
+    
     async def save_stream_event(self, user_id: str, session_id: str, event_type: str, 
                                content_type: Optional[str], agent_source: str, 
                                event_data: Any, event_metadata: Dict[str, Any] = None) -> Optional[str]:
-        """保存流式事件"""
+        """
+        保存流式事件（写缓冲，按批次落库）
+        
+        事件ID在本地生成并立即返回，事件随所在批次写入PostgreSQL与Redis；
+        需要立即可读时调用 flush_stream_events
+        """
         try:
             event_dict = {
+                'id': str(uuid.uuid4()),
                 'user_id': user_id,
                 'session_id': session_id,
                 'event_type': event_type,
@@ -1466,49 +1493,74 @@ class JubenStorageManager:
                 'is_replayed': False,
                 'created_at': datetime.now().isoformat()
             }
-            
-            # 1. 保存到PostgreSQL
-            async def _save_to_db():
-                sql = """
-                INSERT INTO stream_events (
-                    user_id, session_id, event_type, content_type, agent_source,
-                    event_data, event_metadata, is_replayed, created_at
-                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-                RETURNING id
-                """
-                row = await fetch_one(
-                    sql,
-                    event_dict["user_id"],
-                    event_dict["session_id"],
-                    event_dict["event_type"],
-                    event_dict.get("content_type"),
-                    event_dict.get("agent_source"),
-                    event_dict.get("event_data"),
-                    event_dict.get("event_metadata") or {},
-                    event_dict.get("is_replayed", False),
-                    event_dict.get("created_at"),
-                )
-                return row["id"] if row else None
-            
-            event_id = await self.error_handler.with_retry(_save_to_db, "保存流式事件")
-            
-            # 2. 缓存到Redis（最近的事件）
-            if event_id and self.redis_client:
-                cache_key = f"juben:stream_events:{user_id}:{session_id}"
-                event_dict['id'] = event_id
-                await self.redis_client.lpush(cache_key, event_dict)
-                # 只保留最近50个事件在缓存中
-                await self.redis_client.lrange(cache_key, 0, 49)
-            
-            return event_id
+            await self.stream_event_buffer.add(event_dict)
+            return event_dict['id']
             
         except Exception as e:
             self.logger.error(f"❌ 保存流式事件失败: {e}")
             return None
     
+    async def _write_stream_events(self, events: List[Dict[str, Any]]):
+        """批量写入一批流式事件（COPY 落库 + 每会话一次 Redis 推入）"""
+        records = [
+            (
+                uuid.UUID(event['id']),
+                event['user_id'],
+                event['session_id'],
+                event['event_type'],
+                event.get('content_type'),
+                event.get('agent_source'),
+                json.dumps(event.get('event_data'), ensure_ascii=False, default=str),
+                json.dumps(event.get('event_metadata') or {}, ensure_ascii=False, default=str),
+                event.get('is_replayed', False),
+                datetime.fromisoformat(event['created_at']).astimezone(),
+            )
+            for event in events
+        ]
+        
+        async def _save_to_db():
+            return await copy_records('stream_events', self.STREAM_EVENT_COLUMNS, records)
+        
+        await self.error_handler.with_retry(_save_to_db, "批量保存流式事件")
+        
+        # 缓存到Redis（每会话最近的事件，新事件在前）
+        if self.redis_client:
+            sessions: Dict[tuple, List[Dict[str, Any]]] = {}
+            for event in events:
+                sessions.setdefault((event['user_id'], event['session_id']), []).append(event)
+            cache_size = self.stream_event_config['cache_size']
+            for (user_id, session_id), session_events in sessions.items():
+                cache_key = f"juben:stream_events:{user_id}:{session_id}"
+                await self.redis_client.lpush(cache_key, *session_events[-cache_size:])
+                await self.redis_client.ltrim(cache_key, 0, cache_size - 1)
+        
+        self.logger.debug(f"💾 批量保存流式事件: {len(events)} 条")
+    
+    async def flush_stream_events(self, user_id: Optional[str] = None, session_id: Optional[str] = None) -> int:
+        """
+        立即落库缓冲中的流式事件
+        
+        Args:
+            user_id: 用户ID（与 session_id 同时提供时只刷写该会话）
+            session_id: 会话ID
+        
+        Returns:
+            int: 写入的事件数量
+        """
+        try:
+            if user_id and session_id:
+                return await self.stream_event_buffer.flush_session(user_id, session_id)
+            return await self.stream_event_buffer.flush_all()
+        except Exception as e:
+            self.logger.error(f"❌ 刷写流式事件失败: {e}")
+            return 0
+    
     async def get_stream_events(self, user_id: str, session_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """获取流式事件"""
         try:
+            # 先落库该会话缓冲中的事件，保证读到最新写入
+            await self.flush_stream_events(user_id, session_id)
+            
             # 1. 尝试从Redis获取
             if self.redis_client:
                 cache_key = f"juben:stream_events:{user_id}:{session_id}"
@@ -1543,10 +1595,9 @@ class JubenStorageManager:
             # 3. 缓存到Redis
             if events and self.redis_client:
                 cache_key = f"juben:stream_events:{user_id}:{session_id}"
-                for event in reversed(events):
-                    await self.redis_client.lpush(cache_key, event)
-                # 只保留最近50个事件在缓存中
-                await self.redis_client.lrange(cache_key, 0, 49)
+                await self.redis_client.lpush(cache_key, *reversed(events))
+                # 只保留最近的事件在缓存中
+                await self.redis_client.ltrim(cache_key, 0, self.stream_event_config['cache_size'] - 1)
             
             return events or []
             
@@ -1574,6 +1625,8 @@ class JubenStorageManager:
     async def close(self):
         """关闭存储管理器"""
         try:
+            await self.stream_event_buffer.close()
+            
             if self.redis_client:
                 await self.redis_client.close()
             
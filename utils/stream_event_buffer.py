@@ -0,0 +1,248 @@
+"""
+流式事件写缓冲（write-behind）
+按会话缓冲流式事件，达到数量或时间阈值时整批落库，避免每个事件一次数据库往返
+
+- 单会话缓冲达到 batch_size 立即刷写该会话
+- 其余事件最多延迟 flush_interval 秒后统一刷写
+- 全局待写事件达到 max_pending 时，写入方等待刷写完成（背压）
+- flush_session 用于会话完成/读取前保证该会话事件已全部落库
+- 写入失败的事件放回缓冲，按指数退避（flush_interval 起，最长 MAX_RETRY_DELAY 秒）重新调度刷写
+- 整批连续失败 ISOLATE_AFTER_FAILURES 次后改为二分写入，定位导致整批失败的事件；
+  单独写入累计失败 MAX_EVENT_FAILURES 次的事件转入死信（默认写入错误日志），其余事件正常落库
+"""
+import asyncio
+import json
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from utils.logger import JubenLogger
+
+SessionKey = Tuple[str, str]
+FlushCallback = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+DeadLetterCallback = Callable[[List[Dict[str, Any]], BaseException], Awaitable[None]]
+
+
+class StreamEventBuffer:
+    """按会话缓冲的流式事件写入器"""
+
+    MIN_RETRY_DELAY = 0.1
+    MAX_RETRY_DELAY = 30.0
+    # 整批连续失败该次数后二分定位失败事件
+    ISOLATE_AFTER_FAILURES = 3
+    # 单个事件单独写入失败该次数后转入死信
+    MAX_EVENT_FAILURES = 3
+    # 二分写入时尚无任何事件写入成功、已有该数量的单个事件失败，视为存储不可用，停止本轮二分
+    ISOLATION_PROBE = 3
+
+    def __init__(
+        self,
+        flush_callback: FlushCallback,
+        batch_size: int = 100,
+        flush_interval: float = 0.5,
+        max_pending: int = 5000,
+        dead_letter_callback: Optional[DeadLetterCallback] = None
+    ):
+        """
+        初始化写缓冲
+
+        Args:
+            flush_callback: 批量写入回调，接收同一批次的事件列表（可跨会话）
+            batch_size: 单会话缓冲达到该数量时立即刷写
+            flush_interval: 最长缓冲时间（秒）
+            max_pending: 全局待写事件上限，超过后写入方等待刷写
+            dead_letter_callback: 死信回调，接收无法写入的事件与最后一次异常，默认写入错误日志
+        """
+        self.logger = JubenLogger("stream_event_buffer")
+        self.flush_callback = flush_callback
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval)
+        self.max_pending = max(self.batch_size, max_pending)
+        self.dead_letter_callback = dead_letter_callback or self._log_dead_letters
+
+        self._buffers: "OrderedDict[SessionKey, List[Dict[str, Any]]]" = OrderedDict()
+        self._pending_count = 0
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._retry_delay = 0.0
+        self._batch_failures = 0  # 整批写入连续失败次数
+        self._event_failures: Dict[int, int] = {}  # id(事件) -> 单独写入失败次数
+        self._dead_letter_count = 0
+        self._closed = False
+
+    @property
+    def pending_count(self) -> int:
+        """待写事件数量"""
+        return self._pending_count
+
+    @property
+    def dead_letter_count(self) -> int:
+        """已转入死信的事件数量"""
+        return self._dead_letter_count
+
+    async def add(self, event: Dict[str, Any]) -> None:
+        """
+        加入一个事件（需包含 user_id 与 session_id）
+
+        Args:
+            event: 事件记录
+        """
+        if self._pending_count >= self.max_pending:
+            # 背压：写入方等待积压事件落库后再继续
+            await self.flush_all()
+
+        key = (event["user_id"], event["session_id"])
+        buffer = self._buffers.setdefault(key, [])
+        buffer.append(event)
+        self._pending_count += 1
+
+        if len(buffer) >= self.batch_size:
+            await self.flush_session(*key)
+        else:
+            self._schedule_flush()
+
+    def _schedule_flush(self, delay: Optional[float] = None) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            delay = self.flush_interval if delay is None else delay
+            self._flush_task = asyncio.create_task(self._delayed_flush(delay))
+
+    def _schedule_retry(self) -> None:
+        """写入失败后按指数退避重新调度刷写"""
+        if self._closed:
+            return
+        self._retry_delay = min(
+            max(self._retry_delay * 2, self.flush_interval, self.MIN_RETRY_DELAY),
+            self.MAX_RETRY_DELAY
+        )
+        self.logger.warning(f"⚠️ 流式事件写入失败，{self._retry_delay:.1f} 秒后重试（待写 {self._pending_count} 条）")
+        self._schedule_flush(self._retry_delay)
+
+    async def _delayed_flush(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        # 刷写失败时需要能重新调度
+        self._flush_task = None
+        try:
+            await self.flush_all()
+        except Exception as e:
+            self.logger.error(f"❌ 定时刷写流式事件失败: {e}")
+
+    def _take(self, keys: List[SessionKey]) -> List[Dict[str, Any]]:
+        batch: List[Dict[str, Any]] = []
+        for key in keys:
+            events = self._buffers.pop(key, None)
+            if events:
+                batch.extend(events)
+        self._pending_count -= len(batch)
+        return batch
+
+    def _requeue(self, batch: List[Dict[str, Any]]) -> None:
+        """写入失败的事件放回缓冲头部，超出上限的最旧事件丢弃"""
+        overflow = self._pending_count + len(batch) - self.max_pending
+        if overflow > 0:
+            self.logger.error(f"❌ 流式事件积压超过上限，丢弃 {overflow} 条最旧事件")
+            for event in batch[:overflow]:
+                self._event_failures.pop(id(event), None)
+            batch = batch[overflow:]
+
+        grouped: "OrderedDict[SessionKey, List[Dict[str, Any]]]" = OrderedDict()
+        for event in batch:
+            grouped.setdefault((event["user_id"], event["session_id"]), []).append(event)
+        for key, events in grouped.items():
+            self._buffers[key] = events + self._buffers.get(key, [])
+        self._pending_count += len(batch)
+
+    async def _log_dead_letters(self, events: List[Dict[str, Any]], error: BaseException) -> None:
+        for event in events:
+            self.logger.error(f"❌ 流式事件写入失败已转入死信（{error!r}）: {json.dumps(event, ensure_ascii=False, default=str)}")
+
+    async def _flush(self, keys: List[SessionKey]) -> int:
+        async with self._flush_lock:
+            batch = self._take(keys)
+            if not batch:
+                return 0
+            if self._batch_failures >= self.ISOLATE_AFTER_FAILURES:
+                return await self._flush_isolating(batch)
+            try:
+                await self.flush_callback(batch)
+            except Exception:
+                self._batch_failures += 1
+                self._requeue(batch)
+                self._schedule_retry()
+                raise
+            self._batch_failures = 0
+            self._retry_delay = 0.0
+            return len(batch)
+
+    async def _flush_isolating(self, batch: List[Dict[str, Any]]) -> int:
+        """
+        二分写入，定位导致整批失败的事件（调用方持有刷写锁）
+
+        单独写入失败的事件累计失败次数，达到 MAX_EVENT_FAILURES 后转入死信；
+        尚无事件写入成功时连续 ISOLATION_PROBE 个单事件失败，视为存储不可用，剩余事件放回缓冲
+        """
+        written = [False] * len(batch)
+        failed: List[int] = []
+        last_error: Optional[BaseException] = None
+        ranges = [(0, len(batch))]
+        while ranges:
+            start, end = ranges.pop()
+            try:
+                await self.flush_callback(batch[start:end])
+            except Exception as e:
+                last_error = e
+                if end - start > 1:
+                    mid = (start + end) // 2
+                    ranges.extend([(mid, end), (start, mid)])
+                    continue
+                failed.append(start)
+                self._event_failures[id(batch[start])] = self._event_failures.get(id(batch[start]), 0) + 1
+                if len(failed) >= self.ISOLATION_PROBE and not any(written):
+                    break
+                continue
+            written[start:end] = [True] * (end - start)
+
+        dead = [idx for idx in failed if self._event_failures[id(batch[idx])] >= self.MAX_EVENT_FAILURES]
+        dead_set = set(dead)
+        for idx, event in enumerate(batch):
+            if written[idx] or idx in dead_set:
+                self._event_failures.pop(id(event), None)
+        if dead:
+            self._dead_letter_count += len(dead)
+            try:
+                await self.dead_letter_callback([batch[idx] for idx in dead], last_error)
+            except Exception as e:
+                self.logger.error(f"❌ 写入流式事件死信失败: {e}")
+
+        remaining = [event for idx, event in enumerate(batch) if not written[idx] and idx not in dead_set]
+        if remaining:
+            self._requeue(remaining)
+            self._schedule_retry()
+            raise last_error
+        self._batch_failures = 0
+        self._retry_delay = 0.0
+        return sum(written)
+
+    async def flush_session(self, user_id: str, session_id: str) -> int:
+        """
+        刷写单个会话的缓冲事件
+
+        Returns:
+            int: 写入的事件数量
+        """
+        return await self._flush([(user_id, session_id)])
+
+    async def flush_all(self) -> int:
+        """
+        刷写全部缓冲事件
+
+        Returns:
+            int: 写入的事件数量
+        """
+        return await self._flush(list(self._buffers.keys()))
+
+    async def close(self) -> None:
+        """停止定时刷写并写入剩余事件"""
+        self._closed = True
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        self._flush_task = None
+        await self.flush_all()
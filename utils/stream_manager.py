@@ -6,7 +6,7 @@
 创建时间：2026年2月7日
 
 功能：
-1. 流式事件缓存（Redis 暂存最后 50 个 token）
+1. 流式事件缓存（每条消息一个 Redis Stream，条目ID即序列号）
 2. 断点续传支持
 3. 异常处理和 SSE 错误事件
 4. Message ID 生成和追踪
@@ -88,8 +88,8 @@ class StreamSessionManager:
     3. 支持断点续传
     """
 
-    # Redis 键前缀
-    STREAM_CACHE_PREFIX = "stream:cache:"
+    # Redis 键前缀（事件日志为 Stream 类型，条目ID为 "<sequence>-0"）
+    STREAM_CACHE_PREFIX = "stream:log:"
     STREAM_META_PREFIX = "stream:meta:"
 
     # 配置
@@ -124,6 +124,23 @@ class StreamSessionManager:
             message_id: 消息 ID
             event: 流式事件
 
+        Returns:
+            bool: 是否保存成功
+        """
+        return await self.save_events(message_id, [event])
+
+    async def save_events(
+        self,
+        message_id: str,
+        events: List[StreamEvent]
+    ) -> bool:
+        """
+        批量保存事件到 Redis Stream（XADD + EXPIRE 单次往返）
+
+        Args:
+            message_id: 消息 ID
+            events: 流式事件（序列号递增）
+
         Returns:
             bool: 是否保存成功
         """
@@ -132,22 +149,15 @@ class StreamSessionManager:
             if not redis:
                 return False
 
-            # 缓存键
             cache_key = f"{self.STREAM_CACHE_PREFIX}{message_id}"
-
-            # 事件数据
-            event_data = json.dumps(event.to_dict())
-
-            # 使用 Redis List 存储事件
-            await redis.rpush(cache_key, event_data)
-
-            # 限制缓存大小
-            await redis.ltrim(cache_key, -self.MAX_CACHE_SIZE, -1)
-
-            # 设置过期时间
-            await redis.expire(cache_key, self.CACHE_TTL)
-
-            return True
+            entry_ids = await redis.xadd_many(
+                cache_key,
+                [{"event": json.dumps(event.to_dict(), ensure_ascii=False)} for event in events],
+                maxlen=self.MAX_CACHE_SIZE,
+                expire=self.CACHE_TTL,
+                ids=[f"{event.sequence}-0" for event in events]
+            )
+            return len(entry_ids) == len(events)
 
         except Exception as e:
             self.logger.error(f"保存事件失败: {e}")
@@ -159,7 +169,7 @@ class StreamSessionManager:
         from_sequence: int = 0
     ) -> List[StreamEvent]:
         """
-        获取缓存的事件
+        获取缓存的事件（只读取 from_sequence 之后的尾部）
 
         Args:
             message_id: 消息 ID
@@ -174,25 +184,20 @@ class StreamSessionManager:
                 return []
 
             cache_key = f"{self.STREAM_CACHE_PREFIX}{message_id}"
-
-            # 获取所有缓存事件
-            cached_data = await redis.lrange(cache_key, 0, -1)
+            entries = await redis.xrange(cache_key, f"{from_sequence + 1}-0", "+")
 
             events = []
-            for data in cached_data:
+            for _, fields in entries:
                 try:
-                    event_dict = json.loads(data)
-                    event = StreamEvent(
+                    event_dict = json.loads(fields["event"])
+                    events.append(StreamEvent(
                         event_type=StreamEventType(event_dict["event_type"]),
                         content=event_dict["content"],
                         metadata=event_dict.get("metadata", {}),
                         timestamp=event_dict.get("timestamp", ""),
                         message_id=event_dict.get("message_id", ""),
                         sequence=event_dict.get("sequence", 0)
-                    )
-                    # 只返回序列号大于 from_sequence 的事件
-                    if event.sequence > from_sequence:
-                        events.append(event)
+                    ))
                 except Exception as e:
                     self.logger.warning(f"解析缓存事件失败: {e}")
 
@@ -202,6 +207,21 @@ class StreamSessionManager:
             self.logger.error(f"获取缓存事件失败: {e}")
             return []
 
+    async def get_cache_size(self, message_id: str) -> int:
+        """
+        获取缓存的事件数量
+
+        Args:
+            message_id: 消息 ID
+
+        Returns:
+            int: 事件数量
+        """
+        redis = await self._get_redis()
+        if not redis:
+            return 0
+        return await redis.xlen(f"{self.STREAM_CACHE_PREFIX}{message_id}")
+
     async def clear_cache(self, message_id: str) -> bool:
         """
         清除消息缓存
@@ -75,10 +75,17 @@ class StreamReplayManager:
     5. 任务状态检查 - 判断任务是否完成
     """
 
+    EVENT_LOG_PREFIX = "juben:stream_log:"
+    EVENT_LOG_MAXLEN = 5000
+    EVENT_LOG_TTL = 7 * 24 * 3600
+    REPLAY_CURSOR_FIELD = "__cursor__"
+
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self._storage_manager = None
 
+        self._redis_client = None
+
         # 心跳缓存（避免频繁数据库写入）
         self._heartbeat_cache: Dict[str, datetime] = {}
         self._heartbeat_cache_ttl = 5  # 5秒缓存
@@ -90,6 +97,36 @@ class StreamReplayManager:
             self._storage_manager = get_storage()
         return self._storage_manager
 
+    async def _get_redis(self):
+        """获取 Redis 客户端"""
+        if self._redis_client is None:
+            from utils.redis_client import get_redis_client
+            self._redis_client = await get_redis_client()
+        return self._redis_client
+
+    def _event_log_key(self, session_id: str) -> str:
+        """会话事件日志（Redis Stream，追加写）"""
+        return f"{self.EVENT_LOG_PREFIX}{session_id}"
+
+    def _replayed_key(self, session_id: str) -> str:
+        """回放标记（Hash：回放游标 + 单独标记的条目ID）"""
+        return f"{self.EVENT_LOG_PREFIX}{session_id}:replayed"
+
+    @staticmethod
+    def _next_entry_id(entry_id: str) -> str:
+        """紧随其后的条目ID（XRANGE 起点，兼容不支持排他区间的 Redis 版本）"""
+        ms, _, seq = str(entry_id).partition('-')
+        return f"{ms}-{int(seq or 0) + 1}"
+
+    def _entry_to_event(self, entry_id: str, fields: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        try:
+            event_dict = json.loads(fields["event"])
+        except Exception as e:
+            self.logger.warning(f"⚠️ 解析事件失败: {e}")
+            return None
+        event_dict['id'] = entry_id
+        return event_dict
+
     def _normalize_boolean(self, value: Any, default: bool = False) -> bool:
         """统一处理布尔值"""
         if value is None:
@@ -214,46 +251,36 @@ class StreamReplayManager:
             bool: 是否成功
         """
         try:
-            # 使用Redis存储（简化版本）
-            try:
-                from utils.redis_client import get_redis_client
-                redis_client = await get_redis_client()
-                if redis_client:
-                    event_key = f"juben:stream_event:{session_id}:{datetime.now(timezone.utc).timestamp()}"
-
-                    event_record = StreamEventRecord(
-                        session_id=session_id,
-                        user_id=user_id,
-                        event_type=event_type,
-                        content_type=content_type,
-                        agent_source=agent_source,
-                        event_data=event_data,
-                        event_metadata=event_metadata or {},
-                        is_replayed=False,
-                        is_after_disconnect=is_after_disconnect,
-                        is_session_complete=is_session_complete,
-                        task_phase=task_phase
-                    )
-
-                    # 存储到Redis（7天过期）
-                    await redis_client.setex(
-                        event_key,
-                        7 * 24 * 3600,
-                        json.dumps(event_record.to_dict(), ensure_ascii=False, default=str)
-                    )
-
-                    # 添加到会话事件列表
-                    list_key = f"juben:stream_events:{session_id}"
-                    await redis_client.rpush(list_key, event_key)
-                    await redis_client.expire(list_key, 7 * 24 * 3600)
-
-                    self.logger.debug(f"✅ 事件已存储: session_id={session_id}, type={event_type}")
-                    return True
+            redis_client = await self._get_redis()
+            if not redis_client:
+                return False
 
-            except Exception as e:
-                self.logger.warning(f"⚠️ Redis事件存储失败: {e}")
+            event_record = StreamEventRecord(
+                session_id=session_id,
+                user_id=user_id,
+                event_type=event_type,
+                content_type=content_type,
+                agent_source=agent_source,
+                event_data=event_data,
+                event_metadata=event_metadata or {},
+                is_replayed=False,
+                is_after_disconnect=is_after_disconnect,
+                is_session_complete=is_session_complete,
+                task_phase=task_phase
+            )
 
-            return False
+            # 追加到会话事件日志（XADD + EXPIRE 单次往返，7天过期）
+            entry_ids = await redis_client.xadd_many(
+                self._event_log_key(session_id),
+                [{"event": json.dumps(event_record.to_dict(), ensure_ascii=False, default=str)}],
+                maxlen=self.EVENT_LOG_MAXLEN,
+                expire=self.EVENT_LOG_TTL
+            )
+            if not entry_ids:
+                return False
+
+            self.logger.debug(f"✅ 事件已存储: session_id={session_id}, type={event_type}")
+            return True
 
         except Exception as e:
             self.logger.error(f"❌ 存储事件失败: {e}")
@@ -343,27 +370,23 @@ class StreamReplayManager:
             }
 
     async def _get_unreplayed_events(self, session_id: str) -> List[Dict[str, Any]]:
-        """获取未回放的事件"""
+        """获取未回放的事件（只读取回放游标之后的部分）"""
         try:
-            from utils.redis_client import get_redis_client
-            redis_client = await get_redis_client()
+            redis_client = await self._get_redis()
             if not redis_client:
                 return []
 
-            list_key = f"juben:stream_events:{session_id}"
-            event_keys = await redis_client.lrange(list_key, 0, -1)
+            replayed = await redis_client.hgetall(self._replayed_key(session_id))
+            cursor = replayed.pop(self.REPLAY_CURSOR_FIELD, None)
+            start = self._next_entry_id(cursor) if cursor else "-"
 
             events = []
-            for event_key in event_keys:
-                try:
-                    event_data = await redis_client.get(event_key)
-                    if event_data:
-                        event_dict = json.loads(event_data)
-                        # 只返回未回放的事件
-                        if not self._normalize_boolean(event_dict.get('is_replayed', False)):
-                            events.append(event_dict)
-                except Exception as e:
-                    self.logger.warning(f"⚠️ 解析事件失败: {e}")
+            for entry_id, fields in await redis_client.xrange(self._event_log_key(session_id), start, "+"):
+                if entry_id in replayed:
+                    continue
+                event_dict = self._entry_to_event(entry_id, fields)
+                if event_dict is not None:
+                    events.append(event_dict)
 
             return events
 
@@ -384,25 +407,21 @@ class StreamReplayManager:
             Dict[str, Any]: 任务状态
         """
         try:
-            from utils.redis_client import get_redis_client
-            redis_client = await get_redis_client()
+            redis_client = await self._get_redis()
             if not redis_client:
                 return {"is_running": False, "reason": "redis_unavailable"}
 
-            list_key = f"juben:stream_events:{session_id}"
-            event_keys = await redis_client.lrange(list_key, -5)  # 获取最后5个事件
+            # 获取最后5个事件
+            entries = await redis_client.xrevrange(self._event_log_key(session_id), count=5)
 
-            if not event_keys:
+            if not entries:
                 return {"is_running": False, "reason": "no_events_found"}
 
             events = []
-            for event_key in event_keys:
-                try:
-                    event_data = await redis_client.get(event_key)
-                    if event_data:
-                        events.append(json.loads(event_data))
-                except Exception:
-                    pass
+            for entry_id, fields in reversed(entries):
+                event_dict = self._entry_to_event(entry_id, fields)
+                if event_dict is not None:
+                    events.append(event_dict)
 
             if not events:
                 return {"is_running": False, "reason": "no_valid_events"}
@@ -475,29 +494,24 @@ class StreamReplayManager:
             bool: 是否成功
         """
         try:
-            from utils.redis_client import get_redis_client
-            redis_client = await get_redis_client()
+            redis_client = await self._get_redis()
             if not redis_client:
                 return False
 
-            list_key = f"juben:stream_events:{session_id}"
-            event_keys = await redis_client.lrange(list_key, 0, -1)
-
-            count = 0
-            for event_key in event_keys:
-                try:
-                    event_data = await redis_client.get(event_key)
-                    if event_data:
-                        event_dict = json.loads(event_data)
-                        # 如果指定了event_ids，只标记这些事件
-                        if event_ids is None or event_dict.get('id') in event_ids:
-                            event_dict['is_replayed'] = True
-                            await redis_client.set(event_key, json.dumps(event_dict, default=str))
-                            count += 1
-                except Exception:
-                    pass
-
-            self.logger.info(f"✅ 标记了 {count} 个事件为已回放")
+            # 事件日志只追加不修改：全部标记时推进回放游标，指定ID时单独记录
+            replayed_key = self._replayed_key(session_id)
+            if event_ids is None:
+                latest = await redis_client.xrevrange(self._event_log_key(session_id), count=1)
+                if latest:
+                    await redis_client.hset(replayed_key, self.REPLAY_CURSOR_FIELD, latest[0][0])
+                count = len(latest)
+            else:
+                for event_id in event_ids:
+                    await redis_client.hset(replayed_key, str(event_id), "1")
+                count = len(event_ids)
+            await redis_client.expire(replayed_key, self.EVENT_LOG_TTL)
+
+            self.logger.info(f"✅ 标记事件为已回放: session_id={session_id}, count={count}")
             return True
 
         except Exception as e:
@@ -542,31 +556,17 @@ class StreamReplayManager:
             List[Dict]: 事件列表
         """
         try:
-            from utils.redis_client import get_redis_client
-            redis_client = await get_redis_client()
+            redis_client = await self._get_redis()
             if not redis_client:
                 return []
 
-            list_key = f"juben:stream_events:{session_id}"
-            event_keys = await redis_client.lrange(list_key, 0, -1)
-
+            # 条目ID以毫秒时间戳开头，直接按ID范围读取
+            start = f"{int(timestamp * 1000) + 1}-0"
             events = []
-            cutoff_time = datetime.fromtimestamp(timestamp, tz=timezone.utc)
-
-            for event_key in event_keys:
-                try:
-                    event_data = await redis_client.get(event_key)
-                    if event_data:
-                        event_dict = json.loads(event_data)
-                        event_time_str = event_dict.get('created_at', '')
-                        if event_time_str:
-                            if event_time_str.endswith('Z'):
-                                event_time_str = event_time_str.replace('Z', '+00:00')
-                            event_time = datetime.fromisoformat(event_time_str)
-                            if event_time > cutoff_time:
-                                events.append(event_dict)
-                except Exception:
-                    pass
+            for entry_id, fields in await redis_client.xrange(self._event_log_key(session_id), start, "+"):
+                event_dict = self._entry_to_event(entry_id, fields)
+                if event_dict is not None:
+                    events.append(event_dict)
 
             return events
 
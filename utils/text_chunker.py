@@ -0,0 +1,350 @@
+"""
+流式文本分块
+基于偏移量的生成器分块：按正则/查找定位句子与段落边界，只在产出分块时切片一次，
+不做逐字符拼接，也不保留文本的中间副本。
+
+供 RagIndexer 的各 ChunkingStrategy 以及 TextSplitterAgent 共用。
+"""
+import json
+import re
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+
+class ChunkingStrategy(Enum):
+    """分块策略"""
+    FIXED = "fixed"           # 固定大小分块
+    SEMANTIC = "semantic"     # 语义感知分块
+    STRUCTURAL = "structural" # 结构感知分块
+    ADAPTIVE = "adaptive"     # 自适应分块
+
+
+@dataclass
+class ChunkInfo:
+    """分块信息（start_pos/end_pos 为原文偏移；由JSON重新序列化得到的分块为 -1）"""
+    content: str
+    chunk_index: int
+    start_pos: int
+    end_pos: int
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+SENTENCE_ENDINGS: Tuple[str, ...] = ('。', '！', '？', '.', '!', '?')
+PARAGRAPH_SEPARATOR = '\n\n'
+
+_sentence_patterns: Dict[Tuple[str, ...], "re.Pattern"] = {}
+
+
+def _sentence_pattern(endings: Sequence[str]) -> "re.Pattern":
+    """句子正则：非结束符序列 + 连续结束符（如 "！？"、"..."），或无结束符的结尾片段"""
+    key = tuple(endings)
+    pattern = _sentence_patterns.get(key)
+    if pattern is None:
+        chars = re.escape("".join(key))
+        pattern = re.compile(f"[^{chars}]*[{chars}]+|[^{chars}]+")
+        _sentence_patterns[key] = pattern
+    return pattern
+
+
+def strip_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    """去掉区间两端空白，返回新区间（可能为空区间）"""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def iter_paragraph_spans(
+    text: str,
+    separator: str = PARAGRAPH_SEPARATOR,
+    start: int = 0,
+    end: Optional[int] = None
+) -> Iterator[Tuple[int, int]]:
+    """按分隔符产出段落区间（已去除两端空白，跳过空段落）"""
+    end = len(text) if end is None else end
+    pos = start
+    while pos <= end:
+        sep_pos = text.find(separator, pos, end)
+        para_end = end if sep_pos == -1 else sep_pos
+        s, e = strip_span(text, pos, para_end)
+        if s < e:
+            yield s, e
+        if sep_pos == -1:
+            break
+        pos = sep_pos + len(separator)
+
+
+def iter_sentence_spans(
+    text: str,
+    endings: Sequence[str] = SENTENCE_ENDINGS,
+    separator: str = PARAGRAPH_SEPARATOR
+) -> Iterator[Tuple[int, int]]:
+    """产出句子区间：句子不跨段落，连续的结束符归入同一句"""
+    pattern = _sentence_pattern(endings)
+    for para_start, para_end in iter_paragraph_spans(text, separator):
+        for match in pattern.finditer(text, para_start, para_end):
+            s, e = strip_span(text, match.start(), match.end())
+            if s < e:
+                yield s, e
+
+
+def iter_long_span_pieces(text: str, start: int, end: int, piece_size: int) -> Iterator[Tuple[int, int]]:
+    """把过长区间切成不超过 piece_size 的片段，优先在逗号或空格处断开"""
+    pos = start
+    while pos < end:
+        piece_end = min(pos + piece_size, end)
+        if piece_end < end:
+            split_pos = max(text.rfind(',', pos, piece_end), text.rfind(' ', pos, piece_end))
+            if split_pos > pos:
+                piece_end = split_pos + 1
+        s, e = strip_span(text, pos, piece_end)
+        if s < e:
+            yield s, e
+        pos = piece_end
+
+
+def _make_chunk(text: str, start: int, end: int, index: int, **metadata) -> ChunkInfo:
+    return ChunkInfo(content=text[start:end], chunk_index=index, start_pos=start, end_pos=end, metadata=metadata)
+
+
+def iter_fixed_chunks(
+    text: str,
+    chunk_size: int = 800,
+    overlap: int = 120,
+    start_index: int = 0
+) -> Iterator[ChunkInfo]:
+    """固定大小分块（带重叠）"""
+    length = len(text)
+    index = start_index
+    start = 0
+    while start < length:
+        end = min(start + chunk_size, length)
+        s, e = strip_span(text, start, end)
+        if s < e:
+            yield _make_chunk(text, s, e, index)
+            index += 1
+        if end >= length:
+            break
+        start = max(end - overlap, start + 1)
+
+
+def iter_semantic_chunks(
+    text: str,
+    max_chunk_size: int = 1500,
+    long_piece_size: int = 800,
+    endings: Sequence[str] = SENTENCE_ENDINGS,
+    start_index: int = 0
+) -> Iterator[ChunkInfo]:
+    """
+    语义感知分块：按句子累积到 max_chunk_size，超长单句按 long_piece_size 强制切分
+
+    分块内容为原文连续切片（保留句子之间的原始空白/换行）
+    """
+    index = start_index
+    chunk_start: Optional[int] = None
+    chunk_end = 0
+
+    for s, e in iter_sentence_spans(text, endings):
+        if (e - (s if chunk_start is None else chunk_start)) <= max_chunk_size:
+            if chunk_start is None:
+                chunk_start = s
+            chunk_end = e
+            continue
+
+        # 当前块已满，产出并开始新块
+        if chunk_start is not None:
+            yield _make_chunk(text, chunk_start, chunk_end, index)
+            index += 1
+        chunk_start = None
+
+        if e - s > max_chunk_size:
+            last: Optional[Tuple[int, int]] = None
+            for piece in iter_long_span_pieces(text, s, e, long_piece_size):
+                if last is not None:
+                    yield _make_chunk(text, last[0], last[1], index)
+                    index += 1
+                last = piece
+            if last is not None:
+                chunk_start, chunk_end = last
+        else:
+            chunk_start, chunk_end = s, e
+
+    if chunk_start is not None:
+        yield _make_chunk(text, chunk_start, chunk_end, index)
+
+
+def iter_markdown_chunks(
+    text: str,
+    max_chunk_size: int = 1500,
+    start_index: int = 0
+) -> Iterator[ChunkInfo]:
+    """Markdown结构分块：标题开启新块，块长度达到上限时断开"""
+    index = start_index
+    chunk_start: Optional[int] = None
+    length = len(text)
+    pos = 0
+
+    while pos < length:
+        newline = text.find('\n', pos)
+        line_end = length if newline == -1 else newline + 1
+        line_s, line_e = strip_span(text, pos, line_end)
+        is_header = line_s < line_e and text[line_s] == '#'
+
+        if is_header and chunk_start is not None:
+            s, e = strip_span(text, chunk_start, pos)
+            if s < e:
+                yield _make_chunk(text, s, e, index)
+                index += 1
+            chunk_start = None
+
+        if chunk_start is None:
+            chunk_start = pos
+
+        if line_end - chunk_start >= max_chunk_size:
+            s, e = strip_span(text, chunk_start, line_end)
+            if s < e:
+                yield _make_chunk(text, s, e, index)
+                index += 1
+            chunk_start = None
+
+        pos = line_end
+
+    if chunk_start is not None:
+        s, e = strip_span(text, chunk_start, length)
+        if s < e:
+            yield _make_chunk(text, s, e, index)
+
+
+def iter_json_chunks(
+    text: str,
+    max_chunk_size: int = 1500,
+    long_piece_size: int = 800,
+    start_index: int = 0
+) -> Iterator[ChunkInfo]:
+    """JSON结构分块：按顶层键/元素重新序列化，超长项再做语义分块；解析失败时按语义分块"""
+    try:
+        data = json.loads(text)
+    except (ValueError, TypeError):
+        yield from iter_semantic_chunks(text, max_chunk_size, long_piece_size, start_index=start_index)
+        return
+
+    if isinstance(data, dict):
+        items = ({key: value} for key, value in data.items())
+    elif isinstance(data, list):
+        items = iter(data)
+    else:
+        yield ChunkInfo(content=text, chunk_index=start_index, start_pos=0, end_pos=len(text))
+        return
+
+    index = start_index
+    for item in items:
+        serialized = json.dumps(item, ensure_ascii=False, indent=2)
+        if len(serialized) > max_chunk_size:
+            for sub in iter_semantic_chunks(serialized, max_chunk_size, long_piece_size, start_index=index):
+                sub.start_pos = sub.end_pos = -1
+                index = sub.chunk_index + 1
+                yield sub
+        else:
+            yield ChunkInfo(content=serialized, chunk_index=index, start_pos=-1, end_pos=-1)
+            index += 1
+
+
+def _first_non_space(text: str) -> str:
+    match = re.search(r"\S", text)
+    return text[match.start()] if match else ""
+
+
+def iter_structural_chunks(
+    text: str,
+    max_chunk_size: int = 1500,
+    long_piece_size: int = 800
+) -> Iterator[ChunkInfo]:
+    """结构感知分块：JSON / Markdown / 其余按语义分块"""
+    first = _first_non_space(text)
+    if first in ('{', '['):
+        return iter_json_chunks(text, max_chunk_size, long_piece_size)
+    if first == '#':
+        return iter_markdown_chunks(text, max_chunk_size)
+    return iter_semantic_chunks(text, max_chunk_size, long_piece_size)
+
+
+def iter_chunks(
+    text: str,
+    strategy: ChunkingStrategy = ChunkingStrategy.SEMANTIC,
+    chunk_size: int = 800,
+    overlap: int = 120,
+    max_chunk_size: int = 1500
+) -> Iterator[ChunkInfo]:
+    """
+    按策略流式分块
+
+    Args:
+        text: 输入文本
+        strategy: 分块策略
+        chunk_size: 固定分块大小 / 超长句切分大小
+        overlap: 固定分块重叠
+        max_chunk_size: 语义/结构分块的最大块长度
+
+    Returns:
+        Iterator[ChunkInfo]: 分块生成器
+    """
+    if not text:
+        return iter(())
+
+    if strategy == ChunkingStrategy.FIXED:
+        return iter_fixed_chunks(text, chunk_size, overlap)
+    if strategy == ChunkingStrategy.SEMANTIC:
+        return iter_semantic_chunks(text, max_chunk_size, chunk_size)
+    if strategy == ChunkingStrategy.STRUCTURAL:
+        return iter_structural_chunks(text, max_chunk_size, chunk_size)
+
+    # ADAPTIVE：结构化内容走结构分块，段落较多走语义分块，否则固定分块
+    if _first_non_space(text) in ('{', '[', '#'):
+        return iter_structural_chunks(text, max_chunk_size, chunk_size)
+    para_count = 0
+    for _ in iter_paragraph_spans(text):
+        para_count += 1
+        if para_count > 3:
+            return iter_semantic_chunks(text, max_chunk_size, chunk_size)
+    return iter_fixed_chunks(text, chunk_size, overlap)
+
+
+def iter_window_chunks(
+    text: str,
+    chunk_size: int,
+    overlap: int = 0,
+    preserve_sentences: bool = True,
+    sentence_endings: Sequence[str] = ('。', '！', '？', '\n', '；', '…')
+) -> Iterator[ChunkInfo]:
+    """
+    滑动窗口分块（TextSplitterAgent 使用）
+
+    窗口末尾 30% 范围内按 sentence_endings 的优先顺序寻找断点，断点需保证块长至少为 chunk_size 的一半
+    """
+    length = len(text)
+    index = 0
+    start = 0
+    while start < length:
+        end = min(start + chunk_size, length)
+
+        if preserve_sentences and end < length:
+            best_end = end
+            search_start = start + int(chunk_size * 0.7)
+            for ending in sentence_endings:
+                last_ending = text.rfind(ending, search_start, end)
+                if last_ending > search_start:
+                    best_end = last_ending + 1
+                    break
+            if best_end > start + int(chunk_size * 0.5):
+                end = best_end
+
+        s, e = strip_span(text, start, end)
+        if s < e:
+            yield _make_chunk(text, s, e, index)
+            index += 1
+
+        if end >= length:
+            break
+        start = max(end - overlap, start + 1)
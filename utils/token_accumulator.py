@@ -14,6 +14,7 @@ import os
 import json
 import logging
 import asyncio
+import threading
 from dataclasses import dataclass, asdict
 from typing import Dict, Any, Optional, List
 from datetime import datetime, date, timedelta
@@ -95,32 +96,114 @@ class DailyUsageReport:
         return asdict(self)
 
 
+# 原子累加脚本：计数累加、按模型字段累加，并在首次写入时设置TTL
+# 只访问单个键（Redis Cluster 下不会跨槽），排行榜与全局统计在同一管道中用单键命令更新
+# KEYS: 每日配额哈希
+# ARGV: 配额TTL, total_tokens, prompt_tokens, completion_tokens, llm_calls, [模型字段, tokens]...
+# 返回累加后的配额哈希（HGETALL），供同步读取复用
+RECORD_USAGE_SCRIPT = """
+local key = KEYS[1]
+redis.call('HINCRBY', key, 'total_tokens', ARGV[2])
+redis.call('HINCRBY', key, 'prompt_tokens', ARGV[3])
+redis.call('HINCRBY', key, 'completion_tokens', ARGV[4])
+redis.call('HINCRBY', key, 'llm_calls', ARGV[5])
+for i = 6, #ARGV, 2 do
+    redis.call('HINCRBY', key, ARGV[i], ARGV[i + 1])
+end
+if redis.call('TTL', key) < 0 then
+    redis.call('EXPIRE', key, ARGV[1])
+end
+return redis.call('HGETALL', key)
+"""
+
+# 每个配额键在管道中排在脚本之后的排行榜/统计命令数（见 QuotaChecker._queue_aggregates）
+AGGREGATE_COMMANDS = 8
+
+# 计数只增不减：用于回填时不覆盖已累加的更大值
+# KEYS: 计数键  ARGV: 值, TTL
+SET_IF_GREATER_SCRIPT = """
+if tonumber(redis.call('GET', KEYS[1]) or '0') < tonumber(ARGV[1]) then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+end
+return 1
+"""
+
+STATS_DAILY_TTL = 86400 * 31
+STATS_MONTHLY_TTL = 86400 * 400
+
+
+def daily_ranking_key(prefix: str, date_str: str) -> str:
+    """日Token排行ZSET键（成员为用户ID，分值为当日tokens）"""
+    return f"{prefix}:ranking:daily:{date_str}"
+
+
+def monthly_ranking_key(prefix: str, month: str) -> str:
+    """月Token排行ZSET键（month 为 YYYY-MM）"""
+    return f"{prefix}:ranking:monthly:{month}"
+
+
+def daily_stats_key(date_str: str) -> str:
+    """全站日Token总量计数键"""
+    return f"token_stats:daily:{date_str}"
+
+
+def monthly_stats_key(month: str) -> str:
+    """全站月Token总量计数键"""
+    return f"token_stats:monthly:{month}"
+
+
+def ranking_backfill_key(prefix: str) -> str:
+    """排行榜回填完成标记键"""
+    return f"{prefix}:ranking:backfilled"
+
+
 class QuotaChecker:
     """
     Token配额检查器
 
     功能：
     1. 检查用户每日Token使用配额
-    2. 记录Token使用到Redis
+    2. 记录Token使用到Redis（Lua脚本原子累加，按模型拆分为 model:<名称> 字段）
     3. 生成每日使用报告
     4. 根据智谱AI价格计算费用
+
+    批量模式（flush_interval > 0）：同一时间窗口内的多次调用先在本地合并，
+    窗口结束后每个键只执行一次脚本；配额检查会叠加本地尚未写入的增量。
     """
 
-    def __init__(self, redis_client=None, quota_settings=None):
+    MODEL_FIELD_PREFIX = "model:"
+
+    def __init__(self, redis_client=None, quota_settings=None, flush_interval: Optional[float] = None):
         """
         初始化配额检查器
 
         Args:
             redis_client: Redis客户端实例
             quota_settings: 配额设置配置
+            flush_interval: 批量写入间隔（秒），0 表示每次调用立即写入，None 表示读取配置
         """
         self.logger = logging.getLogger(__name__)
         self._redis = redis_client
         self._quota_settings = quota_settings
-        self._memory_usage: Dict[str, Dict[str, Any]] = {}
+        self._flush_interval = flush_interval
+
+        # 尚未写入Redis的增量：key -> {"total_tokens", "prompt_tokens", "completion_tokens", "llm_calls", "models"}
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._pending_lock = threading.Lock()
+        # 已取出、正在写入的批次（写入完成前仍计入读取结果）
+        self._inflight: List[Dict[str, Dict[str, Any]]] = []
+        self._flush_timer: Optional[threading.Timer] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        # 最近一次脚本返回的哈希快照（异步客户端下同步读取使用）
+        self._snapshots: Dict[str, Dict[str, Any]] = {}
+        self._record_script = None
 
         # 延迟加载配置和Redis客户端
         self._settings_loaded = False
+        # 未注入客户端时，首次异步调用从连接池获取异步Redis客户端
+        self._connect_async = False
+        # 异步客户端所属的事件循环（首次异步调用时记录，其他线程的写入调度到该循环执行）
+        self._redis_loop: Optional[asyncio.AbstractEventLoop] = None
 
     def _ensure_settings(self):
         """确保配置已加载"""
@@ -129,20 +212,74 @@ class QuotaChecker:
                 from config.settings import juben_settings
                 self._quota_settings = juben_settings.quota
 
+            if self._flush_interval is None:
+                self._flush_interval = getattr(self._quota_settings, "usage_flush_interval", 0.0)
+
             if self._redis is None:
-                try:
-                    from utils.redis_client import get_redis_client
-                    self._redis = get_redis_client()
-                    if asyncio.iscoroutine(self._redis):
-                        # 同步上下文无法await，回退到内存模式
-                        self.logger.warning("⚠️ Redis客户端为异步对象，配额检查将使用内存存储")
-                        self._redis = {}
-                except ImportError:
-                    self.logger.warning("⚠️ 无法导入Redis客户端，配额检查将使用内存存储")
-                    self._redis = {}  # 使用内存存储作为后备
+                # 项目的Redis客户端是异步的，只能在事件循环中获取（见 _aensure_redis）；获取前使用内存存储
+                self._redis = {}
+                self._connect_async = True
 
             self._settings_loaded = True
 
+    async def _aensure_redis(self):
+        """异步调用入口：首次调用时从连接池获取异步Redis客户端，并把此前记录在内存中的用量转为待写增量"""
+        self._ensure_settings()
+        if self._redis_loop is None and self._is_async_redis():
+            self._redis_loop = asyncio.get_running_loop()
+        if not self._connect_async:
+            return
+        self._connect_async = False
+
+        client = None
+        try:
+            from utils.redis_client import get_connection_pool_manager
+            manager = await get_connection_pool_manager()
+            client = await manager.get_redis_client('normal_priority')
+        except Exception as e:
+            self.logger.warning(f"⚠️ 获取Redis客户端失败: {e}")
+        if client is None:
+            self.logger.warning("⚠️ Redis不可用，配额检查将使用内存存储")
+            return
+
+        memory, self._redis = self._redis, client
+        self._redis_loop = asyncio.get_running_loop()
+        self._import_memory_usage(memory)
+
+    def _import_memory_usage(self, memory: Dict[str, Any]) -> None:
+        """把内存模式下记录的用量转为待写增量"""
+        prefix = f"{self._quota_settings.redis_key_prefix if self._quota_settings else 'quota'}:daily:"
+        for key, data in memory.items():
+            user_id, _, date_str = key[len(prefix):].rpartition(":")
+            usage = self._parse_usage_hash(data)
+            delta = {
+                "user_id": user_id,
+                "date": date_str,
+                "total_tokens": usage["total_tokens"],
+                "prompt_tokens": usage["prompt_tokens"],
+                "completion_tokens": usage["completion_tokens"],
+                "llm_calls": usage["llm_calls"],
+                "models": usage["model_breakdown"]
+            }
+            with self._pending_lock:
+                self._merge_delta(self._pending.setdefault(key, {}), delta)
+
+    def _is_async_redis(self) -> bool:
+        """redis.asyncio 的命令方法返回 awaitable 但本身不是协程函数，需同时检查 execute_command"""
+        return any(
+            asyncio.iscoroutinefunction(getattr(self._redis, name, None))
+            for name in ("execute_command", "hgetall")
+        )
+
+    def _get_record_script(self):
+        """注册累加脚本（EVALSHA，脚本缺失时自动重新加载）"""
+        if self._record_script is None:
+            self._record_script = self._redis.register_script(RECORD_USAGE_SCRIPT)
+        return self._record_script
+
+    def _get_ttl(self) -> int:
+        return self._quota_settings.daily_ttl if self._quota_settings else 172800
+
     def _get_daily_key(self, user_id: str, date_str: Optional[str] = None) -> str:
         """
         生成每日配额Redis键
@@ -177,6 +314,68 @@ class QuotaChecker:
         quota_field = mapping.get(user_tier, "free_daily_quota")
         return getattr(self._quota_settings, quota_field, 100000)
 
+    # ==================== 用量解析 ====================
+
+    @staticmethod
+    def _decode(value: Any) -> str:
+        return value.decode("utf-8", errors="ignore") if isinstance(value, bytes) else str(value)
+
+    def _parse_usage_hash(self, data: Any) -> Dict[str, Any]:
+        """
+        解析每日用量哈希（HGETALL 字典或脚本返回的扁平列表）
+
+        model:<名称> 字段汇总为 model_breakdown；兼容旧版 JSON 形式的 model_breakdown 字段
+        """
+        if isinstance(data, (list, tuple)):
+            data = dict(zip(data[::2], data[1::2]))
+
+        usage = {"total_tokens": 0, "prompt_tokens": 0, "completion_tokens": 0, "llm_calls": 0}
+        model_breakdown: Dict[str, int] = {}
+
+        for raw_field, raw_value in (data or {}).items():
+            field = self._decode(raw_field)
+            if field in usage:
+                usage[field] = int(self._decode(raw_value) or 0)
+            elif field.startswith(self.MODEL_FIELD_PREFIX):
+                model = field[len(self.MODEL_FIELD_PREFIX):]
+                model_breakdown[model] = model_breakdown.get(model, 0) + int(self._decode(raw_value) or 0)
+            elif field == "model_breakdown":
+                try:
+                    legacy = raw_value if isinstance(raw_value, dict) else json.loads(self._decode(raw_value) or "{}")
+                except Exception:
+                    legacy = {}
+                for model, tokens in legacy.items():
+                    model_breakdown[model] = model_breakdown.get(model, 0) + int(tokens)
+
+        usage["model_breakdown"] = model_breakdown
+        return usage
+
+    def _local_delta(self, key: str) -> Optional[Dict[str, Any]]:
+        """本进程尚未写入（含写入中）的增量"""
+        with self._pending_lock:
+            batches = [batch[key] for batch in self._inflight if key in batch]
+            if key in self._pending:
+                batches.append(self._pending[key])
+        if not batches:
+            return None
+        total: Dict[str, Any] = {}
+        for delta in batches:
+            self._merge_delta(total, delta)
+        return total
+
+    def _merge_pending(self, key: str, usage: Dict[str, Any]) -> Dict[str, Any]:
+        """叠加本进程尚未写入的增量"""
+        delta = self._local_delta(key)
+        if not delta:
+            return usage
+        for field in ("total_tokens", "prompt_tokens", "completion_tokens", "llm_calls"):
+            usage[field] += delta[field]
+        breakdown = dict(usage["model_breakdown"])
+        for model, tokens in delta["models"].items():
+            breakdown[model] = breakdown.get(model, 0) + tokens
+        usage["model_breakdown"] = breakdown
+        return usage
+
     def get_daily_usage(
         self,
         user_id: str,
@@ -204,45 +403,52 @@ class QuotaChecker:
 
         if isinstance(self._redis, dict):
             # 内存存储模式
-            data = self._redis.get(key, {})
+            usage = self._parse_usage_hash(self._redis.get(key, {}))
+        elif self._is_async_redis():
+            # 异步客户端无法在同步上下文读取，使用最近一次写入返回的快照
+            usage = self._parse_usage_hash(self._snapshots.get(key, {}))
         else:
-            # 异步客户端则使用内存镜像避免阻塞
-            if hasattr(self._redis, "hgetall") and asyncio.iscoroutinefunction(self._redis.hgetall):
-                data = self._memory_usage.get(key, {})
-            else:
-                # Redis模式（同步）
-                try:
-                    data = self._redis.hgetall(key)
-                    if data:
-                        # Redis返回bytes，需要解码
-                        data = {k.decode(): json.loads(v.decode()) if v.startswith('{') else v
-                               for k, v in data.items()}
-                except Exception as e:
-                    self.logger.error(f"❌ 从Redis获取每日使用量失败: {e}")
-                    data = {}
-
-        # 兼容不同存储形态下的 model_breakdown 类型：
-        # - Redis 模式：字符串形式的 JSON
-        # - 内存/字典模式：可能直接是 dict
-        raw_breakdown = data.get("model_breakdown", "{}")
-        if isinstance(raw_breakdown, dict):
-            model_breakdown = raw_breakdown
+            # Redis模式（同步）
+            try:
+                usage = self._parse_usage_hash(self._redis.hgetall(key))
+            except Exception as e:
+                self.logger.error(f"❌ 从Redis获取每日使用量失败: {e}")
+                usage = self._parse_usage_hash({})
+
+        return self._merge_pending(key, usage)
+
+    async def aget_daily_usage(
+        self,
+        user_id: str,
+        date_str: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """获取用户每日Token使用量（异步，异步Redis客户端下读取服务端最新值）"""
+        await self._aensure_redis()
+        if not self._is_async_redis():
+            return self.get_daily_usage(user_id, date_str)
+
+        key = self._get_daily_key(user_id, date_str)
+        try:
+            usage = self._parse_usage_hash(await self._redis.hgetall(key))
+        except Exception as e:
+            self.logger.error(f"❌ 从Redis获取每日使用量失败: {e}")
+            usage = self._parse_usage_hash(self._snapshots.get(key, {}))
+        return self._merge_pending(key, usage)
+
+    def _get_used_tokens(self, key: str) -> int:
+        """当日已用 tokens（同步Redis下只读取单个字段，一次往返）"""
+        if isinstance(self._redis, dict) or self._is_async_redis():
+            source = self._redis.get(key, {}) if isinstance(self._redis, dict) else self._snapshots.get(key, {})
+            used = self._parse_usage_hash(source)["total_tokens"]
         else:
             try:
-                # 既兼容 bytes 也兼容 str
-                if isinstance(raw_breakdown, bytes):
-                    raw_breakdown = raw_breakdown.decode("utf-8", errors="ignore")
-                model_breakdown = json.loads(raw_breakdown or "{}")
-            except Exception:
-                model_breakdown = {}
+                used = int(self._decode(self._redis.hget(key, "total_tokens") or 0))
+            except Exception as e:
+                self.logger.error(f"❌ 从Redis获取每日使用量失败: {e}")
+                used = 0
 
-        return {
-            "total_tokens": int(data.get("total_tokens", 0)),
-            "prompt_tokens": int(data.get("prompt_tokens", 0)),
-            "completion_tokens": int(data.get("completion_tokens", 0)),
-            "llm_calls": int(data.get("llm_calls", 0)),
-            "model_breakdown": model_breakdown,
-        }
+        delta = self._local_delta(key)
+        return used + (delta["total_tokens"] if delta else 0)
 
     def check_quota(
         self,
@@ -275,19 +481,55 @@ class QuotaChecker:
 
         # 检查是否启用配额限制
         if self._quota_settings and not self._quota_settings.enabled:
-            return {
-                "allowed": True,
-                "used_tokens": 0,
-                "quota_limit": float('inf'),
-                "remaining": float('inf'),
-                "percentage": 0.0,
-                "user_tier": user_tier,
-                "message": "配额检查已禁用"
-            }
+            return self._quota_disabled_result(user_tier)
+
+        used_tokens = self._get_used_tokens(self._get_daily_key(user_id))
+        return self._build_quota_result(user_id, user_tier, used_tokens, raise_on_exceed)
+
+    async def acheck_quota(
+        self,
+        user_id: str,
+        user_tier: str = "free",
+        raise_on_exceed: bool = True
+    ) -> Dict[str, Any]:
+        """检查用户配额（异步，异步Redis客户端下一次HGET往返）"""
+        await self._aensure_redis()
+        if not self._is_async_redis():
+            return self.check_quota(user_id, user_tier, raise_on_exceed)
+
+        if self._quota_settings and not self._quota_settings.enabled:
+            return self._quota_disabled_result(user_tier)
+
+        key = self._get_daily_key(user_id)
+        try:
+            used_tokens = int(self._decode(await self._redis.hget(key, "total_tokens") or 0))
+        except Exception as e:
+            self.logger.error(f"❌ 从Redis获取每日使用量失败: {e}")
+            used_tokens = self._parse_usage_hash(self._snapshots.get(key, {}))["total_tokens"]
+        delta = self._local_delta(key)
+        used_tokens += delta["total_tokens"] if delta else 0
+        return self._build_quota_result(user_id, user_tier, used_tokens, raise_on_exceed)
+
+    @staticmethod
+    def _quota_disabled_result(user_tier: str) -> Dict[str, Any]:
+        return {
+            "allowed": True,
+            "used_tokens": 0,
+            "quota_limit": float('inf'),
+            "remaining": float('inf'),
+            "percentage": 0.0,
+            "user_tier": user_tier,
+            "message": "配额检查已禁用"
+        }
 
-        daily_usage = self.get_daily_usage(user_id)
+    def _build_quota_result(
+        self,
+        user_id: str,
+        user_tier: str,
+        used_tokens: int,
+        raise_on_exceed: bool
+    ) -> Dict[str, Any]:
         quota_limit = self._get_user_tier_quota(user_tier)
-        used_tokens = daily_usage["total_tokens"]
 
         remaining = quota_limit - used_tokens
         percentage = (used_tokens / quota_limit * 100) if quota_limit > 0 else 0
@@ -311,7 +553,8 @@ class QuotaChecker:
 
         # 如果超限且需要抛出异常
         if should_block and raise_on_exceed:
-            # 计算预计费用
+            # 计算预计费用（仅超限时读取模型明细）
+            daily_usage = self.get_daily_usage(user_id)
             estimated_cost = self._estimate_cost(used_tokens, daily_usage.get("model_breakdown", {}))
             raise QuotaExceededError(
                 user_id=user_id,
@@ -330,6 +573,191 @@ class QuotaChecker:
 
         return result
 
+    # ==================== 用量记录 ====================
+
+    @staticmethod
+    def _merge_delta(target: Dict[str, Any], delta: Dict[str, Any]) -> None:
+        for field in ("user_id", "date"):
+            if field in delta:
+                target.setdefault(field, delta[field])
+        for field in ("total_tokens", "prompt_tokens", "completion_tokens", "llm_calls"):
+            target[field] = target.get(field, 0) + delta[field]
+        models = target.setdefault("models", {})
+        for model, tokens in delta["models"].items():
+            models[model] = models.get(model, 0) + tokens
+
+    def _add_pending(
+        self,
+        user_id: str,
+        tokens: int,
+        prompt_tokens: int,
+        completion_tokens: int,
+        model_name: str
+    ) -> str:
+        """累加到待写增量，返回每日配额键"""
+        date_str = date.today().isoformat()
+        key = self._get_daily_key(user_id, date_str)
+        delta = {
+            "user_id": user_id,
+            "date": date_str,
+            "total_tokens": tokens,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "llm_calls": 1,
+            "models": {model_name: tokens}
+        }
+        with self._pending_lock:
+            self._merge_delta(self._pending.setdefault(key, {}), delta)
+        return key
+
+    def _take_pending(self) -> Dict[str, Dict[str, Any]]:
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+            if pending:
+                self._inflight.append(pending)
+            return pending
+
+    def _finish_batch(self, batch: Dict[str, Dict[str, Any]], failed_keys: List[str]) -> None:
+        """批次写入结束；写入失败的键把增量放回待写队列，避免丢失（已成功的键不重放，避免重复计数）"""
+        with self._pending_lock:
+            self._inflight = [b for b in self._inflight if b is not batch]
+            for key in failed_keys:
+                self._merge_delta(self._pending.setdefault(key, {}), batch[key])
+
+    def _apply_results(self, batch: Dict[str, Dict[str, Any]], keys: List[str], results: List[Any]) -> bool:
+        """
+        处理管道结果（raise_on_error=False，失败的命令以异常对象返回）
+
+        配额脚本失败的键重新排队；排行榜/统计命令失败只记录日志（配额已累加，重放会重复计数）
+        """
+        failed_keys = []
+        stride = AGGREGATE_COMMANDS + 1
+        for index, key in enumerate(keys):
+            snapshot = results[index * stride]
+            if isinstance(snapshot, Exception):
+                self.logger.error(f"❌ 写入Token使用量失败 {key}: {snapshot}")
+                failed_keys.append(key)
+                continue
+            self._snapshots[key] = snapshot
+            errors = [r for r in results[index * stride + 1:(index + 1) * stride] if isinstance(r, Exception)]
+            if errors:
+                self.logger.warning(f"⚠️ 更新Token排行榜/统计失败 {key}: {errors[0]}")
+        self._finish_batch(batch, failed_keys)
+        return not failed_keys
+
+    def _queue_aggregates(self, pipe, delta: Dict[str, Any]) -> None:
+        """在管道中追加排行榜与全站统计的更新（均为单键命令，共 AGGREGATE_COMMANDS 条）"""
+        prefix = self._quota_settings.redis_key_prefix if self._quota_settings else "quota"
+        date_str, month = delta["date"], delta["date"][:7]
+        tokens = delta["total_tokens"]
+        pipe.zincrby(daily_ranking_key(prefix, date_str), tokens, delta["user_id"])
+        pipe.expire(daily_ranking_key(prefix, date_str), STATS_DAILY_TTL)
+        pipe.zincrby(monthly_ranking_key(prefix, month), tokens, delta["user_id"])
+        pipe.expire(monthly_ranking_key(prefix, month), STATS_MONTHLY_TTL)
+        pipe.incrby(daily_stats_key(date_str), tokens)
+        pipe.expire(daily_stats_key(date_str), STATS_DAILY_TTL)
+        pipe.incrby(monthly_stats_key(month), tokens)
+        pipe.expire(monthly_stats_key(month), STATS_MONTHLY_TTL)
+
+    def _script_args(self, delta: Dict[str, Any]) -> List[Any]:
+        args: List[Any] = [
+            self._get_ttl(),
+            delta["total_tokens"],
+            delta["prompt_tokens"],
+            delta["completion_tokens"],
+            delta["llm_calls"],
+        ]
+        for model, tokens in delta["models"].items():
+            args.extend([f"{self.MODEL_FIELD_PREFIX}{model}", tokens])
+        return args
+
+    def flush(self) -> bool:
+        """
+        将待写增量写入Redis（同步客户端；每个键一次脚本调用加排行榜/统计更新，整体一次非事务管道往返）
+
+        Returns:
+            bool: 是否成功
+        """
+        batch = self._take_pending()
+        if not batch:
+            return True
+
+        try:
+            script = self._get_record_script()
+            pipe = self._redis.pipeline(transaction=False)
+            keys = list(batch.keys())
+            for key in keys:
+                script(keys=[key], args=self._script_args(batch[key]), client=pipe)
+                self._queue_aggregates(pipe, batch[key])
+            results = pipe.execute(raise_on_error=False)
+        except Exception as e:
+            # 管道整体失败（如连接错误）：无法确认哪些键已写入，整批重新排队
+            self.logger.error(f"❌ 写入Token使用量失败: {e}")
+            self._finish_batch(batch, list(batch.keys()))
+            return False
+        return self._apply_results(batch, keys, results)
+
+    async def aflush(self) -> bool:
+        """将待写增量写入Redis（异步客户端）"""
+        batch = self._take_pending()
+        if not batch:
+            return True
+
+        try:
+            script = self._get_record_script()
+            pipe = self._redis.pipeline(transaction=False)
+            keys = list(batch.keys())
+            for key in keys:
+                await script(keys=[key], args=self._script_args(batch[key]), client=pipe)
+                self._queue_aggregates(pipe, batch[key])
+            results = await pipe.execute(raise_on_error=False)
+        except Exception as e:
+            self.logger.error(f"❌ 异步记录Token使用量失败: {e}")
+            self._finish_batch(batch, list(batch.keys()))
+            return False
+        return self._apply_results(batch, keys, results)
+
+    async def _aflush_after_window(self):
+        try:
+            await asyncio.sleep(self._flush_interval)
+            await self.aflush()
+        finally:
+            self._flush_task = None
+
+    def _flush_after_window(self):
+        self._flush_timer = None
+        self.flush()
+
+    def _schedule_async_flush(self):
+        """在异步客户端所属的事件循环中调度写入"""
+        if not self._flush_interval:
+            self._redis_loop.create_task(self.aflush())
+        elif self._flush_task is None:
+            self._flush_task = self._redis_loop.create_task(self._aflush_after_window())
+
+    def _schedule_flush(self):
+        """按配置立即写入或在时间窗口结束后批量写入"""
+        if self._is_async_redis():
+            loop = self._redis_loop
+            if loop is None or loop.is_closed():
+                # 异步客户端还没有在事件循环中使用过：增量保留，由下一次异步调用写入
+                return
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is loop:
+                self._schedule_async_flush()
+            else:
+                # 其他线程（或其他事件循环）中的同步调用：异步客户端不能跨事件循环使用，调度回所属循环
+                loop.call_soon_threadsafe(self._schedule_async_flush)
+        elif not self._flush_interval:
+            self.flush()
+        elif self._flush_timer is None:
+            self._flush_timer = threading.Timer(self._flush_interval, self._flush_after_window)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
     def record_usage(
         self,
         user_id: str,
@@ -341,6 +769,8 @@ class QuotaChecker:
         """
         记录Token使用量
 
+        Redis模式下通过Lua脚本原子累加（一次往返）；批量模式下合并后在窗口结束时写入。
+
         Args:
             user_id: 用户ID
             tokens: 总token数
@@ -356,82 +786,55 @@ class QuotaChecker:
         key = self._get_daily_key(user_id)
 
         try:
-            # 始终更新内存镜像，确保并发一致性
-            mem = self._memory_usage.get(key, {})
-            mem["total_tokens"] = mem.get("total_tokens", 0) + tokens
-            mem["prompt_tokens"] = mem.get("prompt_tokens", 0) + prompt_tokens
-            mem["completion_tokens"] = mem.get("completion_tokens", 0) + completion_tokens
-            mem["llm_calls"] = mem.get("llm_calls", 0) + 1
-            mem_breakdown = json.loads(mem.get("model_breakdown", "{}"))
-            mem_breakdown[model_name] = mem_breakdown.get(model_name, 0) + tokens
-            mem["model_breakdown"] = json.dumps(mem_breakdown)
-            self._memory_usage[key] = mem
-
             if isinstance(self._redis, dict):
                 # 内存存储模式
-                data = self._redis.get(key, {})
-                data["total_tokens"] = data.get("total_tokens", 0) + tokens
-                data["prompt_tokens"] = data.get("prompt_tokens", 0) + prompt_tokens
-                data["completion_tokens"] = data.get("completion_tokens", 0) + completion_tokens
-                data["llm_calls"] = data.get("llm_calls", 0) + 1
-
-                model_breakdown = data.get("model_breakdown", {})
-                model_breakdown[model_name] = model_breakdown.get(model_name, 0) + tokens
-                data["model_breakdown"] = model_breakdown
-
-                self._redis[key] = data
-            else:
-                # Redis模式
-                if hasattr(self._redis, "pipeline") and not asyncio.iscoroutinefunction(self._redis.pipeline):
-                    pipe = self._redis.pipeline()
-                    pipe.hincrby(key, "total_tokens", tokens)
-                    pipe.hincrby(key, "prompt_tokens", prompt_tokens)
-                    pipe.hincrby(key, "completion_tokens", completion_tokens)
-                    pipe.hincrby(key, "llm_calls", 1)
-
-                    current_data = self._redis.hget(key, "model_breakdown")
-                    if current_data:
-                        model_breakdown = json.loads(current_data.decode())
-                    else:
-                        model_breakdown = {}
-
+                with self._pending_lock:
+                    data = self._redis.get(key, {})
+                    data["total_tokens"] = data.get("total_tokens", 0) + tokens
+                    data["prompt_tokens"] = data.get("prompt_tokens", 0) + prompt_tokens
+                    data["completion_tokens"] = data.get("completion_tokens", 0) + completion_tokens
+                    data["llm_calls"] = data.get("llm_calls", 0) + 1
+
+                    model_breakdown = data.get("model_breakdown", {})
                     model_breakdown[model_name] = model_breakdown.get(model_name, 0) + tokens
-                    pipe.hset(key, "model_breakdown", json.dumps(model_breakdown))
+                    data["model_breakdown"] = model_breakdown
 
-                    ttl = self._quota_settings.daily_ttl if self._quota_settings else 172800
-                    pipe.expire(key, ttl)
-                    pipe.execute()
+                    self._redis[key] = data
+                success = True
+            else:
+                self._add_pending(user_id, tokens, prompt_tokens, completion_tokens, model_name)
+                success = True
+                if self._is_async_redis() or self._flush_interval:
+                    self._schedule_flush()
                 else:
-                    async def _async_write():
-                        try:
-                            pipe = self._redis.pipeline()
-                            await pipe.hincrby(key, "total_tokens", tokens)
-                            await pipe.hincrby(key, "prompt_tokens", prompt_tokens)
-                            await pipe.hincrby(key, "completion_tokens", completion_tokens)
-                            await pipe.hincrby(key, "llm_calls", 1)
-                            current_data = await self._redis.hget(key, "model_breakdown")
-                            model_breakdown = json.loads(current_data) if current_data else {}
-                            model_breakdown[model_name] = model_breakdown.get(model_name, 0) + tokens
-                            await pipe.hset(key, "model_breakdown", json.dumps(model_breakdown))
-                            ttl = self._quota_settings.daily_ttl if self._quota_settings else 172800
-                            await pipe.expire(key, ttl)
-                            await pipe.execute()
-                        except Exception as e:
-                            self.logger.error(f"❌ 异步记录Token使用量失败: {e}")
-
-                    try:
-                        loop = asyncio.get_running_loop()
-                        loop.create_task(_async_write())
-                    except RuntimeError:
-                        asyncio.run(_async_write())
+                    success = self.flush()
 
             self.logger.debug(f"✅ 记录Token使用: {user_id} +{tokens} tokens")
-            return True
+            return success
 
         except Exception as e:
             self.logger.error(f"❌ 记录Token使用失败: {e}")
             return False
 
+    async def arecord_usage(
+        self,
+        user_id: str,
+        tokens: int,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        model_name: str = "unknown"
+    ) -> bool:
+        """记录Token使用量（异步；未启用批量时等待写入完成）"""
+        await self._aensure_redis()
+        if not self._is_async_redis():
+            return self.record_usage(user_id, tokens, prompt_tokens, completion_tokens, model_name)
+
+        self._add_pending(user_id, tokens, prompt_tokens, completion_tokens, model_name)
+        if self._flush_interval:
+            self._schedule_flush()
+            return True
+        return await self.aflush()
+
     def _estimate_cost(
         self,
         total_tokens: int,
@@ -526,13 +929,36 @@ class TokenAccumulator:
                 user_tier=user_tier,
                 raise_on_exceed=True  # 超限则抛出异常
             )
+            self._log_quota_status(user_id, quota_status)
 
-            self.logger.info(
-                f"📊 配额检查通过 | 用户: {user_id} | "
-                f"已用: {quota_status['used_tokens']:,} / {quota_status['quota_limit']:,} "
-                f"({quota_status['percentage']:.1f}%)"
+        return self._create_accumulator(user_id, session_id, user_tier)
+
+    async def ainitialize_accumulator(
+        self,
+        user_id: str,
+        session_id: str,
+        user_tier: str = "free",
+        check_quota: bool = True
+    ) -> str:
+        """初始化Token累加器（异步，配额检查读取Redis最新值）"""
+        if check_quota and self._quota_checker:
+            quota_status = await self._quota_checker.acheck_quota(
+                user_id=user_id,
+                user_tier=user_tier,
+                raise_on_exceed=True
             )
+            self._log_quota_status(user_id, quota_status)
+
+        return self._create_accumulator(user_id, session_id, user_tier)
+
+    def _log_quota_status(self, user_id: str, quota_status: Dict[str, Any]) -> None:
+        self.logger.info(
+            f"📊 配额检查通过 | 用户: {user_id} | "
+            f"已用: {quota_status['used_tokens']:,} / {quota_status['quota_limit']:,} "
+            f"({quota_status['percentage']:.1f}%)"
+        )
 
+    def _create_accumulator(self, user_id: str, session_id: str, user_tier: str) -> str:
         accumulator_key = self._get_accumulator_key(user_id, session_id)
 
         # 初始化累加器数据
@@ -575,32 +1001,10 @@ class TokenAccumulator:
             bool: 是否成功
         """
         try:
-            if accumulator_key not in self._accumulators:
-                self.logger.warning(f"⚠️ 累加器不存在: {accumulator_key}")
+            user_id = self._accumulate(accumulator_key, usage, agent_name, model_name, provider)
+            if user_id is None:
                 return False
 
-            accumulator_data = self._accumulators[accumulator_key]
-            user_id = accumulator_data.get("user_id", "")
-
-            # 累加token使用情况
-            current_usage = TokenUsage.from_dict(accumulator_data["usage"])
-            current_usage.prompt_tokens += usage.prompt_tokens
-            current_usage.completion_tokens += usage.completion_tokens
-            current_usage.total_tokens += usage.total_tokens
-
-            accumulator_data["usage"] = current_usage.to_dict()
-            accumulator_data["updated_at"] = datetime.now().isoformat()
-
-            # 记录LLM调用详情
-            call_record = {
-                "timestamp": datetime.now().isoformat(),
-                "agent_name": agent_name,
-                "model_name": model_name,
-                "provider": provider,
-                "usage": usage.to_dict()
-            }
-            accumulator_data["llm_calls"].append(call_record)
-
             # 同时记录到配额检查器
             if self._quota_checker and user_id:
                 self._quota_checker.record_usage(
@@ -610,13 +1014,76 @@ class TokenAccumulator:
                     completion_tokens=usage.completion_tokens,
                     model_name=model_name
                 )
+            return True
 
-            self.logger.info(f"✅ Token使用量已累加: {usage.total_tokens} tokens (总计: {current_usage.total_tokens} tokens)")
+        except Exception as e:
+            self.logger.error(f"❌ 添加token使用量失败: {e}")
+            return False
+
+    async def aadd_token_usage(
+        self,
+        accumulator_key: str,
+        usage: TokenUsage,
+        agent_name: str = "unknown",
+        model_name: str = "unknown",
+        provider: str = "unknown"
+    ) -> bool:
+        """添加token使用情况（异步，每日配额统计通过异步Redis客户端写入）"""
+        try:
+            user_id = self._accumulate(accumulator_key, usage, agent_name, model_name, provider)
+            if user_id is None:
+                return False
+
+            if self._quota_checker and user_id:
+                await self._quota_checker.arecord_usage(
+                    user_id=user_id,
+                    tokens=usage.total_tokens,
+                    prompt_tokens=usage.prompt_tokens,
+                    completion_tokens=usage.completion_tokens,
+                    model_name=model_name
+                )
             return True
 
         except Exception as e:
             self.logger.error(f"❌ 添加token使用量失败: {e}")
             return False
+
+    def _accumulate(
+        self,
+        accumulator_key: str,
+        usage: TokenUsage,
+        agent_name: str,
+        model_name: str,
+        provider: str
+    ) -> Optional[str]:
+        """累加到会话累加器，返回用户ID（累加器不存在时返回 None）"""
+        if accumulator_key not in self._accumulators:
+            self.logger.warning(f"⚠️ 累加器不存在: {accumulator_key}")
+            return None
+
+        accumulator_data = self._accumulators[accumulator_key]
+
+        # 累加token使用情况
+        current_usage = TokenUsage.from_dict(accumulator_data["usage"])
+        current_usage.prompt_tokens += usage.prompt_tokens
+        current_usage.completion_tokens += usage.completion_tokens
+        current_usage.total_tokens += usage.total_tokens
+
+        accumulator_data["usage"] = current_usage.to_dict()
+        accumulator_data["updated_at"] = datetime.now().isoformat()
+
+        # 记录LLM调用详情
+        call_record = {
+            "timestamp": datetime.now().isoformat(),
+            "agent_name": agent_name,
+            "model_name": model_name,
+            "provider": provider,
+            "usage": usage.to_dict()
+        }
+        accumulator_data["llm_calls"].append(call_record)
+
+        self.logger.info(f"✅ Token使用量已累加: {usage.total_tokens} tokens (总计: {current_usage.total_tokens} tokens)")
+        return accumulator_data.get("user_id", "")
     
     def get_billing_summary(self, accumulator_key: str) -> Optional[Dict[str, Any]]:
         """
@@ -704,6 +1171,16 @@ def create_token_accumulator(
     return token_accumulator.initialize_accumulator(user_id, session_id, request_timestamp, user_tier, check_quota)
 
 
+async def acreate_token_accumulator(
+    user_id: str,
+    session_id: str,
+    user_tier: str = "free",
+    check_quota: bool = True
+) -> str:
+    """创建token累加器（异步配额检查）"""
+    return await token_accumulator.ainitialize_accumulator(user_id, session_id, user_tier, check_quota)
+
+
 async def add_token_usage(
     accumulator_key: str,
     usage: TokenUsage,
@@ -712,7 +1189,7 @@ async def add_token_usage(
     provider: str = "unknown"
 ) -> bool:
     """添加token使用情况"""
-    return token_accumulator.add_token_usage(accumulator_key, usage, agent_name, model_name, provider)
+    return await token_accumulator.aadd_token_usage(accumulator_key, usage, agent_name, model_name, provider)
 
 
 def get_billing_summary(accumulator_key: str) -> Optional[Dict[str, Any]]:
@@ -747,7 +1224,7 @@ async def get_usage_report(
         QuotaExceededError: 当配额超限时（仅hard模式）
     """
     # 获取每日使用量
-    daily_usage = quota_checker.get_daily_usage(user_id, date_str)
+    daily_usage = await quota_checker.aget_daily_usage(user_id, date_str)
 
     # 获取配额限制
     quota_limit = quota_checker._get_user_tier_quota(user_tier)
@@ -838,26 +1315,128 @@ class TokenRankingManager:
     Token排行榜管理器
 
     功能：
-    1. 每日用户Token消耗排行榜
+    1. 每日/月度用户Token消耗排行榜
     2. 每日/月度Token统计
     3. Token仪表盘数据
+
+    数据由 QuotaChecker 记录用量时同步维护（日/月排行ZSET与总量计数），
+    读取时不扫描配额键，往返次数与用户数量无关。
+    排行榜上线前已有的本月配额键在首次读取时回填一次（全局只执行一次，见 backfill_current_month）
     """
 
-    def __init__(self):
+    def __init__(self, redis_client=None):
         self.logger = logging.getLogger(__name__)
         self.connection_pool_manager = None
+        self._redis = redis_client
+        self._backfill_checked = False
 
     async def _get_redis_client(self):
         """获取Redis客户端（使用连接池管理器）"""
-        if self.connection_pool_manager is None:
-            from utils.connection_pool_manager import get_connection_pool_manager
-            self.connection_pool_manager = await get_connection_pool_manager()
+        if self._redis is not None:
+            redis_client = self._redis
+        else:
+            if self.connection_pool_manager is None:
+                from utils.connection_pool_manager import get_connection_pool_manager
+                self.connection_pool_manager = await get_connection_pool_manager()
+            redis_client = await self.connection_pool_manager.get_redis_client('normal')
+
+        if not self._backfill_checked and redis_client is not None:
+            self._backfill_checked = True
+            try:
+                if await redis_client.set(ranking_backfill_key(self._get_key_prefix()), datetime.now().isoformat(), nx=True):
+                    await self.backfill_current_month(redis_client)
+            except Exception as e:
+                self.logger.error(f"回填Token排行榜失败: {e}")
+        return redis_client
+
+    async def backfill_current_month(self, redis_client) -> int:
+        """
+        用本月已有的每日配额键回填日/月排行榜与全站统计
+
+        配额哈希的 total_tokens 包含排行榜上线后累加的部分，因此排行分值只增不减（ZADD GT），
+        统计计数取较大值，重复执行不会重复计数
 
-        return await self.connection_pool_manager.get_redis_client('normal')
+        Returns:
+            int: 回填的配额键数量
+        """
+        prefix = self._get_key_prefix()
+        month = date.today().strftime("%Y-%m")
+        daily_prefix = f"{prefix}:daily:"
+        keys = [
+            key.decode() if isinstance(key, bytes) else key
+            async for key in redis_client.scan_iter(match=f"{daily_prefix}*:{month}-*", count=500)
+        ]
+        if not keys:
+            return 0
+
+        pipe = redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hget(key, "total_tokens")
+        totals = await pipe.execute()
+
+        daily: Dict[str, Dict[str, int]] = {}
+        monthly: Dict[str, int] = {}
+        for key, total in zip(keys, totals):
+            user_id, _, date_str = key[len(daily_prefix):].rpartition(":")
+            tokens = self._to_int(total)
+            if not user_id or tokens <= 0:
+                continue
+            daily.setdefault(date_str, {})[user_id] = tokens
+            monthly[user_id] = monthly.get(user_id, 0) + tokens
+
+        set_if_greater = redis_client.register_script(SET_IF_GREATER_SCRIPT)
+        pipe = redis_client.pipeline(transaction=False)
+        for date_str, users in daily.items():
+            pipe.zadd(daily_ranking_key(prefix, date_str), users, gt=True)
+            pipe.expire(daily_ranking_key(prefix, date_str), STATS_DAILY_TTL)
+            await set_if_greater(
+                keys=[daily_stats_key(date_str)], args=[sum(users.values()), STATS_DAILY_TTL], client=pipe
+            )
+        if monthly:
+            pipe.zadd(monthly_ranking_key(prefix, month), monthly, gt=True)
+            pipe.expire(monthly_ranking_key(prefix, month), STATS_MONTHLY_TTL)
+            await set_if_greater(
+                keys=[monthly_stats_key(month)], args=[sum(monthly.values()), STATS_MONTHLY_TTL], client=pipe
+            )
+        await pipe.execute()
+
+        self.logger.info(f"已回填{month}的Token排行榜，共{len(keys)}个配额键")
+        return len(keys)
+
+    def _get_key_prefix(self) -> str:
+        try:
+            from config.settings import juben_settings
+            return juben_settings.quota.redis_key_prefix
+        except Exception:
+            return "quota"
+
+    @staticmethod
+    def _recent_dates(days: int) -> List[str]:
+        today = date.today()
+        return [(today - timedelta(days=i)).isoformat() for i in range(days)]
+
+    @staticmethod
+    def _recent_months(months: int) -> List[str]:
+        year, month = date.today().year, date.today().month
+        result = []
+        for _ in range(months):
+            result.append(f"{year:04d}-{month:02d}")
+            month -= 1
+            if month == 0:
+                year, month = year - 1, 12
+        return result
+
+    @staticmethod
+    def _to_int(value: Any) -> int:
+        if value is None:
+            return 0
+        if isinstance(value, bytes):
+            value = value.decode()
+        return int(float(value))
 
     async def get_daily_token_stats(self, days: int = 7) -> Dict[str, int]:
         """
-        获取最近几天的Token消耗统计
+        获取最近几天的Token消耗统计（一次 MGET）
 
         Args:
             days: 获取最近多少天的数据，默认7天
@@ -868,19 +1447,9 @@ class TokenRankingManager:
         try:
             redis_client = await self._get_redis_client()
 
-            daily_stats = {}
-
-            for i in range(days):
-                date_str = (date.today() - timedelta(days=i)).isoformat()
-                key = f"token_stats:daily:{date_str}"
-
-                try:
-                    value = await redis_client.get(key)
-                    tokens = int(value) if value else 0
-                    daily_stats[date_str] = tokens
-                except Exception as e:
-                    self.logger.warning(f"⚠️ 获取日统计失败: {key}, {e}")
-                    daily_stats[date_str] = 0
+            dates = self._recent_dates(days)
+            values = await redis_client.mget([daily_stats_key(d) for d in dates])
+            daily_stats = {d: self._to_int(v) for d, v in zip(dates, values)}
 
             # 按日期排序
             return dict(sorted(daily_stats.items()))
@@ -891,7 +1460,7 @@ class TokenRankingManager:
 
     async def get_monthly_token_stats(self, months: int = 3) -> Dict[str, int]:
         """
-        获取最近几个月的Token消耗统计
+        获取最近几个月的Token消耗统计（一次 MGET）
 
         Args:
             months: 获取最近多少个月的数据，默认3个月
@@ -902,19 +1471,9 @@ class TokenRankingManager:
         try:
             redis_client = await self._get_redis_client()
 
-            monthly_stats = {}
-
-            for i in range(months):
-                month = (datetime.now() - timedelta(days=i * 30)).strftime("%Y-%m")
-                key = f"token_stats:monthly:{month}"
-
-                try:
-                    value = await redis_client.get(key)
-                    tokens = int(value) if value else 0
-                    monthly_stats[month] = tokens
-                except Exception as e:
-                    self.logger.warning(f"⚠️ 获取月统计失败: {key}, {e}")
-                    monthly_stats[month] = 0
+            month_list = self._recent_months(months)
+            values = await redis_client.mget([monthly_stats_key(m) for m in month_list])
+            monthly_stats = {m: self._to_int(v) for m, v in zip(month_list, values)}
 
             # 按月份排序
             return dict(sorted(monthly_stats.items()))
@@ -923,13 +1482,44 @@ class TokenRankingManager:
             self.logger.error(f"获取月Token统计失败: {e}")
             return {}
 
+    async def _build_ranking(
+        self,
+        redis_client,
+        target_date: str,
+        entries: List[Any]
+    ) -> List[Dict[str, Any]]:
+        """根据 ZREVRANGE 结果组装排行榜，调用次数通过一次管道批量读取"""
+        prefix = self._get_key_prefix()
+        entries = [(member, score) for member, score in entries if score > 0]
+        if not entries:
+            return []
+
+        pipe = redis_client.pipeline()
+        for member, _ in entries:
+            user_id = member.decode() if isinstance(member, bytes) else member
+            pipe.hget(f"{prefix}:daily:{user_id}:{target_date}", "llm_calls")
+        call_counts = await pipe.execute()
+
+        ranking = []
+        for rank, ((member, score), llm_calls) in enumerate(zip(entries, call_counts), 1):
+            tokens = int(score)
+            llm_calls = self._to_int(llm_calls) or 1
+            ranking.append({
+                "user_id": member.decode() if isinstance(member, bytes) else member,
+                "total_tokens": tokens,
+                "llm_calls": llm_calls,
+                "avg_tokens_per_call": tokens // llm_calls,
+                "rank": rank
+            })
+        return ranking
+
     async def get_daily_user_token_ranking(
         self,
         target_date: Optional[str] = None,
         top_n: int = 10
     ) -> List[Dict[str, Any]]:
         """
-        获取指定日期用户Token消耗排行榜
+        获取指定日期用户Token消耗排行榜（ZREVRANGE + 一次管道读取调用次数）
 
         Args:
             target_date: 目标日期，格式：YYYY-MM-DD，默认今天
@@ -944,52 +1534,10 @@ class TokenRankingManager:
 
             redis_client = await self._get_redis_client()
 
-            # 从每日配额统计key获取用户数据
-            pattern = f"quota:daily:*:{target_date}"
-            keys = await redis_client.keys(pattern)
-
-            user_token_stats = {}
-
-            for key in keys:
-                try:
-                    # 确保key为字符串类型（Redis返回bytes）
-                    key_str = key.decode() if isinstance(key, bytes) else key
-
-                    # 从key中提取user_id: quota:daily:{user_id}:{date}
-                    parts = key_str.split(":")
-                    if len(parts) >= 4:
-                        user_id = parts[2]
-
-                        # 获取total_tokens字段
-                        total_tokens = await redis_client.hget(key, "total_tokens")
-                        tokens = int(total_tokens) if total_tokens else 0
-
-                        if tokens > 0:
-                            # 获取会话数和调用次数
-                            llm_calls = await redis_client.hget(key, "llm_calls")
-                            llm_calls = int(llm_calls) if llm_calls else 1
-
-                            user_token_stats[user_id] = {
-                                "user_id": user_id,
-                                "total_tokens": tokens,
-                                "llm_calls": llm_calls,
-                                "avg_tokens_per_call": tokens // llm_calls
-                            }
-
-                except Exception as e:
-                    self.logger.warning(f"处理用户Token排行数据失败: {key}, {e}")
-                    continue
-
-            # 按Token消耗量排序并取前N名
-            ranking = sorted(
-                user_token_stats.values(),
-                key=lambda x: x["total_tokens"],
-                reverse=True
-            )[:top_n]
-
-            # 添加排名信息
-            for i, user_stats in enumerate(ranking, 1):
-                user_stats["rank"] = i
+            entries = await redis_client.zrevrange(
+                daily_ranking_key(self._get_key_prefix(), target_date), 0, top_n - 1, withscores=True
+            )
+            ranking = await self._build_ranking(redis_client, target_date, entries)
 
             self.logger.info(f"获取{target_date}用户Token排行榜完成，共{len(ranking)}名用户")
             return ranking
@@ -998,25 +1546,72 @@ class TokenRankingManager:
             self.logger.error(f"获取用户Token排行榜失败: {e}")
             return []
 
+    async def get_monthly_user_token_ranking(
+        self,
+        month: Optional[str] = None,
+        top_n: int = 10
+    ) -> List[Dict[str, Any]]:
+        """
+        获取指定月份用户Token消耗排行榜
+
+        Args:
+            month: 目标月份，格式：YYYY-MM，默认本月
+            top_n: 返回前N名用户，默认10名
+
+        Returns:
+            List[Dict[str, Any]]: 用户Token消耗排行榜（user_id、total_tokens、rank）
+        """
+        try:
+            month = month or date.today().strftime("%Y-%m")
+            redis_client = await self._get_redis_client()
+            entries = await redis_client.zrevrange(
+                monthly_ranking_key(self._get_key_prefix(), month), 0, top_n - 1, withscores=True
+            )
+            return [
+                {
+                    "user_id": member.decode() if isinstance(member, bytes) else member,
+                    "total_tokens": int(score),
+                    "rank": rank
+                }
+                for rank, (member, score) in enumerate(((m, s) for m, s in entries if s > 0), 1)
+            ]
+
+        except Exception as e:
+            self.logger.error(f"获取月度用户Token排行榜失败: {e}")
+            return []
+
     async def get_token_dashboard_data(self) -> Dict[str, Any]:
         """
         获取Token统计仪表盘数据
 
+        与用户数量无关的固定往返：一次管道读取日/月统计、今日排行与活跃用户数，
+        再一次管道读取上榜用户的调用次数
+
         Returns:
             Dict[str, Any]: Token统计仪表盘数据
         """
         try:
-            # 获取基础统计数据
-            daily_stats = await self.get_daily_token_stats(7)
-            monthly_stats = await self.get_monthly_token_stats(3)
-            today_ranking = await self.get_daily_user_token_ranking(top_n=10)
+            redis_client = await self._get_redis_client()
+            prefix = self._get_key_prefix()
+            today_date = date.today().isoformat()
+            dates = self._recent_dates(7)
+            month_list = self._recent_months(3)
+            ranking_key = daily_ranking_key(prefix, today_date)
+
+            pipe = redis_client.pipeline()
+            pipe.mget([daily_stats_key(d) for d in dates])
+            pipe.mget([monthly_stats_key(m) for m in month_list])
+            pipe.zrevrange(ranking_key, 0, 9, withscores=True)
+            pipe.zcount(ranking_key, "(0", "+inf")
+            daily_values, monthly_values, entries, active_users = await pipe.execute()
+
+            daily_stats = dict(sorted({d: self._to_int(v) for d, v in zip(dates, daily_values)}.items()))
+            monthly_stats = dict(sorted({m: self._to_int(v) for m, v in zip(month_list, monthly_values)}.items()))
+            today_ranking = await self._build_ranking(redis_client, today_date, entries)
 
             # 计算总体统计
-            today_total = 0
             weekly_total = sum(daily_stats.values())
             monthly_total = sum(monthly_stats.values())
-
-            today_date = date.today().isoformat()
             today_total = daily_stats.get(today_date, 0)
 
             # 格式化图表数据
@@ -1035,7 +1630,8 @@ class TokenRankingManager:
                     "today_tokens": today_total,
                     "weekly_tokens": weekly_total,
                     "monthly_tokens": monthly_total,
-                    "today_top_users": len(today_ranking)
+                    "today_top_users": len(today_ranking),
+                    "today_active_users": int(active_users or 0)
                 },
                 "daily_chart": daily_chart_data,
                 "monthly_chart": monthly_chart_data,
@@ -1050,7 +1646,8 @@ class TokenRankingManager:
                     "today_tokens": 0,
                     "weekly_tokens": 0,
                     "monthly_tokens": 0,
-                    "today_top_users": 0
+                    "today_top_users": 0,
+                    "today_active_users": 0
                 },
                 "daily_chart": {"labels": [], "token_counts": []},
                 "monthly_chart": {"labels": [], "token_counts": []},
@@ -1073,10 +1670,10 @@ def get_token_ranking_manager() -> TokenRankingManager:
 
 # ==================== 便捷函数 ====================
 
-async def get_daily_token_ranking(top_n: int = 10) -> List[Dict[str, Any]]:
+async def get_daily_token_ranking(top_n: int = 10, target_date: Optional[str] = None) -> List[Dict[str, Any]]:
     """获取每日Token排行榜"""
     manager = get_token_ranking_manager()
-    return await manager.get_daily_user_token_ranking(top_n=top_n)
+    return await manager.get_daily_user_token_ranking(target_date=target_date, top_n=top_n)
 
 
 async def get_token_stats(days: int = 7) -> Dict[str, int]:
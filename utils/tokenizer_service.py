@@ -0,0 +1,294 @@
+"""
+Token计数服务
+所有Token预算相关代码共享的分词计数：按模型选择编码，按内容哈希做LRU缓存，支持消息列表批量计数
+
+编码选择（均为离线加载，不在请求路径上下载词表）：
+- OpenAI（gpt-*、o1/o3 等）：tiktoken BPE（cl100k_base / o200k_base，词表文件需预先放入 TIKTOKEN_CACHE_DIR，
+  缓存中没有词表文件时不加载 tiktoken，避免首次计数时联网下载）
+- GLM / Qwen：本地 tokenizer.json（需要 tokenizers，目录由 TOKENIZER_DIR 指定，如 <dir>/glm/tokenizer.json）
+- 其余模型或依赖/词表缺失：启发式估算（中文约1字符=1token，其他约4字符=1token）
+
+构建上下文时同一段历史会被反复计数，缓存命中后不再重复分词
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    tiktoken = None
+    TIKTOKEN_AVAILABLE = False
+
+try:
+    from tokenizers import Tokenizer
+    TOKENIZERS_AVAILABLE = True
+except ImportError:
+    Tokenizer = None
+    TOKENIZERS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 中文字符（与原各处估算口径一致）
+_CJK_PATTERN = re.compile(r"[\u4e00-\u9fff]")
+
+# 短文本直接计数，不进入缓存
+MIN_CACHED_LENGTH = 64
+
+# 每条消息的角色/格式开销
+MESSAGE_OVERHEAD_TOKENS = 5
+
+HEURISTIC_ENCODING = "heuristic"
+
+# tiktoken 词表下载地址（缓存文件名为地址的 sha1）
+TIKTOKEN_BLOB_URLS = {
+    "cl100k_base": "https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken",
+    "o200k_base": "https://openaipublic.blob.core.windows.net/encodings/o200k_base.tiktoken",
+}
+
+
+def tiktoken_cache_file(name: str) -> Optional[Path]:
+    """
+    tiktoken 词表在本地缓存中的路径（与 tiktoken 的缓存规则一致）
+
+    Returns:
+        缓存文件路径；未知编码或缓存被禁用（TIKTOKEN_CACHE_DIR 为空）时返回 None
+    """
+    url = TIKTOKEN_BLOB_URLS.get(name)
+    if url is None:
+        return None
+    if "TIKTOKEN_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["TIKTOKEN_CACHE_DIR"]
+    elif "DATA_GYM_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["DATA_GYM_CACHE_DIR"]
+    else:
+        cache_dir = os.path.join(tempfile.gettempdir(), "data-gym-cache")
+    if not cache_dir:
+        return None
+    return Path(cache_dir) / hashlib.sha1(url.encode()).hexdigest()
+
+
+def _resolve_encoding_name(model: Optional[str]) -> str:
+    """模型名 -> 编码名"""
+    name = (model or "").lower()
+    # OpenRouter 等带厂商前缀的模型名（如 openai/gpt-4o）
+    name = name.rsplit("/", 1)[-1]
+    if name.startswith(("gpt-4o", "gpt-4.1", "o1", "o3", "o4")):
+        return "o200k_base"
+    if name.startswith(("gpt-3.5", "gpt-4", "text-embedding")):
+        return "cl100k_base"
+    if "glm" in name:
+        return "glm"
+    if "qwen" in name:
+        return "qwen"
+    return HEURISTIC_ENCODING
+
+
+class _HeuristicEncoding:
+    """启发式估算（正则计数，避免逐字符 Python 循环）"""
+
+    name = HEURISTIC_ENCODING
+
+    def count_batch(self, texts: List[str]) -> List[int]:
+        counts = []
+        for text in texts:
+            chinese_chars = len(_CJK_PATTERN.findall(text))
+            other_chars = len(text) - chinese_chars
+            counts.append(chinese_chars + max(1, other_chars // 4))
+        return counts
+
+
+class _TiktokenEncoding:
+    """tiktoken BPE 编码"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._encoding = tiktoken.get_encoding(name)
+
+    def count_batch(self, texts: List[str]) -> List[int]:
+        return [len(tokens) for tokens in self._encoding.encode_ordinary_batch(texts)]
+
+
+class _HFTokenizerEncoding:
+    """本地 tokenizer.json 编码（GLM / Qwen）"""
+
+    def __init__(self, name: str, path: Path):
+        self.name = name
+        self._tokenizer = Tokenizer.from_file(str(path))
+
+    def count_batch(self, texts: List[str]) -> List[int]:
+        return [len(encoding.ids) for encoding in self._tokenizer.encode_batch(texts, add_special_tokens=False)]
+
+
+class TokenizerService:
+    """共享的Token计数服务"""
+
+    def __init__(self, tokenizer_dir: Optional[str] = None, cache_size: Optional[int] = None):
+        """
+        初始化Token计数服务
+
+        Args:
+            tokenizer_dir: 本地 tokenizer 目录（默认读取 TOKENIZER_DIR）
+            cache_size: LRU 缓存条目数（默认读取 TOKENIZER_CACHE_SIZE）
+        """
+        self.tokenizer_dir = Path(tokenizer_dir or os.getenv("TOKENIZER_DIR", "models/tokenizers"))
+        self.cache_size = cache_size if cache_size is not None else int(os.getenv("TOKENIZER_CACHE_SIZE", "4096"))
+
+        self._heuristic = _HeuristicEncoding()
+        self._encodings: Dict[str, Any] = {HEURISTIC_ENCODING: self._heuristic}
+        self._encoding_lock = threading.Lock()
+
+        self._cache: "OrderedDict[Tuple[str, bytes], int]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ==================== 编码加载 ====================
+
+    def _load_encoding(self, name: str):
+        """加载编码，失败时回退到启发式估算"""
+        try:
+            if name in TIKTOKEN_BLOB_URLS:
+                cache_file = tiktoken_cache_file(name)
+                if TIKTOKEN_AVAILABLE and cache_file is not None and cache_file.exists():
+                    return _TiktokenEncoding(name)
+                if TIKTOKEN_AVAILABLE:
+                    logger.warning(f"tiktoken 词表 {name} 不在本地缓存中（{cache_file}），使用启发式估算")
+            else:
+                path = self.tokenizer_dir / name / "tokenizer.json"
+                if TOKENIZERS_AVAILABLE and path.exists():
+                    return _HFTokenizerEncoding(name, path)
+        except Exception as e:
+            logger.warning(f"加载分词器失败({name})，使用启发式估算: {e}")
+        return self._heuristic
+
+    def get_encoding(self, model: Optional[str] = None):
+        """获取模型对应的编码（首次使用时加载）"""
+        name = _resolve_encoding_name(model)
+        encoding = self._encodings.get(name)
+        if encoding is None:
+            with self._encoding_lock:
+                encoding = self._encodings.get(name)
+                if encoding is None:
+                    encoding = self._load_encoding(name)
+                    self._encodings[name] = encoding
+        return encoding
+
+    # ==================== 计数 ====================
+
+    def count(self, text: str, model: Optional[str] = None) -> int:
+        """计算单段文本的token数"""
+        if not text:
+            return 0
+        return self.count_batch([text], model)[0]
+
+    def count_batch(self, texts: Iterable[str], model: Optional[str] = None) -> List[int]:
+        """
+        批量计算token数
+
+        缓存未命中的文本一次性交给分词器批量编码
+
+        Args:
+            texts: 文本列表
+            model: 模型名（决定编码）
+
+        Returns:
+            List[int]: 与输入对齐的token数
+        """
+        texts = list(texts)
+        encoding = self.get_encoding(model)
+        counts: List[int] = [0] * len(texts)
+        missing: List[int] = []
+        keys: Dict[int, Tuple[str, bytes]] = {}
+
+        with self._cache_lock:
+            for index, text in enumerate(texts):
+                if not text:
+                    continue
+                if len(text) < MIN_CACHED_LENGTH or self.cache_size <= 0:
+                    missing.append(index)
+                    continue
+                key = (encoding.name, hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest())
+                cached = self._cache.get(key)
+                if cached is None:
+                    keys[index] = key
+                    missing.append(index)
+                    self.misses += 1
+                else:
+                    self._cache.move_to_end(key)
+                    counts[index] = cached
+                    self.hits += 1
+
+        if not missing:
+            return counts
+
+        encoded = encoding.count_batch([texts[index] for index in missing])
+        with self._cache_lock:
+            for index, value in zip(missing, encoded):
+                counts[index] = value
+                key = keys.get(index)
+                if key is not None:
+                    self._cache[key] = value
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+        return counts
+
+    def count_messages(
+        self,
+        messages: List[Dict[str, Any]],
+        model: Optional[str] = None,
+        per_message_overhead: int = MESSAGE_OVERHEAD_TOKENS
+    ) -> int:
+        """
+        计算消息列表的总token数
+
+        Args:
+            messages: 消息列表（content 非字符串时按 str() 计数）
+            model: 模型名
+            per_message_overhead: 每条消息的角色/格式开销
+
+        Returns:
+            int: 总token数
+        """
+        contents = []
+        for message in messages:
+            content = message.get("content", "")
+            contents.append(content if isinstance(content, str) else str(content or ""))
+        return sum(self.count_batch(contents, model)) + per_message_overhead * len(messages)
+
+    def cache_info(self) -> Dict[str, Any]:
+        """缓存统计"""
+        with self._cache_lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._cache),
+                "max_size": self.cache_size,
+                "encodings": {name: encoding.name for name, encoding in self._encodings.items()},
+            }
+
+    def clear_cache(self):
+        """清空缓存"""
+        with self._cache_lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# 全局Token计数服务实例
+_tokenizer_service: Optional[TokenizerService] = None
+
+
+def get_tokenizer_service() -> TokenizerService:
+    """获取Token计数服务单例"""
+    global _tokenizer_service
+    if _tokenizer_service is None:
+        _tokenizer_service = TokenizerService()
+    return _tokenizer_service
@@ -231,17 +231,13 @@ class VectorStore:
         try:
             self.ensure_initialized()
             
-            collection = await self.milvus_client.get_collection(collection_name)
-            if not collection:
-                return False
-            
             # 构建删除表达式
-            expr = f"text_id in {text_ids}"
-            
-            # 执行删除
-            collection.delete(expr)
-            collection.flush()
-            
+            expr = f"text_id in {list(text_ids)}"
+
+            # 执行删除（Milvus与本地向量后端接口一致）
+            if not await self.milvus_client.delete_by_expr(collection_name, expr):
+                return False
+
             self.logger.info(f"✅ 从集合 {collection_name} 删除 {len(text_ids)} 个文档")
             return True
             
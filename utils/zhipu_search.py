@@ -3,6 +3,7 @@
 基于智谱AI的web_search功能，提供网络搜索服务
 """
 import os
+import asyncio
 import logging
 from typing import Dict, Any, List, Optional
 from pathlib import Path
@@ -15,6 +16,11 @@ env_path = project_root / ".env"
 if env_path.exists():
     load_dotenv(env_path)
 
+try:
+    from ..utils.http_pool import get_sync_http_client
+except ImportError:
+    from utils.http_pool import get_sync_http_client
+
 # 设置日志
 logger = logging.getLogger(__name__)
 
@@ -42,7 +48,7 @@ class ZhipuSearchClient:
         if ZhipuAI is None:
             raise ImportError("zhipuai包未安装")
         
-        self.client = ZhipuAI(api_key=self.api_key)
+        self.client = ZhipuAI(api_key=self.api_key, http_client=get_sync_http_client())
         self.search_engine = "search-std"
         self.default_count = 5
         self.default_content_size = "medium"
@@ -94,6 +100,10 @@ class ZhipuSearchClient:
                 "results": []
             }
     
+    async def asearch_web(self, query: str, count: Optional[int] = None, content_size: Optional[str] = None) -> Dict[str, Any]:
+        """搜索网络内容（异步接口，SDK调用在线程中执行，不阻塞事件循环）"""
+        return await asyncio.to_thread(self.search_web, query, count, content_size)
+
     def _parse_search_response(self, response) -> List[Dict[str, Any]]:
         """
         解析智谱AI搜索结果